@@ -1,23 +1,36 @@
 from typing import Dict
+import functools
 import os
 import dash_bootstrap_components as dbc
 from dash import Dash, dcc, html, Input, Output
 import components as cmp
-from config import CREDENTIALS_DICT, PROJECT_ID, REQUIRED_ENV_VARS
+from config import DATA_BACKEND, REQUIRED_ENV_VARS
 from guide.layout import create_layout as create_guide_layout
 from market_dashboard.layout import create_layout as create_market_dashboard_layout
 from portfolio_dashboard.layout import create_layout as create_portfolio_dashboard_layout
 from portfolio_form.layout import create_layout as create_portfolio_form_layout
+from risk_dashboard.layout import create_layout as create_risk_dashboard_layout
 from market_dashboard.callbacks import register_callbacks as register_market_callbacks
 from portfolio_dashboard.callbacks import register_callbacks as register_portfolio_callbacks
 from portfolio_form.callbacks import register_callbacks as register_portfolio_form_callbacks
+from risk_dashboard.callbacks import register_callbacks as register_risk_callbacks
 import services.db as db
-from utils.google_cloud_utils import get_bigquery_client
+from services.governor import register_governor
+from services.jobs import create_background_manager
+from services.sequencing import register_sequencing
+from services.ticker_index import TickerIndex, get_ticker_index, set_ticker_index
+from utils.http_utils import register_http_caching
+from utils.metrics import configure_logging, instrument_callbacks, register_metrics_route
 
 def create_app() -> Dash:
     # Init Dash app with bootstrap theme
     dbc_css = "https://cdn.jsdelivr.net/gh/AnnMarieW/dash-bootstrap-templates/dbc.min.css"
-    app = Dash(__name__, external_stylesheets=[dbc.themes.LUX, dbc_css])
+    # Heavy callbacks run as background jobs when a job manager is available
+    app = Dash(
+        __name__,
+        external_stylesheets=[dbc.themes.LUX, dbc_css],
+        background_callback_manager=create_background_manager(),
+    )
     app.title = 'Stock Market Analytics App'
 
     # Define paths for the sidebar
@@ -25,6 +38,7 @@ def create_app() -> Dash:
         'Market Dashboard': '/',
         'My Portfolio': '/portfolio-form',
         'Portfolio Dashboard': '/portfolio-dashboard',
+        'Risk Dashboard': '/risk',
         'User Guide': '/guide',
     }
     
@@ -44,6 +58,9 @@ def create_app() -> Dash:
             dcc.Location(id='url'),
             dcc.Store(id={'type': 'portfolio-data', 'section': 'global'}, storage_type='local'),
             dcc.Store(id={'type': 'price-data', 'section': 'global'}, storage_type='local'),
+            dcc.Store(id={'type': 'ledger-data', 'section': 'global'}, storage_type='local'),
+            # Per-tab id used to sequence bursts of callback calls
+            dcc.Store(id={'type': 'session-id', 'section': 'global'}, storage_type='session'),
             dbc.Row([
                 sidebar,
                 dbc.Col(content, sm=12, md={'size': 10, 'offset': 2}, className='mb-4')
@@ -54,31 +71,44 @@ def create_app() -> Dash:
     )
 
     # Validate all required environment variables
-    for var in REQUIRED_ENV_VARS:
-        if var not in os.environ:
-            raise EnvironmentError(f"Missing required environment variable: {var}")
+    if DATA_BACKEND == 'bigquery':
+        for var in REQUIRED_ENV_VARS:
+            if var not in os.environ:
+                raise EnvironmentError(f"Missing required environment variable: {var}")
 
-    # Get tickers list from BigQuery
-    client = get_bigquery_client(CREDENTIALS_DICT, PROJECT_ID)
-    tickers = db.get_tickers(client)
+    # Get tickers with their names and sectors and index them for the search dropdowns
+    client = db.get_client()
+    ticker_index = set_ticker_index(TickerIndex.from_metadata(db.get_ticker_metadata(client)))
+    tickers = ticker_index.tickers
 
-    # Handle page navigation through callbacks
-    @app.callback(
-        Output('page-content', 'children'),
-        Input('url', 'pathname')
-    )
-    def display_page(pathname: str) -> html.Div:
+    # Page layouts only depend on the ticker universe, so each is built once per version
+    @functools.lru_cache(maxsize=16)
+    def render_page(pathname: str, tickers_version: str) -> html.Div:
+        index_tickers = get_ticker_index().tickers
         if pathname == '/':
-            return create_market_dashboard_layout(tickers)
+            return create_market_dashboard_layout(index_tickers)
         elif pathname == '/portfolio-form':
-            return create_portfolio_form_layout(tickers)
+            return create_portfolio_form_layout(index_tickers)
         elif pathname == '/portfolio-dashboard':
             return create_portfolio_dashboard_layout()
+        elif pathname == '/risk':
+            return create_risk_dashboard_layout()
         elif pathname == '/guide':
             return create_guide_layout()
         else:
             return html.H1('404 - Page Not Found', className='text-center text-danger fs-4 fw-bold mt-5')
 
+    # Handle page navigation through callbacks
+    @app.callback(
+        Output('page-content', 'children'),
+        Input('url', 'pathname')
+    )
+    def display_page(pathname: str) -> html.Div:
+        # Unknown paths share one cache entry
+        if pathname not in paths.values():
+            pathname = None
+        return render_page(pathname, get_ticker_index().version)
+
     # Fetch stock prices on app load
     @app.callback(
         Output({"type": "price-data", "section": "global"}, "data"),
@@ -99,6 +129,21 @@ def create_app() -> Dash:
     register_market_callbacks(app)
     register_portfolio_callbacks(app)
     register_portfolio_form_callbacks(app)
+    register_risk_callbacks(app)
+
+    # Record per-callback timings and expose them for Prometheus
+    configure_logging()
+    instrument_callbacks(app)
+    register_metrics_route(app.server)
+
+    # Enforce query byte budgets per request and report cost per interaction
+    register_governor(app)
+
+    # Identify browser tabs so bursts of the same callback only compute the latest call
+    register_sequencing(app)
+
+    # Compress responses and let browsers revalidate static resources with ETags
+    register_http_caching(app.server)
     return app
 
 # Init app and server
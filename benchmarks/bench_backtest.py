@@ -0,0 +1,67 @@
+"""
+Rebalancing backtest benchmark.
+
+Generates daily closes on business days and times the vectorized backtest for
+every rebalance schedule, next to a day-by-day loop that trades the same
+holdings as a reference.
+
+Usage:
+    python -m benchmarks.bench_backtest --assets 500 --years 20
+"""
+import argparse
+import time
+import numpy as np
+from services.backtest import SCHEDULES, rebalance_flags, run_backtest
+
+def generate_prices(n_assets: int, years: float, seed: int):
+    rng = np.random.default_rng(seed)
+    start = np.datetime64('2000-01-03')
+    calendar = np.arange(start, start + int(years * 365.25))
+    dates = calendar[np.is_busday(calendar)]
+    returns = rng.normal(0.0003, 0.015, size=(len(dates), n_assets))
+    closes = 100 * np.exp(np.cumsum(returns, axis=0))
+    weights = rng.random(n_assets)
+    return dates, closes, weights / weights.sum()
+
+def loop_backtest(closes: np.ndarray, dates: np.ndarray, weights: np.ndarray, schedule: str) -> np.ndarray:
+    """Reference implementation that values and rebalances the holdings one day at a time."""
+    flags = rebalance_flags(dates, schedule)
+    shares = weights / closes[0]
+    equity = np.empty(len(dates))
+    for day in range(len(dates)):
+        equity[day] = shares @ closes[day]
+        if flags[day]:
+            shares = equity[day] * weights / closes[day]
+    return equity
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Benchmark the vectorized rebalancing backtest.')
+    parser.add_argument('--assets', type=int, default=500)
+    parser.add_argument('--years', type=float, default=20)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    dates, closes, weights = generate_prices(args.assets, args.years, args.seed)
+    print(f"assets={args.assets} days={len(dates)} schedules={len(SCHEDULES)}")
+    total = 0.0
+    for schedule in SCHEDULES:
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            result = run_backtest(closes, dates, weights, schedule)
+            timings.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        reference = loop_backtest(closes, dates, weights, schedule)
+        loop_ms = (time.perf_counter() - start) * 1000
+        assert np.allclose(result.equity, reference)
+        best_ms = min(timings) * 1000
+        total += best_ms
+        print(
+            f"schedule={schedule:<9} rebalances={len(result.turnover):>3} "
+            f"vectorized={best_ms:>7.1f}ms loop={loop_ms:>7.1f}ms speedup={loop_ms / best_ms:>5.1f}x"
+        )
+    print(f"all schedules={total:.1f}ms")
+
+if __name__ == '__main__':
+    main()
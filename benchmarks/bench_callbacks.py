@@ -0,0 +1,288 @@
+"""
+End-to-end latency benchmark for the Dash callbacks.
+
+Each callback is invoked through the _dash-update-component endpoint against the
+local data backend, so timings include querying, DataFrame work, figure
+construction and JSON serialization. Stage times are summed per request, so
+stages running concurrently on the query executor can add up to more than
+the wall-clock total.
+
+Usage:
+    python -m benchmarks.bench_callbacks --tickers 500 --years 10 --out results.json
+    python -m benchmarks.bench_callbacks --compare base.json head.json
+"""
+import argparse
+import datetime as dt
+import functools
+import json
+import os
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+from typing import Any, Callable, Dict, List
+import numpy as np
+
+PERIODS = ['1 month', '3 months', '6 months', '1 year', '5 years', 'max']
+CORR_TICKER_COUNTS = [2, 5, 10, 25]
+PORTFOLIO_SIZES = [1, 10, 50]
+CORR_VIEWS = ['matrix', 'clustered', 'sector', 'pairs']
+
+class StageTimer:
+    """Accumulate time spent in patched functions, grouped by stage."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.durations = defaultdict(float)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.durations = defaultdict(float)
+
+    def wrap(self, stage: str, func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                with self._lock:
+                    self.durations[stage] += elapsed
+        return wrapper
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self.durations)
+
+def install_stage_timers(timer: StageTimer) -> None:
+    """Patch the data, figure and serialization layers with stage timers."""
+    import dash._callback
+    import components as cmp
+    import services.db as db
+
+    db._execute_query = timer.wrap('query', db._execute_query)
+    for name in ['get_price_data', 'get_volume_data', 'get_corr_matrix', 'get_sector_data',
+                 'get_stocks_current_price', 'aggregate_portfolio_by_sector']:
+        setattr(db, name, timer.wrap('fetch', getattr(db, name)))
+    for name in dir(cmp):
+        if name.startswith('create_') and (name.endswith('_chart') or name.endswith('_heatmap')):
+            setattr(cmp, name, timer.wrap('figure', getattr(cmp, name)))
+    dash._callback.to_json = timer.wrap('serialize', dash._callback.to_json)
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    values_ms = np.array(values) * 1000
+    return {
+        'p50': round(float(np.percentile(values_ms, 50)), 3),
+        'p95': round(float(np.percentile(values_ms, 95)), 3),
+        'p99': round(float(np.percentile(values_ms, 99)), 3),
+        'mean': round(float(values_ms.mean()), 3),
+    }
+
+def build_scenarios(tickers: List[str], prices: Dict[str, float], n_tickers: int) -> List[Dict[str, Any]]:
+    """Build the parameter grid as (callback, params, inputs, state, changed) scenarios."""
+    # Sequenced market callbacks take the tab's session id as their last State
+    session = [uuid.uuid4().hex]
+    scenarios = []
+    for ticker in tickers[:n_tickers]:
+        for period in PERIODS:
+            scenarios.append({
+                'callback': 'update_stock_and_volume_charts',
+                'params': {'ticker': ticker, 'period': period},
+                'inputs': [ticker, period, 'all'],
+                'state': session,
+            })
+    for count in CORR_TICKER_COUNTS:
+        for period in PERIODS:
+            scenarios.append({
+                'callback': 'update_heatmap',
+                'params': {'corr_tickers': count, 'period': period},
+                'inputs': [tickers[:count], period, 'matrix', 'selected'],
+                'state': session,
+            })
+    # Every view over the full universe
+    for view in CORR_VIEWS:
+        scenarios.append({
+            'callback': 'update_heatmap',
+            'params': {'corr_tickers': len(tickers), 'view': view},
+            'inputs': [tickers[:2], '1 year', view, 'all'],
+            'state': session,
+        })
+    # Rebased performance and rolling correlation against the universe and against one of the selection
+    for benchmark in ['universe', tickers[0]]:
+        for period in PERIODS:
+            scenarios.append({
+                'callback': 'update_comparison',
+                'params': {'corr_tickers': 5, 'benchmark': benchmark, 'period': period},
+                'inputs': [tickers[:5], period, benchmark, '90'],
+                'state': session,
+            })
+    # Sector indices and rotation under each weighting and view
+    for weighting in ['equal', 'cap']:
+        for view in ['index', 'relative']:
+            scenarios.append({
+                'callback': 'update_sector_charts',
+                'params': {'weighting': weighting, 'view': view},
+                'inputs': ['1 year', weighting, view],
+                'state': session,
+            })
+    for size in PORTFOLIO_SIZES:
+        holdings = tickers[:size]
+        total = sum(prices.get(ticker, 0) * 10 for ticker in holdings)
+        portfolio = json.dumps([
+            {
+                'Ticker': ticker,
+                'Shares': 10,
+                'Price': prices.get(ticker, 0),
+                'Value': prices.get(ticker, 0) * 10,
+                'Weight': round(prices.get(ticker, 0) * 10 / total, 2) if total else 0,
+            }
+            for ticker in holdings
+        ])
+        scenarios.append({
+            'callback': 'update_dashboard',
+            'params': {'portfolio_size': size},
+            'inputs': ['/portfolio-dashboard', portfolio],
+            'changed': [1],
+        })
+        new_ticker = tickers[size % len(tickers)]
+        scenarios.append({
+            'callback': 'handle_portfolio_update',
+            'params': {'portfolio_size': size},
+            'inputs': [1, None, None],
+            'state': [new_ticker, 5, portfolio, prices, None, None, None],
+        })
+    return scenarios
+
+def run_benchmark(repeats: int, n_tickers: int) -> List[Dict[str, Any]]:
+    # The app reads its configuration on import, so it is imported here
+    import app as dash_app
+    import services.db as db
+    from benchmarks.dash_client import DashCallbackClient
+
+    client = DashCallbackClient(dash_app.app)
+    backend = db.get_client()
+    tickers = db.get_tickers(backend)
+    prices = db.get_stocks_current_price(backend, tickers)
+
+    timer = StageTimer()
+    install_stage_timers(timer)
+
+    results = []
+    for scenario in build_scenarios(tickers, prices, n_tickers):
+        latencies, stages, payload_bytes = [], defaultdict(list), 0
+        for i in range(repeats + 1):
+            timer.reset()
+            payload = client.build_payload(
+                scenario['callback'], scenario['inputs'], scenario.get('state'), scenario.get('changed')
+            )
+            start = time.perf_counter()
+            status, body = client.post(payload)
+            elapsed = time.perf_counter() - start
+            if status != 200:
+                raise RuntimeError(f"{scenario['callback']} failed with status {status}: {body[:200]}")
+            # The first run warms imports and Plotly templates
+            if i == 0:
+                continue
+            latencies.append(elapsed)
+            payload_bytes = len(body)
+            for stage, duration in timer.snapshot().items():
+                stages[stage].append(duration)
+
+        stage_summary = {stage: summarize(values) for stage, values in stages.items()}
+        # DataFrame work is the fetcher time not spent waiting on the backend
+        if 'fetch' in stages and 'query' in stages:
+            stage_summary['dataframe'] = summarize(
+                [max(f - q, 0) for f, q in zip(stages['fetch'], stages['query'])]
+            )
+        results.append({
+            'callback': scenario['callback'],
+            'params': scenario['params'],
+            'samples': len(latencies),
+            'latency_ms': summarize(latencies),
+            'stages_ms': stage_summary,
+            'payload_bytes': payload_bytes,
+        })
+        print(f"{scenario['callback']:<32} {json.dumps(scenario['params']):<48} "
+              f"p50={results[-1]['latency_ms']['p50']:>9.2f}ms p95={results[-1]['latency_ms']['p95']:>9.2f}ms "
+              f"bytes={payload_bytes:>9}")
+    return results
+
+def compare_results(base_path: str, head_path: str) -> None:
+    """Print p50/p95 latency and payload changes between two result files."""
+    with open(base_path) as f:
+        base = json.load(f)
+    with open(head_path) as f:
+        head = json.load(f)
+
+    def key(result):
+        return result['callback'], json.dumps(result['params'], sort_keys=True)
+
+    base_results = {key(result): result for result in base['results']}
+    for result in head['results']:
+        previous = base_results.get(key(result))
+        if previous is None:
+            continue
+        deltas = []
+        for metric in ['p50', 'p95']:
+            old, new = previous['latency_ms'][metric], result['latency_ms'][metric]
+            deltas.append(f"{metric} {old:.1f}->{new:.1f}ms ({(new - old) / old:+.0%})" if old else metric)
+        old_bytes, new_bytes = previous['payload_bytes'], result['payload_bytes']
+        deltas.append(f"bytes {old_bytes}->{new_bytes}")
+        print(f"{result['callback']:<32} {key(result)[1]:<48} " + '  '.join(deltas))
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True).strip()
+    except Exception:
+        return 'unknown'
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Benchmark Dash callback latency against the local data backend.')
+    parser.add_argument('--data-dir', help='Existing local dataset (generated when omitted)')
+    parser.add_argument('--tickers', type=int, default=500, help='Tickers in the generated dataset')
+    parser.add_argument('--years', type=float, default=10, help='Years of history in the generated dataset')
+    parser.add_argument('--chart-tickers', type=int, default=3, help='Tickers used for the price chart grid')
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--cache', action='store_true', help='Keep the query result cache enabled')
+    parser.add_argument('--out', help='Write results to this JSON file')
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'HEAD'), help='Compare two result files')
+    args = parser.parse_args()
+
+    if args.compare:
+        compare_results(*args.compare)
+        return
+
+    data_dir = args.data_dir
+    if not data_dir:
+        from utils.synthetic_data import write_local_dataset
+        data_dir = tempfile.mkdtemp(prefix='sma-bench-')
+        write_local_dataset(data_dir, args.tickers, args.years)
+
+    # Configure the app before it is imported
+    os.environ['DATA_BACKEND'] = 'local'
+    os.environ['LOCAL_DATA_DIR'] = data_dir
+    if not args.cache:
+        os.environ['QUERY_CACHE_TTL_SECONDS'] = '0'
+
+    results = run_benchmark(args.repeats, args.chart_tickers)
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump({
+                'meta': {
+                    'commit': _git_commit(),
+                    'timestamp': dt.datetime.now().isoformat(timespec='seconds'),
+                    'data_dir': data_dir,
+                    'tickers': args.tickers,
+                    'years': args.years,
+                    'repeats': args.repeats,
+                    'cache': args.cache,
+                },
+                'results': results,
+            }, f, indent=2)
+        print(f"Results written to {args.out}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""
+Tax-lot ledger benchmark.
+
+Builds a random ledger of buys and sells and times, per cost-basis method,
+the first full pass over the history and the update after one more trade is
+appended, including the P&L summary the dashboard shows.
+
+Usage:
+    python -m benchmarks.bench_ledger --trades 100000 --tickers 50
+"""
+import argparse
+import time
+import numpy as np
+from services.ledger import COST_METHODS, Ledger, clear_cost_basis_cache, get_cost_basis, summarize_pnl
+
+def generate_ledger(n_trades: int, n_tickers: int, seed: int) -> Ledger:
+    rng = np.random.default_rng(seed)
+    tickers = [f"T{i}" for i in range(n_tickers)]
+    ledger = Ledger()
+    for code, quantity, price, sell in zip(
+        rng.integers(n_tickers, size=n_trades).tolist(),
+        rng.integers(1, 100, size=n_trades).astype(float).tolist(),
+        rng.uniform(50, 150, size=n_trades).tolist(),
+        (rng.random(n_trades) < 0.4).tolist(),
+    ):
+        position = ledger.position(tickers[code])
+        if sell and position > 0:
+            quantity = -min(position, quantity)
+        ledger.append(tickers[code], quantity, price)
+    return ledger
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Benchmark cost-basis and P&L computation on a trade ledger.')
+    parser.add_argument('--trades', type=int, default=100_000)
+    parser.add_argument('--tickers', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    ledger = generate_ledger(args.trades, args.tickers, args.seed)
+    prices = {ticker: 100.0 for ticker in ledger.tickers}
+    start = time.perf_counter()
+    Ledger.from_dict(ledger.to_dict())
+    print(f"trades={len(ledger)} store round trip={(time.perf_counter() - start) * 1000:.1f}ms")
+
+    clear_cost_basis_cache()
+    for method in COST_METHODS:
+        start = time.perf_counter()
+        get_cost_basis(ledger, method)
+        replay_ms = (time.perf_counter() - start) * 1000
+
+        ledger.append(ledger.tickers[0], 10, 100.0)
+        start = time.perf_counter()
+        summarize_pnl(get_cost_basis(ledger, method).positions(ledger.tickers, prices))
+        append_ms = (time.perf_counter() - start) * 1000
+        print(f"method={method:<8} full pass={replay_ms:>7.1f}ms after append={append_ms:>6.2f}ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+"""
+Bytes-on-the-wire benchmark for each page of the app.
+
+For every page the app shell (index, layout and dependencies) and the callbacks
+the page fires on load are requested once per encoding, and the response sizes
+are summed. A second visit revalidates the shell with If-None-Match to show what
+the ETags save.
+
+Usage:
+    python -m benchmarks.bench_payloads --tickers 500 --years 10
+    python -m benchmarks.bench_payloads --url http://localhost:8050
+"""
+import argparse
+import json
+import os
+import tempfile
+import uuid
+from typing import Any, Dict, List, Tuple
+
+SHELL_PATHS = ['/', '/_dash-layout', '/_dash-dependencies']
+PAGES = ['/', '/portfolio-form', '/portfolio-dashboard', '/guide']
+
+def build_page_requests(tickers: List[str], prices: Dict[str, float], page: str) -> List[Tuple[str, list, list, list]]:
+    """Callbacks fired when a page loads as (name, inputs, state, changed)."""
+    holdings = tickers[:10]
+    total = sum(prices.get(ticker, 0) * 10 for ticker in holdings)
+    portfolio = json.dumps([
+        {
+            'Ticker': ticker,
+            'Shares': 10,
+            'Price': prices.get(ticker, 0),
+            'Value': prices.get(ticker, 0) * 10,
+            'Weight': round(prices.get(ticker, 0) * 10 / total, 2) if total else 0,
+        }
+        for ticker in holdings
+    ])
+
+    # Sequenced market callbacks take the tab's session id as their last State
+    session = [uuid.uuid4().hex]
+    page_requests = [('display_page', [page], [], [0]), ('fetch_prices_on_load', [page], [], [0])]
+    if page == '/':
+        page_requests += [
+            ('update_stock_and_volume_charts', [tickers[0], '1 month', 'all'], session, [0]),
+            ('update_heatmap', [tickers[:2], '1 month', 'matrix', 'selected'], session, [0]),
+            ('update_comparison', [tickers[:2], '1 month', 'universe', '30'], session, [0]),
+            ('update_overview', ['1 day'], [], [0]),
+            ('update_sector_charts', ['1 month', 'equal', 'index'], session, [0]),
+        ]
+    elif page == '/portfolio-form':
+        page_requests.append(('update_portfolio_list', [portfolio], [], [0]))
+    elif page == '/portfolio-dashboard':
+        page_requests.append(('update_dashboard', [page, portfolio], [], [1]))
+        page_requests.append(('update_optimizer', [page, portfolio, '1 year', 'long_only'], [], [1]))
+    return page_requests
+
+def measure_page(client, page_requests: List[Tuple[str, list, list, list]], encoding: str) -> Dict[str, Any]:
+    headers = {'Accept-Encoding': encoding}
+    shell_bytes, callback_bytes, etags = 0, 0, {}
+    for path in SHELL_PATHS:
+        status, body, response_headers = client.get(path, headers=headers)
+        if status != 200:
+            raise RuntimeError(f"GET {path} failed with status {status}")
+        shell_bytes += len(body)
+        etags[path] = response_headers.get('ETag', '')
+    for name, inputs, state, changed in page_requests:
+        status, body = client.post(client.build_payload(name, inputs, state, changed), headers=headers)
+        if status != 200:
+            raise RuntimeError(f"{name} failed with status {status}: {body[:200]}")
+        callback_bytes += len(body)
+
+    # A repeat visit only revalidates the shell
+    revisit_bytes = 0
+    for path, etag in etags.items():
+        _, body, _ = client.get(path, headers={**headers, 'If-None-Match': etag})
+        revisit_bytes += len(body)
+    return {
+        'shell_bytes': shell_bytes,
+        'callback_bytes': callback_bytes,
+        'total_bytes': shell_bytes + callback_bytes,
+        'revisit_shell_bytes': revisit_bytes,
+    }
+
+def run_benchmark(base_url: str = None) -> List[Dict[str, Any]]:
+    # The app reads its configuration on import, so it is imported here
+    import app as dash_app
+    import services.db as db
+    from benchmarks.dash_client import DashCallbackClient
+    from utils.http_utils import supported_encodings
+
+    client = DashCallbackClient(dash_app.app, base_url)
+    backend = db.get_client()
+    tickers = db.get_tickers(backend)
+    prices = db.get_stocks_current_price(backend, tickers)
+
+    encodings = ['identity'] + supported_encodings()
+    results = []
+    for page in PAGES:
+        page_requests = build_page_requests(tickers, prices, page)
+        sizes = {encoding: measure_page(client, page_requests, encoding) for encoding in encodings}
+        results.append({'page': page, 'bytes': sizes})
+
+        baseline = sizes['identity']['total_bytes']
+        columns = '  '.join(
+            f"{encoding}={size['total_bytes']:>9} ({size['total_bytes'] / baseline:.0%})"
+            for encoding, size in sizes.items()
+        )
+        print(f"{page:<22} {columns}  revisit shell={sizes[encodings[-1]]['revisit_shell_bytes']}")
+    return results
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Measure response bytes per page with and without compression.')
+    parser.add_argument('--url', help='Benchmark a running server instead of the in-process app')
+    parser.add_argument('--data-dir', help='Existing local dataset (generated when omitted)')
+    parser.add_argument('--tickers', type=int, default=500, help='Tickers in the generated dataset')
+    parser.add_argument('--years', type=float, default=10, help='Years of history in the generated dataset')
+    parser.add_argument('--out', help='Write results to this JSON file')
+    args = parser.parse_args()
+
+    if not args.url:
+        data_dir = args.data_dir
+        if not data_dir:
+            from utils.synthetic_data import write_local_dataset
+            data_dir = tempfile.mkdtemp(prefix='sma-bench-')
+            write_local_dataset(data_dir, args.tickers, args.years)
+
+        # Configure the app before it is imported
+        os.environ['DATA_BACKEND'] = 'local'
+        os.environ['LOCAL_DATA_DIR'] = data_dir
+
+    results = run_benchmark(args.url)
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump({'results': results}, f, indent=2)
+        print(f"Results written to {args.out}")
+
+if __name__ == '__main__':
+    main()
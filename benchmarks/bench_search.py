@@ -0,0 +1,64 @@
+"""
+Ticker search index benchmark.
+
+Builds the index over a synthetic universe and reports build time plus query
+latency percentiles for symbol prefixes, company name words and misspelled
+symbols that take the fuzzy fallback.
+
+Usage:
+    python -m benchmarks.bench_search --symbols 10000
+"""
+import argparse
+import time
+from typing import Callable, Dict, List
+import numpy as np
+from benchmarks.bench_callbacks import summarize
+from services.ticker_index import TickerIndex
+from utils.synthetic_data import generate_sectors_data, generate_tickers
+
+def time_queries(search: Callable[[str], List[str]], queries: List[str]) -> Dict[str, float]:
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        search(query)
+        latencies.append(time.perf_counter() - start)
+    # Report microseconds rather than the milliseconds summarize returns
+    return {name: round(value * 1000, 3) for name, value in summarize(latencies).items()}
+
+def build_queries(tickers: List[str], names: List[str], n_queries: int, seed: int) -> Dict[str, List[str]]:
+    rng = np.random.default_rng(seed)
+    picks = rng.integers(0, len(tickers), size=n_queries)
+    lengths = rng.integers(1, 4, size=n_queries)
+    typos = []
+    for i in picks:
+        # Insert a letter; for 4-letter symbols this always misses every prefix and takes the fuzzy path
+        position = rng.integers(1, len(tickers[i]))
+        typos.append(tickers[i][:position] + 'Q' + tickers[i][position:])
+    return {
+        'symbol_prefix': [tickers[i][:n] for i, n in zip(picks, lengths)],
+        'name_word': [names[i].split()[0][:n + 2].lower() for i, n in zip(picks, lengths)],
+        'fuzzy': typos,
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Benchmark ticker search index build and query latency.')
+    parser.add_argument('--symbols', type=int, default=10000)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    tickers = generate_tickers(args.symbols, seed=args.seed)
+    metadata = generate_sectors_data(tickers, seed=args.seed)
+
+    start = time.perf_counter()
+    index = TickerIndex.from_metadata(metadata)
+    build_ms = (time.perf_counter() - start) * 1000
+    print(f"build {len(index)} symbols: {build_ms:.1f}ms")
+
+    queries = build_queries(tickers, metadata['name'].to_list(), args.queries, args.seed)
+    for kind, kind_queries in queries.items():
+        stats = time_queries(index.search, kind_queries)
+        print(f"{kind:<14} p50={stats['p50']:>9.1f}us p95={stats['p95']:>9.1f}us p99={stats['p99']:>9.1f}us")
+
+if __name__ == '__main__':
+    main()
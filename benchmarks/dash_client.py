@@ -0,0 +1,123 @@
+import json
+import time
+from typing import Any, Dict, List, Tuple, Union
+from dash import Dash
+
+# Seconds a background job may take before the request is reported as failed
+JOB_TIMEOUT_SECONDS = 120
+# Status returned for a background job that did not finish in time, as a gateway would
+JOB_TIMEOUT_STATUS = 504
+
+def stringify_id(component_id: Union[str, dict]) -> str:
+    """Serialize a component id the way the Dash renderer does."""
+    if isinstance(component_id, dict):
+        return json.dumps(component_id, sort_keys=True, separators=(',', ':'))
+    return component_id
+
+def _parse_output_key(output_key: str) -> Union[dict, List[dict]]:
+    # Multi-output keys look like '..id1.prop1...id2.prop2..'
+    is_multi = output_key.startswith('..') and output_key.endswith('..')
+    parts = output_key[2:-2].split('...') if is_multi else [output_key]
+    outputs = []
+    for part in parts:
+        component_id, prop = part.rsplit('.', 1)
+        if component_id.startswith('{'):
+            component_id = json.loads(component_id)
+        outputs.append({'id': component_id, 'property': prop})
+    return outputs if is_multi else outputs[0]
+
+class DashCallbackClient:
+    """Invoke registered Dash callbacks through the _dash-update-component endpoint."""
+
+    def __init__(
+        self, app: Dash, base_url: str = None, poll_seconds: float = 0.05, job_timeout: float = JOB_TIMEOUT_SECONDS
+    ) -> None:
+        self.app = app
+        self.base_url = base_url
+        self.poll_seconds = poll_seconds
+        self.job_timeout = job_timeout
+        if base_url:
+            import requests
+            self.session = requests.Session()
+        else:
+            self.session = app.server.test_client()
+
+        # Index callbacks by the name of the decorated function
+        self.callbacks = {}
+        for output_key, spec in app.callback_map.items():
+            # Clientside callbacks run in the browser and have no server function
+            if 'callback' not in spec:
+                continue
+            func = getattr(spec['callback'], '__wrapped__', spec['callback'])
+            self.callbacks[func.__name__] = (output_key, spec)
+
+    def build_payload(
+        self,
+        name: str,
+        inputs: List[Any],
+        state: List[Any] = None,
+        changed: List[int] = None
+    ) -> Dict[str, Any]:
+        """Build the request body for a callback from positional input and state values."""
+        output_key, spec = self.callbacks[name]
+        input_values = [dict(item, value=value) for item, value in zip(spec['inputs'], inputs)]
+        state_values = [dict(item, value=value) for item, value in zip(spec['state'], state or [])]
+        changed_indices = changed if changed is not None else [0]
+        return {
+            'output': output_key,
+            'outputs': _parse_output_key(output_key),
+            'inputs': input_values,
+            'state': state_values,
+            'changedPropIds': [
+                f"{stringify_id(input_values[i]['id'])}.{input_values[i]['property']}"
+                for i in changed_indices
+            ],
+        }
+
+    def _send(self, body: str, headers: Dict[str, str], query: str = '') -> Tuple[int, bytes]:
+        if self.base_url:
+            response = self.session.post(f'{self.base_url}/_dash-update-component{query}', data=body, headers=headers)
+            return response.status_code, response.content
+        response = self.session.post(f'/_dash-update-component{query}', data=body, headers=headers)
+        return response.status_code, response.data
+
+    def post(self, payload: Dict[str, Any], headers: Dict[str, str] = None) -> Tuple[int, bytes]:
+        """Send a callback request and return the status code and raw response body.
+
+        Background callbacks answer with a job to poll; it is polled like the renderer does until the
+        outputs arrive, which are returned as if the callback had run inline. A job that has not answered
+        after job_timeout seconds is reported with a 504 status.
+        """
+        body = json.dumps(payload)
+        headers = {'Content-Type': 'application/json', **(headers or {})}
+        status, content = self._send(body, headers)
+        if status != 200 or not content.startswith(b'{"cacheKey"'):
+            return status, content
+
+        job = json.loads(content)
+        query = f"?cacheKey={job['cacheKey']}&job={job['job']}"
+        # Poll uncompressed so progress can be told from the result, then fetch the kept result as asked
+        plain_headers = {name: value for name, value in headers.items() if name.lower() != 'accept-encoding'}
+        deadline = time.perf_counter() + self.job_timeout
+        while True:
+            status, content = self._send(body, plain_headers, query)
+            if status != 200 or b'"response"' in content:
+                break
+            if time.perf_counter() >= deadline:
+                return JOB_TIMEOUT_STATUS, f"Background job {job['job']} did not finish in {self.job_timeout:g}s".encode()
+            time.sleep(self.poll_seconds)
+        if status == 200 and plain_headers != headers:
+            return self._send(body, headers, query)
+        return status, content
+
+    def call(self, name: str, inputs: List[Any], state: List[Any] = None, changed: List[int] = None) -> Tuple[int, bytes]:
+        return self.post(self.build_payload(name, inputs, state, changed))
+
+    def get(self, path: str, headers: Dict[str, str] = None) -> Tuple[int, bytes, Dict[str, str]]:
+        """Fetch a GET resource and return the status code, raw response body and headers."""
+        if self.base_url:
+            # Read the body as sent so compressed sizes can be measured
+            response = self.session.get(f'{self.base_url}{path}', headers=headers, stream=True)
+            return response.status_code, response.raw.read(), dict(response.headers)
+        response = self.session.get(path, headers=headers)
+        return response.status_code, response.data, dict(response.headers)
@@ -0,0 +1,199 @@
+"""
+Concurrency load test replaying dashboard sessions against a gunicorn server.
+
+Starts gunicorn on a local dataset with the chosen worker class (or targets a
+running server), then holds an increasing number of simulated users. Each user
+replays session scripts from benchmarks.sessions back to back through the
+_dash-update-component endpoint, and every level reports throughput, latency
+percentiles and the error rate, overall and per callback.
+LOCAL_QUERY_LATENCY_SECONDS is set from --latency so the offline backend waits
+on every query like BigQuery does; that wait is what gevent workers overlap and
+a fixed thread pool does not.
+
+Usage:
+    python -m benchmarks.load_test --worker-class gthread --threads 8
+    python -m benchmarks.load_test --worker-class gevent --concurrency 8,64,256
+    python -m benchmarks.load_test --sessions explore,market --think-time 1
+    python -m benchmarks.load_test --url http://localhost:8080
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, List
+import numpy as np
+from benchmarks.bench_callbacks import summarize
+from benchmarks.sessions import SESSION_SCRIPTS, DashboardSession, SessionExpired
+
+def start_server(port: int, worker_class: str, workers: int, threads: int, latency: float) -> subprocess.Popen:
+    """Launch gunicorn with the repo config and wait until it answers."""
+    env = dict(
+        os.environ,
+        GUNICORN_BIND=f'127.0.0.1:{port}',
+        GUNICORN_WORKER_CLASS=worker_class,
+        GUNICORN_WORKERS=str(workers),
+        GUNICORN_THREADS=str(threads),
+        LOCAL_QUERY_LATENCY_SECONDS=str(latency),
+    )
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py', 'app:server'],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    import requests
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with code {process.returncode}")
+        try:
+            requests.get(f'http://127.0.0.1:{port}/', timeout=1)
+            return process
+        except requests.ConnectionError:
+            time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError("gunicorn did not start within 120 seconds")
+
+def run_level(
+    app,
+    base_url: str,
+    tickers: List[str],
+    concurrency: int,
+    duration: float,
+    sessions: List[str],
+    think_time: float = 0,
+    seed: int = 0
+) -> Dict[str, Any]:
+    """Keep concurrency users replaying sessions for duration seconds and summarize their callbacks."""
+    from benchmarks.dash_client import DashCallbackClient
+
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    completed = 0
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def record(name: str, elapsed: float, ok: bool) -> None:
+        with lock:
+            latencies[name].append(elapsed)
+            if not ok:
+                errors[name] += 1
+
+    def user(user_id: int) -> None:
+        nonlocal completed
+        rng = np.random.default_rng(seed + user_id)
+        client = DashCallbackClient(app, base_url)
+        while time.perf_counter() < deadline:
+            session = DashboardSession(client, tickers, rng, record, think_time, deadline)
+            try:
+                SESSION_SCRIPTS[sessions[rng.integers(len(sessions))]](session)
+            except SessionExpired:
+                return
+            with lock:
+                completed += 1
+
+    started = time.perf_counter()
+    users = [threading.Thread(target=user, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in users:
+        thread.start()
+    for thread in users:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    all_latencies = [value for values in latencies.values() for value in values]
+    total_errors = sum(errors.values())
+    return {
+        'concurrency': concurrency,
+        'sessions_completed': completed,
+        'requests': len(all_latencies),
+        'throughput_rps': round(len(all_latencies) / wall, 1),
+        'error_rate': round(total_errors / len(all_latencies), 4) if all_latencies else 0,
+        'latency_ms': summarize(all_latencies) if all_latencies else {},
+        'callbacks': {
+            name: {
+                'requests': len(values),
+                'error_rate': round(errors[name] / len(values), 4),
+                'latency_ms': summarize(values),
+            }
+            for name, values in sorted(latencies.items())
+        },
+    }
+
+def print_level(result: Dict[str, Any]) -> None:
+    latency = result['latency_ms']
+    print(
+        f"users={result['concurrency']:>4} rps={result['throughput_rps']:>7.1f} "
+        f"p50={latency.get('p50', 0):>8.1f}ms p95={latency.get('p95', 0):>8.1f}ms "
+        f"p99={latency.get('p99', 0):>8.1f}ms errors={result['error_rate']:.1%} "
+        f"sessions={result['sessions_completed']}"
+    )
+    for name, stats in result['callbacks'].items():
+        print(f"    {name:<32} n={stats['requests']:>6} p95={stats['latency_ms']['p95']:>8.1f}ms errors={stats['error_rate']:.1%}")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Replay dashboard sessions at increasing numbers of concurrent users.')
+    parser.add_argument('--url', help='Load a running server instead of starting gunicorn')
+    parser.add_argument('--worker-class', default='gthread', choices=['gthread', 'gevent'])
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--latency', type=float, default=0.2, help='Simulated seconds of BigQuery wait per query')
+    parser.add_argument('--concurrency', default='8,32,128,256', help='Comma-separated simulated user counts')
+    parser.add_argument('--duration', type=float, default=30, help='Seconds per concurrency level')
+    parser.add_argument('--sessions', default=','.join(SESSION_SCRIPTS), help='Comma-separated session scripts to mix')
+    parser.add_argument('--think-time', type=float, default=0, help='Mean seconds a user pauses between actions')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--data-dir', help='Existing local dataset (generated when omitted)')
+    parser.add_argument('--tickers', type=int, default=200, help='Tickers in the generated dataset')
+    parser.add_argument('--years', type=float, default=5, help='Years of history in the generated dataset')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', help='Write results to this JSON file')
+    args = parser.parse_args()
+
+    sessions = args.sessions.split(',')
+    unknown = set(sessions) - set(SESSION_SCRIPTS)
+    if unknown:
+        parser.error(f"unknown sessions: {', '.join(sorted(unknown))}")
+
+    process = None
+    base_url = args.url
+    if not base_url:
+        data_dir = args.data_dir
+        if not data_dir:
+            from utils.synthetic_data import write_local_dataset
+            data_dir = tempfile.mkdtemp(prefix='sma-load-')
+            write_local_dataset(data_dir, args.tickers, args.years)
+        os.environ['DATA_BACKEND'] = 'local'
+        os.environ['LOCAL_DATA_DIR'] = data_dir
+        # The query cache would turn repeated callbacks into cache hits and hide the backend wait
+        os.environ.setdefault('QUERY_CACHE_TTL_SECONDS', '0')
+        process = start_server(args.port, args.worker_class, args.workers, args.threads, args.latency)
+        base_url = f'http://127.0.0.1:{args.port}'
+
+    try:
+        # The app is imported only to build callback payloads
+        import app as dash_app
+        import services.db as db
+        tickers = db.get_tickers(db.get_client())
+
+        results = []
+        for concurrency in [int(level) for level in args.concurrency.split(',')]:
+            result = run_level(
+                dash_app.app, base_url, tickers, concurrency, args.duration, sessions, args.think_time, args.seed
+            )
+            results.append(result)
+            print_level(result)
+    finally:
+        if process:
+            process.terminate()
+            process.wait()
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump({'worker_class': args.worker_class, 'sessions': sessions, 'results': results}, f, indent=2)
+        print(f"Results written to {args.out}")
+
+if __name__ == '__main__':
+    main()
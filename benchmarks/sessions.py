@@ -0,0 +1,187 @@
+"""
+Scripted dashboard sessions for load testing.
+
+A DashboardSession plays one browser tab: every action sends the callbacks the
+Dash renderer would send for it, in dependency order, and keeps the store
+values (prices, portfolio) the renderer would carry into later callbacks.
+Callbacks fired by one action are sent one after another rather than in
+parallel, so each simulated user has at most one request in flight.
+"""
+import json
+import time
+import uuid
+from typing import Any, Callable, Dict, List
+import numpy as np
+from benchmarks.dash_client import DashCallbackClient, stringify_id
+
+PERIOD_BUTTONS = ['btn-one-month', 'btn-three-months', 'btn-six-months', 'btn-one-year', 'btn-five-years', 'btn-max']
+VOLUME_RANGE = 'all'
+INITIAL_PERIOD = '1 month'
+CORR_VIEW = 'matrix'
+CORR_SCOPE = 'selected'
+COMPARE_BENCHMARK = 'universe'
+COMPARE_WINDOW = '30'
+OVERVIEW_WINDOW = '1 day'
+SECTOR_WEIGHTING = 'equal'
+SECTOR_VIEW = 'index'
+OPTIMIZER_PERIOD = '1 year'
+OPTIMIZER_CONSTRAINT = 'long_only'
+BACKTEST_SCHEDULE = 'quarterly'
+COST_METHOD = 'fifo'
+
+def output_value(body: bytes, component_id: Any, prop: str) -> Any:
+    """Read one output property from a _dash-update-component response."""
+    response = json.loads(body).get('response', {})
+    return response.get(stringify_id(component_id), {}).get(prop)
+
+class SessionExpired(Exception):
+    """Raised when a session reaches its deadline part way through its script."""
+
+class DashboardSession:
+    """One simulated user driving the app through its callbacks."""
+
+    def __init__(
+        self,
+        client: DashCallbackClient,
+        tickers: List[str],
+        rng: np.random.Generator,
+        record: Callable[[str, float, bool], None],
+        think_time: float = 0,
+        deadline: float = None
+    ) -> None:
+        self.client = client
+        self.tickers = tickers
+        self.rng = rng
+        self.record = record
+        self.think_time = think_time
+        self.deadline = deadline
+
+        # Client-side state the renderer would hold
+        self.session_id = uuid.uuid4().hex
+        self.prices: Dict[str, float] = {}
+        self.portfolio = '[]'
+        self.ledger = None
+        self.ticker = tickers[0]
+        self.corr_tickers = tickers[:2]
+        self.period = INITIAL_PERIOD
+        self.clicks = [None] * len(PERIOD_BUTTONS)
+        self.submit_clicks = 0
+
+    def call(self, name: str, inputs: List[Any], state: List[Any] = None, changed: List[int] = None) -> bytes:
+        if self.deadline and time.perf_counter() >= self.deadline:
+            raise SessionExpired()
+        start = time.perf_counter()
+        try:
+            status, body = self.client.call(name, inputs, state, changed)
+        except Exception:
+            status, body = None, b''
+        # 204 is how Dash answers a callback that raised PreventUpdate
+        self.record(name, time.perf_counter() - start, status in (200, 204))
+        return body if status == 200 else b''
+
+    def pause(self) -> None:
+        if self.think_time:
+            time.sleep(self.rng.exponential(self.think_time))
+
+    def pick_tickers(self, count: int) -> List[str]:
+        picks = self.rng.choice(len(self.tickers), size=min(count, len(self.tickers)), replace=False)
+        return [self.tickers[i] for i in picks]
+
+    def open_page(self, path: str) -> None:
+        self.call('display_page', [path])
+        body = self.call('fetch_prices_on_load', [path])
+        if body:
+            self.prices = output_value(body, {'type': 'price-data', 'section': 'global'}, 'data') or self.prices
+
+        if path == '/':
+            self.period = INITIAL_PERIOD
+            self.clicks = [None] * len(PERIOD_BUTTONS)
+            self.call('update_stock_and_volume_charts', [self.ticker, self.period, VOLUME_RANGE], [self.session_id])
+            self.call('update_heatmap', [self.corr_tickers, self.period, CORR_VIEW, CORR_SCOPE], [self.session_id])
+            self.call('update_comparison', [self.corr_tickers, self.period, COMPARE_BENCHMARK, COMPARE_WINDOW], [self.session_id])
+            self.call('update_overview', [OVERVIEW_WINDOW])
+            self.call('update_sector_charts', [self.period, SECTOR_WEIGHTING, SECTOR_VIEW], [self.session_id])
+        elif path == '/portfolio-form':
+            self.call('update_portfolio_list', [self.portfolio])
+        elif path == '/portfolio-dashboard':
+            self.call('update_dashboard', [path, self.portfolio], changed=[1])
+            self.call('update_optimizer', [path, self.portfolio, OPTIMIZER_PERIOD, OPTIMIZER_CONSTRAINT], changed=[1])
+            self.call('update_backtest', [path, self.portfolio, BACKTEST_SCHEDULE, None, None], changed=[1])
+            self.call('update_pnl', [path, self.ledger, self.prices, COST_METHOD], changed=[1])
+        self.pause()
+
+    def switch_period(self, button: str) -> None:
+        index = PERIOD_BUTTONS.index(button)
+        self.clicks[index] = (self.clicks[index] or 0) + 1
+        body = self.call('update_time_period_store', list(self.clicks), changed=[index])
+        if body:
+            self.period = output_value(body, {'type': 'time-period-store', 'section': 'market'}, 'data') or self.period
+        self.call('update_stock_and_volume_charts', [self.ticker, self.period, VOLUME_RANGE], [self.session_id], changed=[1])
+        self.call('update_heatmap', [self.corr_tickers, self.period, CORR_VIEW, CORR_SCOPE], [self.session_id], changed=[1])
+        self.call('update_comparison', [self.corr_tickers, self.period, COMPARE_BENCHMARK, COMPARE_WINDOW], [self.session_id], changed=[1])
+        self.call('update_sector_charts', [self.period, SECTOR_WEIGHTING, SECTOR_VIEW], [self.session_id], changed=[0])
+        self.pause()
+
+    def change_ticker(self, ticker: str) -> None:
+        # Typing the first letters into the dropdown searches before the selection lands
+        self.call('search_stock_options', [ticker[:2]], [self.ticker])
+        self.ticker = ticker
+        self.call('update_stock_and_volume_charts', [self.ticker, self.period, VOLUME_RANGE], [self.session_id])
+        self.pause()
+
+    def pick_corr_tickers(self, tickers: List[str]) -> None:
+        # The selection is rebuilt from the picks and each pick redraws the heatmap
+        self.corr_tickers = []
+        for ticker in tickers:
+            self.call('search_corr_options', [ticker[:2]], [self.corr_tickers])
+            self.corr_tickers = self.corr_tickers + [ticker]
+            self.call('update_heatmap', [self.corr_tickers, self.period, CORR_VIEW, CORR_SCOPE], [self.session_id])
+            self.call('update_comparison', [self.corr_tickers, self.period, COMPARE_BENCHMARK, COMPARE_WINDOW], [self.session_id])
+        self.pause()
+
+    def add_stock(self, ticker: str, shares: float) -> None:
+        self.call('search_ticker_input_options', [ticker[:2]], [None])
+        self.submit_clicks += 1
+        body = self.call(
+            'handle_portfolio_update',
+            [self.submit_clicks, None, None],
+            [ticker, shares, self.portfolio, self.prices, None, None, self.ledger]
+        )
+        if body:
+            self.portfolio = output_value(body, {'type': 'portfolio-data', 'section': 'global'}, 'data') or self.portfolio
+            self.ledger = output_value(body, {'type': 'ledger-data', 'section': 'global'}, 'data') or self.ledger
+        self.call('update_portfolio_list', [self.portfolio])
+        self.pause()
+
+def explore_session(session: DashboardSession) -> None:
+    """Browse the market page, then build a 10-stock portfolio and view its dashboard."""
+    session.open_page('/')
+    for button in session.rng.choice(PERIOD_BUTTONS, size=2, replace=False):
+        session.switch_period(str(button))
+    session.change_ticker(session.pick_tickers(1)[0])
+    session.pick_corr_tickers(session.pick_tickers(4))
+    session.open_page('/portfolio-form')
+    for ticker in session.pick_tickers(10):
+        session.add_stock(ticker, float(session.rng.integers(1, 100)))
+    session.open_page('/portfolio-dashboard')
+
+def market_session(session: DashboardSession) -> None:
+    """Stay on the market page, trying every period and a few tickers."""
+    session.open_page('/')
+    for button in PERIOD_BUTTONS:
+        session.switch_period(button)
+    for ticker in session.pick_tickers(3):
+        session.change_ticker(ticker)
+
+def portfolio_session(session: DashboardSession) -> None:
+    """Add a handful of stocks and check the portfolio dashboard."""
+    session.open_page('/portfolio-form')
+    for ticker in session.pick_tickers(5):
+        session.add_stock(ticker, float(session.rng.integers(1, 100)))
+    session.open_page('/portfolio-dashboard')
+
+SESSION_SCRIPTS: Dict[str, Callable[[DashboardSession], None]] = {
+    'explore': explore_session,
+    'market': market_session,
+    'portfolio': portfolio_session,
+}
@@ -0,0 +1,24 @@
+import plotly.express as px
+import polars as pl
+from components.frontier_chart import PORTFOLIO_COLORS
+from utils.fig_utils import style_fig
+from utils.metrics import instrument
+
+@instrument('figure')
+def create_allocation_chart(allocations: pl.DataFrame, title: str) -> px.bar:
+    """Grouped bars of each portfolio's weight per ticker, from 'ticker', 'portfolio' and 'weight' columns."""
+    fig = px.bar(
+        allocations,
+        x='weight',
+        y='ticker',
+        color='portfolio',
+        orientation='h',
+        barmode='group',
+        title=title,
+        color_discrete_map=PORTFOLIO_COLORS,
+    )
+    fig.update_traces(hovertemplate='%{y}<br>%{x:.1%}')
+    style_fig(fig, title, 'h')
+    fig.update_layout(xaxis=dict(title='Weight', tickformat='.0%'), legend=dict(orientation='h', y=-0.2, title=None))
+    fig.update_yaxes(title=None, autorange='reversed')
+    return fig
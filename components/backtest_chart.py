@@ -0,0 +1,32 @@
+import plotly.graph_objects as go
+import polars as pl
+from components.colors import PRIMARY_COLOR, SECONDARY_COLOR
+from utils.fig_utils import style_fig
+from utils.metrics import instrument
+
+# Line colors of each series, in order of appearance
+SERIES_COLORS = ['#FFFFFF', PRIMARY_COLOR, SECONDARY_COLOR, '#FF8C00']
+
+@instrument('figure')
+def create_backtest_chart(data: pl.DataFrame, title: str, y_title: str, tickformat: str, kind: str = 'line') -> go.Figure:
+    """One line (or bar) trace per 'series' of 'value' over 'date'."""
+    fig = go.Figure()
+    for i, (series, rows) in enumerate(data.group_by('series', maintain_order=True)):
+        color = SERIES_COLORS[i % len(SERIES_COLORS)]
+        hovertemplate = f"{series[0]}<br>%{{x}}<br>%{{y:{tickformat}}}<extra></extra>"
+        if kind == 'bar':
+            fig.add_trace(go.Bar(
+                x=rows['date'].to_list(), y=rows['value'].to_list(), name=series[0],
+                marker=dict(color=color), hovertemplate=hovertemplate,
+            ))
+        else:
+            fig.add_trace(go.Scatter(
+                x=rows['date'].to_list(), y=rows['value'].to_list(), name=series[0], mode='lines',
+                line=dict(color=color, width=2), hovertemplate=hovertemplate,
+            ))
+    style_fig(fig, title)
+    fig.update_layout(
+        yaxis=dict(title=y_title, tickformat=tickformat),
+        legend=dict(orientation='h', y=-0.2),
+    )
+    return fig
@@ -1,7 +1,9 @@
 import polars as pl
 import plotly.express as px
 from utils.fig_utils import style_fig
+from utils.metrics import instrument
 
+@instrument('figure')
 def create_bar_chart(
     data: pl.DataFrame,
     x: str,
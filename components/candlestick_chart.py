@@ -1,7 +1,9 @@
 import polars as pl
 import plotly.graph_objects as go
 from utils.fig_utils import style_fig
+from utils.metrics import instrument
 
+@instrument('figure')
 def create_candlestick_chart(df: pl.DataFrame, title: str) -> go.Figure:
     fig = go.Figure(
         data=[
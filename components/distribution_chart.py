@@ -0,0 +1,34 @@
+import plotly.graph_objects as go
+import polars as pl
+from components.colors import PRIMARY_COLOR, SECONDARY_COLOR
+from utils.fig_utils import style_fig
+from utils.metrics import instrument
+
+# Bar colors of each series, in order of appearance
+SERIES_COLORS = [PRIMARY_COLOR, SECONDARY_COLOR, '#FF8C00', '#FFFFFF']
+
+@instrument('figure')
+def create_distribution_chart(distribution: pl.DataFrame, markers: pl.DataFrame, title: str) -> go.Figure:
+    """Overlaid histograms of P&L per 'series' ('pnl', 'share' columns) with dashed lines at each marker ('label', 'pnl')."""
+    fig = go.Figure()
+    for i, (series, data) in enumerate(distribution.group_by('series', maintain_order=True)):
+        color = SERIES_COLORS[i % len(SERIES_COLORS)]
+        fig.add_trace(go.Bar(
+            x=data['pnl'].to_list(),
+            y=data['share'].to_list(),
+            name=series[0],
+            marker=dict(color=color),
+            opacity=0.6,
+            hovertemplate='P&L %{x:$,.0f}<br>%{y:.2%} of paths<extra></extra>',
+        ))
+    for row in markers.iter_rows(named=True):
+        fig.add_vline(x=row['pnl'], line=dict(color='red', dash='dash'), annotation_text=row['label'], annotation_font_color='white')
+    style_fig(fig, title)
+    fig.update_layout(
+        barmode='overlay',
+        bargap=0,
+        xaxis=dict(title='P&L (USD)', tickformat='$,.0f'),
+        yaxis=dict(title='Share of Paths', tickformat='.1%'),
+        legend=dict(orientation='h', y=-0.2),
+    )
+    return fig
@@ -1,6 +1,8 @@
 import plotly.graph_objects as go
 from utils.fig_utils import style_fig
+from utils.metrics import instrument
 
+@instrument('figure')
 def create_empty_chart(title: str, text: str = 'No data available for selected filters') -> go.Figure:
     fig = go.Figure()
     fig.add_annotation(
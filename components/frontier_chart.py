@@ -0,0 +1,53 @@
+import plotly.graph_objects as go
+import polars as pl
+from components.colors import PRIMARY_COLOR, SECONDARY_COLOR
+from utils.fig_utils import style_fig
+from utils.metrics import instrument
+
+# Marker colors of the highlighted portfolios, by name
+PORTFOLIO_COLORS = {
+    'Current': '#FFFFFF',
+    'Min Variance': SECONDARY_COLOR,
+    'Max Sharpe': '#FF8C00',
+}
+
+@instrument('figure')
+def create_frontier_chart(frontier: pl.DataFrame, assets: pl.DataFrame, portfolios: pl.DataFrame, title: str) -> go.Figure:
+    """Efficient frontier line over the individual assets, with the highlighted portfolios as stars.
+
+    Every frame has 'volatility' and 'return' columns; assets adds 'ticker' and portfolios adds 'name'.
+    """
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=assets['volatility'].to_list(),
+        y=assets['return'].to_list(),
+        mode='markers',
+        name='Assets',
+        text=assets['ticker'].to_list(),
+        marker=dict(size=7, color='grey', opacity=0.7),
+        hovertemplate='%{text}<br>Volatility %{x:.1%}<br>Return %{y:.1%}<extra></extra>',
+    ))
+    fig.add_trace(go.Scatter(
+        x=frontier['volatility'].to_list(),
+        y=frontier['return'].to_list(),
+        mode='lines',
+        name='Efficient Frontier',
+        line=dict(color=PRIMARY_COLOR, width=3),
+        hovertemplate='Volatility %{x:.1%}<br>Return %{y:.1%}<extra></extra>',
+    ))
+    for row in portfolios.iter_rows(named=True):
+        fig.add_trace(go.Scatter(
+            x=[row['volatility']],
+            y=[row['return']],
+            mode='markers',
+            name=row['name'],
+            marker=dict(size=16, symbol='star', color=PORTFOLIO_COLORS.get(row['name'], PRIMARY_COLOR)),
+            hovertemplate=f"{row['name']}<br>Volatility %{{x:.1%}}<br>Return %{{y:.1%}}<extra></extra>",
+        ))
+    style_fig(fig, title)
+    fig.update_layout(
+        xaxis=dict(title='Annual Volatility', tickformat='.0%'),
+        yaxis=dict(title='Annual Return', tickformat='.0%'),
+        legend=dict(orientation='h', y=-0.2),
+    )
+    return fig
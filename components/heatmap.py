@@ -1,9 +1,15 @@
 import plotly.express as px
 import polars as pl
 from utils.fig_utils import style_fig
+from utils.metrics import instrument
 
-def create_correlation_heatmap(corr_matrix: pl.DataFrame, title: str) -> px.imshow:
+# Larger matrices show their values on hover only; thousands of text labels stall the browser
+TEXT_MAX_CELLS = 400
+
+@instrument('figure')
+def create_correlation_heatmap(corr_matrix: pl.DataFrame, title: str, text_max_cells: int = TEXT_MAX_CELLS) -> px.imshow:
     labels = corr_matrix.columns
+    show_text = len(labels) * len(labels) <= text_max_cells
     fig = px.imshow(
         corr_matrix,
         x=labels,
@@ -11,10 +17,12 @@ def create_correlation_heatmap(corr_matrix: pl.DataFrame, title: str) -> px.imsh
         title=title,
         zmin=-1,
         zmax=1,
-        text_auto=True,
+        text_auto='.2f' if show_text else False,
         color_continuous_scale='RdYlGn',
         aspect='auto',
     )
     style_fig(fig, title)
     fig.update_yaxes(title=None)
-    return fig
\ No newline at end of file
+    if not show_text:
+        fig.update_traces(hovertemplate='%{y} / %{x}<br>%{z:.2f}<extra></extra>')
+    return fig
@@ -1,13 +1,32 @@
 import polars as pl
 import plotly.express as px
 from utils.fig_utils import style_fig
+from utils.metrics import instrument
 
-def create_line_chart(data: pl.DataFrame, x: str, y: str, title: str, color: str) -> px.line:
-    fig = px.line(data, x=x, y=y, title=title, color_discrete_sequence=[color])
-    fig.update_yaxes(tickprefix='$', title='Price (USD)')
+@instrument('figure')
+def create_line_chart(
+    data: pl.DataFrame,
+    x: str,
+    y: str,
+    title: str,
+    color: str,
+    series: str = None,
+    y_title: str = 'Price (USD)',
+    tickprefix: str = '$',
+    hoverformat: str = '$,.2f'
+) -> px.line:
+    """One line of y over x, or one per value of the series column, the first drawn in color."""
+    colors = [color] + [other for other in px.colors.qualitative.Plotly if other != color]
+    fig = px.line(data, x=x, y=y, color=series, title=title, color_discrete_sequence=colors)
+    fig.update_yaxes(tickprefix=tickprefix, title=y_title)
+    hovertemplate = f'%{{x}}<br>%{{y:{hoverformat}}}'
+    if series is not None:
+        hovertemplate = f'%{{fullData.name}}<br>{hovertemplate}<extra></extra>'
     fig.update_traces(
         line=dict(width=2),
-        hovertemplate='%{x}<br>%{y:$,.2f}'
+        hovertemplate=hovertemplate
     )
     style_fig(fig, title)
-    return fig
\ No newline at end of file
+    if series is not None:
+        fig.update_layout(legend=dict(title=None, orientation='h', y=-0.2))
+    return fig
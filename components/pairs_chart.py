@@ -0,0 +1,23 @@
+import plotly.express as px
+import polars as pl
+from utils.fig_utils import style_fig
+from utils.metrics import instrument
+
+@instrument('figure')
+def create_pairs_chart(pairs: pl.DataFrame, title: str) -> px.bar:
+    """Horizontal bars of pair correlations, strongest at the top, colored like the heatmap."""
+    fig = px.bar(
+        pairs,
+        x='correlation',
+        y='pair',
+        title=title,
+        orientation='h',
+        color='correlation',
+        range_color=[-1, 1],
+        color_continuous_scale='RdYlGn',
+    )
+    fig.update_traces(hovertemplate='%{y}<br>%{x:.2f}<extra></extra>')
+    style_fig(fig, title, 'h')
+    fig.update_layout(xaxis_title=None, xaxis_range=[-1, 1], coloraxis_showscale=False)
+    fig.update_yaxes(title=None, autorange='reversed')
+    return fig
@@ -0,0 +1,51 @@
+import plotly.express as px
+import plotly.graph_objects as go
+import polars as pl
+from utils.fig_utils import style_fig
+from utils.metrics import instrument
+
+# Quadrants of the rotation chart, by the sides of 100 the ratio and momentum are on
+QUADRANTS = [
+    ('Leading', 1, 1),
+    ('Weakening', 1, -1),
+    ('Lagging', -1, -1),
+    ('Improving', -1, 1),
+]
+
+@instrument('figure')
+def create_rotation_chart(data: pl.DataFrame, title: str) -> go.Figure:
+    """Relative-strength ratio against momentum of each sector, a short tail leading to its latest point.
+
+    data has 'sector', 'date', 'ratio' and 'momentum' columns in date order.
+    """
+    fig = go.Figure()
+    colors = px.colors.qualitative.Plotly
+    for i, (sector, tail) in enumerate(data.group_by('sector', maintain_order=True)):
+        sector = sector[0]
+        color = colors[i % len(colors)]
+        fig.add_trace(go.Scatter(
+            x=tail['ratio'].to_list(),
+            y=tail['momentum'].to_list(),
+            mode='lines+markers',
+            name=sector,
+            line=dict(color=color, width=1.5),
+            marker=dict(size=[5] * (len(tail) - 1) + [12], color=color),
+            text=[f'{date:%b %d, %Y}' for date in tail['date'].to_list()],
+            hovertemplate=f'{sector}<br>%{{text}}<br>Ratio %{{x:.1f}}<br>Momentum %{{y:.1f}}<extra></extra>',
+        ))
+    fig.add_hline(y=100, line=dict(color='grey', dash='dot', width=1))
+    fig.add_vline(x=100, line=dict(color='grey', dash='dot', width=1))
+    for name, x_side, y_side in QUADRANTS:
+        fig.add_annotation(
+            text=name, showarrow=False, opacity=0.6,
+            x=1 if x_side > 0 else 0, y=1 if y_side > 0 else 0,
+            xref='x domain', yref='y domain',
+            xanchor='right' if x_side > 0 else 'left', yanchor='top' if y_side > 0 else 'bottom',
+        )
+    style_fig(fig, title)
+    fig.update_layout(
+        xaxis=dict(title='Relative Strength Ratio'),
+        yaxis=dict(title='Relative Strength Momentum'),
+        legend=dict(orientation='h', y=-0.2),
+    )
+    return fig
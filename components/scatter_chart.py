@@ -1,7 +1,9 @@
 import plotly.express as px
 import polars as pl
 from utils.fig_utils import style_fig
+from utils.metrics import instrument
 
+@instrument('figure')
 def create_scatter_chart(df: pl.DataFrame, x: str, y: str, title: str, color: str) -> px.scatter:
     fig = px.scatter(df, x=x, y=y, title=title)
     fig.update_traces(
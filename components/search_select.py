@@ -0,0 +1,21 @@
+from typing import Dict, List, Union
+from dash import dcc
+
+def create_search_select(
+    id: Union[str, dict],
+    options: List[Dict[str, str]],
+    value: Union[str, list] = None,
+    placeholder: str = None,
+    multi: bool = False) -> dcc.Dropdown:
+    # Options are filled by a search_value callback, so only the selected ones are sent with the layout
+    search_select = dcc.Dropdown(
+                        id=id,
+                        options=options,
+                        value=value,
+                        multi=multi,
+                        searchable=True,
+                        placeholder=placeholder,
+                        clearable=False,
+                        className='p-1 w-100 dbc',
+                    )
+    return search_select
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -41,5 +42,125 @@ CREDENTIALS_DICT = {
 PROJECT_ID = os.getenv("PROJECT_ID")
 # BigQuery dataset and tables IDs
 DATASET_ID = os.getenv("DATASET_ID")
-STOCKS_TABLE_ID = os.getenv("STOCKS_TABLE_ID")
-SECTORS_TABLE_ID = os.getenv("SECTORS_TABLE_ID")
+STOCKS_TABLE_ID = os.getenv("STOCKS_TABLE_ID", "stocks")
+SECTORS_TABLE_ID = os.getenv("SECTORS_TABLE_ID", "sectors")
+
+# Data backend: 'bigquery' or 'local' (Parquet files queried with DuckDB)
+DATA_BACKEND = os.getenv("DATA_BACKEND", "bigquery")
+# Directory with the Parquet tables used by the local backend
+LOCAL_DATA_DIR = os.getenv("LOCAL_DATA_DIR", "data")
+
+# Query execution
+# Maximum seconds to wait for a single query job before cancelling it
+QUERY_TIMEOUT_SECONDS = float(os.getenv("QUERY_TIMEOUT_SECONDS", "30"))
+# Number of query jobs that can run concurrently per worker process
+QUERY_MAX_WORKERS = int(os.getenv("QUERY_MAX_WORKERS", "16"))
+# Seconds a query result is reused by later identical requests (0 disables the cache)
+QUERY_CACHE_TTL_SECONDS = float(os.getenv("QUERY_CACHE_TTL_SECONDS", "300"))
+QUERY_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "256"))
+
+# Instrumentation
+# Record per-stage timings and expose them on /metrics
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "false").lower() == "true"
+# Emit spans and logs as structured JSON lines
+METRICS_JSON_LOGS = os.getenv("METRICS_JSON_LOGS", "false").lower() == "true"
+
+# Query cost guardrails (0 disables a budget)
+# Bytes a single Dash request may process across all of its queries
+QUERY_MAX_BYTES_PER_REQUEST = int(os.getenv("QUERY_MAX_BYTES_PER_REQUEST", "0"))
+# Bytes all requests of a worker may process in any 60 second window
+QUERY_MAX_BYTES_PER_MINUTE = int(os.getenv("QUERY_MAX_BYTES_PER_MINUTE", "0"))
+
+# Directory of the memory-mapped price store served to all workers (empty disables it)
+PRICE_STORE_DIR = os.getenv("PRICE_STORE_DIR", "")
+# Directory of the Parquet store queried through lazy Polars plans (empty disables it)
+PARQUET_STORE_DIR = os.getenv("PARQUET_STORE_DIR", "")
+# Rows per row group; smaller groups let ticker filters skip more of the file
+PARQUET_ROW_GROUP_SIZE = int(os.getenv("PARQUET_ROW_GROUP_SIZE", "50000"))
+# Run Parquet store plans on the streaming engine, in bounded memory
+PARQUET_STREAMING = os.getenv("PARQUET_STREAMING", "false").lower() == "true"
+
+# Market digest
+# Directory of the precomputed digest tables read by the overview panel (empty computes them in process)
+DIGEST_DIR = os.getenv("DIGEST_DIR", "")
+# Tickers listed per mover, volume spike and 52-week table
+DIGEST_TOP_N = int(os.getenv("DIGEST_TOP_N", "10"))
+# Trading days of volume a volume spike is measured against
+DIGEST_VOLUME_LOOKBACK = int(os.getenv("DIGEST_VOLUME_LOOKBACK", "20"))
+# Seconds a digest computed in process is reused before it is rebuilt
+DIGEST_CACHE_TTL_SECONDS = float(os.getenv("DIGEST_CACHE_TTL_SECONDS", "3600"))
+
+# Correlation
+# Most tickers drawn as a full or clustered matrix; larger selections fall back to the sector averages
+CORR_MATRIX_MAX_TICKERS = int(os.getenv("CORR_MATRIX_MAX_TICKERS", "150"))
+
+# Sector indices
+# Days of close x volume averaged into a ticker's weight in the cap-proxy sector indices
+SECTOR_CAP_WINDOW = int(os.getenv("SECTOR_CAP_WINDOW", "20"))
+# Indices are keyed by data version, so they can be kept until evicted
+SECTOR_CACHE_TTL_SECONDS = float(os.getenv("SECTOR_CACHE_TTL_SECONDS", "86400"))
+SECTOR_CACHE_MAX_ENTRIES = int(os.getenv("SECTOR_CACHE_MAX_ENTRIES", "2"))
+# Trading days of relative strength averaged into the rotation ratio, and the lag of its momentum
+ROTATION_WINDOW = int(os.getenv("ROTATION_WINDOW", "50"))
+ROTATION_LAG = int(os.getenv("ROTATION_LAG", "10"))
+
+# HTTP response compression
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() == "true"
+# Responses smaller than this are sent uncompressed
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "500"))
+COMPRESSION_LEVEL = int(os.getenv("COMPRESSION_LEVEL", "6"))
+# Encodings in order of preference; 'br' is used only when the brotli package is installed
+COMPRESSION_ALGORITHMS = [name.strip() for name in os.getenv("COMPRESSION_ALGORITHMS", "br,gzip").split(",") if name.strip()]
+
+# Gunicorn serving (read by gunicorn.conf.py)
+GUNICORN_BIND = os.getenv("GUNICORN_BIND", ":8080")
+GUNICORN_WORKERS = int(os.getenv("GUNICORN_WORKERS", "1"))
+# 'gthread' runs GUNICORN_THREADS callbacks per worker; 'gevent' runs up to GUNICORN_WORKER_CONNECTIONS cooperatively
+GUNICORN_WORKER_CLASS = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+GUNICORN_THREADS = int(os.getenv("GUNICORN_THREADS", "8"))
+GUNICORN_WORKER_CONNECTIONS = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", "1000"))
+# Seconds before a silent worker is restarted (0 disables the timeout)
+GUNICORN_TIMEOUT = int(os.getenv("GUNICORN_TIMEOUT", "0"))
+
+# Simulated network round trip added to every local backend query, for load tests
+LOCAL_QUERY_LATENCY_SECONDS = float(os.getenv("LOCAL_QUERY_LATENCY_SECONDS", "0"))
+
+# Portfolio optimizer
+# Annual risk-free rate used for Sharpe ratios
+RISK_FREE_RATE = float(os.getenv("RISK_FREE_RATE", "0.0"))
+# Points sampled along the efficient frontier
+FRONTIER_POINTS = int(os.getenv("FRONTIER_POINTS", "50"))
+# Return statistics are keyed by data version, so they can be kept until evicted
+COVARIANCE_CACHE_MAX_ENTRIES = int(os.getenv("COVARIANCE_CACHE_MAX_ENTRIES", "64"))
+COVARIANCE_CACHE_TTL_SECONDS = float(os.getenv("COVARIANCE_CACHE_TTL_SECONDS", "86400"))
+
+# Value-at-Risk simulator
+# Processes running Monte Carlo chunks (0 runs them in the calling process)
+RISK_MAX_PROCESSES = int(os.getenv("RISK_MAX_PROCESSES", str(min(4, os.cpu_count() or 1))))
+RISK_CHUNK_PATHS = int(os.getenv("RISK_CHUNK_PATHS", "250000"))
+RISK_MAX_PATHS = int(os.getenv("RISK_MAX_PATHS", "5000000"))
+# Root seed of the per-chunk random streams, so a simulation can be reproduced
+RISK_SEED = int(os.getenv("RISK_SEED", "42"))
+RISK_CACHE_MAX_ENTRIES = int(os.getenv("RISK_CACHE_MAX_ENTRIES", "32"))
+RISK_CACHE_TTL_SECONDS = float(os.getenv("RISK_CACHE_TTL_SECONDS", "86400"))
+
+# Tax-lot ledger
+# Cost basis per ledger and method, extended in place as trades are appended
+LEDGER_CACHE_MAX_ENTRIES = int(os.getenv("LEDGER_CACHE_MAX_ENTRIES", "256"))
+LEDGER_CACHE_TTL_SECONDS = float(os.getenv("LEDGER_CACHE_TTL_SECONDS", "3600"))
+
+# Background jobs
+# Heavy callbacks run in job processes managed through a diskcache directory; when disabled they run inline
+BACKGROUND_CALLBACKS_ENABLED = os.getenv("BACKGROUND_CALLBACKS_ENABLED", "true").lower() == "true"
+BACKGROUND_CACHE_DIR = os.getenv("BACKGROUND_CACHE_DIR", os.path.join(tempfile.gettempdir(), "stock-dashboard-jobs"))
+# Jobs computing at once across all workers sharing the cache directory; the rest wait in a queue
+BACKGROUND_MAX_JOBS = int(os.getenv("BACKGROUND_MAX_JOBS", "2"))
+# Results are keyed by inputs and data version and dropped when unused for this long
+BACKGROUND_RESULT_TTL_SECONDS = float(os.getenv("BACKGROUND_RESULT_TTL_SECONDS", "3600"))
+BACKGROUND_POLL_INTERVAL_MS = int(os.getenv("BACKGROUND_POLL_INTERVAL_MS", "500"))
+
+# Request sequencing
+# Calls of the same callback from one session within this window are a burst; only the last one runs
+CALLBACK_DEBOUNCE_MS = int(os.getenv("CALLBACK_DEBOUNCE_MS", "150"))
+SEQUENCE_MAX_SESSIONS = int(os.getenv("SEQUENCE_MAX_SESSIONS", "10000"))
+SEQUENCE_TTL_SECONDS = float(os.getenv("SEQUENCE_TTL_SECONDS", "3600"))
@@ -1,7 +1,10 @@
 # guide/layout.py
+import functools
 from dash import html
 import dash_bootstrap_components as dbc
 
+# The guide is static, so the component tree is built once and reused
+@functools.lru_cache(maxsize=1)
 def create_layout() -> dbc.Container:
     # Header
     header = html.H1("User Guide", className="text-center display-4 text-light")
@@ -0,0 +1,25 @@
+# Gunicorn settings, configured through the GUNICORN_* variables in config.py
+from config import (
+    GUNICORN_BIND, GUNICORN_WORKERS, GUNICORN_WORKER_CLASS, GUNICORN_THREADS,
+    GUNICORN_WORKER_CONNECTIONS, GUNICORN_TIMEOUT
+)
+
+# gevent has to patch the standard library before the app and its clients are imported
+if GUNICORN_WORKER_CLASS == 'gevent':
+    from utils.gevent_utils import patch_for_gevent
+    patch_for_gevent()
+
+bind = GUNICORN_BIND
+workers = GUNICORN_WORKERS
+worker_class = GUNICORN_WORKER_CLASS
+threads = GUNICORN_THREADS
+worker_connections = GUNICORN_WORKER_CONNECTIONS
+timeout = GUNICORN_TIMEOUT
+
+# Import the app once in the master so the ticker index and page layouts are built before fork
+preload_app = True
+
+def post_fork(server, worker):
+    # Connections and thread pools created while preloading must not be shared across processes
+    import services.db as db
+    db.reset_after_fork()
@@ -1,13 +1,46 @@
+import datetime as dt
 from typing import List, Tuple
-from dash import Dash, Input, Output, ctx
-import plotly.graph_objects as go
+from dash import Dash, Input, Output, State, ctx
+import numpy as np
+import polars as pl
 import components as cmp
 import services.db as db
-from config import CREDENTIALS_DICT, PROJECT_ID
-from utils.callback_utils import get_period, get_volume_range
-from utils.google_cloud_utils import get_bigquery_client
+from config import QUERY_TIMEOUT_SECONDS
+from services.correlation import (
+    CLUSTERED_VIEW, PAIRS_VIEW, ROLLING_FETCH_PERIODS, ROLLING_WINDOWS, SECTOR_VIEW, UNIVERSE_BENCHMARK,
+    aggregate_by_sector, cluster_matrix, daily_returns, long_series, rebase, rolling_correlation, served_view,
+    top_pairs,
+)
+from services.digest import Digest, get_digest
+from services.governor import sampled_percent
+from services.price_store import PERIOD_DAYS
+from services.sector_index import MARKET, RELATIVE_STRENGTH_VIEW, get_sector_index, relative_strength, rotation_tails
+from services.resample import DAILY, get_bar_interval
+from services.sequencing import SESSION_STATE, latest_only, raise_if_superseded
+from services.ticker_index import get_ticker_index
+from utils.callback_utils import get_period, get_volume_range, search_ticker_options
+from utils.fig_utils import encode_figure, format_currency
 
 def register_callbacks(app: Dash) -> None:    
+    # Search-as-you-type options for the ticker dropdowns
+    @app.callback(
+        Output({'type': 'dynamic-select-stock', 'section': 'market'}, 'options'),
+        Input({'type': 'dynamic-select-stock', 'section': 'market'}, 'search_value'),
+        State({'type': 'dynamic-select-stock', 'section': 'market'}, 'value'),
+        prevent_initial_call=True
+    )
+    def search_stock_options(search_value: str, value: str) -> List[dict]:
+        return search_ticker_options(search_value, value)
+
+    @app.callback(
+        Output({'type': 'dynamic-select-corr', 'section': 'market'}, 'options'),
+        Input({'type': 'dynamic-select-corr', 'section': 'market'}, 'search_value'),
+        State({'type': 'dynamic-select-corr', 'section': 'market'}, 'value'),
+        prevent_initial_call=True
+    )
+    def search_corr_options(search_value: str, value: List[str]) -> List[dict]:
+        return search_ticker_options(search_value, value)
+
     @app.callback(
         Output({'type': 'time-period-store', 'section': 'market'}, 'data'),
         [
@@ -35,16 +68,33 @@ def register_callbacks(app: Dash) -> None:
             Input({'type': 'dynamic-select-stock', 'section': 'market'}, 'value'),
             Input({'type': 'time-period-store', 'section': 'market'}, 'data'),
             Input({'type': 'dynamic-select-volume', 'section': 'market'}, 'value'),
-        ]
+        ],
+        SESSION_STATE,
     )
-    def update_stock_and_volume_charts(ticker: str, period: str, selected_volume_range: str) -> Tuple[go.Figure, go.Figure, go.Figure]:
-        bigquery_client = get_bigquery_client(CREDENTIALS_DICT, PROJECT_ID)
+    @latest_only
+    def update_stock_and_volume_charts(ticker: str, period: str, selected_volume_range: str) -> Tuple[dict, dict, dict]:
+        bigquery_client = db.get_client()
         try:
-            price_df = db.get_price_data(bigquery_client, ticker, period)
+            # Run the price and volume queries concurrently
+            # Long periods are drawn from weekly or monthly bars
             volume_range = get_volume_range(selected_volume_range)
-            volume_df = db.get_volume_data(bigquery_client, ticker, period, volume_range)
+            interval = get_bar_interval(period)
+            price_df, volume_df = db.gather_queries(
+                [
+                    db.submit_query(db.get_price_data, bigquery_client, ticker, period, interval),
+                    db.submit_query(db.get_volume_data, bigquery_client, ticker, period, volume_range, interval),
+                ],
+                timeout=QUERY_TIMEOUT_SECONDS,
+                default=pl.DataFrame()
+            )
+            # A newer selection from this session has arrived; skip drawing figures it replaces
+            raise_if_superseded()
             
             time_period_text = f'Last {period.capitalize()}' if period != 'max' else 'All Time'
+            # Over the byte budget the series come from a table sample and have gaps; say so on the charts
+            sampled = sampled_percent()
+            if sampled is not None:
+                time_period_text += f' (sampled, {sampled}% of rows)'
             line_chart_title = f'{ticker} Closing Price - {time_period_text}'
             candlestick_chart_title = f'{ticker} Price Movement - {time_period_text}'
             
@@ -58,18 +108,19 @@ def register_callbacks(app: Dash) -> None:
             volume_chart_title = f"{ticker} Trading Volume - {time_period_text}"
             
             short_term_periods = ['1 month', '3 months', '6 months']
-            long_term_periods = ['1 year', '5 years', 'max']
             
+            # Daily bars are unreadable over a year, but weekly and monthly bars are not
             if not volume_df.is_empty():
-                if period in short_term_periods:
+                if period in short_term_periods or interval != DAILY:
                     volume_fig = cmp.create_bar_chart(volume_df, x='date', y='volume', title=volume_chart_title, color=cmp.SECONDARY_COLOR)
-                elif period in long_term_periods:
+                else:
                     volume_fig = cmp.create_scatter_chart(volume_df, x='date', y='volume', title=volume_chart_title, color=cmp.SECONDARY_COLOR)
                 volume_fig.update_layout(yaxis=dict(title='Transactions'))
             else:
                 volume_fig = cmp.create_empty_chart(volume_chart_title)
             
-            return line_fig, candlestick_fig, volume_fig
+            # Send the series as compact typed arrays
+            return encode_figure(line_fig), encode_figure(candlestick_fig), encode_figure(volume_fig)
         finally:
             bigquery_client.close()
     
@@ -78,17 +129,224 @@ def register_callbacks(app: Dash) -> None:
         [
             Input({'type': 'dynamic-select-corr', 'section': 'market'}, 'value'),
             Input({'type': 'time-period-store', 'section': 'market'}, 'data'),
-        ]
+            Input({'type': 'dynamic-select-corr-view', 'section': 'market'}, 'value'),
+            Input({'type': 'dynamic-select-corr-scope', 'section': 'market'}, 'value'),
+        ],
+        SESSION_STATE,
     )
-    def update_heatmap(tickers: List[str], period: str) -> go.Figure:
-        client = get_bigquery_client(CREDENTIALS_DICT, PROJECT_ID)
+    @latest_only
+    def update_heatmap(tickers: List[str], period: str, view: str, scope: str) -> dict:
+        client = db.get_client()
         try:
+            # The full universe stays readable through the sector and pairs views; the matrix views are only
+            # drawn for selections small enough to read, and aggregated server-side past that
+            if scope == 'all':
+                tickers = get_ticker_index().tickers
             corr_matrix = db.get_corr_matrix(client, tickers, period)
+            raise_if_superseded()
             time_period_text = f'Last {period.capitalize()}' if period != 'max' else 'All Time'
             chart_title = f'Stocks Correlation Matrix - {time_period_text}'
-            if not corr_matrix.is_empty():
+            if corr_matrix.is_empty():
+                return encode_figure(cmp.create_empty_chart(chart_title))
+
+            served = served_view(view, corr_matrix.width)
+            if served == PAIRS_VIEW:
+                chart_title = f'Strongest Correlations - {time_period_text}'
+                fig = cmp.create_pairs_chart(top_pairs(corr_matrix), title=chart_title)
+            elif served == SECTOR_VIEW:
+                chart_title = f'Sector Correlation Matrix - {time_period_text}'
+                if served != view:
+                    chart_title += f' ({corr_matrix.width} stocks, too many for a matrix)'
+                sector_matrix = aggregate_by_sector(corr_matrix, get_ticker_index().sectors)
+                fig = cmp.create_correlation_heatmap(corr_matrix=sector_matrix, title=chart_title)
+            elif served == CLUSTERED_VIEW:
+                fig = cmp.create_correlation_heatmap(corr_matrix=cluster_matrix(corr_matrix), title=chart_title)
+            else:
                 fig = cmp.create_correlation_heatmap(corr_matrix=corr_matrix, title=chart_title)
-                return fig
-            return cmp.create_empty_chart(chart_title)
+            return encode_figure(fig)
+        finally:
+            client.close()
+
+    @app.callback(
+        [
+            Output({'type': 'compare-output-performance', 'section': 'market'}, 'figure'),
+            Output({'type': 'compare-output-rolling', 'section': 'market'}, 'figure'),
+            Output({'type': 'compare-select-benchmark', 'section': 'market'}, 'options'),
+        ],
+        [
+            Input({'type': 'dynamic-select-corr', 'section': 'market'}, 'value'),
+            Input({'type': 'time-period-store', 'section': 'market'}, 'data'),
+            Input({'type': 'compare-select-benchmark', 'section': 'market'}, 'value'),
+            Input({'type': 'compare-select-window', 'section': 'market'}, 'value'),
+        ],
+        SESSION_STATE,
+    )
+    @latest_only
+    def update_comparison(tickers: List[str], period: str, benchmark: str, window: str) -> Tuple[dict, dict, List[dict]]:
+        tickers = tickers or []
+        window = int(window or ROLLING_WINDOWS[0])
+        benchmark_options = [{'label': 'Equal-Weight Universe', 'value': UNIVERSE_BENCHMARK}] + [{'label': ticker, 'value': ticker} for ticker in tickers]
+        # A benchmark removed from the selection falls back to the universe
+        if benchmark not in tickers:
+            benchmark = UNIVERSE_BENCHMARK
+
+        time_period_text = f'Last {period.capitalize()}' if period != 'max' else 'All Time'
+        benchmark_text = 'Equal-Weight Universe' if benchmark == UNIVERSE_BENCHMARK else benchmark
+        performance_title = f'Relative Performance - {time_period_text}'
+        rolling_title = f'{window}-Day Rolling Correlation vs {benchmark_text} - {time_period_text}'
+
+        client = db.get_client()
+        try:
+            # One batched fetch of the selection covers a ticker benchmark and the history the first window needs
+            matrix = db.get_close_matrix(client, tickers, ROLLING_FETCH_PERIODS.get(period, 'max'), include_dates=True) if tickers else pl.DataFrame()
+            # The universe benchmark is the equal-weight market column of the sector index, built once per data version
+            index = get_sector_index(client) if benchmark == UNIVERSE_BENCHMARK and not matrix.is_empty() else None
+            raise_if_superseded()
+        except ValueError as e:
+            return encode_figure(cmp.create_empty_chart(performance_title, text=str(e))), encode_figure(cmp.create_empty_chart(rolling_title, text=str(e))), benchmark_options
+        finally:
+            client.close()
+
+        selected = [ticker for ticker in tickers if ticker in matrix.columns]
+        if not selected:
+            return encode_figure(cmp.create_empty_chart(performance_title)), encode_figure(cmp.create_empty_chart(rolling_title)), benchmark_options
+
+        dates = matrix['date'].cast(pl.Date).to_numpy()
+        columns = matrix.columns[1:]
+        closes = matrix.select(columns).to_numpy().astype(float)
+        returns = daily_returns(closes)
+        if benchmark == UNIVERSE_BENCHMARK:
+            benchmark_returns = index.returns_on(dates, MARKET)
+        else:
+            benchmark_returns = returns[:, columns.index(benchmark)]
+        compared = [ticker for ticker in selected if ticker != benchmark]
+        rolling = rolling_correlation(returns[:, [columns.index(ticker) for ticker in compared]], benchmark_returns, window)
+
+        shown = dates > np.datetime64(dt.date.today() - dt.timedelta(days=PERIOD_DAYS[period])) if period in PERIOD_DAYS else np.ones(len(dates), dtype=bool)
+        performance = rebase(closes[shown][:, [columns.index(ticker) for ticker in selected]])
+        performance_df = long_series(dates[shown], selected, performance)
+        rolling_df = long_series(dates[shown], compared, rolling[shown])
+
+        if performance_df.is_empty():
+            performance_fig = cmp.create_empty_chart(performance_title)
+        else:
+            performance_fig = cmp.create_line_chart(
+                performance_df, x='date', y='value', title=performance_title, color=cmp.PRIMARY_COLOR,
+                series='ticker', y_title='Rebased (100)', tickprefix='', hoverformat='.1f'
+            )
+        if rolling_df.is_empty():
+            rolling_fig = cmp.create_empty_chart(rolling_title)
+        else:
+            rolling_fig = cmp.create_line_chart(
+                rolling_df, x='date', y='value', title=rolling_title, color=cmp.PRIMARY_COLOR,
+                series='ticker', y_title='Correlation', tickprefix='', hoverformat='.2f'
+            )
+            rolling_fig.update_yaxes(range=[-1, 1])
+        return encode_figure(performance_fig), encode_figure(rolling_fig), benchmark_options
+
+    @app.callback(
+        [
+            Output({'type': 'overview-output-sectors', 'section': 'market'}, 'figure'),
+            Output({'type': 'overview-table-gainers', 'section': 'market'}, 'rowData'),
+            Output({'type': 'overview-table-losers', 'section': 'market'}, 'rowData'),
+            Output({'type': 'overview-table-spikes', 'section': 'market'}, 'rowData'),
+            Output({'type': 'overview-table-extremes', 'section': 'market'}, 'rowData'),
+            Output({'type': 'overview-as-of', 'section': 'market'}, 'children'),
+        ],
+        Input({'type': 'overview-select-window', 'section': 'market'}, 'value'),
+    )
+    def update_overview(window: str) -> Tuple[dict, List[dict], List[dict], List[dict], List[dict], str]:
+        # Every table comes from a precomputed digest; get_digest never scans the stocks table
+        client = db.get_client()
+        try:
+            digest = get_digest(client)
+        finally:
+            client.close()
+        if digest is None:
+            digest = Digest({}, '', None)
+            as_of_text = 'Market digest not built yet'
+        else:
+            as_of_text = f'As of {digest.as_of:%b %d, %Y}' if digest.as_of else 'No market data yet'
+
+        chart_title = f'Sector Returns - {window.title()}'
+        sectors = digest.table('sectors').filter(pl.col('window') == window)
+        if sectors.is_empty():
+            sector_fig = cmp.create_empty_chart(chart_title)
+        else:
+            sector_fig = cmp.create_bar_chart(sectors.with_columns(pl.col('return') * 100), x='sector', y='return', title=chart_title, color=cmp.PRIMARY_COLOR)
+            sector_fig.update_traces(hovertemplate='%{x}<br>%{y:+.2f}%<extra></extra>')
+            sector_fig.update_layout(yaxis=dict(title='Average Return (%)', ticksuffix='%'))
+
+        movers = digest.table('movers')
+        mover_rows = {}
+        for direction in ['gainers', 'losers']:
+            rows = movers.filter((pl.col('window') == window) & (pl.col('direction') == direction))
+            mover_rows[direction] = [
+                {'Ticker': row['ticker'], 'Sector': row['sector'], 'Close': format_currency(row['close']), 'Return': f"{row['return']:+.2%}"}
+                for row in rows.iter_rows(named=True)
+            ]
+        spike_rows = [
+            {'Ticker': row['ticker'], 'Volume': f"{row['volume']:,.0f}", 'Average': f"{row['average']:,.0f}", 'Z-Score': f"{row['zscore']:.1f}"}
+            for row in digest.table('volume_spikes').iter_rows(named=True)
+        ]
+        extreme_rows = [
+            {'Ticker': row['ticker'], 'Kind': row['kind'], 'Close': format_currency(row['close']), 'Range': f"{format_currency(row['low'])} - {format_currency(row['high'])}"}
+            for row in digest.table('extremes').iter_rows(named=True)
+        ]
+        return encode_figure(sector_fig), mover_rows['gainers'], mover_rows['losers'], spike_rows, extreme_rows, as_of_text
+
+    @app.callback(
+        [
+            Output({'type': 'sector-output-index', 'section': 'market'}, 'figure'),
+            Output({'type': 'sector-output-rotation', 'section': 'market'}, 'figure'),
+        ],
+        [
+            Input({'type': 'time-period-store', 'section': 'market'}, 'data'),
+            Input({'type': 'sector-select-weighting', 'section': 'market'}, 'value'),
+            Input({'type': 'sector-select-view', 'section': 'market'}, 'value'),
+        ],
+        SESSION_STATE,
+    )
+    @latest_only
+    def update_sector_charts(period: str, weighting: str, view: str) -> Tuple[dict, dict]:
+        # Index series are cached per data version, so switching views and periods does not refetch
+        time_period_text = f'Last {period.capitalize()}' if period != 'max' else 'All Time'
+        if view == RELATIVE_STRENGTH_VIEW:
+            index_title = f'Sector Relative Strength vs Market - {time_period_text}'
+        else:
+            index_title = f'Sector Indices - {time_period_text}'
+        rotation_title = 'Sector Rotation'
+
+        client = db.get_client()
+        try:
+            index = get_sector_index(client)
+            raise_if_superseded()
+        except ValueError as e:
+            return encode_figure(cmp.create_empty_chart(index_title, text=str(e))), encode_figure(cmp.create_empty_chart(rotation_title))
         finally:
-            client.close()
\ No newline at end of file
+            client.close()
+
+        sectors = index.listed_sectors()
+        if not sectors:
+            return encode_figure(cmp.create_empty_chart(index_title)), encode_figure(cmp.create_empty_chart(rotation_title))
+
+        shown = index.dates > np.datetime64(dt.date.today() - dt.timedelta(days=PERIOD_DAYS[period])) if period in PERIOD_DAYS else np.ones(len(index.dates), dtype=bool)
+        levels = index.levels[weighting][shown]
+        columns = [index.sectors.index(sector) for sector in sectors]
+        if view == RELATIVE_STRENGTH_VIEW:
+            series_df = long_series(index.dates[shown], sectors, relative_strength(levels[:, columns], levels[:, -1]))
+            y_title = 'Relative Strength (100)'
+        else:
+            series_df = long_series(index.dates[shown], sectors + [MARKET], rebase(levels[:, columns + [len(index.sectors) - 1]]))
+            y_title = 'Rebased (100)'
+
+        if series_df.is_empty():
+            index_fig = cmp.create_empty_chart(index_title)
+        else:
+            index_fig = cmp.create_line_chart(
+                series_df.rename({'ticker': 'sector'}), x='date', y='value', title=index_title, color=cmp.PRIMARY_COLOR,
+                series='sector', y_title=y_title, tickprefix='', hoverformat='.1f'
+            )
+        tails = rotation_tails(index, weighting)
+        rotation_fig = cmp.create_rotation_chart(tails, title=rotation_title) if not tails.is_empty() else cmp.create_empty_chart(rotation_title)
+        return encode_figure(index_fig), encode_figure(rotation_fig)
@@ -2,6 +2,10 @@ from dash import dcc, html
 import dash_bootstrap_components as dbc
 import components as cmp
 import services.db as db
+from services.correlation import CLUSTERED_VIEW, MATRIX_VIEW, PAIRS_VIEW, ROLLING_WINDOWS, SECTOR_VIEW, UNIVERSE_BENCHMARK
+from services.digest import DIGEST_WINDOWS
+from services.sector_index import CAP_WEIGHT, EQUAL_WEIGHT, INDEX_VIEW, RELATIVE_STRENGTH_VIEW
+from utils.callback_utils import get_ticker_options
 from utils.google_cloud_utils import get_bigquery_client
 
 def create_layout(tickers: list) -> dbc.Container:
@@ -11,8 +15,8 @@ def create_layout(tickers: list) -> dbc.Container:
         className='text-center opacity-75 fs-4'
     )
 
-    # Get options dictionaries for the select components
-    ticker_options = [{'label': ticker, 'value': ticker} for ticker in tickers]
+    # Only the default selections are sent; the dropdowns search the rest on the server
+    ticker_options = get_ticker_options(tickers[:2])
 
     volume_options = [
         {'label': 'All', 'value': 'all'},
@@ -23,6 +27,17 @@ def create_layout(tickers: list) -> dbc.Container:
         {'label': 'Very Low (< 100K)', 'value': 'very_low'}
     ]
 
+    corr_view_options = [
+        {'label': 'Matrix', 'value': MATRIX_VIEW},
+        {'label': 'Clustered Matrix', 'value': CLUSTERED_VIEW},
+        {'label': 'Sector Average', 'value': SECTOR_VIEW},
+        {'label': 'Strongest Pairs', 'value': PAIRS_VIEW},
+    ]
+    corr_scope_options = [
+        {'label': 'Selected Stocks', 'value': 'selected'},
+        {'label': 'All Stocks', 'value': 'all'},
+    ]
+
     # Create the UI components
     general_filters_group = dbc.Card(
         dbc.CardBody([
@@ -30,9 +45,9 @@ def create_layout(tickers: list) -> dbc.Container:
                 # Ticker select input
                 dbc.Col([
                     cmp.create_label('Select Stock:', {'type': 'dynamic-select-stock', 'section': 'market'}),
-                    cmp.create_select(
+                    cmp.create_search_select(
                         id={'type': 'dynamic-select-stock', 'section': 'market'},
-                        options=ticker_options,
+                        options=ticker_options[:1],
                         value=ticker_options[0]['value']
                     )
                 ], sm=12, md=4, className="pe-3 my-2 align-self-center"),
@@ -75,6 +90,76 @@ def create_layout(tickers: list) -> dbc.Container:
         class_name="mb-4 shadow-sm bg-dark text-light"
     )
 
+    sector_weighting_options = [
+        {'label': 'Equal Weight', 'value': EQUAL_WEIGHT},
+        {'label': 'Price x Volume', 'value': CAP_WEIGHT},
+    ]
+    sector_view_options = [
+        {'label': 'Sector Index', 'value': INDEX_VIEW},
+        {'label': 'Relative Strength', 'value': RELATIVE_STRENGTH_VIEW},
+    ]
+
+    # Universe-wide overview read from the precomputed market digest
+    overview_window_options = [{'label': window.title(), 'value': window} for window in DIGEST_WINDOWS]
+    overview_table_columns = {
+        'gainers': ['Ticker', 'Sector', 'Close', 'Return'],
+        'losers': ['Ticker', 'Sector', 'Close', 'Return'],
+        'spikes': ['Ticker', 'Volume', 'Average', 'Z-Score'],
+        'extremes': ['Ticker', 'Kind', 'Close', 'Range'],
+    }
+    overview_titles = {
+        'gainers': 'Top Gainers',
+        'losers': 'Top Losers',
+        'spikes': 'Volume Spikes',
+        'extremes': '52-Week Highs & Lows',
+    }
+    overview_tables = [
+        dbc.Col(
+            dbc.Card(
+                dbc.CardBody([
+                    html.H5(overview_titles[name], className='card-title text-center mb-3'),
+                    cmp.create_table(
+                        id={'type': f'overview-table-{name}', 'section': 'market'},
+                        columns=[{'field': field, 'sortable': True} for field in columns],
+                        data=[],
+                    )
+                ]),
+                class_name='mb-4 shadow-sm bg-dark text-light'
+            ),
+            xl=3, md=6, sm=12
+        )
+        for name, columns in overview_table_columns.items()
+    ]
+    overview_section = dbc.Row([
+        dbc.Row([
+            dbc.Col(
+                cmp.create_chart_container(
+                    content_id={'type': 'overview-output-sectors', 'section': 'market'},
+                    inputs=[
+                        dbc.Row([
+                            dbc.Col([
+                                cmp.create_label('Market Overview Window:', {'type': 'overview-select-window', 'section': 'market'}),
+                                cmp.create_select(
+                                    id={'type': 'overview-select-window', 'section': 'market'},
+                                    options=overview_window_options,
+                                    value=overview_window_options[0]['value']
+                                )
+                            ], width=6),
+                            dbc.Col(
+                                html.Small(id={'type': 'overview-as-of', 'section': 'market'}, className='text-light opacity-75'),
+                                width=6, className='align-self-end text-end'
+                            )
+                        ])
+                    ],
+                    bg_color='dark',
+                    loading_color=cmp.PRIMARY_COLOR
+                ),
+                width=12
+            )
+        ]),
+        dbc.Row(overview_tables, className='align-items-stretch')
+    ], className='mb-4')
+
     # Charts section
     charts_section = dbc.Row([
         # Line and Candlestick charts row
@@ -144,22 +229,123 @@ def create_layout(tickers: list) -> dbc.Container:
                         ]),
                         dbc.Row([
                             dbc.Col(
-                                cmp.create_multi_select(
+                                cmp.create_search_select(
                                     id={'type': 'dynamic-select-corr', 'section': 'market'},
                                     options=ticker_options,
-                                    value=[ticker_options[0]['value'], ticker_options[1]['value']],
-                                    placeholder='Select stocks'
+                                    value=[option['value'] for option in ticker_options],
+                                    placeholder='Select stocks',
+                                    multi=True
                                 ), 
                                 width=12
                             )
+                        ]),
+                        dbc.Row([
+                            dbc.Col(
+                                cmp.create_select(
+                                    id={'type': 'dynamic-select-corr-view', 'section': 'market'},
+                                    options=corr_view_options,
+                                    value=MATRIX_VIEW,
+                                    placeholder='Select a view'
+                                ),
+                                width=6
+                            ),
+                            dbc.Col(
+                                cmp.create_select(
+                                    id={'type': 'dynamic-select-corr-scope', 'section': 'market'},
+                                    options=corr_scope_options,
+                                    value='selected',
+                                    placeholder='Select stocks to correlate'
+                                ),
+                                width=6
+                            )
+                        ], className='mt-1')
+                    ],
+                    bg_color='dark',
+                    loading_color=cmp.PRIMARY_COLOR
+                ),
+                xl=6, md=12, sm=12
+            )
+        ], className='align-items-stretch'),
+
+        # Relative performance and rolling correlation of the correlation selection
+        dbc.Row([
+            dbc.Col(
+                cmp.create_chart_container(
+                    content_id={'type': 'compare-output-performance', 'section': 'market'},
+                    bg_color='dark',
+                    loading_color=cmp.PRIMARY_COLOR
+                ),
+                xl=6, md=12, sm=12
+            ),
+            dbc.Col(
+                cmp.create_chart_container(
+                    content_id={'type': 'compare-output-rolling', 'section': 'market'},
+                    inputs=[
+                        dbc.Row([
+                            dbc.Col([
+                                cmp.create_label('Correlate Against:', {'type': 'compare-select-benchmark', 'section': 'market'}),
+                                cmp.create_select(
+                                    id={'type': 'compare-select-benchmark', 'section': 'market'},
+                                    options=[{'label': 'Equal-Weight Universe', 'value': UNIVERSE_BENCHMARK}],
+                                    value=UNIVERSE_BENCHMARK
+                                )
+                            ], width=6),
+                            dbc.Col([
+                                cmp.create_label('Window:', {'type': 'compare-select-window', 'section': 'market'}),
+                                cmp.create_select(
+                                    id={'type': 'compare-select-window', 'section': 'market'},
+                                    options=[{'label': f'{window} Days', 'value': str(window)} for window in ROLLING_WINDOWS],
+                                    value=str(ROLLING_WINDOWS[0])
+                                )
+                            ], width=6)
+                        ])
+                    ],
+                    bg_color='dark',
+                    loading_color=cmp.PRIMARY_COLOR
+                ),
+                xl=6, md=12, sm=12
+            )
+        ], className='mt-4 align-items-stretch'),
+
+        # Sector indices over the whole universe, and their rotation against the market
+        dbc.Row([
+            dbc.Col(
+                cmp.create_chart_container(
+                    content_id={'type': 'sector-output-index', 'section': 'market'},
+                    inputs=[
+                        dbc.Row([
+                            dbc.Col([
+                                cmp.create_label('Sector Weighting:', {'type': 'sector-select-weighting', 'section': 'market'}),
+                                cmp.create_select(
+                                    id={'type': 'sector-select-weighting', 'section': 'market'},
+                                    options=sector_weighting_options,
+                                    value=sector_weighting_options[0]['value']
+                                )
+                            ], width=6),
+                            dbc.Col([
+                                cmp.create_label('Sector View:', {'type': 'sector-select-view', 'section': 'market'}),
+                                cmp.create_select(
+                                    id={'type': 'sector-select-view', 'section': 'market'},
+                                    options=sector_view_options,
+                                    value=sector_view_options[0]['value']
+                                )
+                            ], width=6)
                         ])
                     ],
                     bg_color='dark',
                     loading_color=cmp.PRIMARY_COLOR
                 ),
                 xl=6, md=12, sm=12
+            ),
+            dbc.Col(
+                cmp.create_chart_container(
+                    content_id={'type': 'sector-output-rotation', 'section': 'market'},
+                    bg_color='dark',
+                    loading_color=cmp.PRIMARY_COLOR
+                ),
+                xl=6, md=12, sm=12
             )
-        ], className='align-items-stretch')
+        ], className='mt-4 align-items-stretch')
     ])
 
     # Main layout
@@ -181,6 +367,9 @@ def create_layout(tickers: list) -> dbc.Container:
             dbc.Col(navigation_buttons_group, md=12, lg=10, xl=4)
         ], class_name='mb-4 justify-content-center'),
 
+        # Overview section
+        overview_section,
+
         # Charts section
         charts_section
 
@@ -1,12 +1,24 @@
+import datetime as dt
 from io import StringIO
 from dash import Dash, Input, Output
+import numpy as np
 import pandas as pd
 import polars as pl
-from config import CREDENTIALS_DICT, PROJECT_ID
 import components as cmp
 import services.db as db
-from utils.fig_utils import format_currency, format_percent
-from utils.google_cloud_utils import get_bigquery_client
+from services.backtest import NONE, backtest_portfolio
+from services.jobs import background_callback
+from services.ledger import Ledger, get_cost_basis, summarize_pnl
+from services.optimizer import current_weights, efficient_frontier, get_return_statistics
+from utils.fig_utils import encode_figure, format_currency, format_percent
+
+# Tickers shown in the allocation chart, by largest weight in any of the portfolios
+ALLOCATION_MAX_TICKERS = 20
+# Backtest range when no dates are picked
+BACKTEST_DEFAULT_DAYS = 5 * 365
+BACKTEST_LABELS = {'none': 'Buy and Hold', 'monthly': 'Monthly', 'quarterly': 'Quarterly', 'annual': 'Annually'}
+BACKTEST_CHARTS = ['Backtest Equity', 'Drawdown', 'Rebalance Turnover']
+PNL_KPIS = ['Cost Basis', 'Unrealized P&L', 'Realized P&L', 'Unrealized Return']
 
 def register_callbacks(app: Dash) -> None:
     @app.callback(
@@ -61,7 +73,7 @@ def register_callbacks(app: Dash) -> None:
         portfolio_distribution_chart.update_layout(xaxis=dict(title='Value (USD)'))
 
         # Get sector data and create sector distribution chart
-        client = get_bigquery_client(CREDENTIALS_DICT, PROJECT_ID)
+        client = db.get_client()
         try:
             sector_df = db.get_sector_data(client)
             aggregated_df = db.aggregate_portfolio_by_sector(
@@ -86,4 +98,156 @@ def register_callbacks(app: Dash) -> None:
             portfolio_distribution_chart,
             sector_distribution_chart
         ]
-        return kpis + charts
\ No newline at end of file
+        return kpis + charts
+
+    @background_callback(
+        app,
+        [
+            Output({'type': 'efficient-frontier-chart', 'section': 'portfolio'}, 'figure'),
+            Output({'type': 'optimal-allocation-chart', 'section': 'portfolio'}, 'figure'),
+        ],
+        [
+            Input("url", "pathname"),
+            Input({'type': 'portfolio-data', 'section': 'global'}, 'data'),
+            Input({'type': 'optimizer-select-period', 'section': 'portfolio'}, 'value'),
+            Input({'type': 'optimizer-select-constraint', 'section': 'portfolio'}, 'value'),
+        ],
+        status=Output({'type': 'job-status', 'section': 'optimizer'}, 'children'),
+    )
+    def update_optimizer(set_progress, pathname, portfolio_data: str, period: str, constraint: str) -> list:
+        portfolio_df = pd.read_json(StringIO(portfolio_data), orient="records") if portfolio_data else pd.DataFrame()
+        if len(portfolio_df) < 2:
+            return [
+                encode_figure(cmp.create_empty_chart(title=title, text="Add at least two stocks to optimize the portfolio."))
+                for title in ['Efficient Frontier', 'Optimal Allocation']
+            ]
+
+        set_progress("Estimating returns and covariance...")
+        client = db.get_client()
+        try:
+            statistics = get_return_statistics(client, portfolio_df["Ticker"].to_list(), period)
+        except ValueError as e:
+            return [encode_figure(cmp.create_empty_chart(title=title, text=str(e))) for title in ['Efficient Frontier', 'Optimal Allocation']]
+        finally:
+            client.close()
+
+        set_progress("Tracing the efficient frontier...")
+        frontier = efficient_frontier(statistics, long_only=constraint != 'short')
+        portfolios = {
+            'Current': current_weights(statistics, dict(zip(portfolio_df["Ticker"], portfolio_df["Value"]))),
+            'Min Variance': frontier.min_variance,
+            'Max Sharpe': frontier.max_sharpe,
+        }
+        returns, volatility, _ = statistics.performance(np.vstack(list(portfolios.values())))
+        asset_volatility = np.sqrt(np.diag(statistics.cov))
+
+        frontier_chart = cmp.create_frontier_chart(
+            frontier=pl.DataFrame({'volatility': frontier.volatility, 'return': frontier.returns}),
+            assets=pl.DataFrame({'ticker': statistics.tickers, 'volatility': asset_volatility, 'return': statistics.mean}),
+            portfolios=pl.DataFrame({'name': list(portfolios), 'volatility': volatility, 'return': returns}),
+            title=f"Efficient Frontier - {period.title()}",
+        )
+
+        weights = np.vstack(list(portfolios.values()))
+        shown = np.argsort(-np.abs(weights).max(axis=0), kind='stable')[:ALLOCATION_MAX_TICKERS]
+        allocations = pl.DataFrame({
+            'ticker': [statistics.tickers[i] for i in shown for _ in portfolios],
+            'portfolio': [name for _ in shown for name in portfolios],
+            'weight': [float(weights[j, i]) for i in shown for j in range(len(portfolios))],
+        })
+        allocation_chart = cmp.create_allocation_chart(allocations, title="Optimal Allocation")
+        return [encode_figure(frontier_chart), encode_figure(allocation_chart)]
+
+    @background_callback(
+        app,
+        [
+            Output({'type': 'backtest-equity-chart', 'section': 'portfolio'}, 'figure'),
+            Output({'type': 'backtest-drawdown-chart', 'section': 'portfolio'}, 'figure'),
+            Output({'type': 'backtest-turnover-chart', 'section': 'portfolio'}, 'figure'),
+        ],
+        [
+            Input("url", "pathname"),
+            Input({'type': 'portfolio-data', 'section': 'global'}, 'data'),
+            Input({'type': 'backtest-select-schedule', 'section': 'portfolio'}, 'value'),
+            Input({'type': 'backtest-date-range', 'section': 'portfolio'}, 'start_date'),
+            Input({'type': 'backtest-date-range', 'section': 'portfolio'}, 'end_date'),
+        ],
+        status=Output({'type': 'job-status', 'section': 'backtest'}, 'children'),
+    )
+    def update_backtest(set_progress, pathname, portfolio_data: str, schedule: str, start_date: str, end_date: str) -> list:
+        portfolio_df = pd.read_json(StringIO(portfolio_data), orient="records") if portfolio_data else pd.DataFrame()
+        if portfolio_df.empty:
+            return [
+                encode_figure(cmp.create_empty_chart(title=title, text="Please add stocks to your portfolio in 'My Portfolio' section."))
+                for title in BACKTEST_CHARTS
+            ]
+
+        end = dt.date.fromisoformat(end_date) if end_date else dt.date.today()
+        start = dt.date.fromisoformat(start_date) if start_date else end - dt.timedelta(days=BACKTEST_DEFAULT_DAYS)
+        values = portfolio_df.groupby("Ticker")["Value"].sum().to_dict()
+        # Compare the chosen schedule with never rebalancing
+        schedules = list(dict.fromkeys([NONE, schedule]))
+
+        set_progress("Loading price history...")
+        client = db.get_client()
+        try:
+            backtests = backtest_portfolio(client, values, schedules, start, end)
+        except ValueError as e:
+            return [encode_figure(cmp.create_empty_chart(title=title, text=str(e))) for title in BACKTEST_CHARTS]
+        finally:
+            client.close()
+
+        # Equity curves start from today's portfolio value
+        total_value = float(portfolio_df["Value"].sum())
+        equity, drawdown, turnover = [], [], []
+        for backtest in backtests:
+            summary = backtest.summary()
+            label = BACKTEST_LABELS.get(backtest.schedule, backtest.schedule)
+            equity.append(pl.DataFrame({
+                'date': backtest.dates,
+                'series': f"{label} (CAGR {format_percent(summary['cagr'])})",
+                'value': backtest.equity / backtest.equity[0] * total_value,
+            }))
+            drawdown.append(pl.DataFrame({
+                'date': backtest.dates,
+                'series': f"{label} (Max {format_percent(summary['max_drawdown'])})",
+                'value': backtest.drawdown,
+            }))
+            turnover.append(pl.DataFrame({
+                'date': backtest.rebalance_dates,
+                'series': label,
+                'value': backtest.turnover,
+            }, schema={'date': pl.Date, 'series': pl.Utf8, 'value': pl.Float64}))
+
+        period = f"{backtests[0].dates[0]} to {backtests[0].dates[-1]}"
+        equity_chart = cmp.create_backtest_chart(pl.concat(equity), f"Backtest Equity - {period}", 'Value (USD)', '$,.0f')
+        drawdown_chart = cmp.create_backtest_chart(pl.concat(drawdown), "Drawdown", 'Drawdown', '.1%')
+        turnover_df = pl.concat(turnover).filter(pl.col('series') != BACKTEST_LABELS[NONE])
+        if turnover_df.is_empty():
+            turnover_chart = cmp.create_empty_chart(title="Rebalance Turnover", text="Buy and hold never trades after the initial purchase.")
+        else:
+            turnover_chart = cmp.create_backtest_chart(turnover_df, "Rebalance Turnover", 'One-Way Turnover', '.1%', kind='bar')
+        return [encode_figure(equity_chart), encode_figure(drawdown_chart), encode_figure(turnover_chart)]
+
+    @app.callback(
+        [Output({'type': 'kpi-value', 'section': kpi}, 'children') for kpi in PNL_KPIS],
+        [
+            Input("url", "pathname"),
+            Input({'type': 'ledger-data', 'section': 'global'}, 'data'),
+            Input({'type': 'price-data', 'section': 'global'}, 'data'),
+            Input({'type': 'select-cost-method', 'section': 'portfolio'}, 'value'),
+        ]
+    )
+    def update_pnl(pathname, ledger_data: dict, price_data: dict, method: str) -> list:
+        ledger = Ledger.from_dict(ledger_data)
+        if not len(ledger):
+            return ['-'] * len(PNL_KPIS)
+        # Only the trades appended since the last call are applied
+        positions = get_cost_basis(ledger, method).positions(ledger.tickers, price_data or {})
+        summary = summarize_pnl(positions)
+        return [
+            format_currency(summary['cost_basis']),
+            format_currency(summary['unrealized']),
+            format_currency(summary['realized']),
+            format_percent(summary['unrealized_return']),
+        ]
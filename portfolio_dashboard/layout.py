@@ -1,4 +1,4 @@
-from dash import html
+from dash import dcc, html
 import dash_bootstrap_components as dbc
 import components as cmp
 
@@ -36,6 +36,36 @@ def create_layout() -> dbc.Container:
         dbc.Col(cmp.create_kpi_card("HHI", "-", color="primary", value_id={'type': 'kpi-value', 'section': 'HHI'}), xl=3, md=6, xs=12, class_name="mb-4"),
     ], class_name="mb-4 justify-content-center")
 
+    # P&L KPIs from the trade ledger, under the selected cost-basis method
+    cost_method_options = [
+        {"label": "FIFO", "value": "fifo"},
+        {"label": "LIFO", "value": "lifo"},
+        {"label": "Average Cost", "value": "average"},
+    ]
+    pnl_kpis = ["Cost Basis", "Unrealized P&L", "Realized P&L", "Unrealized Return"]
+    pnl_group = dbc.Card(
+        dbc.CardBody([
+            dbc.Row([
+                dbc.Col([
+                    cmp.create_label("Cost Basis Method:", {'type': 'select-cost-method', 'section': 'portfolio'}),
+                    cmp.create_select(
+                        id={'type': 'select-cost-method', 'section': 'portfolio'},
+                        options=cost_method_options,
+                        value="fifo",
+                    ),
+                ], xl=3, md=6, xs=12),
+            ], class_name="mb-3 justify-content-center"),
+            dbc.Row([
+                dbc.Col(
+                    cmp.create_kpi_card(kpi, "-", color="primary", value_id={'type': 'kpi-value', 'section': kpi}),
+                    xl=3, md=6, xs=12
+                )
+                for kpi in pnl_kpis
+            ], class_name="justify-content-center"),
+        ]),
+        class_name="mb-4 shadow-sm bg-dark text-light"
+    )
+
     # Chart Containers
     portfolio_distribution_chart =  cmp.create_chart_container(
         content_id={'type': 'portfolio-distribution-chart', 'section': 'portfolio'},
@@ -49,6 +79,99 @@ def create_layout() -> dbc.Container:
         loading_color=cmp.PRIMARY_COLOR
     )
 
+    # Optimizer: lookback and constraint shared by the frontier and allocation charts
+    lookback_options = [
+        {"label": period.title(), "value": period}
+        for period in ["3 months", "6 months", "1 year", "5 years", "max"]
+    ]
+    constraint_options = [
+        {"label": "Long Only", "value": "long_only"},
+        {"label": "Allow Short Positions", "value": "short"},
+    ]
+    efficient_frontier_chart = cmp.create_chart_container(
+        content_id={'type': 'efficient-frontier-chart', 'section': 'portfolio'},
+        inputs=[
+            dbc.Row([
+                dbc.Col([
+                    cmp.create_label("Lookback:", {'type': 'optimizer-select-period', 'section': 'portfolio'}),
+                    cmp.create_select(
+                        id={'type': 'optimizer-select-period', 'section': 'portfolio'},
+                        options=lookback_options,
+                        value="1 year",
+                    ),
+                ], width=6),
+                dbc.Col([
+                    cmp.create_label("Positions:", {'type': 'optimizer-select-constraint', 'section': 'portfolio'}),
+                    cmp.create_select(
+                        id={'type': 'optimizer-select-constraint', 'section': 'portfolio'},
+                        options=constraint_options,
+                        value="long_only",
+                    ),
+                ], width=6),
+            ]),
+            # Queue position and progress of the background job
+            html.Small(id={'type': 'job-status', 'section': 'optimizer'}, className="text-muted"),
+        ],
+        bg_color='dark',
+        loading_color=cmp.PRIMARY_COLOR
+    )
+
+    optimal_allocation_chart = cmp.create_chart_container(
+        content_id={'type': 'optimal-allocation-chart', 'section': 'portfolio'},
+        bg_color='dark',
+        loading_color=cmp.PRIMARY_COLOR
+    )
+
+    # Backtest: rebalance schedule and date range shared by the equity, drawdown and turnover charts
+    schedule_options = [
+        {"label": "Buy and Hold", "value": "none"},
+        {"label": "Monthly", "value": "monthly"},
+        {"label": "Quarterly", "value": "quarterly"},
+        {"label": "Annually", "value": "annual"},
+    ]
+    backtest_equity_chart = cmp.create_chart_container(
+        content_id={'type': 'backtest-equity-chart', 'section': 'portfolio'},
+        inputs=[
+            dbc.Row([
+                dbc.Col([
+                    cmp.create_label("Rebalance:", {'type': 'backtest-select-schedule', 'section': 'portfolio'}),
+                    cmp.create_select(
+                        id={'type': 'backtest-select-schedule', 'section': 'portfolio'},
+                        options=schedule_options,
+                        value="quarterly",
+                    ),
+                ], md=6, sm=12),
+                dbc.Col([
+                    cmp.create_label("Dates:", {'type': 'backtest-date-range', 'section': 'portfolio'}),
+                    # Left empty, the range defaults to the last five years when the callback runs
+                    dcc.DatePickerRange(
+                        id={'type': 'backtest-date-range', 'section': 'portfolio'},
+                        start_date_placeholder_text="5 years ago",
+                        end_date_placeholder_text="Today",
+                        clearable=True,
+                        display_format="YYYY-MM-DD",
+                        className="w-100",
+                    ),
+                ], md=6, sm=12),
+            ]),
+            html.Small(id={'type': 'job-status', 'section': 'backtest'}, className="text-muted"),
+        ],
+        bg_color='dark',
+        loading_color=cmp.PRIMARY_COLOR
+    )
+
+    backtest_drawdown_chart = cmp.create_chart_container(
+        content_id={'type': 'backtest-drawdown-chart', 'section': 'portfolio'},
+        bg_color='dark',
+        loading_color=cmp.PRIMARY_COLOR
+    )
+
+    backtest_turnover_chart = cmp.create_chart_container(
+        content_id={'type': 'backtest-turnover-chart', 'section': 'portfolio'},
+        bg_color='dark',
+        loading_color=cmp.PRIMARY_COLOR
+    )
+
     # Layout
     layout = dbc.Container([
         dbc.Row([dbc.Col(title, width=12)], class_name="my-2 text-center"),
@@ -56,10 +179,20 @@ def create_layout() -> dbc.Container:
         html.Hr(className='mb-4'),
         navigation_buttons_group,
         kpi_cards_group,
+        pnl_group,
         dbc.Row([
             dbc.Col(portfolio_distribution_chart, xl=6, md=12, sm=12),
             dbc.Col(sector_distribution_chart, xl=6, md=12, sm=12)
         ], class_name="mb-4"),
+        dbc.Row([
+            dbc.Col(efficient_frontier_chart, xl=6, md=12, sm=12),
+            dbc.Col(optimal_allocation_chart, xl=6, md=12, sm=12)
+        ], class_name="mb-4"),
+        dbc.Row([dbc.Col(backtest_equity_chart, width=12)], class_name="mb-4"),
+        dbc.Row([
+            dbc.Col(backtest_drawdown_chart, xl=6, md=12, sm=12),
+            dbc.Col(backtest_turnover_chart, xl=6, md=12, sm=12)
+        ], class_name="mb-4"),
     ], fluid=True)
 
     return layout
@@ -1,19 +1,33 @@
-from typing import Dict, Union
+from typing import Any, Dict, Union
 from io import StringIO
+import datetime as dt
 from dash import Dash, Input, Output, State, callback_context
 import dash_ag_grid as dag
 import pandas as pd
 import components as cmp
+from services.ledger import Ledger, open_positions, record_position_change
 from services.portfolio import add_stock, edit_stock, delete_stock
+from utils.callback_utils import search_ticker_options
 from utils.fig_utils import prepare_table_data
 
 def register_callbacks(app: Dash) -> None:
+    # Search-as-you-type options for the ticker dropdown
+    @app.callback(
+        Output({"type": "input-ticker", "section": "portfolio-form"}, "options"),
+        Input({"type": "input-ticker", "section": "portfolio-form"}, "search_value"),
+        State({"type": "input-ticker", "section": "portfolio-form"}, "value"),
+        prevent_initial_call=True
+    )
+    def search_ticker_input_options(search_value: str, value: str) -> list:
+        return search_ticker_options(search_value, value)
+
     @app.callback(
         [
             Output({"type": "portfolio-data", "section": "global"}, "data"),
             Output({"type": "alert-feedback", "section": "portfolio-form"}, "is_open"),
             Output({"type": "alert-feedback", "section": "portfolio-form"}, "color"),
             Output({"type": "alert-feedback", "section": "portfolio-form"}, "children"),
+            Output({"type": "ledger-data", "section": "global"}, "data"),
         ],
         [
             Input({"type": "button-submit", "section": "portfolio-form"}, "n_clicks"),
@@ -25,6 +39,9 @@ def register_callbacks(app: Dash) -> None:
             State({"type": "input-shares", "section": "portfolio-form"}, "value"),
             State({"type": "portfolio-data", "section": "global"}, "data"),
             State({"type": "price-data", "section": "global"}, "data"),
+            State({"type": "input-price", "section": "portfolio-form"}, "value"),
+            State({"type": "input-date", "section": "portfolio-form"}, "date"),
+            State({"type": "ledger-data", "section": "global"}, "data"),
         ],
         prevent_initial_call=True,
     )
@@ -36,12 +53,23 @@ def register_callbacks(app: Dash) -> None:
         shares: float,
         portfolio_data: Union[str, None],
         price_data: Dict[str, float],
-    ) -> tuple[Dict[str, float], bool, str, str]:
+        trade_price: float = None,
+        trade_date: str = None,
+        ledger_data: Dict[str, Any] = None,
+    ) -> tuple[Dict[str, float], bool, str, str, Dict[str, Any]]:
         if portfolio_data:
             portfolio_data = pd.read_json(StringIO(portfolio_data), orient="records")
         else:
             portfolio_data = pd.DataFrame()
 
+        # Every change is also recorded as a trade; holdings from before the ledger become its opening buys
+        ledger = Ledger.from_dict(ledger_data)
+        if not len(ledger) and not portfolio_data.empty:
+            open_positions(ledger, {
+                row["Ticker"]: (row["Shares"], row["Price"]) for row in portfolio_data.to_dict("records")
+            })
+        date = dt.date.fromisoformat(trade_date[:10]) if trade_date else None
+
         # Default alert properties
         alert_open = True
         alert_color = "info"
@@ -49,7 +77,7 @@ def register_callbacks(app: Dash) -> None:
         
         # Prevent triggering add_stock on page load
         if add_clicks is None:
-            return portfolio_data.to_json(orient="records"), False,alert_color, alert_message
+            return portfolio_data.to_json(orient="records"), False,alert_color, alert_message, ledger_data
         
         # Identify which button was clicked to trigger the callback
         triggered_id = callback_context.triggered[0]["prop_id"]
@@ -61,6 +89,7 @@ def register_callbacks(app: Dash) -> None:
                     alert_message = "Invalid input. Please enter a valid ticker and positive shares."
                 else:
                     price = price_data[ticker]
+                    ledger.append(ticker, shares, trade_price or price, date)
                     portfolio_data = add_stock(portfolio_data, ticker, shares, price)
                     alert_color = "success"
                     alert_message = f"Added {shares} shares of {ticker}."
@@ -69,6 +98,7 @@ def register_callbacks(app: Dash) -> None:
                     alert_color = "warning"
                     alert_message = f"Cannot edit: {ticker} is not in the portfolio or shares are invalid."
                 else:
+                    record_position_change(ledger, ticker, shares, trade_price or price_data[ticker], date)
                     portfolio_data = edit_stock(portfolio_data, ticker, shares, price_data[ticker])
                     alert_color = "success"
                     alert_message = f"Updated {ticker} to {shares} shares."
@@ -77,6 +107,7 @@ def register_callbacks(app: Dash) -> None:
                     alert_color = "warning"
                     alert_message = f"Cannot delete: {ticker} is not in the portfolio."
                 else:
+                    record_position_change(ledger, ticker, 0, trade_price or price_data[ticker], date)
                     portfolio_data = delete_stock(portfolio_data, ticker)
                     alert_color = "danger"
                     alert_message = f"Deleted {ticker} from the portfolio."
@@ -84,7 +115,7 @@ def register_callbacks(app: Dash) -> None:
             alert_color = "danger"
             alert_message = f"Error: {str(e)}"
         portfolio_data_json = portfolio_data.to_json(orient="records")
-        return portfolio_data_json, alert_open, alert_color, alert_message
+        return portfolio_data_json, alert_open, alert_color, alert_message, ledger.to_dict()
 
     # Callback to display the portfolio list
     @app.callback(
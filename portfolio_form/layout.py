@@ -1,6 +1,7 @@
-from dash import html
+from dash import dcc, html
 import dash_bootstrap_components as dbc
 import components as cmp
+from utils.callback_utils import get_ticker_options
 
 def create_layout(tickers: list) -> dbc.Container:
     # Header components
@@ -27,14 +28,14 @@ def create_layout(tickers: list) -> dbc.Container:
         class_name="mb-4 shadow-sm bg-dark text-light"
     )
     
-    # Get ticker options from the database
-    ticker_options = [{"label": ticker, "value": ticker} for ticker in tickers]
+    # Only the default ticker is sent; the dropdown searches the rest on the server
+    ticker_options = get_ticker_options(tickers[:1])
 
     # Select input for stock ticker
     ticker_select = dbc.Col(
         [
             cmp.create_label("Stock Ticker:", {"type": "input-ticker", "section": "portfolio-form"}),
-            cmp.create_select(
+            cmp.create_search_select(
                 id={"type": "input-ticker", "section": "portfolio-form"},
                 options=ticker_options,
                 value=ticker_options[0]["value"]
@@ -58,6 +59,38 @@ def create_layout(tickers: list) -> dbc.Container:
         xs=12, sm=10, md=6, lg=5, xl=4, class_name="pe-lg-3 mb-3 mb-lg-0"
     )
 
+    # Trade price and date recorded in the ledger; left empty they default to the current price and today
+    price_input = dbc.Col(
+        [
+            cmp.create_label("Trade Price:", {"type": "input-price", "section": "portfolio-form"}),
+            dcc.Input(
+                id={"type": "input-price", "section": "portfolio-form"},
+                type="number",
+                min=0,
+                step=0.01,
+                placeholder="Current price",
+                debounce=True,
+                className="form-control bg-primary text-light text-center",
+                style={"height": "48px", "border": "none"},
+            )
+        ],
+        xs=12, sm=10, md=6, lg=5, xl=4, class_name="pe-lg-3 mb-3 mb-lg-0"
+    )
+
+    date_input = dbc.Col(
+        [
+            cmp.create_label("Trade Date:", {"type": "input-date", "section": "portfolio-form"}),
+            dcc.DatePickerSingle(
+                id={"type": "input-date", "section": "portfolio-form"},
+                placeholder="Today",
+                clearable=True,
+                display_format="YYYY-MM-DD",
+                className="w-100",
+            )
+        ],
+        xs=12, sm=10, md=6, lg=5, xl=4, class_name="pe-lg-3 mb-3 mb-lg-0"
+    )
+
     # Buttons
     blank_space = html.Div(style={"height": "34px"})
     add_button = dbc.Col(
@@ -105,6 +138,10 @@ def create_layout(tickers: list) -> dbc.Container:
                 [ticker_select, shares_slider], 
                 class_name="justify-content-center mb-3"
             ),
+            dbc.Row(
+                [price_input, date_input],
+                class_name="justify-content-center mb-3"
+            ),
             dbc.Row(
                 [add_button, edit_button, delete_button], 
                 class_name="justify-content-center"
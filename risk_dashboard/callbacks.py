@@ -0,0 +1,113 @@
+from io import StringIO
+from typing import Any, Dict, List, Optional
+from dash import Dash, Input, Output, State, no_update
+import pandas as pd
+import polars as pl
+import components as cmp
+from risk_dashboard.layout import RISK_KPIS
+from services.risk import HISTORICAL, get_risk_job, start_risk_job
+from utils.fig_utils import encode_figure, format_currency
+
+KPI_OUTPUTS = [f"{measure} {confidence} {horizon}D" for measure, confidence, horizon in RISK_KPIS]
+
+def _portfolio_shares(portfolio_data: Optional[str]) -> Dict[str, float]:
+    portfolio_df = pd.read_json(StringIO(portfolio_data), orient="records") if portfolio_data else pd.DataFrame()
+    if portfolio_df.empty:
+        return {}
+    return portfolio_df.groupby("Ticker")["Shares"].sum().astype(float).to_dict()
+
+def _empty_outputs(text: str) -> list:
+    empty_chart = cmp.create_empty_chart(title='No Data', text=text)
+    return ['-'] * len(KPI_OUTPUTS) + [encode_figure(empty_chart), []]
+
+def _result_outputs(result: Dict[str, Any]) -> list:
+    horizons = result['horizons']
+    kpis = [
+        format_currency(horizons[str(horizon)][measure.lower()][confidence])
+        for measure, confidence, horizon in RISK_KPIS
+    ]
+    rows = [
+        {
+            "Horizon": f"{horizon}D",
+            "Confidence": confidence,
+            "VaR": format_currency(summary['var'][confidence]),
+            "CVaR": format_currency(summary['cvar'][confidence]),
+        }
+        for horizon, summary in horizons.items()
+        for confidence in summary['var']
+    ]
+
+    # Histogram of P&L per horizon, bars at bin centres, with VaR lines at the 99% level
+    distribution = pl.concat([
+        pl.DataFrame({
+            'series': f"{horizon}D",
+            'pnl': [(low + high) / 2 for low, high in zip(summary['bins'][:-1], summary['bins'][1:])],
+            'share': [count / max(summary['paths'], 1) for count in summary['counts']],
+        })
+        for horizon, summary in horizons.items()
+    ])
+    markers = pl.DataFrame({
+        'label': [f"VaR 99% {horizon}D" for horizon in horizons],
+        'pnl': [-summary['var']['99%'] for summary in horizons.values()],
+    })
+    method = 'Historical' if result['method'] == HISTORICAL else f"Monte Carlo ({result['method'].title()})"
+    chart = cmp.create_distribution_chart(distribution, markers, title=f"P&L Distribution - {method}")
+    return kpis + [encode_figure(chart), rows]
+
+def register_callbacks(app: Dash) -> None:
+    @app.callback(
+        [
+            Output({'type': 'job', 'section': 'risk'}, 'data'),
+            Output({'type': 'interval', 'section': 'risk'}, 'disabled'),
+            Output({'type': 'progress', 'section': 'risk'}, 'value'),
+        ],
+        Input({'type': 'button-run', 'section': 'risk'}, 'n_clicks'),
+        [
+            State({'type': 'portfolio-data', 'section': 'global'}, 'data'),
+            State({'type': 'select-method', 'section': 'risk'}, 'value'),
+            State({'type': 'select-paths', 'section': 'risk'}, 'value'),
+            State({'type': 'select-period', 'section': 'risk'}, 'value'),
+        ],
+        prevent_initial_call=True,
+    )
+    def start_simulation(n_clicks: int, portfolio_data: str, method: str, paths: str, period: str) -> list:
+        shares = _portfolio_shares(portfolio_data)
+        if not shares:
+            return [{'error': "Please add stocks to your portfolio in 'My Portfolio' section."}, True, 0]
+        # The simulation runs in the background; the interval polls it until it finishes
+        job = start_risk_job(shares, method, int(paths), period)
+        request = {'key': job.key, 'shares': shares, 'method': method, 'paths': int(paths), 'period': period}
+        return [request, job.done, int(job.progress * 100)]
+
+    @app.callback(
+        [
+            Output({'type': 'progress', 'section': 'risk'}, 'value', allow_duplicate=True),
+            Output({'type': 'progress', 'section': 'risk'}, 'label'),
+            Output({'type': 'interval', 'section': 'risk'}, 'disabled', allow_duplicate=True),
+            *[Output({'type': 'kpi-value', 'section': kpi}, 'children') for kpi in KPI_OUTPUTS],
+            Output({'type': 'distribution-chart', 'section': 'risk'}, 'figure'),
+            Output({'type': 'risk-table', 'section': 'risk'}, 'rowData'),
+        ],
+        [
+            Input({'type': 'interval', 'section': 'risk'}, 'n_intervals'),
+            Input({'type': 'job', 'section': 'risk'}, 'data'),
+        ],
+        prevent_initial_call=True,
+    )
+    def poll_simulation(n_intervals: int, request: Optional[Dict[str, Any]]) -> List[Any]:
+        if not request:
+            return [no_update] * (5 + len(KPI_OUTPUTS))
+        if 'error' in request:
+            return [0, "", True] + _empty_outputs(request['error'])
+
+        job = get_risk_job(request['key'])
+        if job is None:
+            # The worker running the job exited or its state expired; seeds are fixed, so running it here gives the same result
+            job = start_risk_job(request['shares'], request['method'], request['paths'], request['period'])
+        progress = int(job.progress * 100)
+
+        if not job.done:
+            return [progress, f"{progress}%", False] + [no_update] * (2 + len(KPI_OUTPUTS))
+        if job.error is not None:
+            return [100, "Failed", True] + _empty_outputs(job.error)
+        return [100, "Done", True] + _result_outputs(job.result)
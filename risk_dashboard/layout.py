@@ -0,0 +1,127 @@
+from dash import dcc, html
+import dash_bootstrap_components as dbc
+import components as cmp
+from services.risk import BOOTSTRAP, HISTORICAL, NORMAL
+
+# KPI cards, as (measure, confidence, horizon in days)
+RISK_KPIS = [("VaR", "95%", 1), ("CVaR", "95%", 1), ("VaR", "99%", 10), ("CVaR", "99%", 10)]
+
+def create_layout() -> dbc.Container:
+    title = html.H1("Risk Dashboard", className="text-center display-4 text-light")
+    description = html.P("Estimate how much your portfolio could lose", className="text-center opacity-75 fs-4")
+
+    # Navigation Buttons
+    navigation_buttons_group = dbc.Row([
+        dbc.Col(
+            dbc.Card(
+                dbc.CardBody(
+                    dbc.ButtonGroup(
+                        [
+                            dbc.Button("Portfolio Dashboard", href="/portfolio-dashboard", color="success"),
+                            dbc.Button("My Portfolio", href="/portfolio-form", color="info"),
+                            dbc.Button("Guide", href="/guide", color="secondary"),
+                        ],
+                        size="sm",
+                        className="w-100",
+                        style={"justify-content": "center"}
+                    )
+                ),
+                class_name="mb-4 shadow-sm bg-dark text-light"
+            ),
+            xl=6, lg=8, md=10, sm=12
+        )
+    ], class_name="mb-4 justify-content-center")
+
+    method_options = [
+        {"label": "Historical", "value": HISTORICAL},
+        {"label": "Monte Carlo (Normal)", "value": NORMAL},
+        {"label": "Monte Carlo (Bootstrap)", "value": BOOTSTRAP},
+    ]
+    paths_options = [
+        {"label": f"{paths:,} paths", "value": str(paths)}
+        for paths in [100_000, 1_000_000, 5_000_000]
+    ]
+    lookback_options = [
+        {"label": period.title(), "value": period}
+        for period in ["6 months", "1 year", "5 years", "max"]
+    ]
+
+    # Simulation settings, run button and progress
+    controls = dbc.Card(
+        dbc.CardBody([
+            dbc.Row([
+                dbc.Col([
+                    cmp.create_label("Method:", {"type": "select-method", "section": "risk"}),
+                    cmp.create_select(id={"type": "select-method", "section": "risk"}, options=method_options, value=NORMAL),
+                ], md=3, sm=12),
+                dbc.Col([
+                    cmp.create_label("Simulated Paths:", {"type": "select-paths", "section": "risk"}),
+                    cmp.create_select(id={"type": "select-paths", "section": "risk"}, options=paths_options, value="1000000"),
+                ], md=3, sm=12),
+                dbc.Col([
+                    cmp.create_label("Lookback:", {"type": "select-period", "section": "risk"}),
+                    cmp.create_select(id={"type": "select-period", "section": "risk"}, options=lookback_options, value="1 year"),
+                ], md=3, sm=12),
+                dbc.Col(
+                    cmp.create_button(id={"type": "button-run", "section": "risk"}, text="Run", color="success"),
+                    md=3, sm=12, class_name="align-self-end"
+                ),
+            ], class_name="mb-3"),
+            dbc.Progress(
+                id={"type": "progress", "section": "risk"},
+                value=0,
+                striped=True,
+                animated=True,
+                color="success",
+            ),
+            # Polls the running job; enabled while a simulation is in progress
+            dcc.Interval(id={"type": "interval", "section": "risk"}, interval=500, disabled=True),
+            dcc.Store(id={"type": "job", "section": "risk"}),
+        ]),
+        class_name="mb-4 shadow-sm bg-dark text-light"
+    )
+
+    # KPI Cards
+    kpi_cards_group = dbc.Row([
+        dbc.Col(
+            cmp.create_kpi_card(
+                f"{measure} {confidence} ({horizon}D)", "-", color="primary",
+                value_id={'type': 'kpi-value', 'section': f"{measure} {confidence} {horizon}D"}
+            ),
+            xl=3, md=6, xs=12, class_name="mb-4"
+        )
+        for measure, confidence, horizon in RISK_KPIS
+    ], class_name="mb-4 justify-content-center")
+
+    distribution_chart = cmp.create_chart_container(
+        content_id={'type': 'distribution-chart', 'section': 'risk'},
+        bg_color='dark',
+        loading_color=cmp.PRIMARY_COLOR
+    )
+
+    risk_table = dbc.Card(
+        dbc.CardBody(
+            cmp.create_table(
+                id={'type': 'risk-table', 'section': 'risk'},
+                columns=[{"field": field} for field in ["Horizon", "Confidence", "VaR", "CVaR"]],
+                data=[],
+            )
+        ),
+        class_name="mb-4 shadow-sm bg-dark text-light"
+    )
+
+    # Layout
+    layout = dbc.Container([
+        dbc.Row([dbc.Col(title, width=12)], class_name="my-2 text-center"),
+        dbc.Row([dbc.Col(description, width=12)], class_name="mb-4 text-center"),
+        html.Hr(className='mb-4'),
+        navigation_buttons_group,
+        controls,
+        kpi_cards_group,
+        dbc.Row([
+            dbc.Col(distribution_chart, xl=8, md=12, sm=12),
+            dbc.Col(risk_table, xl=4, md=12, sm=12)
+        ], class_name="mb-4"),
+    ], fluid=True)
+
+    return layout
@@ -0,0 +1,116 @@
+import datetime as dt
+from typing import Dict, List, Tuple
+import numpy as np
+import polars as pl
+from google.cloud import bigquery
+import services.db as db
+from utils.metrics import instrument
+
+TRADING_DAYS = 252
+
+NONE = 'none'
+MONTHLY = 'monthly'
+QUARTERLY = 'quarterly'
+ANNUAL = 'annual'
+SCHEDULES = [NONE, MONTHLY, QUARTERLY, ANNUAL]
+# Calendar months per rebalance period; months count from 1970-01, so periods line up with quarters and years
+PERIOD_MONTHS = {MONTHLY: 1, QUARTERLY: 3, ANNUAL: 12}
+
+class Backtest:
+    """Daily equity and drawdown of a rebalanced portfolio, plus the turnover of each rebalance."""
+
+    def __init__(
+        self,
+        schedule: str,
+        dates: np.ndarray,
+        equity: np.ndarray,
+        rebalance_dates: np.ndarray,
+        turnover: np.ndarray
+    ) -> None:
+        self.schedule = schedule
+        self.dates = dates
+        self.equity = equity
+        self.drawdown = equity / np.maximum.accumulate(equity) - 1
+        self.rebalance_dates = rebalance_dates
+        self.turnover = turnover
+
+    def summary(self) -> Dict[str, float]:
+        """Total and annualized return, volatility, maximum drawdown and turnover per year."""
+        years = max(len(self.equity) - 1, 1) / TRADING_DAYS
+        daily_returns = self.equity[1:] / self.equity[:-1] - 1
+        total_return = float(self.equity[-1] / self.equity[0] - 1)
+        return {
+            'total_return': total_return,
+            'cagr': float((1 + total_return) ** (1 / years) - 1),
+            'volatility': float(daily_returns.std() * np.sqrt(TRADING_DAYS)) if len(daily_returns) else 0.0,
+            'max_drawdown': float(self.drawdown.min()),
+            'annual_turnover': float(self.turnover.sum() / years),
+        }
+
+def rebalance_flags(dates: np.ndarray, schedule: str) -> np.ndarray:
+    """Mark the first trading day of each new period; the initial purchase on the first day is not a rebalance."""
+    flags = np.zeros(len(dates), dtype=bool)
+    if schedule == NONE or len(dates) < 2:
+        return flags
+    periods = dates.astype('datetime64[M]').astype(np.int64) // PERIOD_MONTHS[schedule]
+    flags[1:] = periods[1:] != periods[:-1]
+    return flags
+
+@instrument('portfolio')
+def run_backtest(closes: np.ndarray, dates: np.ndarray, weights: np.ndarray, schedule: str) -> Backtest:
+    """Simulate buying the target weights on the first day and restoring them at the close of every rebalance day.
+
+    closes is a (date x ticker) matrix without gaps. Between rebalances the holdings are fixed, so each day's
+    value is the value at the last rebalance times the weighted price growth since then; the whole path is
+    computed with array operations.
+    """
+    flags = rebalance_flags(dates, schedule)
+    # Holding period each day is valued in: it starts at the close of the last rebalance strictly before it
+    period = np.concatenate([[0], np.cumsum(flags)[:-1]])
+    # Units of each ticker bought per unit of value at the start of every holding period
+    units = weights / closes[np.concatenate([[0], np.flatnonzero(flags)])]
+
+    held = units[period]
+    growth = np.einsum('ij,ij->i', closes, held)
+    # Value carried into each holding period is the product of the growth of every period before it
+    carried = np.cumprod(np.concatenate([[1.0], growth[flags]]))
+    equity = carried[period] * growth
+
+    # Weights drift with prices until the rebalance trades them back to target
+    drifted = held[flags] * closes[flags] / growth[flags, None]
+    turnover = np.abs(drifted - weights).sum(axis=1) / 2
+    return Backtest(schedule, dates, equity, dates[flags], turnover)
+
+def prepare_backtest(close_matrix: pl.DataFrame, values: Dict[str, float]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, List[str]]:
+    """Dates, gap-free closes and target weights over the days every held ticker traded."""
+    tickers = [
+        ticker for ticker in close_matrix.columns
+        if ticker != 'date' and values.get(ticker, 0) > 0 and close_matrix[ticker].null_count() < close_matrix.height
+    ]
+    if not tickers:
+        raise ValueError("None of the holdings have price history in the selected dates")
+    aligned = close_matrix.select(['date'] + tickers).fill_null(strategy='forward').drop_nulls()
+    if aligned.height < 2:
+        raise ValueError("Not enough overlapping price history to backtest")
+    weights = np.array([values[ticker] for ticker in tickers], dtype=float)
+    return (
+        aligned['date'].cast(pl.Date).to_numpy().astype('datetime64[D]'),
+        aligned.select(tickers).to_numpy().astype(float),
+        weights / weights.sum(),
+        tickers,
+    )
+
+def backtest_portfolio(
+    client: bigquery.Client,
+    values: Dict[str, float],
+    schedules: List[str],
+    start_date: dt.date,
+    end_date: dt.date
+) -> List[Backtest]:
+    """Backtest the holdings, weighted by value, under each schedule between two dates."""
+    # Only the backtest range is fetched
+    close_matrix = db.get_close_matrix(client, sorted(values), 'max', include_dates=True, start_date=start_date, end_date=end_date)
+    if close_matrix.is_empty():
+        raise ValueError("No price history for the holdings")
+    dates, closes, weights, _ = prepare_backtest(close_matrix, values)
+    return [run_backtest(closes, dates, weights, schedule) for schedule in schedules]
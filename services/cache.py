@@ -0,0 +1,144 @@
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Optional
+from cachetools import LRUCache, TTLCache
+
+# Sentinel returned by ResultCache.get when a key is not cached
+MISSING = object()
+
+class _Flight:
+    def __init__(self) -> None:
+        self.future = Future()
+        self.followers = 0
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key into a single execution.
+
+    Followers wait at most timeout seconds for the leader's outcome, then raise
+    concurrent.futures.TimeoutError; the leader's call is left running.
+    """
+
+    def __init__(self, timeout: Optional[float] = None) -> None:
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._flights: Dict[Hashable, _Flight] = {}
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Run fn for the first caller of key and share its outcome with concurrent callers."""
+        with self._lock:
+            self.calls += 1
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.executions += 1
+            else:
+                flight.followers += 1
+                self.coalesced += 1
+
+        if not leader:
+            try:
+                return flight.future.result(timeout=self.timeout)
+            finally:
+                with self._lock:
+                    flight.followers -= 1
+
+        try:
+            result = fn()
+        except BaseException as e:
+            flight.future.set_exception(e)
+            raise
+        else:
+            flight.future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._flights[key]
+
+    def has_followers(self, key: Hashable) -> bool:
+        """Check whether other callers are waiting on the in-flight call for key."""
+        with self._lock:
+            flight = self._flights.get(key)
+            return flight is not None and flight.followers > 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'executions': self.executions,
+                'coalesced': self.coalesced,
+                'in_flight': len(self._flights),
+            }
+
+class ResultCache:
+    """Thread-safe TTL cache whose misses are loaded through a SingleFlight.
+
+    The last value of each key is also kept after it expires so callers can
+    fall back to it when a fresh load is not allowed.
+    """
+
+    def __init__(self, ttl: float, maxsize: int, flights: SingleFlight = None) -> None:
+        self.enabled = ttl > 0 and maxsize > 0
+        self._cache = TTLCache(maxsize=max(maxsize, 1), ttl=max(ttl, 0))
+        self._stale = LRUCache(maxsize=max(maxsize, 1))
+        self._lock = threading.Lock()
+        self.flights = flights or SingleFlight()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Any:
+        if not self.enabled:
+            return MISSING
+        with self._lock:
+            value = self._cache.get(key, MISSING)
+            if value is MISSING:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._stale[key] = value
+            if self.enabled:
+                self._cache[key] = value
+
+    def get_stale(self, key: Hashable) -> Any:
+        """Return the last value stored for key even if it has expired."""
+        with self._lock:
+            return self._stale.get(key, MISSING)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+            self._stale.clear()
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """Return the cached value for key, loading it at most once across concurrent callers."""
+        value = self.get(key)
+        if value is not MISSING:
+            return value
+
+        def load():
+            # The cache is filled before the flight is released, so callers
+            # arriving after an expiry see either the flight or the new value
+            with self._lock:
+                cached = self._cache.get(key, MISSING) if self.enabled else MISSING
+            if cached is not MISSING:
+                return cached
+            loaded = loader()
+            self.set(key, loaded)
+            return loaded
+
+        return self.flights.do(key, load)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._cache),
+            }
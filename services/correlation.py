@@ -0,0 +1,187 @@
+from typing import Dict, List
+import numpy as np
+import polars as pl
+from config import CORR_MATRIX_MAX_TICKERS
+from utils.metrics import instrument
+
+# Views of the correlation card
+MATRIX_VIEW = 'matrix'
+CLUSTERED_VIEW = 'clustered'
+SECTOR_VIEW = 'sector'
+PAIRS_VIEW = 'pairs'
+
+# Strongest pairs listed by the pairs view
+TOP_PAIRS = 20
+UNKNOWN_SECTOR = 'Unknown'
+
+# Rolling correlation windows in trading days, and the benchmark averaging every ticker's daily return
+ROLLING_WINDOWS = [30, 90]
+UNIVERSE_BENCHMARK = 'universe'
+# Period fetched for each displayed period, so the first shown day already has a full 90-day window behind it
+ROLLING_FETCH_PERIODS = {
+    '1 month': '6 months',
+    '3 months': '1 year',
+    '6 months': '1 year',
+    '1 year': '5 years',
+    '5 years': 'max',
+    'max': 'max',
+}
+
+@instrument('dataframe')
+def cluster_order(corr: np.ndarray) -> np.ndarray:
+    """Leaf order of an average-linkage clustering on 1 - correlation, so correlated tickers sit together.
+
+    Clusters are merged along nearest-neighbour chains: a chain follows each cluster's nearest neighbour until
+    two clusters are each other's nearest, and merges them. Average linkage never brings a merged cluster closer
+    to the rest than its parts were, so the chain stays valid after a merge and the clustering costs O(n²)
+    rather than the O(n³) of searching the whole matrix for the closest pair at every merge.
+    """
+    n = len(corr)
+    if n < 3:
+        return np.arange(n)
+
+    dist = 1 - np.nan_to_num(np.asarray(corr, dtype=float), nan=0.0)
+    np.fill_diagonal(dist, np.inf)
+    sizes = np.ones(n)
+    members: List[List[int]] = [[i] for i in range(n)]
+    chain: List[int] = []
+
+    for _ in range(n - 1):
+        if not chain:
+            chain.append(int(np.argmin(sizes == 0)))
+        while True:
+            a = chain[-1]
+            b = int(np.argmin(dist[a]))
+            # Prefer the previous cluster on ties so the chain cannot cycle
+            if len(chain) > 1 and dist[a, chain[-2]] <= dist[a, b]:
+                break
+            chain.append(b)
+        b = chain.pop()
+        a = chain.pop()
+        i, j = min(a, b), max(a, b)
+        # Lance-Williams update for average linkage; the merged cluster takes the lower index
+        merged = (sizes[i] * dist[i] + sizes[j] * dist[j]) / (sizes[i] + sizes[j])
+        dist[i, :] = merged
+        dist[:, i] = merged
+        dist[i, i] = np.inf
+        dist[j, :] = np.inf
+        dist[:, j] = np.inf
+        sizes[i] += sizes[j]
+        sizes[j] = 0
+        members[i] = members[i] + members[j]
+    return np.array(members[i])
+
+def served_view(view: str, n_tickers: int, max_tickers: int = CORR_MATRIX_MAX_TICKERS) -> str:
+    """The view drawn for a selection: past max_tickers a matrix is unreadable and too large to send, so the
+    matrix and clustered views fall back to the sector averages."""
+    if view in (PAIRS_VIEW, SECTOR_VIEW) or n_tickers <= max_tickers:
+        return view
+    return SECTOR_VIEW
+
+def reorder_matrix(corr_matrix: pl.DataFrame, order: np.ndarray) -> pl.DataFrame:
+    """Permute rows and columns of a square correlation DataFrame."""
+    columns = [corr_matrix.columns[i] for i in order]
+    return corr_matrix[order.tolist()].select(columns)
+
+def cluster_matrix(corr_matrix: pl.DataFrame) -> pl.DataFrame:
+    return reorder_matrix(corr_matrix, cluster_order(corr_matrix.to_numpy()))
+
+@instrument('dataframe')
+def top_pairs(corr_matrix: pl.DataFrame, k: int = TOP_PAIRS) -> pl.DataFrame:
+    """The k ticker pairs with the largest absolute correlation, strongest first."""
+    corr = corr_matrix.to_numpy()
+    rows, cols = np.triu_indices(len(corr), k=1)
+    values = corr[rows, cols]
+    valid = ~np.isnan(values)
+    rows, cols, values = rows[valid], cols[valid], values[valid]
+    # Partition before sorting so only the top k are ordered
+    if len(values) > k:
+        keep = np.argpartition(-np.abs(values), k)[:k]
+        rows, cols, values = rows[keep], cols[keep], values[keep]
+    order = np.argsort(-np.abs(values), kind='stable')
+    labels = corr_matrix.columns
+    return pl.DataFrame({
+        'pair': [f"{labels[rows[i]]} / {labels[cols[i]]}" for i in order],
+        'correlation': values[order],
+    })
+
+@instrument('dataframe')
+def aggregate_by_sector(corr_matrix: pl.DataFrame, sectors: Dict[str, str]) -> pl.DataFrame:
+    """Average correlation between the tickers of each pair of sectors, ignoring each ticker with itself."""
+    labels = corr_matrix.columns
+    ticker_sectors = [sectors.get(ticker) or UNKNOWN_SECTOR for ticker in labels]
+    names = sorted(set(ticker_sectors))
+    membership = np.zeros((len(labels), len(names)))
+    membership[np.arange(len(labels)), [names.index(sector) for sector in ticker_sectors]] = 1
+
+    corr = corr_matrix.to_numpy().astype(float)
+    valid = ~np.isnan(corr)
+    np.fill_diagonal(valid, False)
+    corr = np.where(valid, corr, 0.0)
+    sums = membership.T @ corr @ membership
+    counts = membership.T @ valid.astype(float) @ membership
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = np.where(counts > 0, sums / counts, np.nan)
+    return pl.DataFrame(means, schema=names)
+
+def forward_filled(closes: np.ndarray) -> np.ndarray:
+    """Carry each column's last close over the days it did not trade; days before its first close stay NaN."""
+    rows = np.where(~np.isnan(closes), np.arange(len(closes))[:, None], 0)
+    np.maximum.accumulate(rows, axis=0, out=rows)
+    return closes[rows, np.arange(closes.shape[1])]
+
+def rebase(closes: np.ndarray, base: float = 100.0) -> np.ndarray:
+    """Scale each column of a (date x ticker) close matrix so its first close equals base."""
+    filled = forward_filled(closes)
+    first_rows = np.argmax(~np.isnan(filled), axis=0)
+    return filled / filled[first_rows, np.arange(filled.shape[1])] * base
+
+def daily_returns(closes: np.ndarray) -> np.ndarray:
+    """Simple returns of a (date x ticker) close matrix; the first day and days before a ticker's first close are NaN."""
+    filled = forward_filled(closes)
+    returns = np.full(filled.shape, np.nan)
+    returns[1:] = filled[1:] / filled[:-1] - 1
+    return returns
+
+@instrument('dataframe')
+def rolling_correlation(x: np.ndarray, y: np.ndarray, window: int) -> np.ndarray:
+    """Correlation over the trailing window of each column of x with y, which is one column or one per column of x.
+
+    Windows are summed from cumulative sums of x, y, x², y² and xy, so every window length costs O(n) per column
+    however long it is. Windows with any missing day are NaN.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.broadcast_to(np.asarray(y, dtype=float).reshape(len(x), -1), x.shape)
+    valid = ~(np.isnan(x) | np.isnan(y))
+    # Centering first keeps the differences of large sums from cancelling
+    days = np.maximum(valid.sum(axis=0), 1)
+    x = np.where(valid, x, 0.0)
+    y = np.where(valid, y, 0.0)
+    x = np.where(valid, x - x.sum(axis=0) / days, 0.0)
+    y = np.where(valid, y - y.sum(axis=0) / days, 0.0)
+
+    def window_sums(values: np.ndarray) -> np.ndarray:
+        sums = np.cumsum(np.vstack([np.zeros((1, values.shape[1])), values]), axis=0)
+        return sums[window:] - sums[:-window]
+
+    result = np.full(x.shape, np.nan)
+    if len(x) < window:
+        return result
+    count = window_sums(valid.astype(float))
+    sum_x, sum_y = window_sums(x), window_sums(y)
+    covariance = window * window_sums(x * y) - sum_x * sum_y
+    variance_x = window * window_sums(x * x) - sum_x ** 2
+    variance_y = window * window_sums(y * y) - sum_y ** 2
+    with np.errstate(invalid='ignore', divide='ignore'):
+        corr = covariance / np.sqrt(variance_x * variance_y)
+    result[window - 1:] = np.where((count == window) & (variance_x > 0) & (variance_y > 0), np.clip(corr, -1, 1), np.nan)
+    return result
+
+def long_series(dates: np.ndarray, tickers: List[str], values: np.ndarray) -> pl.DataFrame:
+    """Date/ticker/value rows of a (date x ticker) matrix for a multi-series line chart, without the missing days."""
+    long = pl.DataFrame({
+        'date': np.tile(dates, len(tickers)),
+        'ticker': np.repeat(tickers, len(dates)),
+        'value': values.T.ravel(),
+    })
+    return long.filter(pl.col('value').is_not_nan())
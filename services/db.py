@@ -1,13 +1,253 @@
+import contextlib
+import contextvars
+import datetime as dt
+import json
+import logging
 import sqlite3
-from typing import List, Dict
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait
+from typing import Any, Callable, Iterator, List, Dict
 from google.cloud import bigquery
+import pandas as pd
 import polars as pl
-from config import PROJECT_ID, DATASET_ID, STOCKS_TABLE_ID, SECTORS_TABLE_ID
- 
+from config import (
+    CREDENTIALS_DICT, PROJECT_ID, DATASET_ID, STOCKS_TABLE_ID, SECTORS_TABLE_ID, DATA_BACKEND, LOCAL_DATA_DIR,
+    QUERY_MAX_WORKERS, QUERY_TIMEOUT_SECONDS, QUERY_CACHE_TTL_SECONDS, QUERY_CACHE_MAX_ENTRIES, PRICE_STORE_DIR,
+    PARQUET_STORE_DIR
+)
+from services.cache import MISSING, ResultCache, SingleFlight
+from services.governor import QueryBudgetExceededError, downsample_query, governor
+from services.parquet_store import open_parquet_store
+from services.price_store import open_store
+from services.resample import DAILY, filter_volume, resample_ohlcv, sql_bar_date
+from utils.google_cloud_utils import get_bigquery_client
+from utils.metrics import instrument, record_query_job, registry
+
+logger = logging.getLogger(__name__)
+
+STOCKS_TABLE = f"`{PROJECT_ID}.{DATASET_ID}.{STOCKS_TABLE_ID}`"
+
+# Shared pool used to run independent queries concurrently
+_query_executor = ThreadPoolExecutor(max_workers=QUERY_MAX_WORKERS, thread_name_prefix='bq-query')
+# Handle of the submitted fetcher running in the current context, if any
+_active_handle = contextvars.ContextVar('active_query_handle', default=None)
+# Identical concurrent queries share one job, and its result is cached for a short time
+_query_flights = SingleFlight(QUERY_TIMEOUT_SECONDS)
+_query_cache = ResultCache(QUERY_CACHE_TTL_SECONDS, QUERY_CACHE_MAX_ENTRIES, _query_flights)
+
+def get_client() -> bigquery.Client:
+    """Create a client for the configured data backend."""
+    if DATA_BACKEND == 'local':
+        # Imported lazily so DuckDB is only needed for offline runs
+        from services.local_db import LocalClient
+        return LocalClient(LOCAL_DATA_DIR)
+    return get_bigquery_client(CREDENTIALS_DICT, PROJECT_ID)
+
+class QueryCancelledError(Exception):
+    """Raised when a query is cancelled before it is sent to the backend."""
+
+class QueryHandle:
+    """Future-like handle for a fetcher submitted to the query executor."""
+
+    def __init__(self) -> None:
+        self.future: Future = None
+        self._jobs = []
+        self._cancelled = False
+        self._lock = threading.Lock()
+
+    def track_job(self, job) -> None:
+        """Register a backend job so it can be cancelled with the handle."""
+        with self._lock:
+            self._jobs.append(job)
+            cancelled = self._cancelled
+        if cancelled:
+            _cancel_job(job)
+
+    def cancel(self) -> None:
+        """Cancel the pending fetcher and every backend job it started."""
+        with self._lock:
+            self._cancelled = True
+            jobs = list(self._jobs)
+        if self.future is not None:
+            self.future.cancel()
+        for job in jobs:
+            _cancel_job(job)
+
+    def cancelled(self) -> bool:
+        return self._cancelled
+
+    def done(self) -> bool:
+        return self.future is not None and self.future.done()
+
+    def result(self, timeout: float = None) -> Any:
+        """Wait for the fetcher result, cancelling it if the timeout expires."""
+        try:
+            return self.future.result(timeout=timeout)
+        except FutureTimeoutError:
+            self.cancel()
+            raise
+
+@contextlib.contextmanager
+def query_scope(handle: QueryHandle) -> Iterator[QueryHandle]:
+    """Track the queries run or submitted in this block with handle, so cancelling it cancels them."""
+    token = _active_handle.set(handle)
+    try:
+        yield handle
+    finally:
+        _active_handle.reset(token)
+
+def submit_query(fetcher: Callable, *args, **kwargs) -> QueryHandle:
+    """Run a fetcher such as get_price_data on the query executor."""
+    handle = QueryHandle()
+    context = contextvars.copy_context()
+    # Cancelling the handle of the enclosing scope also cancels the fetchers submitted from it
+    parent = _active_handle.get()
+    if parent is not None:
+        parent.track_job(handle)
+
+    def run():
+        _active_handle.set(handle)
+        return fetcher(*args, **kwargs)
+
+    handle.future = _query_executor.submit(context.run, run)
+    return handle
+
+def gather_queries(handles: List[QueryHandle], timeout: float = None, default: Any = None) -> List[Any]:
+    """Wait for all handles, cancel the ones still running after the timeout and return their results."""
+    wait([handle.future for handle in handles], timeout=timeout)
+    results = []
+    for handle in handles:
+        if handle.done() and not handle.future.cancelled():
+            results.append(handle.future.result())
+        else:
+            handle.cancel()
+            results.append(default)
+    return results
+
+def get_query_stats() -> Dict[str, Dict[str, int]]:
+    """Return request coalescing and result cache counters."""
+    return {
+        'single_flight': _query_flights.stats(),
+        'cache': _query_cache.stats(),
+    }
+
+def clear_query_cache() -> None:
+    _query_cache.clear()
+
+def reset_after_fork() -> None:
+    """Give a forked worker its own query threads and local databases; the cache warmed before fork is kept."""
+    global _query_executor
+    _query_executor = ThreadPoolExecutor(max_workers=QUERY_MAX_WORKERS, thread_name_prefix='bq-query')
+    if DATA_BACKEND == 'local':
+        from services.local_db import reset_databases
+        reset_databases()
+
+def _query_stats_samples() -> list:
+    stats = get_query_stats()
+    return [
+        ('sma_query_cache_hits', {}, stats['cache']['hits']),
+        ('sma_query_cache_misses', {}, stats['cache']['misses']),
+        ('sma_query_cache_size', {}, stats['cache']['size']),
+        ('sma_query_single_flight_executions', {}, stats['single_flight']['executions']),
+        ('sma_query_single_flight_coalesced', {}, stats['single_flight']['coalesced']),
+        ('sma_query_in_flight', {}, stats['single_flight']['in_flight']),
+    ]
+
+registry.add_collector(_query_stats_samples)
+
+class _SharedJob:
+    """Cancels the underlying job only if no coalesced caller still waits on it."""
+
+    def __init__(self, job, key: str) -> None:
+        self.job = job
+        self.key = key
+
+    def cancel(self) -> None:
+        if not _query_flights.has_followers(self.key):
+            self.job.cancel()
+
+def _cancel_job(job) -> None:
+    try:
+        job.cancel()
+    except Exception as e:
+        logger.error(f"Error cancelling query job: {e}")
+
+def _query_key(query: str, query_params: List[bigquery.ScalarQueryParameter] = None) -> str:
+    params = [param.to_api_repr() for param in query_params or []]
+    return json.dumps([query, params], sort_keys=True, default=str)
+
+def _run_query(
+    client: bigquery.Client,
+    query: str,
+    query_params: List[bigquery.ScalarQueryParameter] = None,
+    sampled_table: str = None
+) -> pd.DataFrame:
+    # Concurrent identical queries share one in-flight job and its cached result
+    key = _query_key(query, query_params)
+    try:
+        return _query_cache.get_or_load(key, lambda: _execute_query(client, query, query_params, key))
+    except QueryBudgetExceededError as e:
+        # Over budget: serve the last result for this query if there is one
+        stale = _query_cache.get_stale(key)
+        if stale is not MISSING:
+            logger.warning(f"{e}; serving a cached result")
+            return stale
+        if sampled_table is None:
+            raise
+
+        # Otherwise read a sample of the table that fits in the remaining budget
+        estimate = governor.estimate(client, query, query_params)
+        percent = governor.sample_percent(estimate)
+        if not percent:
+            raise
+        logger.warning(f"{e}; downsampling to {percent}% of {sampled_table}")
+        governor.record_downsample(percent)
+        sampled_query = downsample_query(query, sampled_table, percent)
+        sampled_key = _query_key(sampled_query, query_params)
+        return _query_cache.get_or_load(
+            sampled_key,
+            lambda: _execute_query(client, sampled_query, query_params, sampled_key, estimate * percent // 100)
+        )
+
+def _execute_query(
+    client: bigquery.Client,
+    query: str,
+    query_params: List[bigquery.ScalarQueryParameter],
+    key: str,
+    estimated_bytes: int = None
+) -> pd.DataFrame:
+    # Don't start new jobs for a fetcher that was already cancelled
+    handle = _active_handle.get()
+    if handle is not None and handle.cancelled():
+        raise QueryCancelledError("Query cancelled before submission")
+
+    # Check the byte budgets before the job is billed
+    if governor.enforcing:
+        if estimated_bytes is None:
+            estimated_bytes = governor.estimate(client, query, query_params)
+        governor.admit(estimated_bytes)
+
+    job_config = bigquery.QueryJobConfig(query_parameters=query_params or [])
+    job = client.query(query, job_config=job_config)
+    if handle is not None:
+        handle.track_job(_SharedJob(job, key))
+
+    # Bound the wait so a slow job cannot pin the calling thread
+    try:
+        pandas_df = job.result(timeout=QUERY_TIMEOUT_SECONDS).to_dataframe()
+        record_query_job(job)
+        governor.record(getattr(job, 'total_bytes_processed', None))
+        return pandas_df
+    except FutureTimeoutError:
+        _cancel_job(job)
+        raise
+
+@instrument('query', count_rows=True)
 def get_price_data(
     client: bigquery.Client,
     ticker: str,
-    period: str = 'max'
+    period: str = 'max',
+    interval: str = DAILY
 ) -> pl.DataFrame:
     # Define the SQL query to fetch stock price data
     period_filter = '' if period == 'max' else "AND date > DATE_SUB(CURRENT_DATE(), INTERVAL @period_days DAY)"
@@ -23,8 +263,35 @@ def get_price_data(
         ORDER BY
             date ASC
     """
+    # Weekly and monthly bars are aggregated by the query, so only the bars are returned
+    if interval != DAILY:
+        query = f"""
+            SELECT
+                {sql_bar_date(interval)} AS date,
+                MIN_BY(open, date) AS open,
+                MAX_BY(close, date) AS close,
+                MAX(high) AS high,
+                MIN(low) AS low
+            FROM
+                `{PROJECT_ID}.{DATASET_ID}.{STOCKS_TABLE_ID}`
+            WHERE
+                ticker = @ticker
+            {period_filter}
+            GROUP BY
+                1
+            ORDER BY
+                1
+        """
     # prepare the query parameters based on the period
     try:
+        # Slice the shared memory-mapped store when it has the ticker
+        store = open_store(PRICE_STORE_DIR)
+        if store is not None and store.has([ticker]):
+            return resample_ohlcv(store.price_frame(ticker, period), interval)
+        parquet = open_parquet_store(PARQUET_STORE_DIR)
+        if parquet is not None and parquet.has([ticker]):
+            return resample_ohlcv(parquet.collect(parquet.price_plan(ticker, period)), interval)
+
         if period == 'max':
             query_params = [
                 bigquery.ScalarQueryParameter("ticker", "STRING", ticker)
@@ -43,20 +310,20 @@ def get_price_data(
                 bigquery.ScalarQueryParameter("period_days", "INT64", period_days)
             ]
         
-        job_config = bigquery.QueryJobConfig(query_parameters=query_params)
-        
         # Execute the query and convert the result to a Polars DataFrame
-        pandas_df = client.query(query, job_config=job_config).to_dataframe()
+        pandas_df = _run_query(client, query, query_params, sampled_table=STOCKS_TABLE)
         return pl.from_pandas(pandas_df)
     except Exception as e:
-        print(f"Error during get_stock_data call: {e}")
+        logger.error(f"Error during get_stock_data call: {e}")
         return pl.DataFrame()
 
+@instrument('query', count_rows=True)
 def get_volume_data(
     client: bigquery.Client,
     ticker: str,
     period: str = 'max',
-    volume_range: tuple = (0, 100000)
+    volume_range: tuple = (0, 100000),
+    interval: str = DAILY
 ) -> pl.DataFrame:
     # Define the SQL query to fetch stock volume data
     period_filter = '' if period == 'max' else "AND date > DATE_SUB(CURRENT_DATE(), INTERVAL @period_days DAY)"
@@ -66,9 +333,9 @@ def get_volume_data(
     
     # Handle infinite volume range
     if max_volume == float('inf'):
-        volume_condition = "AND volume >= @min_volume"
+        volume_bounds = ">= @min_volume"
     else:
-        volume_condition = "AND volume BETWEEN @min_volume AND @max_volume"
+        volume_bounds = "BETWEEN @min_volume AND @max_volume"
     
     query = f"""
         SELECT
@@ -77,13 +344,39 @@ def get_volume_data(
             `{PROJECT_ID}.{DATASET_ID}.{STOCKS_TABLE_ID}`
         WHERE
             ticker = @ticker
-            {volume_condition}
+            AND volume {volume_bounds}
             {period_filter}
         ORDER BY
             date ASC
     """
+    # Bars are summed by the query, and the volume range applies to each bar's total rather than its days
+    if interval != DAILY:
+        query = f"""
+            SELECT
+                {sql_bar_date(interval)} AS date, ticker, CAST(SUM(volume) AS INT64) AS volume
+            FROM
+                `{PROJECT_ID}.{DATASET_ID}.{STOCKS_TABLE_ID}`
+            WHERE
+                ticker = @ticker
+                {period_filter}
+            GROUP BY
+                1, ticker
+            HAVING
+                SUM(volume) {volume_bounds}
+            ORDER BY
+                1
+        """
     
     try:
+        # Stored days are filtered by volume only after they are summed into bars
+        day_range = volume_range if interval == DAILY else (0, float('inf'))
+        store = open_store(PRICE_STORE_DIR)
+        if store is not None and store.has([ticker]):
+            return filter_volume(resample_ohlcv(store.volume_frame(ticker, period, day_range), interval), volume_range)
+        parquet = open_parquet_store(PARQUET_STORE_DIR)
+        if parquet is not None and parquet.has([ticker]):
+            return filter_volume(resample_ohlcv(parquet.collect(parquet.volume_plan(ticker, period, day_range)), interval), volume_range)
+
         # Prepare the query parameters
         query_params = [
             bigquery.ScalarQueryParameter("ticker", "STRING", ticker),
@@ -110,31 +403,42 @@ def get_volume_data(
                 bigquery.ScalarQueryParameter("period_days", "INT64", period_days)
             )
         
-        job_config = bigquery.QueryJobConfig(query_parameters=query_params)
-        
         # Execute the query and convert the result to a Polars DataFrame
-        pandas_df = client.query(query, job_config=job_config).to_dataframe()
+        pandas_df = _run_query(client, query, query_params, sampled_table=STOCKS_TABLE)
         return pl.from_pandas(pandas_df)
     except Exception as e:
-        print(f"Error during get_volume_data call: {e}")
+        logger.error(f"Error during get_volume_data call: {e}")
         return pl.DataFrame()
     
-def get_corr_matrix(
+@instrument('query', count_rows=True)
+def get_close_matrix(
     client: bigquery.Client,
     tickers: List[str],
-    period: str = 'max'
+    period: str = 'max',
+    include_dates: bool = False,
+    start_date: dt.date = None,
+    end_date: dt.date = None
 ) -> pl.DataFrame:
-    ticker_placeholders = ', '.join([f"'{ticker}'" for ticker in tickers])
+    """Daily closes with one column per ticker, in date order, fetched in one batched query.
+
+    With include_dates the first column is the 'date' of each row. start_date and end_date further
+    limit the rows to a date range, both ends included.
+    """
     period_filter = '' if period == 'max' else "AND date > DATE_SUB(CURRENT_DATE(), INTERVAL @period_days DAY)"
+    start_filter = '' if start_date is None else "AND date >= @start_date"
+    end_filter = '' if end_date is None else "AND date <= @end_date"
     
+    # Tickers are passed as an array parameter so every selection shares one query template
     query = f"""
         SELECT
             ticker, date, MAX(close) AS close
         FROM
             `{PROJECT_ID}.{DATASET_ID}.{STOCKS_TABLE_ID}`
         WHERE
-            ticker IN ({ticker_placeholders})
+            ticker IN UNNEST(@tickers)
             {period_filter}
+            {start_filter}
+            {end_filter}
         GROUP BY
             ticker, date
         ORDER BY
@@ -142,7 +446,14 @@ def get_corr_matrix(
     """
     
     try:
-        query_params = []
+        store = open_store(PRICE_STORE_DIR)
+        if store is not None and store.has(tickers):
+            return store.close_matrix(tickers, period, include_dates, start_date, end_date)
+        parquet = open_parquet_store(PARQUET_STORE_DIR)
+        if parquet is not None and parquet.has(tickers):
+            return parquet.close_matrix(tickers, period, include_dates, start_date, end_date)
+
+        query_params = [bigquery.ArrayQueryParameter("tickers", "STRING", tickers)]
         if period != 'max':
             period_days = {
                 '1 month': 30,
@@ -154,9 +465,12 @@ def get_corr_matrix(
             query_params.append(
                 bigquery.ScalarQueryParameter("period_days", "INT64", period_days)
             )
+        if start_date is not None:
+            query_params.append(bigquery.ScalarQueryParameter("start_date", "DATE", start_date))
+        if end_date is not None:
+            query_params.append(bigquery.ScalarQueryParameter("end_date", "DATE", end_date))
         
-        job_config = bigquery.QueryJobConfig(query_parameters=query_params)
-        pandas_df = client.query(query, job_config=job_config).to_dataframe()
+        pandas_df = _run_query(client, query, query_params)
         
         stock_data = pl.from_pandas(pandas_df)
         if stock_data.is_empty():
@@ -167,13 +481,47 @@ def get_corr_matrix(
             index='date',
             columns='ticker'
         )
-        numeric_data = pivoted_data.drop("date")
-        corr_matrix = numeric_data.corr()
-        return corr_matrix
+        pivoted_data = pivoted_data.sort("date")
+        return pivoted_data if include_dates else pivoted_data.drop("date")
     except Exception as e:
-        print(f"Error during get_corr_matrix_bigquery call: {e}")
+        logger.error(f"Error during get_close_matrix call: {e}")
+        return pl.DataFrame()
+
+@instrument('query', count_rows=True)
+def get_corr_matrix(
+    client: bigquery.Client,
+    tickers: List[str],
+    period: str = 'max'
+) -> pl.DataFrame:
+    close_matrix = get_close_matrix(client, tickers, period)
+    if close_matrix.is_empty():
         return pl.DataFrame()
+    return close_matrix.corr()
+
+@instrument('query')
+def get_data_version(client: bigquery.Client) -> str:
+    """Identify the current contents of the stocks table so derived results can be cached against it."""
+    store = open_store(PRICE_STORE_DIR)
+    if store is not None:
+        return store.generation
+    parquet = open_parquet_store(PARQUET_STORE_DIR)
+    if parquet is not None:
+        return parquet.generation
 
+    query = f"""
+        SELECT
+            MAX(date) AS last_date, COUNT(*) AS row_count
+        FROM
+            {STOCKS_TABLE}
+    """
+    try:
+        row = _run_query(client, query).iloc[0]
+        return f"{row['last_date']}:{row['row_count']}"
+    except Exception as e:
+        logger.error(f"Error during get_data_version call: {e}")
+        return ''
+
+@instrument('query', count_rows=True)
 def get_tickers(client: bigquery.Client) -> List[str]:
     query = f"""
         SELECT DISTINCT ticker
@@ -181,68 +529,140 @@ def get_tickers(client: bigquery.Client) -> List[str]:
         ORDER BY ticker
     """
     try:
-        pandas_df = client.query(query).to_dataframe()
+        pandas_df = _run_query(client, query)
         return pandas_df['ticker'].tolist()
     except Exception as e:
-        print(f"Error during get_tickers call: {e}")
+        logger.error(f"Error during get_tickers call: {e}")
         return ['NA']
 
+@instrument('query', count_rows=True)
+def get_ticker_metadata(client: bigquery.Client) -> pl.DataFrame:
+    # Symbols with their company name and sector for the ticker search index
+    query = f"""
+        SELECT ticker, ANY_VALUE(name) AS name, ANY_VALUE(sector) AS sector
+        FROM `{PROJECT_ID}.{DATASET_ID}.{SECTORS_TABLE_ID}`
+        GROUP BY ticker
+        ORDER BY ticker
+    """
+    try:
+        pandas_df = _run_query(client, query)
+        return pl.from_pandas(pandas_df)
+    except Exception as e:
+        # Degraded mode, e.g. a sectors table without names: the search still covers every symbol
+        logger.warning(f"Error during get_ticker_metadata call: {e}; searching tickers without names or sectors")
+        return pl.DataFrame(
+            {'ticker': get_tickers(client), 'name': None, 'sector': None},
+            schema={'ticker': pl.Utf8, 'name': pl.Utf8, 'sector': pl.Utf8}
+        )
+
+@instrument('query', count_rows=True)
 def get_stocks_current_price(
     client: bigquery.Client,
     tickers: List[str]
 ) -> Dict[str, float]:
-    ticker_placeholders = ', '.join([f"'{ticker}'" for ticker in tickers])
+    # Latest close per ticker in a single scan instead of a second MAX(date) pass over the table
     query = f"""
         SELECT
             ticker, close
         FROM
             `{PROJECT_ID}.{DATASET_ID}.{STOCKS_TABLE_ID}`
         WHERE
-            date = (SELECT MAX(date) FROM `{PROJECT_ID}.{DATASET_ID}.{STOCKS_TABLE_ID}`)
-        AND
-            ticker IN ({ticker_placeholders})
+            ticker IN UNNEST(@tickers)
+        QUALIFY
+            ROW_NUMBER() OVER (PARTITION BY ticker ORDER BY date DESC) = 1
     """
     try:
-        pandas_df = client.query(query).to_dataframe()
+        store = open_store(PRICE_STORE_DIR)
+        if store is not None and store.has(tickers):
+            return store.latest_close(tickers)
+        parquet = open_parquet_store(PARQUET_STORE_DIR)
+        if parquet is not None and parquet.has(tickers):
+            return parquet.latest_close(tickers)
+
+        query_params = [bigquery.ArrayQueryParameter("tickers", "STRING", tickers)]
+        pandas_df = _run_query(client, query, query_params)
         return dict(zip(pandas_df["ticker"], pandas_df["close"]))
     except Exception as e:
-        print(f"Error during get_stocks_current_price call: {e}")
+        logger.error(f"Error during get_stocks_current_price call: {e}")
         return {}
 
+@instrument('query', count_rows=True)
+def get_price_history(client: bigquery.Client, since: dt.date = None) -> pl.DataFrame:
+    # Full daily history of every ticker, or only the days after since, used to build the stores and sector indices
+    since_filter = '' if since is None else 'WHERE date > @since'
+    query = f"""
+        SELECT
+            date, ticker, open, high, low, close, volume
+        FROM
+            `{PROJECT_ID}.{DATASET_ID}.{STOCKS_TABLE_ID}`
+        {since_filter}
+        ORDER BY
+            ticker, date
+    """
+    job_config = None
+    if since is not None:
+        job_config = bigquery.QueryJobConfig(query_parameters=[bigquery.ScalarQueryParameter("since", "DATE", since)])
+    try:
+        # Batch export: bypass the request cache and budgets
+        pandas_df = client.query(query, job_config=job_config).result().to_dataframe()
+        return pl.from_pandas(pandas_df)
+    except Exception as e:
+        logger.error(f"Error during get_price_history call: {e}")
+        return pl.DataFrame()
+
+@instrument('query', count_rows=True)
+def get_universe_history(client: bigquery.Client, since: dt.date = None) -> pl.DataFrame:
+    """Daily close and volume of every ticker, or only the days after since, for indices built on a request.
+
+    Unlike the batch export it runs under the request cache and byte budgets, and a failed fetch raises
+    ValueError instead of returning an empty frame, so nothing built from it is cached.
+    """
+    since_filter = '' if since is None else 'WHERE date > @since'
+    query = f"""
+        SELECT
+            date, ticker, close, volume
+        FROM
+            {STOCKS_TABLE}
+        {since_filter}
+        ORDER BY
+            ticker, date
+    """
+    query_params = [] if since is None else [bigquery.ScalarQueryParameter("since", "DATE", since)]
+    try:
+        return pl.from_pandas(_run_query(client, query, query_params))
+    except Exception as e:
+        logger.error(f"Error during get_universe_history call: {e}")
+        raise ValueError("Price history is unavailable right now.") from e
+
+@instrument('query', count_rows=True)
 def get_sector_data(client: bigquery.Client) -> pl.DataFrame:
     # Define the SQL query to fetch sector data
     query = f"""
-        SELECT *
+        SELECT ticker, sector
         FROM `{PROJECT_ID}.{DATASET_ID}.{SECTORS_TABLE_ID}`
     """
     
     try:
-        # Set up the query job configuration
-        job_config = bigquery.QueryJobConfig()
-        
         # Execute the query and convert the result to a Polars DataFrame
-        pandas_df = client.query(query, job_config=job_config).to_dataframe()
+        pandas_df = _run_query(client, query)
         return pl.from_pandas(pandas_df)
     except Exception as e:
-        print(f"Error during get_sector_data call: {e}")
+        logger.error(f"Error during get_sector_data call: {e}")
         return pl.DataFrame()
     
+@instrument('dataframe', count_rows=True)
 def aggregate_portfolio_by_sector(portfolio_data: pl.DataFrame, sector_data: pl.DataFrame) -> pl.DataFrame:
     try:
-        merged_data = portfolio_data.join(
-            sector_data,
-            left_on='Ticker',
-            right_on='ticker',
-            how='left'
-        )
-        
-        aggregated_data = merged_data.group_by('sector').agg(
-            pl.col('Value').sum().alias('Total Value')
+        # One plan, so only the joined columns are carried and the join, group and sort run in a single pass
+        aggregated_data = (
+            portfolio_data.lazy()
+            .select(['Ticker', 'Value'])
+            .join(sector_data.lazy().select(['ticker', 'sector']), left_on='Ticker', right_on='ticker', how='left')
+            .group_by('sector')
+            .agg(pl.col('Value').sum().alias('Total Value'))
+            .sort('Total Value', descending=True)
         )
-        
-        aggregated_data = aggregated_data.sort('Total Value', descending=True)
-        
-        return aggregated_data
+        return aggregated_data.collect()
     except Exception as e:
-        print(f"Error during portfolio aggregation: {e}")
+        logger.error(f"Error during portfolio aggregation: {e}")
         return pl.DataFrame()
@@ -0,0 +1,327 @@
+"""
+Market digest: universe-wide tables precomputed once per data refresh.
+
+A digest holds four small tables computed in one vectorized pass over the
+(date x ticker) close, high, low and volume matrices of the last year:
+
+    movers          window/direction/rank/ticker/sector/close/return: top gainers and losers per window
+    volume_spikes   rank/ticker/sector/close/volume/average/zscore: latest volume against its trailing average
+    extremes        kind/ticker/sector/close/high/low: tickers setting a 52-week high or low on the last day
+    sectors         window/sector/return/tickers: average return of each sector per window
+
+Each generation is a directory of Parquet files next to a meta.json with the
+data version it was computed from and its as-of date:
+
+    <digest>/CURRENT
+    <digest>/gen-<timestamp>/<table>.parquet
+    <digest>/gen-<timestamp>/meta.json
+
+Writing a price store or Parquet store generation rebuilds the digest when
+DIGEST_DIR is set. Other backends run the command below on a schedule; with
+--if-stale it only rebuilds after the stocks table changed. Requests never
+read the stocks table for a digest: without a digest directory, the overview
+computes one in process only from a local price or Parquet store (or the
+offline backend), at most once per DIGEST_CACHE_TTL_SECONDS, and otherwise
+reports that the digest has not been built yet.
+
+Usage:
+    python -m services.digest --out /var/lib/sma/digest [--if-stale]
+"""
+import argparse
+import datetime as dt
+import json
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import polars as pl
+from google.cloud import bigquery
+import services.db as db
+from config import DATA_BACKEND, DIGEST_CACHE_TTL_SECONDS, DIGEST_DIR, DIGEST_TOP_N, DIGEST_VOLUME_LOOKBACK, PARQUET_STORE_DIR, PRICE_STORE_DIR
+from services.cache import ResultCache
+from services.correlation import UNKNOWN_SECTOR, forward_filled
+from services.parquet_store import open_parquet_store
+from services.price_store import current_generation, open_store, publish_generation, stage_generation
+from utils.metrics import instrument
+
+# Calendar days each mover window looks back from the last trading day
+DIGEST_WINDOWS = {
+    '1 day': 1,
+    '1 week': 7,
+    '1 month': 30,
+    '3 months': 90,
+    '1 year': 365,
+}
+FIELDS = ['high', 'low', 'close', 'volume']
+# Column types of each table, so empty tables keep them too
+SCHEMAS = {
+    'movers': {'window': pl.String, 'direction': pl.String, 'rank': pl.Int64, 'ticker': pl.String, 'sector': pl.String, 'close': pl.Float64, 'return': pl.Float64},
+    'volume_spikes': {'rank': pl.Int64, 'ticker': pl.String, 'sector': pl.String, 'close': pl.Float64, 'volume': pl.Float64, 'average': pl.Float64, 'zscore': pl.Float64},
+    'extremes': {'kind': pl.String, 'ticker': pl.String, 'sector': pl.String, 'close': pl.Float64, 'high': pl.Float64, 'low': pl.Float64},
+    'sectors': {'window': pl.String, 'sector': pl.String, 'return': pl.Float64, 'tickers': pl.Int64},
+}
+TABLES = list(SCHEMAS)
+META_FILE = 'meta.json'
+# Calendar days of history the digest reads: the longest window plus room for holidays
+HISTORY_DAYS = max(DIGEST_WINDOWS.values()) + 10
+
+class Digest:
+    """The digest tables of one data version."""
+
+    def __init__(self, tables: Dict[str, pl.DataFrame], version: str, as_of: Optional[dt.date]) -> None:
+        self.tables = tables
+        self.version = version
+        self.as_of = as_of
+
+    def table(self, name: str) -> pl.DataFrame:
+        return self.tables.get(name, pl.DataFrame(schema=SCHEMAS[name]))
+
+def history_matrices(history: pl.DataFrame, fields: List[str] = FIELDS) -> Tuple[np.ndarray, List[str], Dict[str, np.ndarray]]:
+    """Dates, tickers and one (date x ticker) matrix per field from date/ticker/OHLCV rows; NaN where a ticker has no row."""
+    tickers = history['ticker'].unique().sort().to_list()
+    day_index = history['date'].cast(pl.Date).to_numpy().astype('datetime64[D]')
+    dates = np.unique(day_index)
+    rows = np.searchsorted(dates, day_index)
+    columns = history['ticker'].replace_strict({ticker: column for column, ticker in enumerate(tickers)}, return_dtype=pl.Int64).to_numpy()
+    matrices = {}
+    for field in fields:
+        matrix = np.full((len(dates), len(tickers)), np.nan)
+        matrix[rows, columns] = history[field].cast(pl.Float64).to_numpy()
+        matrices[field] = matrix
+    return dates, tickers, matrices
+
+@instrument('dataframe')
+def compute_digest(
+    dates: np.ndarray,
+    tickers: List[str],
+    fields: Dict[str, np.ndarray],
+    sectors: Dict[str, str],
+    top_n: int = DIGEST_TOP_N,
+    lookback: int = DIGEST_VOLUME_LOOKBACK
+) -> Dict[str, pl.DataFrame]:
+    """Digest tables from (date x ticker) matrices whose last row is the latest trading day."""
+    if len(dates) < 2 or not tickers:
+        return {name: pl.DataFrame(schema=schema) for name, schema in SCHEMAS.items()}
+
+    close = np.asarray(fields['close'], dtype=float)
+    volume = np.asarray(fields['volume'], dtype=float)
+    traded = ~np.isnan(close)
+    # Only tickers that traded on the last day are listed
+    active = traded[-1]
+    filled = forward_filled(close)
+    latest = close[-1]
+    ticker_array = np.array(tickers, dtype=object)
+    sector_array = np.array([sectors.get(ticker) or UNKNOWN_SECTOR for ticker in tickers], dtype=object)
+    as_of = dates[-1].astype('datetime64[D]')
+
+    # One return per window and ticker, from the close on or before the start of the window
+    starts = np.array([np.searchsorted(dates, as_of - np.timedelta64(days, 'D'), side='right') - 1 for days in DIGEST_WINDOWS.values()])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        returns = np.where(starts[:, None] >= 0, latest / filled[np.maximum(starts, 0)] - 1, np.nan)
+    returns[:, ~active] = np.nan
+
+    movers = []
+    for window, window_returns in zip(DIGEST_WINDOWS, returns):
+        ranked = np.flatnonzero(~np.isnan(window_returns))
+        ranked = ranked[np.argsort(window_returns[ranked], kind='stable')]
+        for direction, picked in (('gainers', ranked[::-1][:top_n]), ('losers', ranked[:top_n])):
+            picked = picked[window_returns[picked] > 0] if direction == 'gainers' else picked[window_returns[picked] < 0]
+            movers.append(pl.DataFrame({
+                'window': [window] * len(picked),
+                'direction': [direction] * len(picked),
+                'rank': np.arange(1, len(picked) + 1),
+                'ticker': ticker_array[picked].tolist(),
+                'sector': sector_array[picked].tolist(),
+                'close': latest[picked],
+                'return': window_returns[picked],
+            }, schema=SCHEMAS['movers']))
+
+    # Latest volume in standard deviations above the trailing days each ticker traded
+    history_volume = volume[-lookback - 1:-1]
+    history_traded = traded[-lookback - 1:-1] & ~np.isnan(history_volume)
+    days = history_traded.sum(axis=0)
+    values = np.where(history_traded, history_volume, 0.0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        average = values.sum(axis=0) / days
+        deviation = np.sqrt(np.where(history_traded, (values - average) ** 2, 0.0).sum(axis=0) / (days - 1))
+        zscore = (volume[-1] - average) / deviation
+    spiking = np.flatnonzero(active & (days >= max(lookback // 2, 2)) & (deviation > 0) & (zscore > 0))
+    spiking = spiking[np.argsort(-zscore[spiking], kind='stable')][:top_n]
+    volume_spikes = pl.DataFrame({
+        'rank': np.arange(1, len(spiking) + 1),
+        'ticker': ticker_array[spiking].tolist(),
+        'sector': sector_array[spiking].tolist(),
+        'close': latest[spiking],
+        'volume': volume[-1, spiking],
+        'average': average[spiking],
+        'zscore': zscore[spiking],
+    }, schema=SCHEMAS['volume_spikes'])
+
+    # 52-week range from the daily highs and lows, and the tickers whose last day reached either end
+    year = dates > as_of - np.timedelta64(365, 'D')
+    high = np.where(np.isnan(fields['high'][year]), -np.inf, fields['high'][year]).max(axis=0)
+    low = np.where(np.isnan(fields['low'][year]), np.inf, fields['low'][year]).min(axis=0)
+    day_return = returns[0]
+    extremes = []
+    for kind, reached, order in (
+        ('52-Week High', active & (fields['high'][-1] >= high), -1),
+        ('52-Week Low', active & (fields['low'][-1] <= low), 1),
+    ):
+        picked = np.flatnonzero(reached)
+        picked = picked[np.argsort(order * np.nan_to_num(day_return[picked]), kind='stable')][:top_n]
+        extremes.append(pl.DataFrame({
+            'kind': [kind] * len(picked),
+            'ticker': ticker_array[picked].tolist(),
+            'sector': sector_array[picked].tolist(),
+            'close': latest[picked],
+            'high': high[picked],
+            'low': low[picked],
+        }, schema=SCHEMAS['extremes']))
+
+    # Equal-weight average return of each sector, summed per sector code in one bincount per window
+    sector_names, sector_codes = np.unique(sector_array.astype(str), return_inverse=True)
+    sector_tables = []
+    for window, window_returns in zip(DIGEST_WINDOWS, returns):
+        valid = ~np.isnan(window_returns)
+        counts = np.bincount(sector_codes[valid], minlength=len(sector_names))
+        sums = np.bincount(sector_codes[valid], weights=window_returns[valid], minlength=len(sector_names))
+        listed = counts > 0
+        sector_tables.append(pl.DataFrame({
+            'window': [window] * int(listed.sum()),
+            'sector': sector_names[listed].tolist(),
+            'return': sums[listed] / counts[listed],
+            'tickers': counts[listed],
+        }, schema=SCHEMAS['sectors']).sort('return', descending=True))
+
+    return {
+        'movers': pl.concat(movers),
+        'volume_spikes': volume_spikes,
+        'extremes': pl.concat(extremes),
+        'sectors': pl.concat(sector_tables),
+    }
+
+def write_digest(digest_dir: str, tables: Dict[str, pl.DataFrame], version: str, as_of: Optional[dt.date]) -> str:
+    """Write the tables as a new digest generation and make it the current one."""
+    generation, staging = stage_generation(digest_dir)
+    for name in TABLES:
+        tables.get(name, pl.DataFrame(schema=SCHEMAS[name])).write_parquet(os.path.join(staging, f'{name}.parquet'))
+    with open(os.path.join(staging, META_FILE), 'w') as f:
+        json.dump({'version': version, 'as_of': as_of.isoformat() if as_of else None}, f)
+    publish_generation(digest_dir, generation, staging)
+    return generation
+
+def load_digest(path: str) -> Digest:
+    with open(os.path.join(path, META_FILE)) as f:
+        meta = json.load(f)
+    tables = {name: pl.read_parquet(os.path.join(path, f'{name}.parquet')) for name in TABLES}
+    as_of = dt.date.fromisoformat(meta['as_of']) if meta.get('as_of') else None
+    return Digest(tables, meta['version'], as_of)
+
+_digests: Dict[str, Tuple[str, Digest]] = {}
+_digests_lock = threading.Lock()
+
+def open_digest(digest_dir: str) -> Optional[Digest]:
+    """Return the current digest generation, reloading it after a swap, or None if there is none."""
+    generation = current_generation(digest_dir)
+    if generation is None:
+        return None
+
+    with _digests_lock:
+        cached = _digests.get(digest_dir)
+        if cached is None or cached[0] != generation:
+            cached = _digests[digest_dir] = (generation, load_digest(os.path.join(digest_dir, generation)))
+        return cached[1]
+
+def digest_from_history(history: pl.DataFrame, sectors: Dict[str, str], version: str) -> Digest:
+    """Digest of the last year of date/ticker/OHLCV rows."""
+    if history.is_empty():
+        return Digest({name: pl.DataFrame(schema=schema) for name, schema in SCHEMAS.items()}, version, None)
+    cutoff = history['date'].cast(pl.Date).max() - dt.timedelta(days=HISTORY_DAYS)
+    dates, tickers, fields = history_matrices(history.filter(pl.col('date').cast(pl.Date) > cutoff))
+    return Digest(compute_digest(dates, tickers, fields, sectors), version, dates[-1].astype(dt.date))
+
+def _sectors(client: bigquery.Client) -> Dict[str, str]:
+    sector_data = db.get_sector_data(client)
+    return dict(zip(sector_data['ticker'].to_list(), sector_data['sector'].to_list())) if not sector_data.is_empty() else {}
+
+def _digest_from_stores(client: bigquery.Client) -> Optional[Digest]:
+    # The last year of the local price or Parquet store, or None when neither is configured
+    store = open_store(PRICE_STORE_DIR)
+    if store is not None and len(store.dates):
+        # Slicing the last year of the mapped (ticker x date) matrices reads only those columns
+        start = int(np.searchsorted(store.dates, store.dates[-1] - np.timedelta64(HISTORY_DAYS, 'D'), side='right'))
+        close = store.fields['close'][:, start:].T
+        fields = {field: np.array(store.fields[field][:, start:].T, dtype=float) for field in FIELDS}
+        fields['volume'][np.isnan(close)] = np.nan
+        dates = np.asarray(store.dates[start:])
+        tables = compute_digest(dates, store.tickers, fields, _sectors(client))
+        return Digest(tables, db.get_data_version(client), dates[-1].astype(dt.date))
+
+    parquet = open_parquet_store(PARQUET_STORE_DIR)
+    if parquet is not None:
+        last_date = parquet.collect(parquet.scan().select(pl.col('date').max())).item()
+        plan = parquet.scan().filter(pl.col('date') > last_date - dt.timedelta(days=HISTORY_DAYS)).select(['date', 'ticker'] + FIELDS)
+        return digest_from_history(parquet.collect(plan), _sectors(client), db.get_data_version(client))
+    return None
+
+def build_digest(client: bigquery.Client) -> Digest:
+    """Compute the digest from the local price or Parquet store when present, otherwise from an export of the last year."""
+    digest = _digest_from_stores(client)
+    if digest is not None:
+        return digest
+    history = db.get_price_history(client, dt.date.today() - dt.timedelta(days=HISTORY_DAYS))
+    return digest_from_history(history, _sectors(client), db.get_data_version(client))
+
+def _build_in_process(client: bigquery.Client) -> Digest:
+    digest = _digest_from_stores(client) if DATA_BACKEND != 'local' else build_digest(client)
+    # Raising keeps a failed or empty build out of the cache, so the next request tries again
+    if digest is None or digest.as_of is None:
+        raise ValueError('No price history to build a digest from')
+    return digest
+
+_digest_cache = ResultCache(DIGEST_CACHE_TTL_SECONDS, 1)
+
+def get_digest(client: bigquery.Client) -> Optional[Digest]:
+    """The precomputed digest, or one computed in process from local data and reused for DIGEST_CACHE_TTL_SECONDS.
+
+    Returns None when there is no digest yet and the only source would be a scan of the stocks table.
+    """
+    digest = open_digest(DIGEST_DIR)
+    if digest is not None:
+        return digest
+    if open_store(PRICE_STORE_DIR) is None and open_parquet_store(PARQUET_STORE_DIR) is None and DATA_BACKEND != 'local':
+        return None
+    try:
+        return _digest_cache.get_or_load('digest', lambda: _build_in_process(client))
+    except ValueError:
+        return None
+
+def refresh_digest(history: pl.DataFrame, client: bigquery.Client, version: str) -> Optional[str]:
+    """Rebuild the digest from history a store generation was just written from, when DIGEST_DIR is set."""
+    if not DIGEST_DIR:
+        return None
+    digest = digest_from_history(history, _sectors(client), version)
+    return write_digest(DIGEST_DIR, digest.tables, digest.version, digest.as_of)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Build a new market digest generation from the configured data backend.')
+    parser.add_argument('--out', default=DIGEST_DIR, required=not DIGEST_DIR, help='Digest directory')
+    parser.add_argument('--if-stale', action='store_true', help='Only rebuild when the data version changed')
+    args = parser.parse_args()
+
+    client = db.get_client()
+    try:
+        current = open_digest(args.out)
+        if args.if_stale and current is not None and current.version == db.get_data_version(client):
+            print(f'Digest in {args.out} is up to date with {current.version}')
+            return
+        digest = build_digest(client)
+    finally:
+        client.close()
+    if digest.as_of is None:
+        raise SystemExit('No price history returned by the data backend')
+    generation = write_digest(args.out, digest.tables, digest.version, digest.as_of)
+    print(f'Wrote {generation} as of {digest.as_of} to {args.out}')
+
+if __name__ == '__main__':
+    main()
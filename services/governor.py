@@ -0,0 +1,195 @@
+import contextvars
+import re
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+from google.cloud import bigquery
+from config import QUERY_MAX_BYTES_PER_REQUEST, QUERY_MAX_BYTES_PER_MINUTE
+from utils.metrics import registry
+
+WINDOW_SECONDS = 60
+# Smallest sample kept when a time-series query is downsampled to fit the budget
+MIN_SAMPLE_PERCENT = 1
+
+class QueryBudgetExceededError(Exception):
+    """Raised when a query would exceed the per-request or per-minute byte budget."""
+
+class _RequestBudget:
+    def __init__(self, interaction: str) -> None:
+        self.interaction = interaction
+        self.bytes = 0
+        # Smallest TABLESAMPLE percentage any of the request's results was read at
+        self.sampled_percent: Optional[int] = None
+
+_current_request = contextvars.ContextVar('current_request_budget', default=None)
+
+def template_key(query: str) -> str:
+    """Normalize a parameterized query so all calls with the same shape share an estimate."""
+    return re.sub(r'\s+', ' ', query).strip()
+
+class QueryGovernor:
+    """Estimate query cost with dry runs, enforce byte budgets and attribute cost to interactions."""
+
+    def __init__(self, max_bytes_per_request: int = 0, max_bytes_per_minute: int = 0) -> None:
+        self.max_bytes_per_request = max_bytes_per_request
+        self.max_bytes_per_minute = max_bytes_per_minute
+        self._lock = threading.Lock()
+        self._estimates: Dict[str, int] = {}
+        self._window = deque()
+        self._window_bytes = 0
+        self._costs: Dict[str, Dict[str, int]] = {}
+        self.rejections = 0
+        self.downsampled = 0
+
+    @property
+    def enforcing(self) -> bool:
+        return self.max_bytes_per_request > 0 or self.max_bytes_per_minute > 0
+
+    def estimate(
+        self,
+        client: bigquery.Client,
+        query: str,
+        query_params: List[bigquery.ScalarQueryParameter] = None
+    ) -> int:
+        """Return the bytes a query template processes, dry-running it the first time it is seen."""
+        key = template_key(query)
+        with self._lock:
+            if key in self._estimates:
+                return self._estimates[key]
+
+        job_config = bigquery.QueryJobConfig(
+            dry_run=True,
+            use_query_cache=False,
+            query_parameters=query_params or []
+        )
+        estimate = client.query(query, job_config=job_config).total_bytes_processed or 0
+        with self._lock:
+            self._estimates[key] = estimate
+        return estimate
+
+    def remaining(self) -> float:
+        """Bytes still available to the current request under both budgets."""
+        with self._lock:
+            return self._remaining()
+
+    def admit(self, estimated_bytes: int) -> None:
+        """Reserve budget for a query or raise QueryBudgetExceededError."""
+        # Checking and reserving under one lock keeps concurrent queries from admitting against the same bytes
+        with self._lock:
+            remaining = self._remaining()
+            if estimated_bytes > remaining:
+                self.rejections += 1
+                raise QueryBudgetExceededError(
+                    f"Query needs {estimated_bytes} bytes, {remaining:.0f} left in the budget"
+                )
+            self._reserve(estimated_bytes)
+
+    def sample_percent(self, estimated_bytes: int) -> int:
+        """Largest TABLESAMPLE percentage that fits the remaining budget, or 0 if none does."""
+        if estimated_bytes <= 0:
+            return 0
+        percent = int(self.remaining() / estimated_bytes * 100)
+        return min(percent, 99) if percent >= MIN_SAMPLE_PERCENT else 0
+
+    def record_downsample(self, percent: int) -> None:
+        """Count a downsampled query and mark the current request as served sampled rows."""
+        request = _current_request.get()
+        with self._lock:
+            self.downsampled += 1
+            if request is not None:
+                request.sampled_percent = min(percent, request.sampled_percent or percent)
+
+    def record(self, bytes_processed: int) -> None:
+        """Attribute processed bytes to the interaction of the current request."""
+        request = _current_request.get()
+        interaction = request.interaction if request is not None else 'background'
+        with self._lock:
+            cost = self._costs.setdefault(interaction, {'queries': 0, 'bytes': 0})
+            cost['queries'] += 1
+            cost['bytes'] += bytes_processed or 0
+
+    def cost_report(self) -> List[Dict[str, object]]:
+        """Interactions ordered by the bytes their queries processed."""
+        with self._lock:
+            report = [
+                {'interaction': interaction, **cost}
+                for interaction, cost in self._costs.items()
+            ]
+        return sorted(report, key=lambda item: item['bytes'], reverse=True)
+
+    # The helpers below are called with self._lock held
+    def _remaining(self) -> float:
+        remaining = float('inf')
+        self._expire_window()
+        if self.max_bytes_per_minute > 0:
+            remaining = min(remaining, self.max_bytes_per_minute - self._window_bytes)
+        request = _current_request.get()
+        if self.max_bytes_per_request > 0:
+            used = request.bytes if request is not None else 0
+            remaining = min(remaining, self.max_bytes_per_request - used)
+        return max(remaining, 0)
+
+    def _reserve(self, estimated_bytes: int) -> None:
+        request = _current_request.get()
+        if request is not None:
+            request.bytes += estimated_bytes
+        self._window.append((time.monotonic(), estimated_bytes))
+        self._window_bytes += estimated_bytes
+
+    def _expire_window(self) -> None:
+        cutoff = time.monotonic() - WINDOW_SECONDS
+        while self._window and self._window[0][0] < cutoff:
+            self._window_bytes -= self._window.popleft()[1]
+
+def begin_request(interaction: str) -> None:
+    """Start a per-request budget for the current request context."""
+    _current_request.set(_RequestBudget(interaction))
+
+def sampled_percent() -> Optional[int]:
+    """TABLESAMPLE percentage of the current request's most sampled result, or None if every result is complete."""
+    request = _current_request.get()
+    return request.sampled_percent if request is not None else None
+
+def downsample_query(query: str, table_ref: str, percent: int) -> str:
+    """Read a table through TABLESAMPLE so only a fraction of its blocks is billed."""
+    return query.replace(table_ref, f"{table_ref} TABLESAMPLE SYSTEM ({percent} PERCENT)")
+
+governor = QueryGovernor(QUERY_MAX_BYTES_PER_REQUEST, QUERY_MAX_BYTES_PER_MINUTE)
+
+def _governor_samples() -> list:
+    samples = [
+        ('sma_governor_rejections', {}, governor.rejections),
+        ('sma_governor_downsampled', {}, governor.downsampled),
+    ]
+    for cost in governor.cost_report():
+        samples.append(('sma_interaction_bytes_processed', {'interaction': cost['interaction']}, cost['bytes']))
+        samples.append(('sma_interaction_queries', {'interaction': cost['interaction']}, cost['queries']))
+    return samples
+
+registry.add_collector(_governor_samples)
+
+def register_governor(app) -> None:
+    """Open a byte budget per Dash request and expose the cost report at /query-costs."""
+    from flask import jsonify, request
+
+    # Map callback output keys to the decorated function names
+    names = {}
+    for output_key, spec in app.callback_map.items():
+        if 'callback' not in spec:
+            continue
+        func = getattr(spec['callback'], '__wrapped__', spec['callback'])
+        names[output_key] = getattr(func, '__name__', output_key)
+
+    def start_request_budget():
+        interaction = request.path
+        if request.path.endswith('_dash-update-component'):
+            body = request.get_json(silent=True) or {}
+            interaction = names.get(body.get('output'), body.get('output', interaction))
+        begin_request(interaction)
+
+    def query_costs_view():
+        return jsonify(governor.cost_report())
+
+    app.server.before_request(start_request_budget)
+    app.server.add_url_rule('/query-costs', 'query_costs', query_costs_view)
@@ -0,0 +1,245 @@
+"""
+Background jobs for heavy Dash callbacks.
+
+Callbacks registered with `background_callback` run in a separate process
+under Dash's DiskcacheManager, so a slow query or computation returns the
+web request thread at once and never pins a gunicorn worker. On top of Dash
+this adds:
+
+- a bounded pool: at most BACKGROUND_MAX_JOBS jobs compute at once across
+  every worker sharing the cache directory; the rest wait in arrival order
+  and report their place in the queue as progress
+- result caching by input hash: results are keyed by the callback source,
+  its inputs and the data version, and kept for BACKGROUND_RESULT_TTL_SECONDS
+- cancellation: Dash kills the job of a superseded request when the same
+  callback fires again, and jobs whose `cancel` inputs change
+
+Pool slots and queue tickets are diskcache entries holding the pid that owns
+them. Entries of processes that have exited (for example killed on
+cancellation) are reclaimed, so cancelled jobs never leak capacity.
+
+Jobs run in spawned processes rather than Dash's default fork. A web worker
+has usually run Polars by the time it starts a job, and Polars' thread pool
+does not survive a fork: the forked job would block forever on a lock held by
+a thread that no longer exists, and keep its slot while it did. The job
+function and its arguments are pickled with dill, referencing module globals
+by name, and the spawned process imports what they need.
+"""
+import functools
+import importlib
+import io
+import logging
+import multiprocessing
+import os
+import time
+from types import ModuleType
+from typing import Any, Callable, Dict, List, Optional
+from dash import Input, Output
+import services.db as db
+from config import (
+    BACKGROUND_CACHE_DIR, BACKGROUND_CALLBACKS_ENABLED, BACKGROUND_MAX_JOBS, BACKGROUND_POLL_INTERVAL_MS,
+    BACKGROUND_RESULT_TTL_SECONDS
+)
+
+logger = logging.getLogger(__name__)
+
+try:
+    import diskcache
+    import dill
+    from dash import DiskcacheManager
+    from dash.long_callback.managers.diskcache_manager import _make_job_fn
+except ImportError:
+    diskcache = None
+    DiskcacheManager = object
+
+# Seconds between attempts of a queued job to take a slot
+QUEUE_POLL_SECONDS = 0.05
+
+def _alive(pid: int) -> bool:
+    import psutil
+    try:
+        return psutil.Process(pid).status() != psutil.STATUS_ZOMBIE
+    except psutil.NoSuchProcess:
+        return False
+
+class JobSlots:
+    """A first-come, first-served pool of slots shared by processes through a diskcache."""
+
+    def __init__(self, cache: 'diskcache.Cache', size: int, prefix: str = 'jobs') -> None:
+        self.cache = cache
+        self.size = size
+        self.slots_key = f'{prefix}:slots'
+        self.queue_key = f'{prefix}:queue'
+        self.ticket_key = f'{prefix}:ticket'
+
+    def _live(self, key: str) -> Dict[Any, int]:
+        # Entries whose owner has exited are dropped as they are read
+        entries = self.cache.get(key, {})
+        return {name: pid for name, pid in entries.items() if _alive(pid)}
+
+    def enqueue(self, pid: int) -> int:
+        with self.cache.transact():
+            ticket = self.cache.incr(self.ticket_key)
+            queue = self._live(self.queue_key)
+            queue[ticket] = pid
+            self.cache.set(self.queue_key, queue)
+        return ticket
+
+    def try_acquire(self, ticket: int, pid: int) -> Optional[int]:
+        """Take a free slot if this ticket is first in the queue; otherwise return None."""
+        with self.cache.transact():
+            queue = self._live(self.queue_key)
+            slots = self._live(self.slots_key)
+            free = [slot for slot in range(self.size) if slot not in slots]
+            if not free or min(queue, default=ticket) != ticket:
+                self.cache.set(self.queue_key, queue)
+                return None
+            queue.pop(ticket, None)
+            slots[free[0]] = pid
+            self.cache.set(self.queue_key, queue)
+            self.cache.set(self.slots_key, slots)
+            return free[0]
+
+    def position(self, ticket: int) -> int:
+        """Number of queued jobs ahead of this ticket."""
+        return sum(1 for other in self.cache.get(self.queue_key, {}) if other < ticket)
+
+    def release(self, slot: int) -> None:
+        with self.cache.transact():
+            slots = self.cache.get(self.slots_key, {})
+            slots.pop(slot, None)
+            self.cache.set(self.slots_key, slots)
+
+    def acquire(self, pid: int, on_wait: Callable[[int], None] = None) -> int:
+        """Wait in the queue until a slot is free; on_wait is told how many jobs are ahead when that changes."""
+        ticket = self.enqueue(pid)
+        ahead = None
+        while True:
+            slot = self.try_acquire(ticket, pid)
+            if slot is not None:
+                return slot
+            if on_wait is not None and self.position(ticket) != ahead:
+                ahead = self.position(ticket)
+                on_wait(ahead)
+            time.sleep(QUEUE_POLL_SECONDS)
+
+class _Job:
+    """A background job: waits for a slot, then runs the callback through Dash's job function.
+
+    A module-level class rather than a closure so the job pickles into a spawned process.
+    """
+
+    def __init__(self, fn: Callable, cache: 'diskcache.Cache', slots: JobSlots, progress: bool) -> None:
+        self.fn = fn
+        self.cache = cache
+        self.slots = slots
+        self.progress = progress
+
+    def _on_wait(self, progress_key: str, ahead: int) -> None:
+        if self.progress:
+            self.cache.set(progress_key, [f"Queued, {ahead} job{'s' if ahead != 1 else ''} ahead"])
+
+    def __call__(self, result_key: str, progress_key: str, user_callback_args: Any, context: Any) -> None:
+        # Dash starts a job even when the result is cached; the poll that follows returns it
+        if self.cache.get(result_key) is not None:
+            return
+        slot = self.slots.acquire(os.getpid(), functools.partial(self._on_wait, progress_key))
+        try:
+            if self.progress:
+                self.cache.set(progress_key, ["Computing..."])
+            _make_job_fn(self.fn, self.cache, self.progress)(result_key, progress_key, user_callback_args, context)
+        finally:
+            self.slots.release(slot)
+
+def _pickle_job(job: _Job, args: tuple) -> bytes:
+    # Callbacks are closures, so dill pickles them by value along with the globals they use
+    # (recurse); modules are pickled by name, where dill would copy the project's own
+    pickler_class = type('JobPickler', (dill.Pickler,), {'dispatch': dict(dill.Pickler.dispatch)})
+    pickler_class.dispatch[ModuleType] = lambda pickler, module: pickler.save_reduce(
+        importlib.import_module, (module.__name__,), obj=module
+    )
+    buffer = io.BytesIO()
+    pickler_class(buffer, recurse=True).dump((job, args))
+    return buffer.getvalue()
+
+def _run_job(payload: bytes) -> None:
+    job, args = dill.loads(payload)
+    job(*args)
+
+class BoundedDiskcacheManager(DiskcacheManager):
+    """DiskcacheManager whose jobs wait for a slot in a bounded pool and skip work already cached."""
+
+    def __init__(self, cache: 'diskcache.Cache', max_jobs: int, cache_by: List[Callable] = None, expire: float = None) -> None:
+        # Set before the base class wraps the callbacks registered so far
+        self.slots = JobSlots(cache, max_jobs)
+        super().__init__(cache, cache_by=cache_by, expire=expire)
+
+    def call_job_fn(self, key: str, job_fn: Callable, args: Any, context: Any) -> int:
+        payload = _pickle_job(job_fn, (key, self._make_progress_key(key), args, context))
+        process = multiprocessing.get_context('spawn').Process(target=_run_job, args=(payload,))
+        process.start()
+        return process.pid
+
+    def make_job_fn(self, fn: Callable, progress: bool, key: str = None) -> Callable:
+        return _Job(fn, self.handle, self.slots, progress)
+
+def _data_version() -> str:
+    client = db.get_client()
+    try:
+        return db.get_data_version(client)
+    finally:
+        client.close()
+
+def create_background_manager(
+    cache_dir: str = BACKGROUND_CACHE_DIR,
+    max_jobs: int = BACKGROUND_MAX_JOBS,
+    expire: float = BACKGROUND_RESULT_TTL_SECONDS
+) -> Optional[BoundedDiskcacheManager]:
+    """Job manager over a diskcache directory, or None to run heavy callbacks inline."""
+    if not BACKGROUND_CALLBACKS_ENABLED:
+        return None
+    if diskcache is None:
+        logger.warning("diskcache is not installed; heavy callbacks will run inline")
+        return None
+    try:
+        return BoundedDiskcacheManager(diskcache.Cache(cache_dir), max_jobs, cache_by=[_data_version], expire=expire)
+    except ImportError as e:
+        logger.warning(f"Background callbacks are unavailable ({e}); heavy callbacks will run inline")
+        return None
+
+def _ignore_progress(*_) -> None:
+    pass
+
+def background_callback(app, *dependencies, status: Output = None, cancel: List[Input] = None, **kwargs) -> Callable:
+    """Register a heavy callback to run on the app's job manager, or inline when there is none.
+
+    The decorated function receives a set_progress function first, which sets the `status` output
+    (a text property) while the job runs. Jobs are cancelled when the page changes or any `cancel` input does.
+    """
+    manager = getattr(app, '_background_manager', None)
+
+    def decorator(fn: Callable) -> Callable:
+        if manager is None:
+            @functools.wraps(fn)
+            def inline(*args):
+                return fn(_ignore_progress, *args)
+            return app.callback(*dependencies, **kwargs)(inline)
+
+        if status is None:
+            @functools.wraps(fn)
+            def job(*args):
+                return fn(_ignore_progress, *args)
+        else:
+            job = fn
+        return app.callback(
+            *dependencies,
+            background=True,
+            manager=manager,
+            progress=[status] if status is not None else None,
+            progress_default=[""] if status is not None else None,
+            cancel=[Input('url', 'pathname'), *(cancel or [])],
+            interval=BACKGROUND_POLL_INTERVAL_MS,
+            **kwargs
+        )(job)
+
+    return decorator
@@ -0,0 +1,286 @@
+import datetime as dt
+import threading
+import uuid
+from collections import deque
+from typing import Any, Dict, List, Optional
+import numpy as np
+import polars as pl
+from config import LEDGER_CACHE_MAX_ENTRIES, LEDGER_CACHE_TTL_SECONDS
+from services.cache import MISSING, ResultCache
+from utils.metrics import instrument
+
+FIFO = 'fifo'
+LIFO = 'lifo'
+AVERAGE = 'average'
+COST_METHODS = [FIFO, LIFO, AVERAGE]
+
+# Rows allocated up front; columns double in size whenever they fill up
+INITIAL_CAPACITY = 64
+# Positions smaller than this are treated as closed, absorbing float residue from partial sells
+QUANTITY_EPSILON = 1e-9
+
+# Cost basis per (ledger id, method), brought up to date with the trades appended since it was last used
+_cost_basis_cache = ResultCache(LEDGER_CACHE_TTL_SECONDS, LEDGER_CACHE_MAX_ENTRIES)
+
+class Ledger:
+    """Append-only buy and sell transactions held as columnar arrays.
+
+    Quantities are signed: buys are positive and sells negative. Tickers are stored as integer codes into
+    `tickers`. Each ticker's trades are in date order: lots are consumed in ledger order, so a trade dated
+    before the ticker's last one is rejected rather than applied out of order.
+    """
+
+    def __init__(self, ledger_id: str = None) -> None:
+        self.id = ledger_id or uuid.uuid4().hex
+        self.tickers: List[str] = []
+        self.codes: Dict[str, int] = {}
+        self.size = 0
+        self._ticker = np.empty(INITIAL_CAPACITY, dtype=np.int32)
+        self._date = np.empty(INITIAL_CAPACITY, dtype='datetime64[D]')
+        self._quantity = np.empty(INITIAL_CAPACITY, dtype=np.float64)
+        self._price = np.empty(INITIAL_CAPACITY, dtype=np.float64)
+        self._positions: List[float] = []
+        self._last_dates: List[np.datetime64] = []
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def ticker(self) -> np.ndarray:
+        return self._ticker[:self.size]
+
+    @property
+    def date(self) -> np.ndarray:
+        return self._date[:self.size]
+
+    @property
+    def quantity(self) -> np.ndarray:
+        return self._quantity[:self.size]
+
+    @property
+    def price(self) -> np.ndarray:
+        return self._price[:self.size]
+
+    def trade(self, row: int) -> tuple:
+        return (self.tickers[self._ticker[row]], str(self._date[row]), float(self._quantity[row]), float(self._price[row]))
+
+    def position(self, ticker: str) -> float:
+        code = self.codes.get(ticker)
+        return 0.0 if code is None else self._positions[code]
+
+    def last_date(self, ticker: str) -> Optional[np.datetime64]:
+        code = self.codes.get(ticker)
+        return None if code is None else self._last_dates[code]
+
+    def _code(self, ticker: str) -> int:
+        code = self.codes.get(ticker)
+        if code is None:
+            code = self.codes[ticker] = len(self.tickers)
+            self.tickers.append(ticker)
+            self._positions.append(0.0)
+            self._last_dates.append(None)
+        return code
+
+    def _reserve(self, size: int) -> None:
+        capacity = len(self._quantity)
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        for name in ['_ticker', '_date', '_quantity', '_price']:
+            column = getattr(self, name)
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self.size] = column[:self.size]
+            setattr(self, name, grown)
+
+    def append(self, ticker: str, quantity: float, price: float, date: dt.date = None) -> None:
+        """Record a buy (positive quantity) or sell (negative quantity) of ticker at price."""
+        if not isinstance(ticker, str) or not ticker:
+            raise ValueError("Ticker must be a string.")
+        if not quantity:
+            raise ValueError("Quantity must be non-zero.")
+        if not price or price <= 0:
+            raise ValueError("Price must be a positive number.")
+        if quantity < 0 and -quantity > self.position(ticker) + QUANTITY_EPSILON:
+            raise ValueError(f"Cannot sell {-quantity} shares of {ticker}; only {self.position(ticker)} held.")
+        day = np.datetime64(date or dt.date.today(), 'D')
+        last_date = self.last_date(ticker)
+        if last_date is not None and day < last_date:
+            raise ValueError(f"Trades of {ticker} must be dated on or after its last trade on {last_date}.")
+
+        code = self._code(ticker)
+        self._reserve(self.size + 1)
+        self._ticker[self.size] = code
+        self._date[self.size] = day
+        self._quantity[self.size] = quantity
+        self._price[self.size] = price
+        self.size += 1
+        self._positions[code] += quantity
+        self._last_dates[code] = day
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Columns as JSON-serializable lists, for dcc.Store; dates are days since 1970-01-01."""
+        return {
+            'id': self.id,
+            'tickers': self.tickers,
+            'ticker': self.ticker.tolist(),
+            'date': self.date.astype(np.int64).tolist(),
+            'quantity': self.quantity.tolist(),
+            'price': self.price.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> 'Ledger':
+        """Load the columns written by to_dict; an empty or missing store gives a new ledger."""
+        if not data:
+            return cls()
+        ledger = cls(data['id'])
+        ledger.tickers = list(data['tickers'])
+        ledger.codes = {ticker: code for code, ticker in enumerate(ledger.tickers)}
+        size = len(data['quantity'])
+        ledger._reserve(size)
+        ledger._ticker[:size] = data['ticker']
+        ledger._date[:size] = np.array(data['date'], dtype=np.int64).astype('datetime64[D]')
+        ledger._quantity[:size] = data['quantity']
+        ledger._price[:size] = data['price']
+        ledger.size = size
+        ledger._positions = np.bincount(ledger.ticker, weights=ledger.quantity, minlength=len(ledger.tickers)).tolist()
+        last_dates = np.full(len(ledger.tickers), np.datetime64('NaT'), dtype='datetime64[D]')
+        np.fmax.at(last_dates, ledger.ticker, ledger.date)
+        ledger._last_dates = [None if np.isnat(day) else day for day in last_dates]
+        return ledger
+
+class CostBasis:
+    """Open lots, remaining cost and realized P&L per ticker under one cost-basis method.
+
+    Trades are applied one at a time in ledger order, so bringing the state up to date after an append costs
+    as much as the new trades rather than a replay of the whole history. FIFO and LIFO keep each ticker's open
+    lots in a deque and consume them from the front or the back; average cost only tracks quantity and cost.
+    """
+
+    def __init__(self, method: str) -> None:
+        if method not in COST_METHODS:
+            raise ValueError(f"Unknown cost-basis method: {method}")
+        self.method = method
+        self.applied = 0
+        self.quantity: List[float] = []
+        self.cost: List[float] = []
+        self.realized: List[float] = []
+        self.lots: List[deque] = []
+        self.last_trade: Optional[tuple] = None
+        self._lock = threading.Lock()
+
+    def apply(self, code: int, quantity: float, price: float) -> None:
+        while len(self.quantity) <= code:
+            self.quantity.append(0.0)
+            self.cost.append(0.0)
+            self.realized.append(0.0)
+            self.lots.append(deque())
+
+        if quantity > 0:
+            self.quantity[code] += quantity
+            self.cost[code] += quantity * price
+            if self.method != AVERAGE:
+                self.lots[code].append([quantity, price])
+            return
+
+        sold = -quantity
+        if self.method == AVERAGE:
+            basis = self.cost[code] * sold / self.quantity[code]
+        else:
+            lots, basis, remaining = self.lots[code], 0.0, sold
+            take_oldest = self.method == FIFO
+            while remaining > QUANTITY_EPSILON and lots:
+                lot = lots[0] if take_oldest else lots[-1]
+                taken = min(lot[0], remaining)
+                basis += taken * lot[1]
+                remaining -= taken
+                lot[0] -= taken
+                if lot[0] <= QUANTITY_EPSILON:
+                    lots.popleft() if take_oldest else lots.pop()
+        self.realized[code] += sold * price - basis
+        self.quantity[code] -= sold
+        self.cost[code] -= basis
+        if self.quantity[code] <= QUANTITY_EPSILON:
+            self.quantity[code], self.cost[code] = 0.0, 0.0
+            self.lots[code].clear()
+
+    def update(self, ledger: Ledger) -> 'CostBasis':
+        """Apply the trades appended to the ledger since the last update."""
+        with self._lock:
+            start = self.applied
+            trades = zip(
+                ledger.ticker[start:].tolist(), ledger.quantity[start:].tolist(), ledger.price[start:].tolist()
+            )
+            for code, quantity, price in trades:
+                self.apply(code, quantity, price)
+            self.applied = len(ledger)
+            self.last_trade = ledger.trade(self.applied - 1) if self.applied else None
+        return self
+
+    def follows(self, ledger: Ledger) -> bool:
+        """Check that the trades applied so far are a prefix of the ledger."""
+        if self.applied > len(ledger):
+            return False
+        return self.applied == 0 or ledger.trade(self.applied - 1) == self.last_trade
+
+    def positions(self, tickers: List[str], prices: Dict[str, float]) -> pl.DataFrame:
+        """Quantity, cost basis and realized and unrealized P&L per ticker at the given prices."""
+        n = len(self.quantity)
+        quantity = np.array(self.quantity)
+        cost = np.array(self.cost)
+        # Tickers without a current price are valued at cost
+        price = np.array([prices.get(ticker, np.nan) for ticker in tickers[:n]], dtype=float)
+        market_value = np.where(np.isnan(price), cost, quantity * np.nan_to_num(price))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            average_cost = np.where(quantity > 0, cost / quantity, 0.0)
+        return pl.DataFrame({
+            'ticker': tickers[:n],
+            'quantity': quantity,
+            'average_cost': average_cost,
+            'cost_basis': cost,
+            'market_value': market_value,
+            'unrealized': market_value - cost,
+            'realized': np.array(self.realized),
+        })
+
+def open_positions(ledger: Ledger, holdings: Dict[str, tuple]) -> Ledger:
+    """Record holdings kept before the ledger existed as buys of (shares, price) per ticker."""
+    for ticker, (shares, price) in holdings.items():
+        if shares > 0 and price > 0:
+            ledger.append(ticker, float(shares), float(price))
+    return ledger
+
+def record_position_change(ledger: Ledger, ticker: str, shares: float, price: float, date: dt.date = None) -> Ledger:
+    """Buy or sell the difference between the ledger position and a target number of shares."""
+    change = shares - ledger.position(ticker)
+    if abs(change) > QUANTITY_EPSILON:
+        ledger.append(ticker, change, price, date)
+    return ledger
+
+@instrument('portfolio')
+def get_cost_basis(ledger: Ledger, method: str) -> CostBasis:
+    """Cost basis of the ledger, reusing and extending the one computed for a shorter prefix of it."""
+    key = (ledger.id, method)
+    cost_basis = _cost_basis_cache.get(key)
+    # A ledger that no longer starts with the applied trades was reset or replaced on the client; start again
+    if cost_basis is MISSING or not cost_basis.follows(ledger):
+        cost_basis = CostBasis(method)
+        _cost_basis_cache.set(key, cost_basis)
+    return cost_basis.update(ledger)
+
+def clear_cost_basis_cache() -> None:
+    _cost_basis_cache.clear()
+
+def summarize_pnl(positions: pl.DataFrame) -> Dict[str, float]:
+    """Portfolio totals of cost, market value and P&L."""
+    cost_basis = float(positions['cost_basis'].sum())
+    unrealized = float(positions['unrealized'].sum())
+    realized = float(positions['realized'].sum())
+    return {
+        'cost_basis': cost_basis,
+        'market_value': float(positions['market_value'].sum()),
+        'unrealized': unrealized,
+        'realized': realized,
+        'unrealized_return': unrealized / cost_basis if cost_basis > 0 else 0.0,
+    }
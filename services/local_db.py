@@ -0,0 +1,177 @@
+import os
+import re
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Dict
+import db_dtypes
+import duckdb
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from config import LOCAL_QUERY_LATENCY_SECONDS
+from utils.gevent_utils import run_blocking
+
+# BigQuery syntax that DuckDB spells differently
+TABLE_REF_PATTERN = re.compile(r"`(?:[^`]*\.)?([^`.]+)`")
+DATE_SUB_PATTERN = re.compile(r"DATE_SUB\(\s*(.+?)\s*,\s*INTERVAL\s+(\S+)\s+(DAY|WEEK|MONTH|YEAR)\s*\)", re.IGNORECASE)
+DATE_TRUNC_PATTERN = re.compile(r"DATE_TRUNC\(\s*(\w+)\s*,\s*(WEEK|MONTH|YEAR)(?:\(MONDAY\))?\s*\)", re.IGNORECASE)
+PARAM_PATTERN = re.compile(r"@(\w+)")
+UNNEST_PATTERN = re.compile(r"IN\s+UNNEST\((@\w+)\)", re.IGNORECASE)
+QUOTED_NAME_PATTERN = re.compile(r'"([^"]+)"')
+WORD_PATTERN = re.compile(r"\w+")
+
+# One in-memory DuckDB database per data directory, shared by all clients
+_databases: Dict[str, duckdb.DuckDBPyConnection] = {}
+_databases_lock = threading.Lock()
+
+def translate_query(query: str) -> str:
+    """Rewrite a BigQuery Standard SQL query into the DuckDB dialect."""
+    query = TABLE_REF_PATTERN.sub(r'"\1"', query)
+    query = UNNEST_PATTERN.sub(r"IN (SELECT UNNEST(\1))", query)
+    query = DATE_SUB_PATTERN.sub(r"(\1 - INTERVAL (\2) \3)", query)
+    # DuckDB weeks are ISO weeks, which start on Monday
+    query = DATE_TRUNC_PATTERN.sub(r"CAST(DATE_TRUNC('\2', \1) AS DATE)", query)
+    return PARAM_PATTERN.sub(r"$\1", query)
+
+def _get_database(data_dir: str) -> duckdb.DuckDBPyConnection:
+    data_dir = os.path.abspath(data_dir)
+    with _databases_lock:
+        if data_dir not in _databases:
+            if not os.path.isdir(data_dir):
+                raise FileNotFoundError(f"Local data directory not found: {data_dir}")
+            conn = duckdb.connect()
+            # Expose every Parquet file in the directory as a view named after it
+            for file_name in sorted(os.listdir(data_dir)):
+                table_name, extension = os.path.splitext(file_name)
+                if extension == '.parquet':
+                    path = os.path.join(data_dir, file_name).replace("'", "''")
+                    conn.execute(f"""CREATE VIEW "{table_name}" AS SELECT * FROM read_parquet('{path}')""")
+            _databases[data_dir] = conn
+        return _databases[data_dir]
+
+def _column_sizes(data_dir: str) -> Dict[str, Dict[str, int]]:
+    # Uncompressed bytes per column of every Parquet file, read from the footers
+    sizes = {}
+    for file_name in sorted(os.listdir(data_dir)):
+        table_name, extension = os.path.splitext(file_name)
+        if extension != '.parquet':
+            continue
+        metadata = pq.read_metadata(os.path.join(data_dir, file_name))
+        columns = sizes[table_name] = {}
+        for i in range(metadata.num_row_groups):
+            row_group = metadata.row_group(i)
+            for j in range(row_group.num_columns):
+                column = row_group.column(j)
+                columns[column.path_in_schema] = columns.get(column.path_in_schema, 0) + column.total_uncompressed_size
+    return sizes
+
+def estimate_bytes(query: str, column_sizes: Dict[str, Dict[str, int]]) -> int:
+    """Approximate BigQuery billing for a translated query: full size of every referenced column."""
+    words = set(WORD_PATTERN.findall(query))
+    total = 0
+    for table_name in set(QUOTED_NAME_PATTERN.findall(query)):
+        columns = column_sizes.get(table_name, {})
+        if re.search(r"SELECT\s+\*", query, re.IGNORECASE):
+            total += sum(columns.values())
+        else:
+            total += sum(size for name, size in columns.items() if name in words)
+    return total
+
+def reset_databases() -> None:
+    """Drop cached DuckDB databases so regenerated files are picked up."""
+    with _databases_lock:
+        for conn in _databases.values():
+            conn.close()
+        _databases.clear()
+
+class LocalQueryJob:
+    """Stand-in for bigquery.QueryJob executing against the local DuckDB database."""
+
+    def __init__(
+        self,
+        cursor: duckdb.DuckDBPyConnection,
+        query: str,
+        params: Dict[str, object],
+        total_bytes_processed: int = None,
+        latency: float = LOCAL_QUERY_LATENCY_SECONDS
+    ) -> None:
+        self.cursor = cursor
+        self.query = query
+        self.params = params
+        self.total_bytes_processed = total_bytes_processed
+        self.latency = latency
+        self._frame = None
+        self._cancelled = False
+        self._lock = threading.Lock()
+
+    def result(self, timeout: float = None) -> 'LocalQueryJob':
+        with self._lock:
+            if self._cancelled:
+                raise RuntimeError("Job was cancelled")
+            if self._frame is None:
+                # DuckDB has no query timeout, so interrupt the cursor when it expires
+                timer = threading.Timer(timeout, self.cursor.interrupt) if timeout else None
+                if timer:
+                    timer.start()
+                try:
+                    if self.latency:
+                        # Stand in for the round trip to BigQuery; cooperative under gevent
+                        time.sleep(self.latency)
+                    # DuckDB blocks in C, so under gevent it runs on the hub's thread pool
+                    table = run_blocking(self._execute)
+                except duckdb.InterruptException:
+                    if self._cancelled:
+                        raise RuntimeError("Job was cancelled")
+                    raise FutureTimeoutError(f"Local query exceeded {timeout} seconds")
+                finally:
+                    if timer:
+                        timer.cancel()
+                    self.cursor.close()
+                self._frame = table.to_pandas(types_mapper={pa.date32(): db_dtypes.DateDtype()}.get)
+        return self
+
+    def _execute(self) -> pa.Table:
+        return self.cursor.execute(self.query, self.params).to_arrow_table()
+
+    def to_dataframe(self) -> pd.DataFrame:
+        return self.result()._frame
+
+    def cancel(self) -> bool:
+        self._cancelled = True
+        if self._frame is None:
+            self.cursor.interrupt()
+        return True
+
+    def done(self) -> bool:
+        return self._frame is not None or self._cancelled
+
+class LocalClient:
+    """Offline stand-in for bigquery.Client backed by Parquet files in a directory."""
+
+    def __init__(self, data_dir: str) -> None:
+        self.data_dir = data_dir
+        _get_database(data_dir)
+        self._column_sizes = _column_sizes(data_dir)
+
+    def query(self, query: str, job_config=None) -> LocalQueryJob:
+        query_params = getattr(job_config, 'query_parameters', None) or []
+        params = {param.name: _param_value(param) for param in query_params}
+        query = translate_query(query)
+        estimate = estimate_bytes(query, self._column_sizes)
+        # Looked up per query so a database reset after fork is picked up
+        job = LocalQueryJob(_get_database(self.data_dir).cursor(), query, params, estimate)
+        # Dry runs only report the estimate, like BigQuery
+        if getattr(job_config, 'dry_run', False):
+            job.cursor.close()
+            job._frame = pd.DataFrame()
+        return job
+
+    def close(self) -> None:
+        pass
+
+def _param_value(param) -> object:
+    # Array parameters carry their items in 'values', scalars in 'value'
+    if hasattr(param, 'values'):
+        return list(param.values)
+    return param.value
@@ -0,0 +1,170 @@
+from typing import Dict, List, Tuple
+import numpy as np
+import polars as pl
+from google.cloud import bigquery
+import services.db as db
+from config import COVARIANCE_CACHE_MAX_ENTRIES, COVARIANCE_CACHE_TTL_SECONDS, FRONTIER_POINTS, RISK_FREE_RATE
+from services.cache import ResultCache
+from utils.metrics import instrument
+
+TRADING_DAYS = 252
+# Tickers with fewer daily returns than this in the lookback are left out
+MIN_OBSERVATIONS = 20
+# Accelerated projected gradient stops after this many steps or once weights move less than the tolerance
+MAX_ITERATIONS = 2000
+TOLERANCE = 1e-6
+
+# Return statistics per (tickers, period, data version)
+_statistics_cache = ResultCache(COVARIANCE_CACHE_TTL_SECONDS, COVARIANCE_CACHE_MAX_ENTRIES)
+
+class ReturnStatistics:
+    """Annualized mean and covariance of daily returns for a set of tickers."""
+
+    def __init__(self, tickers: List[str], mean: np.ndarray, cov: np.ndarray) -> None:
+        self.tickers = tickers
+        self.mean = mean
+        self.cov = cov
+
+    def performance(self, weights: np.ndarray, risk_free_rate: float = RISK_FREE_RATE) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Expected return, volatility and Sharpe ratio of one weight vector or of each row of a matrix."""
+        weights = np.atleast_2d(weights)
+        returns = weights @ self.mean
+        volatility = np.sqrt(np.maximum(np.einsum('ij,jk,ik->i', weights, self.cov, weights), 0))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            sharpe = np.where(volatility > 0, (returns - risk_free_rate) / volatility, np.nan)
+        return returns, volatility, sharpe
+
+class Frontier:
+    """Efficient frontier samples plus the minimum-variance and maximum-Sharpe portfolios."""
+
+    def __init__(self, statistics: ReturnStatistics, weights: np.ndarray, min_variance: np.ndarray, max_sharpe: np.ndarray) -> None:
+        self.statistics = statistics
+        self.weights = weights
+        self.min_variance = min_variance
+        self.max_sharpe = max_sharpe
+        self.returns, self.volatility, self.sharpe = statistics.performance(weights)
+
+@instrument('dataframe')
+def return_statistics(close_matrix: pl.DataFrame) -> ReturnStatistics:
+    """Estimate annualized statistics from a close matrix, using each pair's overlapping days for its covariance."""
+    # A ticker that did not trade on a day keeps its last close, so returns span the gap
+    closes = close_matrix.fill_null(strategy='forward').to_numpy().astype(float)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        returns = closes[1:] / closes[:-1] - 1
+    valid = np.isfinite(returns)
+    keep = valid.sum(axis=0) >= MIN_OBSERVATIONS
+    if keep.sum() < 2:
+        raise ValueError("At least two tickers need price history in the lookback period")
+    returns, valid = returns[:, keep], valid[:, keep]
+    tickers = [ticker for ticker, kept in zip(close_matrix.columns, keep) if kept]
+
+    counts = valid.sum(axis=0)
+    mean = np.where(valid, returns, 0).sum(axis=0) / counts
+    centered = np.where(valid, returns - mean, 0)
+    pair_counts = valid.T.astype(float) @ valid
+    cov = centered.T @ centered / np.maximum(pair_counts - 1, 1)
+
+    # Pairwise estimates need not be positive semidefinite; clip the spectrum so the solvers stay convex
+    eigenvalues, eigenvectors = np.linalg.eigh((cov + cov.T) / 2)
+    eigenvalues = np.maximum(eigenvalues, eigenvalues.max() * 1e-8)
+    cov = (eigenvectors * eigenvalues) @ eigenvectors.T
+    return ReturnStatistics(tickers, mean * TRADING_DAYS, cov * TRADING_DAYS)
+
+def get_return_statistics(client: bigquery.Client, tickers: List[str], period: str) -> ReturnStatistics:
+    """Return statistics for tickers over period, fetched in one query and cached per data version."""
+    key = (tuple(sorted(set(tickers))), period, db.get_data_version(client))
+    return _statistics_cache.get_or_load(
+        key,
+        lambda: return_statistics(db.get_close_matrix(client, list(key[0]), period))
+    )
+
+def clear_statistics_cache() -> None:
+    _statistics_cache.clear()
+
+def project_simplex(values: np.ndarray) -> np.ndarray:
+    """Euclidean projection of each row onto the long-only budget set {w >= 0, sum(w) = 1}."""
+    n = values.shape[1]
+    ordered = -np.sort(-values, axis=1)
+    cumulative = np.cumsum(ordered, axis=1) - 1
+    positive = ordered - cumulative / np.arange(1, n + 1) > 0
+    # Index of the last coordinate that stays positive after the shift
+    rho = n - 1 - np.argmax(positive[:, ::-1], axis=1)
+    theta = cumulative[np.arange(len(values)), rho] / (rho + 1)
+    return np.maximum(values - theta[:, None], 0)
+
+def solve_unconstrained(mean: np.ndarray, cov: np.ndarray, risk_tolerance: np.ndarray) -> np.ndarray:
+    """Closed-form minimizers of w'Cw / 2 - t * mean'w subject to sum(w) = 1, one row per t."""
+    ones = np.ones(len(mean))
+    inv_ones = np.linalg.solve(cov, ones)
+    inv_mean = np.linalg.solve(cov, mean)
+    a, b = ones @ inv_ones, ones @ inv_mean
+    return risk_tolerance[:, None] * inv_mean + ((1 - risk_tolerance * b) / a)[:, None] * inv_ones
+
+def solve_long_only(mean: np.ndarray, cov: np.ndarray, risk_tolerance: np.ndarray) -> np.ndarray:
+    """Long-only minimizers of w'Cw / 2 - t * mean'w for every t at once, by accelerated projected gradient."""
+    step = 1 / np.linalg.eigvalsh(cov)[-1]
+    weights = np.full((len(risk_tolerance), len(mean)), 1 / len(mean))
+    momentum, t = weights, np.ones(len(risk_tolerance))
+    for _ in range(MAX_ITERATIONS):
+        gradient = momentum @ cov - risk_tolerance[:, None] * mean
+        updated = project_simplex(momentum - step * gradient)
+        # Restart the momentum of rows that started moving uphill
+        t = np.where(np.einsum('ij,ij->i', gradient, updated - weights) > 0, 1.0, t)
+        t_next = (1 + np.sqrt(1 + 4 * t * t)) / 2
+        momentum = updated + ((t - 1) / t_next)[:, None] * (updated - weights)
+        converged = np.abs(updated - weights).max() < TOLERANCE
+        weights, t = updated, t_next
+        if converged:
+            break
+    return weights
+
+def _max_risk_tolerance(mean: np.ndarray, cov: np.ndarray, long_only: bool) -> float:
+    # Risk tolerance beyond which the frontier reaches the highest-return asset
+    best = int(np.argmax(mean))
+    if long_only:
+        gaps = mean[best] - mean
+        others = gaps > 0
+        if not others.any():
+            return 0.0
+        return float(np.max((cov[best, best] - cov[best, others]) / gaps[others]))
+    ones = np.ones(len(mean))
+    inv_ones = np.linalg.solve(cov, ones)
+    inv_mean = np.linalg.solve(cov, mean)
+    a, b, c = ones @ inv_ones, ones @ inv_mean, mean @ inv_mean
+    slope = c - b * b / a
+    return float(max((mean[best] - b / a) / slope, 0)) if slope > 0 else 0.0
+
+@instrument('portfolio')
+def efficient_frontier(
+    statistics: ReturnStatistics,
+    long_only: bool = True,
+    points: int = FRONTIER_POINTS,
+    risk_free_rate: float = RISK_FREE_RATE
+) -> Frontier:
+    """Sample the efficient frontier and locate its minimum-variance and maximum-Sharpe portfolios."""
+    mean, cov = statistics.mean, statistics.cov
+    solve = solve_long_only if long_only else solve_unconstrained
+    # Square spacing puts more samples near the minimum-variance end, where the frontier bends
+    risk_tolerance = _max_risk_tolerance(mean, cov, long_only) * np.linspace(0, 1, points) ** 2
+    weights = solve(mean, cov, risk_tolerance)
+    min_variance = weights[0]
+
+    excess = mean - risk_free_rate
+    tangency = np.linalg.solve(cov, excess)
+    if not long_only and tangency.sum() > 0:
+        max_sharpe = tangency / tangency.sum()
+    else:
+        # Refine between the neighbours of the best sample; Sharpe is unimodal along the frontier
+        _, _, sharpe = statistics.performance(weights, risk_free_rate)
+        best = int(np.nanargmax(sharpe))
+        low, high = risk_tolerance[max(best - 1, 0)], risk_tolerance[min(best + 1, points - 1)]
+        candidates = solve(mean, cov, np.linspace(low, high, points))
+        _, _, candidate_sharpe = statistics.performance(candidates, risk_free_rate)
+        max_sharpe = candidates[int(np.nanargmax(candidate_sharpe))]
+    return Frontier(statistics, weights, min_variance, max_sharpe)
+
+def current_weights(statistics: ReturnStatistics, values: Dict[str, float]) -> np.ndarray:
+    """Weights of the current holdings over the optimized tickers."""
+    weights = np.array([values.get(ticker, 0.0) for ticker in statistics.tickers], dtype=float)
+    total = weights.sum()
+    return weights / total if total > 0 else weights
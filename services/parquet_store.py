@@ -0,0 +1,172 @@
+"""
+Parquet copy of the stocks table queried through lazy Polars plans.
+
+Each generation is one Parquet file sorted by ticker then date, plus the list
+of tickers it holds:
+
+    <store>/CURRENT                          name of the active generation
+    <store>/gen-<timestamp>/stocks.parquet   date/ticker/OHLCV rows
+    <store>/gen-<timestamp>/tickers.json     tickers in the file
+
+Queries are built as pl.LazyFrame plans over scan_parquet. Ticker, date and
+volume filters are pushed down into the scan, where the min/max statistics
+of each row group skip the groups that cannot match (rows are sorted by
+ticker, so a few tickers only touch a few groups), and only the selected
+columns are decoded. With PARQUET_STREAMING plans run on the streaming
+engine, so universe-wide aggregations work through the file in batches
+instead of materializing it.
+
+Usage:
+    python -m services.parquet_store --out /var/lib/sma/parquet
+"""
+import argparse
+import datetime as dt
+import json
+import os
+import threading
+from typing import Dict, List, Optional
+import polars as pl
+from config import PARQUET_ROW_GROUP_SIZE, PARQUET_STREAMING
+from services.price_store import PERIOD_DAYS, current_generation, publish_generation, stage_generation
+
+FIELDS = ['open', 'high', 'low', 'close', 'volume']
+DATA_FILE = 'stocks.parquet'
+
+def period_filter(period: str) -> pl.Expr:
+    """Rows after the start of the period, like DATE_SUB(CURRENT_DATE(), INTERVAL n DAY)."""
+    if period == 'max':
+        return pl.lit(True)
+    return pl.col('date') > dt.date.today() - dt.timedelta(days=PERIOD_DAYS.get(period, 30))
+
+class ParquetStore:
+    """Lazy query plans over one generation of the Parquet stocks file."""
+
+    def __init__(self, path: str, streaming: bool = PARQUET_STREAMING) -> None:
+        self.path = path
+        self.generation = os.path.basename(path)
+        self.streaming = streaming
+        with open(os.path.join(path, 'tickers.json')) as f:
+            self.tickers: List[str] = json.load(f)
+        self._known = set(self.tickers)
+
+    def has(self, tickers: List[str]) -> bool:
+        return all(ticker in self._known for ticker in tickers)
+
+    def scan(self) -> pl.LazyFrame:
+        return pl.scan_parquet(os.path.join(self.path, DATA_FILE))
+
+    def collect(self, plan: pl.LazyFrame) -> pl.DataFrame:
+        return plan.collect(streaming=self.streaming)
+
+    def price_plan(self, ticker: str, period: str = 'max') -> pl.LazyFrame:
+        """Daily date/open/close/high/low rows of a ticker, like get_price_data."""
+        return (
+            self.scan()
+            .filter((pl.col('ticker') == ticker) & period_filter(period))
+            .select(['date', 'open', 'close', 'high', 'low'])
+            .sort('date')
+        )
+
+    def volume_plan(self, ticker: str, period: str = 'max', volume_range: tuple = (0, float('inf'))) -> pl.LazyFrame:
+        """Daily date/ticker/volume rows of a ticker within a volume range, like get_volume_data."""
+        min_volume, max_volume = volume_range
+        volume_filter = pl.col('volume') >= min_volume
+        if max_volume != float('inf'):
+            volume_filter &= pl.col('volume') <= max_volume
+        return (
+            self.scan()
+            .filter((pl.col('ticker') == ticker) & period_filter(period) & volume_filter)
+            .select(['date', 'ticker', 'volume'])
+            .sort('date')
+        )
+
+    def closes_plan(self, tickers: List[str], period: str = 'max', start_date: dt.date = None, end_date: dt.date = None) -> pl.LazyFrame:
+        """Long date/ticker/close rows of the tickers in date order, within the dates given."""
+        date_filter = period_filter(period)
+        if start_date is not None:
+            date_filter &= pl.col('date') >= start_date
+        if end_date is not None:
+            date_filter &= pl.col('date') <= end_date
+        return (
+            self.scan()
+            .filter(pl.col('ticker').is_in(tickers) & date_filter)
+            .select(['date', 'ticker', 'close'])
+            .sort('date')
+        )
+
+    def close_matrix(
+        self,
+        tickers: List[str],
+        period: str = 'max',
+        include_dates: bool = False,
+        start_date: dt.date = None,
+        end_date: dt.date = None
+    ) -> pl.DataFrame:
+        """Closing prices with one column per ticker over the dates any of them traded, within the dates given."""
+        closes = self.collect(self.closes_plan(tickers, period, start_date, end_date))
+        if closes.is_empty():
+            return pl.DataFrame()
+        # Polars only pivots eagerly; the rows it pivots were already filtered and projected in the scan
+        matrix = closes.pivot(on='ticker', index='date', values='close', aggregate_function='max')
+        columns = [ticker for ticker in tickers if ticker in matrix.columns]
+        return matrix.select((['date'] if include_dates else []) + columns)
+
+    def latest_close(self, tickers: List[str]) -> Dict[str, float]:
+        """Last available close of each ticker, like get_stocks_current_price."""
+        plan = (
+            self.scan()
+            .filter(pl.col('ticker').is_in(tickers))
+            .group_by('ticker')
+            .agg(pl.col('close').sort_by('date').last())
+        )
+        latest = self.collect(plan)
+        return dict(zip(latest['ticker'].to_list(), latest['close'].to_list()))
+
+def write_generation(store_dir: str, df: pl.DataFrame, row_group_size: int = PARQUET_ROW_GROUP_SIZE) -> str:
+    """Write a new generation from date/ticker/OHLCV rows and make it the current one."""
+    generation, staging = stage_generation(store_dir)
+    # Sorting by ticker keeps each ticker in few row groups, so their statistics can rule the rest out
+    df = df.select(['date', 'ticker'] + FIELDS).with_columns(pl.col('date').cast(pl.Date)).sort(['ticker', 'date'])
+    df.write_parquet(os.path.join(staging, DATA_FILE), row_group_size=row_group_size, statistics=True)
+    with open(os.path.join(staging, 'tickers.json'), 'w') as f:
+        json.dump(df['ticker'].unique(maintain_order=True).to_list(), f)
+    publish_generation(store_dir, generation, staging)
+    return generation
+
+_stores: Dict[str, ParquetStore] = {}
+_stores_lock = threading.Lock()
+
+def open_parquet_store(store_dir: str) -> Optional[ParquetStore]:
+    """Return the current generation of a store, reopening it after a swap, or None if there is none."""
+    generation = current_generation(store_dir)
+    if generation is None:
+        return None
+
+    with _stores_lock:
+        store = _stores.get(store_dir)
+        if store is None or store.generation != generation:
+            store = _stores[store_dir] = ParquetStore(os.path.join(store_dir, generation))
+        return store
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Build a new Parquet store generation from the configured data backend.')
+    parser.add_argument('--out', required=True, help='Parquet store directory')
+    parser.add_argument('--row-group-size', type=int, default=PARQUET_ROW_GROUP_SIZE)
+    args = parser.parse_args()
+
+    import services.db as db
+    from services.digest import refresh_digest
+    client = db.get_client()
+    try:
+        history = db.get_price_history(client)
+        if history.is_empty():
+            raise SystemExit('No price history returned by the data backend')
+        generation = write_generation(args.out, history, args.row_group_size)
+        # New data has landed; rebuild the market digest from the same rows
+        refresh_digest(history, client, generation)
+    finally:
+        client.close()
+    print(f"Wrote {generation} with {history['ticker'].n_unique()} tickers to {args.out}")
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,11 @@
+import logging
 import pandas as pd
 import numpy as np
+from utils.metrics import instrument
 
+logger = logging.getLogger(__name__)
+
+@instrument('portfolio')
 def add_stock(portfolio: pd.DataFrame, ticker: str, shares: float, current_price: float) -> pd.DataFrame:
     """Add or update shares for a stock in the portfolio."""
     try:
@@ -19,9 +24,10 @@ def add_stock(portfolio: pd.DataFrame, ticker: str, shares: float, current_price
             portfolio = pd.concat([portfolio, pd.DataFrame([new_stock])], ignore_index=True)
             portfolio = calculate_weights(portfolio)
     except Exception as e:
-        print(f"Error during add_stock: {e}")
+        logger.error(f"Error during add_stock: {e}")
     return portfolio
 
+@instrument('portfolio')
 def edit_stock(portfolio: pd.DataFrame, ticker: str, shares: float, current_price: float) -> pd.DataFrame:
     """Edit the number of shares for a stock in the portfolio."""
     try:
@@ -31,11 +37,12 @@ def edit_stock(portfolio: pd.DataFrame, ticker: str, shares: float, current_pric
             portfolio = update_stock_values(portfolio, ticker, shares, current_price)
             portfolio = calculate_weights(portfolio)
         else:
-            print(f"Cannot edit: {ticker} is not in the portfolio.")
+            logger.warning(f"Cannot edit: {ticker} is not in the portfolio.")
     except Exception as e:
-        print(f"Error during edit_stock: {e}")
+        logger.error(f"Error during edit_stock: {e}")
     return portfolio
 
+@instrument('portfolio')
 def delete_stock(portfolio: pd.DataFrame, ticker: str) -> pd.DataFrame:
     """Delete a stock from the portfolio."""
     try:
@@ -47,9 +54,10 @@ def delete_stock(portfolio: pd.DataFrame, ticker: str) -> pd.DataFrame:
         portfolio = portfolio[portfolio["Ticker"] != ticker].reset_index(drop=True)
         portfolio = calculate_weights(portfolio)
     except Exception as e:
-        print(f"Error during delete_stock: {e}")
+        logger.error(f"Error during delete_stock: {e}")
     return portfolio
 
+@instrument('portfolio')
 def calculate_weights(portfolio: pd.DataFrame) -> pd.DataFrame:
     """Recalculate the weights of all stocks in the portfolio."""
     try:
@@ -58,7 +66,7 @@ def calculate_weights(portfolio: pd.DataFrame) -> pd.DataFrame:
         # Calculate weight for each stock
         portfolio["Weight"] = round(portfolio["Value"] / total_value, 2) if total_value > 0 else 0
     except Exception as e:
-        print(f"Error during calculate_weights: {e}")
+        logger.error(f"Error during calculate_weights: {e}")
     return portfolio
 
 def update_stock_values(portfolio: pd.DataFrame, ticker: str, shares: float, price: float) -> pd.DataFrame:
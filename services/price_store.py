@@ -0,0 +1,241 @@
+"""
+Memory-mapped price store shared by all worker processes.
+
+Each generation is a directory of NumPy files laid out as (ticker x date)
+matrices, one per OHLCV field, plus the date axis and a ticker index:
+
+    <store>/CURRENT                 name of the active generation
+    <store>/gen-<timestamp>/dates.npy       datetime64[D], sorted
+    <store>/gen-<timestamp>/tickers.json    ticker -> row and its first/last valid column
+    <store>/gen-<timestamp>/<field>.npy     float64, NaN where a ticker has no row; volume is
+                                            int64 with 0 on those days, masked by the NaN close
+
+Readers map the files read-only, so every process shares the same page cache
+and slicing one ticker or one date range does not copy the matrix. A refresh
+writes a new generation next to the active one and swaps CURRENT atomically.
+Superseded generations are removed only after GENERATION_GRACE_SECONDS, so a
+reader that resolved CURRENT just before a swap can still open the files.
+
+Usage:
+    python -m services.price_store --out /var/lib/sma/prices
+"""
+import argparse
+import datetime as dt
+import json
+import os
+import shutil
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import polars as pl
+
+FIELDS = ['open', 'high', 'low', 'close', 'volume']
+CURRENT_FILE = 'CURRENT'
+# Generations kept on disk so readers that mapped an older one can finish
+KEEP_GENERATIONS = 2
+# Seconds an older generation outlives the one that replaced it, for readers still opening it
+GENERATION_GRACE_SECONDS = 3600
+
+PERIOD_DAYS = {
+    '1 month': 30,
+    '3 months': 90,
+    '6 months': 180,
+    '1 year': 365,
+    '5 years': 1825,
+}
+
+class PriceStore:
+    """Read-only view over one generation of the memory-mapped price matrices."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.generation = os.path.basename(path)
+        self.dates = np.load(os.path.join(path, 'dates.npy'), mmap_mode='r')
+        self.fields = {field: np.load(os.path.join(path, f'{field}.npy'), mmap_mode='r') for field in FIELDS}
+        with open(os.path.join(path, 'tickers.json')) as f:
+            index = json.load(f)
+        self.tickers: List[str] = index['tickers']
+        self.rows = {ticker: row for row, ticker in enumerate(self.tickers)}
+        self.first = np.array(index['first'], dtype=np.int64)
+        self.last = np.array(index['last'], dtype=np.int64)
+
+    def has(self, tickers: List[str]) -> bool:
+        return all(ticker in self.rows for ticker in tickers)
+
+    def _columns(self, ticker: str, period: str) -> Tuple[int, slice]:
+        # Row of the ticker and the date columns inside the period and the ticker's valid range
+        row = self.rows[ticker]
+        start = self.first[row]
+        if period != 'max':
+            cutoff = np.datetime64(dt.date.today() - dt.timedelta(days=PERIOD_DAYS.get(period, 30)), 'D')
+            start = max(start, int(np.searchsorted(self.dates, cutoff, side='right')))
+        return row, slice(start, self.last[row] + 1)
+
+    def price_frame(self, ticker: str, period: str = 'max') -> pl.DataFrame:
+        """Daily date/open/close/high/low rows of a ticker, like get_price_data."""
+        row, columns = self._columns(ticker, period)
+        close = self.fields['close'][row, columns]
+        present = ~np.isnan(close)
+        return pl.DataFrame({
+            'date': self.dates[columns][present],
+            'open': self.fields['open'][row, columns][present],
+            'close': close[present],
+            'high': self.fields['high'][row, columns][present],
+            'low': self.fields['low'][row, columns][present],
+        })
+
+    def volume_frame(self, ticker: str, period: str = 'max', volume_range: tuple = (0, float('inf'))) -> pl.DataFrame:
+        """Daily date/ticker/volume rows of a ticker within a volume range, like get_volume_data."""
+        row, columns = self._columns(ticker, period)
+        volume = self.fields['volume'][row, columns]
+        keep = ~np.isnan(self.fields['close'][row, columns]) & (volume >= volume_range[0]) & (volume <= volume_range[1])
+        return pl.DataFrame({
+            'date': self.dates[columns][keep],
+            'ticker': [ticker] * int(keep.sum()),
+            'volume': volume[keep],
+        })
+
+    def close_matrix(
+        self,
+        tickers: List[str],
+        period: str = 'max',
+        include_dates: bool = False,
+        start_date: dt.date = None,
+        end_date: dt.date = None
+    ) -> pl.DataFrame:
+        """Closing prices with one column per ticker over the dates any of them traded, within the dates given."""
+        rows = [self.rows[ticker] for ticker in tickers]
+        start = int(self.first[rows].min())
+        stop = int(self.last[rows].max()) + 1
+        if period != 'max':
+            cutoff = np.datetime64(dt.date.today() - dt.timedelta(days=PERIOD_DAYS.get(period, 30)), 'D')
+            start = max(start, int(np.searchsorted(self.dates, cutoff, side='right')))
+        if start_date is not None:
+            start = max(start, int(np.searchsorted(self.dates, np.datetime64(start_date, 'D'), side='left')))
+        if end_date is not None:
+            stop = min(stop, int(np.searchsorted(self.dates, np.datetime64(end_date, 'D'), side='right')))
+        stop = max(start, stop)
+        close = self.fields['close'][rows, start:stop]
+        traded = ~np.isnan(close).all(axis=0)
+        closes = pl.DataFrame({ticker: close[i, traded] for i, ticker in enumerate(tickers)}).fill_nan(None)
+        if include_dates:
+            closes = closes.insert_column(0, pl.Series('date', self.dates[start:stop][traded]))
+        return closes
+
+    def latest_close(self, tickers: List[str]) -> Dict[str, float]:
+        """Last available close of each ticker, like get_stocks_current_price."""
+        close = self.fields['close']
+        return {
+            ticker: float(close[self.rows[ticker], self.last[self.rows[ticker]]])
+            for ticker in tickers if ticker in self.rows
+        }
+
+def write_generation(store_dir: str, df: pl.DataFrame) -> str:
+    """Write a new generation from date/ticker/OHLCV rows and make it the current one."""
+    generation, staging = stage_generation(store_dir)
+
+    df = df.select(['date', 'ticker'] + FIELDS).sort(['ticker', 'date'])
+    tickers = df['ticker'].unique().sort().to_list()
+    dates = np.unique(df['date'].to_numpy().astype('datetime64[D]'))
+    row_index = df['ticker'].replace_strict({ticker: row for row, ticker in enumerate(tickers)}, return_dtype=pl.Int64).to_numpy()
+    column_index = np.searchsorted(dates, df['date'].to_numpy().astype('datetime64[D]'))
+
+    for field in FIELDS:
+        dtype = np.int64 if field == 'volume' else np.float64
+        matrix = np.lib.format.open_memmap(
+            os.path.join(staging, f'{field}.npy'), mode='w+', dtype=dtype, shape=(len(tickers), len(dates))
+        )
+        matrix[:] = 0 if field == 'volume' else np.nan
+        matrix[row_index, column_index] = df[field].to_numpy()
+        matrix.flush()
+        del matrix
+    np.save(os.path.join(staging, 'dates.npy'), dates)
+
+    # Rows are sorted by ticker then date, so each ticker's first and last rows bound its valid columns
+    bounds = df.with_columns(pl.Series('column', column_index)).group_by('ticker', maintain_order=True).agg(
+        pl.col('column').first().alias('first'), pl.col('column').last().alias('last')
+    )
+    with open(os.path.join(staging, 'tickers.json'), 'w') as f:
+        json.dump({'tickers': tickers, 'first': bounds['first'].to_list(), 'last': bounds['last'].to_list()}, f)
+
+    publish_generation(store_dir, generation, staging)
+    return generation
+
+def stage_generation(store_dir: str) -> Tuple[str, str]:
+    """Name a new generation and create the hidden directory it is written to."""
+    os.makedirs(store_dir, exist_ok=True)
+    generation = f"gen-{time.strftime('%Y%m%d%H%M%S')}-{time.time_ns() % 1_000_000_000:09d}"
+    staging = os.path.join(store_dir, f'.{generation}.tmp')
+    os.makedirs(staging)
+    return generation, staging
+
+def publish_generation(store_dir: str, generation: str, staging: str) -> None:
+    """Publish a staged generation, then point CURRENT at it in one rename."""
+    os.rename(staging, os.path.join(store_dir, generation))
+    pointer = os.path.join(store_dir, f'.{CURRENT_FILE}.tmp')
+    with open(pointer, 'w') as f:
+        f.write(generation)
+    os.replace(pointer, os.path.join(store_dir, CURRENT_FILE))
+    _remove_old_generations(store_dir, generation)
+
+def current_generation(store_dir: str) -> Optional[str]:
+    """Name of the generation CURRENT points at, or None if the store has none."""
+    if not store_dir:
+        return None
+    try:
+        with open(os.path.join(store_dir, CURRENT_FILE)) as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return None
+
+def _remove_old_generations(store_dir: str, current: str) -> None:
+    generations = sorted(name for name in os.listdir(store_dir) if name.startswith('gen-'))
+    now = time.time()
+    for name, successor in zip(generations[:-KEEP_GENERATIONS], generations[1:]):
+        if name == current:
+            continue
+        # A generation stops being current when its successor is published
+        try:
+            superseded = os.path.getmtime(os.path.join(store_dir, successor))
+        except OSError:
+            continue
+        if now - superseded >= GENERATION_GRACE_SECONDS:
+            shutil.rmtree(os.path.join(store_dir, name), ignore_errors=True)
+
+_stores: Dict[str, PriceStore] = {}
+_stores_lock = threading.Lock()
+
+def open_store(store_dir: str) -> Optional[PriceStore]:
+    """Return the current generation of a store, reopening it after a swap, or None if there is none."""
+    generation = current_generation(store_dir)
+    if generation is None:
+        return None
+
+    with _stores_lock:
+        store = _stores.get(store_dir)
+        if store is None or store.generation != generation:
+            store = _stores[store_dir] = PriceStore(os.path.join(store_dir, generation))
+        return store
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Build a new price store generation from the configured data backend.')
+    parser.add_argument('--out', required=True, help='Price store directory')
+    args = parser.parse_args()
+
+    import services.db as db
+    from services.digest import refresh_digest
+    client = db.get_client()
+    try:
+        history = db.get_price_history(client)
+        if history.is_empty():
+            raise SystemExit('No price history returned by the data backend')
+        generation = write_generation(args.out, history)
+        # New data has landed; rebuild the market digest from the same rows
+        refresh_digest(history, client, generation)
+    finally:
+        client.close()
+    print(f"Wrote {generation} with {history['ticker'].n_unique()} tickers to {args.out}")
+
+if __name__ == '__main__':
+    main()
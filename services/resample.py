@@ -0,0 +1,62 @@
+from typing import Dict
+import polars as pl
+
+DAILY = '1d'
+WEEKLY = '1w'
+MONTHLY = '1mo'
+
+# Bar size used for each time period; long periods are drawn from pre-aggregated bars
+PERIOD_INTERVALS = {
+    '5 years': WEEKLY,
+    'max': MONTHLY,
+}
+
+# How each OHLCV column is combined into a bar
+OHLCV_AGGREGATIONS: Dict[str, pl.Expr] = {
+    'open': pl.col('open').first(),
+    'high': pl.col('high').max(),
+    'low': pl.col('low').min(),
+    'close': pl.col('close').last(),
+    'volume': pl.col('volume').sum(),
+}
+
+# BigQuery DATE_TRUNC part of each bar size; weeks start on Monday, like Polars' weekly windows
+SQL_DATE_PARTS = {
+    WEEKLY: 'WEEK(MONDAY)',
+    MONTHLY: 'MONTH',
+}
+
+def get_bar_interval(period: str) -> str:
+    """Return the bar size charts should use for a time period."""
+    return PERIOD_INTERVALS.get(period, DAILY)
+
+def resample_ohlcv(df: pl.DataFrame, interval: str, date_column: str = 'date') -> pl.DataFrame:
+    """Aggregate daily OHLCV rows into bars labelled by the first day of each window.
+
+    Only the OHLCV columns present in df are aggregated, and rows are grouped
+    per ticker when a ticker column is present.
+    """
+    if interval == DAILY or df.is_empty():
+        return df
+
+    group_by = 'ticker' if 'ticker' in df.columns else None
+    aggregations = [expr for column, expr in OHLCV_AGGREGATIONS.items() if column in df.columns]
+    sort_columns = [group_by, date_column] if group_by else [date_column]
+    bars = (
+        df.sort(sort_columns)
+        .group_by_dynamic(date_column, every=interval, group_by=group_by, label='left')
+        .agg(aggregations)
+    )
+    # Keep the original column order
+    return bars.select([column for column in df.columns if column in bars.columns])
+
+def sql_bar_date(interval: str, date_column: str = 'date') -> str:
+    """SQL expression for the first day of the bar a date falls in, so bars can be aggregated by the query."""
+    return f"DATE_TRUNC({date_column}, {SQL_DATE_PARTS[interval]})"
+
+def filter_volume(df: pl.DataFrame, volume_range: tuple) -> pl.DataFrame:
+    """Rows whose volume is within the range; bars are filtered on their summed volume, after resampling."""
+    if df.is_empty():
+        return df
+    min_volume, max_volume = volume_range
+    return df.filter((pl.col('volume') >= min_volume) & (pl.col('volume') <= max_volume))
@@ -0,0 +1,352 @@
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import numpy as np
+import polars as pl
+import services.db as db
+from config import (
+    BACKGROUND_CACHE_DIR, RISK_CACHE_MAX_ENTRIES, RISK_CACHE_TTL_SECONDS, RISK_CHUNK_PATHS, RISK_MAX_PATHS, RISK_MAX_PROCESSES,
+    RISK_SEED
+)
+from services.cache import MISSING, ResultCache
+from services.simulation import BOOTSTRAP, NORMAL, simulate_chunk
+from utils.metrics import instrument
+
+logger = logging.getLogger(__name__)
+
+try:
+    import diskcache
+    import psutil
+except ImportError:
+    diskcache = None
+
+HISTORICAL = 'historical'
+METHODS = [HISTORICAL, NORMAL, BOOTSTRAP]
+HORIZONS = [1, 10]
+CONFIDENCE_LEVELS = [0.95, 0.99]
+# Daily returns needed to estimate risk
+MIN_OBSERVATIONS = 20
+# Histogram of simulated returns: bins spanning this many standard deviations either side of the mean
+HISTOGRAM_BINS = 80
+HISTOGRAM_WIDTH = 6
+# Seconds a failed job is reported to pollers before the next request retries it
+FAILED_JOB_SECONDS = 60
+
+# Finished results and failures per holdings hash; jobs running in this process are tracked separately
+_results = ResultCache(RISK_CACHE_TTL_SECONDS, RISK_CACHE_MAX_ENTRIES)
+_failures = ResultCache(FAILED_JOB_SECONDS, RISK_CACHE_MAX_ENTRIES)
+_jobs: Dict[str, 'RiskJob'] = {}
+_jobs_lock = threading.Lock()
+
+# Job state shared by every worker through the background job directory, opened once per process
+_shared: Optional['diskcache.Cache'] = None
+_shared_pid: Optional[int] = None
+_shared_lock = threading.Lock()
+
+# Created on first use, so gunicorn workers each start their own after fork
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_pool_lock = threading.Lock()
+
+class RiskInputs:
+    """Holdings and daily log returns of the tickers with price history."""
+
+    def __init__(self, tickers: List[str], values: np.ndarray, log_returns: np.ndarray) -> None:
+        self.tickers = tickers
+        self.value = float(values.sum())
+        self.weights = values / self.value
+        self.log_returns = log_returns
+        self.mean = log_returns.mean(axis=0)
+        self.cov = np.atleast_2d(np.cov(log_returns, rowvar=False))
+
+    def cholesky(self) -> np.ndarray:
+        # Add jitter until the sample covariance factors; it is singular when assets move in lockstep
+        jitter = 0.0
+        scale = np.trace(self.cov) / len(self.cov)
+        for _ in range(10):
+            try:
+                return np.linalg.cholesky(self.cov + jitter * np.eye(len(self.cov)))
+            except np.linalg.LinAlgError:
+                jitter = max(jitter * 10, scale * 1e-10)
+        raise ValueError("Covariance matrix of returns is not positive definite")
+
+    def bins(self, horizon: int) -> np.ndarray:
+        """Histogram edges of horizon returns, centred on the normal approximation."""
+        center = horizon * float(self.mean @ self.weights)
+        sigma = np.sqrt(horizon * float(self.weights @ self.cov @ self.weights)) or 1e-6
+        return np.linspace(center - HISTOGRAM_WIDTH * sigma, center + HISTOGRAM_WIDTH * sigma, HISTOGRAM_BINS + 1)
+
+class RiskJob:
+    """Progress and outcome of one risk estimate."""
+
+    def __init__(self, key: str, total: int = 1) -> None:
+        self.key = key
+        self.total = total
+        self.completed = 0
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+
+    @property
+    def progress(self) -> float:
+        return 1.0 if self.done else self.completed / max(self.total, 1)
+
+    @property
+    def done(self) -> bool:
+        return self.result is not None or self.error is not None
+
+def prepare_inputs(close_matrix: pl.DataFrame, shares: Dict[str, float]) -> RiskInputs:
+    """Value holdings at the last close and compute daily log returns over the days every ticker traded."""
+    columns = [ticker for ticker in close_matrix.columns if ticker in shares and close_matrix[ticker].null_count() < close_matrix.height]
+    if not columns:
+        raise ValueError("None of the holdings have price history in the lookback period")
+    closes = close_matrix.select(columns).fill_null(strategy='forward').drop_nulls().to_numpy().astype(float)
+    if len(closes) <= MIN_OBSERVATIONS:
+        raise ValueError("Not enough overlapping price history to estimate risk")
+    values = np.array([shares[ticker] for ticker in columns]) * closes[-1]
+    return RiskInputs(columns, values, np.diff(np.log(closes), axis=0))
+
+def holdings_key(shares: Dict[str, float], method: str, n_paths: int, period: str, version: str, seed: int = RISK_SEED) -> str:
+    """Hash of everything a risk estimate depends on."""
+    payload = json.dumps([sorted(shares.items()), method, n_paths, period, version, seed])
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+def tail_count(confidence: float, n_paths: int) -> int:
+    """Number of worst outcomes beyond the VaR quantile; rounded first so 5% of 100 is 5, not 6."""
+    return max(1, int(np.ceil(round((1 - confidence) * n_paths, 9))))
+
+def summarize_tail(sorted_returns: np.ndarray, n_paths: int, value: float) -> Dict[str, Dict[str, float]]:
+    """VaR and CVaR in currency at each confidence level from the worst returns in ascending order."""
+    summary = {'var': {}, 'cvar': {}}
+    for confidence in CONFIDENCE_LEVELS:
+        k = tail_count(confidence, n_paths)
+        label = f"{confidence:.0%}"
+        summary['var'][label] = float(-sorted_returns[k - 1] * value)
+        summary['cvar'][label] = float(-sorted_returns[:k].mean() * value)
+    return summary
+
+def historical_returns(inputs: RiskInputs, horizon: int) -> np.ndarray:
+    """Portfolio returns over every overlapping window of horizon days, in ascending order."""
+    cumulative = np.vstack([np.zeros(len(inputs.tickers)), np.cumsum(inputs.log_returns, axis=0)])
+    window_log_returns = cumulative[horizon:] - cumulative[:-horizon]
+    return np.sort(np.expm1(window_log_returns) @ inputs.weights)
+
+def get_process_pool() -> Optional[ProcessPoolExecutor]:
+    global _process_pool
+    if RISK_MAX_PROCESSES <= 0:
+        return None
+    with _process_pool_lock:
+        if _process_pool is None:
+            # Spawned workers never inherit the server's threads or open connections
+            _process_pool = ProcessPoolExecutor(
+                max_workers=RISK_MAX_PROCESSES, mp_context=multiprocessing.get_context('spawn')
+            )
+        return _process_pool
+
+def _reset_process_pool() -> None:
+    global _process_pool
+    with _process_pool_lock:
+        _process_pool = None
+
+def chunk_sizes(n_paths: int, chunk_paths: int = RISK_CHUNK_PATHS) -> List[int]:
+    full, remainder = divmod(n_paths, chunk_paths)
+    return [chunk_paths] * full + ([remainder] if remainder else [])
+
+@instrument('portfolio')
+def run_risk(
+    inputs: RiskInputs,
+    method: str,
+    n_paths: int,
+    seed: int = RISK_SEED,
+    on_progress: Callable[[int, int], None] = None
+) -> Dict[str, Any]:
+    """Estimate VaR and CVaR for every horizon; Monte Carlo chunks run on the process pool."""
+    bins = {horizon: inputs.bins(horizon) for horizon in HORIZONS}
+    outcomes: Dict[int, Tuple[np.ndarray, np.ndarray, int]] = {}
+
+    if method == HISTORICAL:
+        for horizon in HORIZONS:
+            returns = historical_returns(inputs, horizon)
+            counts = np.histogram(np.clip(returns, bins[horizon][0], bins[horizon][-1]), bins[horizon])[0]
+            outcomes[horizon] = (returns, counts, len(returns))
+        if on_progress:
+            on_progress(1, 1)
+    else:
+        sizes = chunk_sizes(n_paths)
+        # One independent, reproducible stream per chunk regardless of which process runs it
+        seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+        tail_size = tail_count(min(CONFIDENCE_LEVELS), n_paths)
+        arguments = dict(
+            method=method, weights=inputs.weights, horizons=HORIZONS, tail_size=tail_size, bins=bins,
+            mean=inputs.mean if method == NORMAL else None,
+            chol=inputs.cholesky() if method == NORMAL else None,
+            log_returns=inputs.log_returns if method == BOOTSTRAP else None,
+        )
+
+        chunks = []
+        pool = get_process_pool()
+        if pool is None:
+            for i, (size, chunk_seed) in enumerate(zip(sizes, seeds)):
+                chunks.append(simulate_chunk(n_paths=size, seed=chunk_seed, **arguments))
+                if on_progress:
+                    on_progress(i + 1, len(sizes))
+        else:
+            futures = [pool.submit(simulate_chunk, n_paths=size, seed=chunk_seed, **arguments) for size, chunk_seed in zip(sizes, seeds)]
+            try:
+                for i, future in enumerate(as_completed(futures)):
+                    chunks.append(future.result())
+                    if on_progress:
+                        on_progress(i + 1, len(sizes))
+            except BrokenProcessPool:
+                _reset_process_pool()
+                raise
+
+        # The overall worst tail is contained in the union of the chunk tails
+        for horizon in HORIZONS:
+            tail = np.sort(np.concatenate([chunk[horizon][0] for chunk in chunks]))[:tail_size]
+            counts = np.sum([chunk[horizon][1] for chunk in chunks], axis=0)
+            outcomes[horizon] = (tail, counts, n_paths)
+
+    return {
+        'method': method,
+        'value': inputs.value,
+        'tickers': inputs.tickers,
+        'horizons': {
+            str(horizon): {
+                **summarize_tail(returns, paths, inputs.value),
+                'paths': paths,
+                'bins': (bins[horizon] * inputs.value).tolist(),
+                'counts': counts.tolist(),
+            }
+            for horizon, (returns, counts, paths) in outcomes.items()
+        },
+    }
+
+def _shared_jobs() -> Optional['diskcache.Cache']:
+    global _shared, _shared_pid
+    if diskcache is None or not BACKGROUND_CACHE_DIR:
+        return None
+    with _shared_lock:
+        if _shared is None or _shared_pid != os.getpid():
+            _shared = diskcache.Cache(os.path.join(BACKGROUND_CACHE_DIR, 'risk'))
+            _shared_pid = os.getpid()
+        return _shared
+
+def _publish(job: RiskJob) -> None:
+    """Share the job's progress or outcome with the other workers."""
+    shared = _shared_jobs()
+    if shared is None:
+        return
+    state = {'owner': os.getpid(), 'completed': job.completed, 'total': job.total, 'result': job.result, 'error': job.error}
+    shared.set(job.key, state, expire=FAILED_JOB_SECONDS if job.error is not None else RISK_CACHE_TTL_SECONDS)
+
+def _shared_job(key: str) -> Optional[RiskJob]:
+    """The job as last published by any worker, or None if no live worker runs it and none finished it."""
+    shared = _shared_jobs()
+    state = shared.get(key) if shared is not None else None
+    if state is None:
+        return None
+    # A worker that exited mid-run never publishes an outcome
+    if state['result'] is None and state['error'] is None and not psutil.pid_exists(state['owner']):
+        return None
+    job = RiskJob(key, state['total'])
+    job.completed, job.result, job.error = state['completed'], state['result'], state['error']
+    if job.result is not None:
+        _results.set(key, job.result)
+    return job
+
+def _run_job(job: RiskJob, shares: Dict[str, float], method: str, n_paths: int, period: str) -> None:
+    client = db.get_client()
+    result, error = None, None
+    try:
+        close_matrix = db.get_close_matrix(client, sorted(shares), period)
+        inputs = prepare_inputs(close_matrix, shares)
+
+        def on_progress(completed: int, total: int) -> None:
+            job.completed, job.total = completed, total
+            _publish(job)
+
+        result = run_risk(inputs, method, n_paths, RISK_SEED, on_progress)
+        _results.set(job.key, result)
+    except Exception as e:
+        logger.error(f"Error during risk simulation: {e}")
+        error = str(e)
+        _failures.set(job.key, error)
+    finally:
+        client.close()
+        # Outcomes are served from the caches, so the job leaves the running ones before it reports done;
+        # a failure is retried by the next run after FAILED_JOB_SECONDS
+        with _jobs_lock:
+            _jobs.pop(job.key, None)
+        job.result, job.error = result, error
+        _publish(job)
+
+def _finished_job(key: str) -> Optional[RiskJob]:
+    cached = _results.get(key)
+    if cached is not MISSING:
+        job = RiskJob(key)
+        job.completed, job.result = 1, cached
+        return job
+    error = _failures.get(key)
+    if error is not MISSING:
+        job = RiskJob(key)
+        job.error = error
+        return job
+    return None
+
+def start_risk_job(shares: Dict[str, float], method: str, n_paths: int, period: str) -> RiskJob:
+    """Return the running or cached job for these holdings, starting one in the background if needed.
+
+    Jobs running or finished on another worker are picked up through the shared job directory, so a run
+    is not repeated by the worker that happens to serve the next request.
+    """
+    n_paths = max(1, min(int(n_paths), RISK_MAX_PATHS))
+    client = db.get_client()
+    try:
+        key = holdings_key(shares, method, n_paths, period, db.get_data_version(client))
+    finally:
+        client.close()
+
+    cached = _results.get(key)
+    if cached is not MISSING:
+        job = RiskJob(key)
+        job.completed, job.result = 1, cached
+        return job
+
+    with _jobs_lock:
+        job = _jobs.get(key)
+    if job is not None:
+        return job
+    # Starting a run again retries a failed one
+    job = _shared_job(key)
+    if job is not None and job.error is None:
+        return job
+
+    with _jobs_lock:
+        job = _jobs.get(key)
+        if job is not None:
+            return job
+        job = _jobs[key] = RiskJob(key, len(chunk_sizes(n_paths)) if method != HISTORICAL else 1)
+    _publish(job)
+
+    threading.Thread(target=_run_job, args=(job, shares, method, n_paths, period), daemon=True, name='risk-job').start()
+    return job
+
+def get_risk_job(key: str) -> Optional[RiskJob]:
+    """Look up a job by its holdings hash in this process, then in the state shared by the other workers."""
+    with _jobs_lock:
+        job = _jobs.get(key)
+    if job is not None:
+        return job
+    return _finished_job(key) or _shared_job(key)
+
+def clear_risk_cache() -> None:
+    _results.clear()
+    _failures.clear()
+    shared = _shared_jobs()
+    if shared is not None:
+        shared.clear()
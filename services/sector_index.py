@@ -0,0 +1,245 @@
+"""
+Sector index time series built from the whole universe.
+
+Every sector gets two daily index series starting at 100, plus a 'Market'
+series over all tickers:
+
+    equal   each ticker that traded on the day and the day before counts the same
+    cap     each ticker is weighted by its average close x volume over the previous
+            SECTOR_CAP_WINDOW days, a proxy for market capitalization
+
+Daily returns are grouped into sectors in one pass: the (date x ticker) return
+matrix is multiplied by a (ticker x sector) membership matrix, so each day's
+sector sums and counts come out of a single matrix product. The sectors table
+is read once when the index is first built.
+
+A SectorIndex carries the last close and the trailing dollar volume of every
+ticker, so new days extend it without recomputing the history. The index is
+cached per data version; when the version changes only the days after its last
+date are fetched and appended. Without a price or Parquet store the history is
+read under the query budgets, and an index is never cached from a failed read.
+"""
+import datetime as dt
+import threading
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import polars as pl
+from google.cloud import bigquery
+import services.db as db
+from config import (
+    PARQUET_STORE_DIR, PRICE_STORE_DIR, ROTATION_LAG, ROTATION_WINDOW, SECTOR_CACHE_MAX_ENTRIES, SECTOR_CACHE_TTL_SECONDS, SECTOR_CAP_WINDOW,
+)
+from services.cache import ResultCache
+from services.correlation import UNKNOWN_SECTOR, forward_filled
+from services.digest import history_matrices
+from services.parquet_store import open_parquet_store
+from services.price_store import open_store
+from utils.metrics import instrument
+
+EQUAL_WEIGHT = 'equal'
+CAP_WEIGHT = 'cap'
+WEIGHTINGS = [EQUAL_WEIGHT, CAP_WEIGHT]
+MARKET = 'Market'
+BASE_LEVEL = 100.0
+INDEX_VIEW = 'index'
+RELATIVE_STRENGTH_VIEW = 'relative'
+# Points of each sector's trail on the rotation chart, one every ROTATION_TAIL_STEP trading days
+ROTATION_TAIL_POINTS = 6
+ROTATION_TAIL_STEP = 5
+
+class SectorIndex:
+    """Daily index levels per sector and weighting, with the per-ticker state needed to append new days."""
+
+    def __init__(self, sectors: Dict[str, str], cap_window: int = SECTOR_CAP_WINDOW) -> None:
+        self.sector_of = dict(sectors)
+        self.cap_window = cap_window
+        # Columns of the level matrices: every sector, then the whole universe
+        self.sectors: List[str] = sorted(set(self.sector_of.values()) | {UNKNOWN_SECTOR}) + [MARKET]
+        self.dates = np.empty(0, dtype='datetime64[D]')
+        self.levels = {weighting: np.empty((0, len(self.sectors))) for weighting in WEIGHTINGS}
+        self.tickers: List[str] = []
+        self._last_close = np.empty(0)
+        # Dollar volume of the last cap_window days, one row per day
+        self._dollar_volume = np.zeros((cap_window, 0))
+
+    def _membership(self) -> np.ndarray:
+        columns = {sector: column for column, sector in enumerate(self.sectors)}
+        membership = np.zeros((len(self.tickers), len(self.sectors)))
+        rows = np.arange(len(self.tickers))
+        membership[rows, [columns[self.sector_of.get(ticker) or UNKNOWN_SECTOR] for ticker in self.tickers]] = 1
+        membership[:, -1] = 1
+        return membership
+
+    def _aligned(self, tickers: List[str], matrix: np.ndarray) -> np.ndarray:
+        # Columns of a (date x ticker) matrix in this index's ticker order, NaN for tickers it does not include
+        positions = {ticker: column for column, ticker in enumerate(tickers)}
+        aligned = np.full((len(matrix), len(self.tickers)), np.nan)
+        present = [column for column, ticker in enumerate(self.tickers) if ticker in positions]
+        aligned[:, present] = matrix[:, [positions[self.tickers[column]] for column in present]]
+        return aligned
+
+    @instrument('dataframe')
+    def extend(self, dates: np.ndarray, tickers: List[str], close: np.ndarray, volume: np.ndarray) -> 'SectorIndex':
+        """A new index with the days of the (date x ticker) close and volume matrices after the last indexed day appended."""
+        dates = np.asarray(dates).astype('datetime64[D]')
+        keep = dates > self.dates[-1] if len(self.dates) else np.ones(len(dates), dtype=bool)
+        extended = SectorIndex(self.sector_of, self.cap_window)
+        known = set(self.tickers)
+        extended.tickers = self.tickers + [ticker for ticker in tickers if ticker not in known]
+        new_tickers = len(extended.tickers) - len(self.tickers)
+        extended._last_close = np.concatenate([self._last_close, np.full(new_tickers, np.nan)])
+        extended._dollar_volume = np.hstack([self._dollar_volume, np.zeros((self.cap_window, new_tickers))])
+        if not keep.any():
+            extended.dates, extended.levels = self.dates, self.levels
+            return extended
+
+        close = extended._aligned(tickers, np.asarray(close, dtype=float)[keep])
+        volume = extended._aligned(tickers, np.asarray(volume, dtype=float)[keep])
+        traded = ~np.isnan(close)
+
+        # Returns against the previous close, carried across the boundary with the last indexed day
+        filled = forward_filled(np.vstack([extended._last_close, close]))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            returns = filled[1:] / filled[:-1] - 1
+        returns[~traded] = np.nan
+        valid = ~np.isnan(returns)
+        returns = np.where(valid, returns, 0.0)
+
+        # Cap-proxy weight of a day: the dollar volume summed over the cap_window days before it
+        dollar_volume = np.vstack([extended._dollar_volume, np.where(traded, close * volume, 0.0)])
+        sums = np.cumsum(np.vstack([np.zeros((1, dollar_volume.shape[1])), dollar_volume]), axis=0)
+        weights = np.where(valid, sums[self.cap_window:-1] - sums[:-self.cap_window - 1], 0.0)
+
+        # Group by sector: one matrix product per weighting gives every day's sector sums
+        membership = extended._membership()
+        counts = valid.astype(float) @ membership
+        weight_sums = weights @ membership
+        with np.errstate(invalid='ignore', divide='ignore'):
+            sector_returns = {
+                EQUAL_WEIGHT: np.where(counts > 0, (returns @ membership) / counts, 0.0),
+                CAP_WEIGHT: np.where(weight_sums > 0, ((weights * returns) @ membership) / weight_sums, 0.0),
+            }
+        for weighting, daily in sector_returns.items():
+            last = self.levels[weighting][-1] if len(self.dates) else np.full(len(self.sectors), BASE_LEVEL)
+            extended.levels[weighting] = np.vstack([self.levels[weighting], last * np.cumprod(1 + daily, axis=0)])
+        extended.dates = np.concatenate([self.dates, dates[keep]])
+        extended._last_close = filled[-1]
+        extended._dollar_volume = dollar_volume[-self.cap_window:]
+        return extended
+
+    def listed_sectors(self) -> List[str]:
+        """Sectors with at least one indexed ticker, in column order and without the universe."""
+        listed = {self.sector_of.get(ticker) or UNKNOWN_SECTOR for ticker in self.tickers}
+        return [sector for sector in self.sectors[:-1] if sector in listed]
+
+    def returns_on(self, dates: np.ndarray, sector: str = MARKET, weighting: str = EQUAL_WEIGHT) -> np.ndarray:
+        """Daily returns of one column on each of dates; NaN on the first indexed day and on days not indexed."""
+        dates = np.asarray(dates).astype('datetime64[D]')
+        if not len(self.dates):
+            return np.full(len(dates), np.nan)
+        levels = self.levels[weighting][:, self.sectors.index(sector)]
+        returns = np.full(len(levels), np.nan)
+        returns[1:] = levels[1:] / levels[:-1] - 1
+        rows = np.searchsorted(self.dates, dates).clip(max=len(self.dates) - 1)
+        return np.where(self.dates[rows] == dates, returns[rows], np.nan)
+
+    def frame(self, weighting: str = EQUAL_WEIGHT) -> pl.DataFrame:
+        """Index levels with a 'date' column and one column per sector, the universe last."""
+        levels = pl.DataFrame(self.levels[weighting], schema=self.sectors)
+        return levels.insert_column(0, pl.Series('date', self.dates))
+
+def relative_strength(levels: np.ndarray, market: np.ndarray) -> np.ndarray:
+    """Each sector's level over the market's, scaled so the first day is 100."""
+    ratio = levels / market[:, None]
+    return ratio / ratio[0] * BASE_LEVEL
+
+def rotation(levels: np.ndarray, market: np.ndarray, window: int = ROTATION_WINDOW, lag: int = ROTATION_LAG) -> Tuple[np.ndarray, np.ndarray]:
+    """Relative-strength ratio and momentum of each sector, both centered on 100.
+
+    The ratio is relative strength over its trailing window average, and the momentum is the ratio over its
+    value lag days earlier. Days without enough history are NaN.
+    """
+    strength = levels / market[:, None]
+    sums = np.cumsum(np.vstack([np.zeros((1, strength.shape[1])), strength]), axis=0)
+    ratio = np.full(strength.shape, np.nan)
+    ratio[window - 1:] = strength[window - 1:] / ((sums[window:] - sums[:-window]) / window) * BASE_LEVEL
+    momentum = np.full(strength.shape, np.nan)
+    momentum[lag:] = ratio[lag:] / ratio[:-lag] * BASE_LEVEL
+    return ratio, momentum
+
+def rotation_tails(index: SectorIndex, weighting: str = EQUAL_WEIGHT) -> pl.DataFrame:
+    """Sector/date/ratio/momentum rows of the last few weekly points of every listed sector, in date order."""
+    sectors = index.listed_sectors()
+    columns = [index.sectors.index(sector) for sector in sectors]
+    levels = index.levels[weighting]
+    ratio, momentum = rotation(levels[:, columns], levels[:, -1])
+    rows = np.arange(len(index.dates) - 1, -1, -ROTATION_TAIL_STEP)[:ROTATION_TAIL_POINTS][::-1]
+    tails = pl.DataFrame({
+        'sector': np.repeat(sectors, len(rows)),
+        'date': np.tile(index.dates[rows], len(sectors)),
+        'ratio': ratio[rows].T.ravel(),
+        'momentum': momentum[rows].T.ravel(),
+    })
+    return tails.filter(pl.col('ratio').is_not_nan() & pl.col('momentum').is_not_nan())
+
+def universe_history(client: bigquery.Client, since: Optional[np.datetime64] = None) -> Tuple[np.ndarray, List[str], np.ndarray, np.ndarray]:
+    """Dates, tickers and the (date x ticker) close and volume matrices of every ticker, after since when given.
+
+    Raises ValueError when the data backend cannot be read.
+    """
+    store = open_store(PRICE_STORE_DIR)
+    if store is not None and len(store.dates):
+        start = 0 if since is None else int(np.searchsorted(store.dates, since, side='right'))
+        close = np.array(store.fields['close'][:, start:].T, dtype=float)
+        volume = np.array(store.fields['volume'][:, start:].T, dtype=float)
+        return np.asarray(store.dates[start:]), store.tickers, close, volume
+
+    since_date = None if since is None else since.astype(dt.date)
+    parquet = open_parquet_store(PARQUET_STORE_DIR)
+    if parquet is not None:
+        plan = parquet.scan().select(['date', 'ticker', 'close', 'volume'])
+        if since_date is not None:
+            plan = plan.filter(pl.col('date') > since_date)
+        history = parquet.collect(plan)
+    else:
+        # Indices are built on a request, so the fetch is budgeted like any other query
+        history = db.get_universe_history(client, since_date)
+    if history.is_empty():
+        return np.empty(0, dtype='datetime64[D]'), [], np.empty((0, 0)), np.empty((0, 0))
+    dates, tickers, fields = history_matrices(history, ['close', 'volume'])
+    return dates, tickers, fields['close'], fields['volume']
+
+_index_cache = ResultCache(SECTOR_CACHE_TTL_SECONDS, SECTOR_CACHE_MAX_ENTRIES)
+_latest: Optional[SectorIndex] = None
+_latest_lock = threading.Lock()
+
+def _build_sector_index(client: bigquery.Client) -> SectorIndex:
+    global _latest
+    with _latest_lock:
+        previous = _latest
+    if previous is None or not len(previous.dates):
+        sector_data = db.get_sector_data(client)
+        sectors = dict(zip(sector_data['ticker'].to_list(), sector_data['sector'].to_list())) if not sector_data.is_empty() else {}
+        index = SectorIndex(sectors).extend(*universe_history(client))
+        # An empty index would be cached for the whole data version; let the next request try again
+        if not len(index.dates):
+            raise ValueError("No price history to build the sector indices from.")
+    else:
+        # Only the days after the last indexed one are fetched; the carried state continues the series
+        index = previous.extend(*universe_history(client, previous.dates[-1]))
+    with _latest_lock:
+        _latest = index
+    return index
+
+def get_sector_index(client: bigquery.Client) -> SectorIndex:
+    """The sector index of the current data version, extended from the previous version's when there is one.
+
+    Raises ValueError when the history cannot be fetched; a failed build is not cached.
+    """
+    return _index_cache.get_or_load(db.get_data_version(client), lambda: _build_sector_index(client))
+
+def clear_sector_index_cache() -> None:
+    global _latest
+    _index_cache.clear()
+    with _latest_lock:
+        _latest = None
@@ -0,0 +1,157 @@
+"""
+Per-session request sequencing for callbacks fired in bursts.
+
+Every call of a callback decorated with `latest_only` opens a new generation
+for the (browser session, callback) pair. Opening one cancels the previous
+generation: queries it has not sent yet are skipped and its running query
+jobs are cancelled. A superseded call answers with no update instead of
+results the renderer would throw away anyway.
+
+A call that arrives while the previous one is still running, within
+CALLBACK_DEBOUNCE_MS of its start, is part of a burst: it waits out the
+window first and only runs if nothing newer came in. Other calls run at once.
+
+A session is one browser tab, identified by a random id kept in the tab's
+sessionStorage and sent as the callback's last State (SESSION_STATE). Calls
+made before the id is set run unsequenced.
+"""
+import contextvars
+import functools
+import threading
+import time
+from typing import Callable, Dict
+from dash import Input, Output, State
+from dash.exceptions import PreventUpdate
+import services.db as db
+from config import CALLBACK_DEBOUNCE_MS, SEQUENCE_MAX_SESSIONS, SEQUENCE_TTL_SECONDS
+from services.cache import MISSING, ResultCache
+from utils.metrics import registry
+
+SESSION_STORE = {'type': 'session-id', 'section': 'global'}
+SESSION_STATE = State(SESSION_STORE, 'data')
+
+# (session, callback, generation) of the latest_only call running in this context
+_current_call = contextvars.ContextVar('current_sequenced_call', default=None)
+
+class Generation:
+    """One call of a callback in a session, with a handle that cancels the queries it started."""
+
+    def __init__(self, number: int) -> None:
+        self.number = number
+        self.started = time.monotonic()
+        self.finished = False
+        self.handle = db.QueryHandle()
+
+    def cancel(self) -> None:
+        self.handle.cancel()
+
+class Sequencer:
+    """Track the latest generation per (session, callback) and cancel the ones it supersedes."""
+
+    def __init__(self, debounce_seconds: float, ttl: float, max_sessions: int) -> None:
+        self.debounce_seconds = debounce_seconds
+        self._latest = ResultCache(ttl, max_sessions)
+        self._lock = threading.Lock()
+        self.started = 0
+        self.superseded = 0
+        self.dropped = 0
+
+    def begin(self, session_id: str, name: str) -> Generation:
+        key = (session_id, name)
+        with self._lock:
+            previous = self._latest.get(key)
+            generation = Generation(1 if previous is MISSING else previous.number + 1)
+            self._latest.set(key, generation)
+            self.started += 1
+            if previous is not MISSING:
+                self.superseded += 1
+        if previous is not MISSING:
+            previous.cancel()
+            # A burst is in progress; give the call after this one a chance to supersede it before any work
+            if not previous.finished and generation.started - previous.started < self.debounce_seconds:
+                time.sleep(self.debounce_seconds)
+        return generation
+
+    def is_latest(self, session_id: str, name: str, generation: Generation) -> bool:
+        return self._latest.get((session_id, name)) is generation
+
+    def drop(self) -> None:
+        with self._lock:
+            self.dropped += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {'started': self.started, 'superseded': self.superseded, 'dropped': self.dropped}
+
+sequencer = Sequencer(CALLBACK_DEBOUNCE_MS / 1000, SEQUENCE_TTL_SECONDS, SEQUENCE_MAX_SESSIONS)
+
+def _sequencer_samples() -> list:
+    stats = sequencer.stats()
+    return [
+        ('sma_callback_generations_started', {}, stats['started']),
+        ('sma_callback_generations_superseded', {}, stats['superseded']),
+        ('sma_callback_results_dropped', {}, stats['dropped']),
+    ]
+
+registry.add_collector(_sequencer_samples)
+
+def raise_if_superseded() -> None:
+    """Stop a latest_only callback early, for example between its queries and building its figures."""
+    call = _current_call.get()
+    if call is not None and not sequencer.is_latest(*call):
+        sequencer.drop()
+        raise PreventUpdate
+
+def latest_only(func: Callable) -> Callable:
+    """Run a callback as the newest generation of its session, dropping its result if a newer call arrives.
+
+    The callback is registered with SESSION_STATE as its last dependency; the wrapper consumes that value,
+    so the decorated function does not take it.
+    """
+    name = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args):
+        *args, session_id = args
+        if not session_id:
+            return func(*args)
+
+        generation = sequencer.begin(session_id, name)
+        if not sequencer.is_latest(session_id, name, generation):
+            sequencer.drop()
+            raise PreventUpdate
+        token = _current_call.set((session_id, name, generation))
+        try:
+            with db.query_scope(generation.handle):
+                result = func(*args)
+        except PreventUpdate:
+            raise
+        except Exception:
+            # Failures caused by the cancellation are not reported for a call nobody waits on
+            if sequencer.is_latest(session_id, name, generation):
+                raise
+            result = None
+        finally:
+            generation.finished = True
+            _current_call.reset(token)
+        if not sequencer.is_latest(session_id, name, generation):
+            sequencer.drop()
+            raise PreventUpdate
+        return result
+
+    return wrapper
+
+def register_sequencing(app) -> None:
+    """Give each browser tab a session id on first load, kept for the life of the tab."""
+    app.clientside_callback(
+        """
+        function(pathname, sessionId) {
+            if (sessionId) {
+                return window.dash_clientside.no_update;
+            }
+            return window.crypto.randomUUID ? window.crypto.randomUUID() : Math.random().toString(36).slice(2);
+        }
+        """,
+        Output(SESSION_STORE, 'data'),
+        Input('url', 'pathname'),
+        SESSION_STATE,
+    )
@@ -0,0 +1,69 @@
+"""
+Monte Carlo portfolio return simulation.
+
+Runs inside ProcessPoolExecutor workers, so it only depends on NumPy and is
+cheap to import in a spawned process. A chunk simulates its share of the paths
+with its own seeded generator and returns just what the parent needs to
+combine chunks exactly: the worst tail of simulated returns and histogram
+counts over shared bins.
+"""
+from typing import Dict, List, Tuple
+import numpy as np
+
+NORMAL = 'normal'
+BOOTSTRAP = 'bootstrap'
+
+# Asset returns held in memory at once per batch (paths x days x assets)
+BATCH_ELEMENTS = 4_000_000
+
+def simulate_horizon_returns(
+    rng: np.random.Generator,
+    method: str,
+    size: int,
+    horizon: int,
+    weights: np.ndarray,
+    mean: np.ndarray = None,
+    chol: np.ndarray = None,
+    log_returns: np.ndarray = None
+) -> np.ndarray:
+    """Buy-and-hold portfolio returns over horizon days for size paths."""
+    if method == NORMAL:
+        # Daily log returns are multivariate normal, so their h-day sum is N(h * mean, h * cov)
+        draws = rng.standard_normal((size, len(weights)))
+        horizon_log_returns = horizon * mean + np.sqrt(horizon) * draws @ chol.T
+    else:
+        # Resample whole historical days so cross-asset dependence is kept
+        days = rng.integers(0, len(log_returns), size=(size, horizon))
+        horizon_log_returns = log_returns[days].sum(axis=1)
+    return np.expm1(horizon_log_returns) @ weights
+
+def simulate_chunk(
+    method: str,
+    n_paths: int,
+    seed: np.random.SeedSequence,
+    weights: np.ndarray,
+    horizons: List[int],
+    tail_size: int,
+    bins: Dict[int, np.ndarray],
+    mean: np.ndarray = None,
+    chol: np.ndarray = None,
+    log_returns: np.ndarray = None
+) -> Dict[int, Tuple[np.ndarray, np.ndarray]]:
+    """Simulate n_paths paths per horizon and return (sorted worst tail_size returns, histogram counts)."""
+    rng = np.random.default_rng(seed)
+    results = {}
+    for horizon in horizons:
+        batch = max(1, BATCH_ELEMENTS // (horizon * len(weights)))
+        tail = np.empty(0)
+        counts = np.zeros(len(bins[horizon]) - 1, dtype=np.int64)
+        for start in range(0, n_paths, batch):
+            returns = simulate_horizon_returns(
+                rng, method, min(batch, n_paths - start), horizon, weights, mean, chol, log_returns
+            )
+            counts += np.histogram(np.clip(returns, bins[horizon][0], bins[horizon][-1]), bins[horizon])[0]
+            # Only the worst returns can decide VaR and CVaR, so keep the running tail
+            tail = np.concatenate([tail, returns])
+            if len(tail) > tail_size:
+                tail = np.partition(tail, tail_size - 1)[:tail_size]
+        results[horizon] = (np.sort(tail), counts)
+    return results
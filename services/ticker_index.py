@@ -0,0 +1,134 @@
+import bisect
+import difflib
+import hashlib
+import re
+import threading
+from typing import Dict, List
+
+# Matches returned to a search-as-you-type dropdown
+SEARCH_LIMIT = 20
+WORD_PATTERN = re.compile(r"\w+")
+
+class TickerIndex:
+    """In-memory ticker search over sorted arrays.
+
+    Queries are answered in order of preference: symbols starting with the
+    query, then companies whose name or sector words start with each query
+    word, and only when nothing matched, symbols one edit away from the query
+    (found through a table of single-letter deletions).
+    """
+
+    def __init__(self, tickers: List[str], names: Dict[str, str] = None, sectors: Dict[str, str] = None) -> None:
+        self.tickers = sorted(set(tickers))
+        self.names = names or {}
+        self.sectors = sectors or {}
+        self._keys = [ticker.upper() for ticker in self.tickers]
+
+        # Sorted (word, row) pairs over company names and sectors
+        words = sorted(
+            (word, row)
+            for row, ticker in enumerate(self.tickers)
+            for word in set(WORD_PATTERN.findall(f"{self.names.get(ticker, '')} {self.sectors.get(ticker, '')}".upper()))
+        )
+        self._words = [word for word, _ in words]
+        self._word_rows = [row for _, row in words]
+        self._row_words = {}
+        for word, row in words:
+            self._row_words.setdefault(row, []).append(word)
+
+        # Single-letter deletions of every symbol for the fuzzy fallback
+        self._deletions: Dict[str, List[int]] = {}
+        for row, key in enumerate(self._keys):
+            for variant in _deletions(key):
+                self._deletions.setdefault(variant, []).append(row)
+
+        # Identifies this universe so layouts built from it can be memoized
+        fingerprint = '\n'.join(f"{ticker}\t{self.names.get(ticker, '')}\t{self.sectors.get(ticker, '')}" for ticker in self.tickers)
+        self.version = hashlib.sha1(fingerprint.encode()).hexdigest()[:12]
+
+    @classmethod
+    def from_metadata(cls, metadata) -> 'TickerIndex':
+        """Build the index from a ticker/name/sector DataFrame."""
+        tickers = metadata['ticker'].to_list()
+        columns = metadata.columns
+        # Missing names and sectors are left out rather than indexed as text
+        names = {t: name for t, name in zip(tickers, metadata['name'].to_list()) if name} if 'name' in columns else None
+        sectors = {t: sector for t, sector in zip(tickers, metadata['sector'].to_list()) if sector} if 'sector' in columns else None
+        return cls(tickers, names, sectors)
+
+    def __len__(self) -> int:
+        return len(self.tickers)
+
+    def label(self, ticker: str) -> str:
+        """Dropdown label with the company name when it is known."""
+        name = self.names.get(ticker)
+        return f"{ticker} - {name}" if name else ticker
+
+    def search(self, query: str, limit: int = SEARCH_LIMIT) -> List[str]:
+        """Return up to limit tickers matching query, best matches first."""
+        key = (query or '').strip().upper()
+        if not key:
+            return self.tickers[:limit]
+
+        matches = self._symbol_prefix(key, limit)
+        if len(matches) < limit:
+            for ticker in self._word_prefix(WORD_PATTERN.findall(key), limit):
+                if ticker not in matches:
+                    matches.append(ticker)
+                    if len(matches) == limit:
+                        break
+        if not matches:
+            matches = self._fuzzy(key, limit)
+        return matches
+
+    def _symbol_prefix(self, key: str, limit: int) -> List[str]:
+        start = bisect.bisect_left(self._keys, key)
+        matches = []
+        for row in range(start, min(start + limit, len(self._keys))):
+            if not self._keys[row].startswith(key):
+                break
+            matches.append(self.tickers[row])
+        return matches
+
+    def _word_prefix(self, query_words: List[str], limit: int) -> List[str]:
+        if not query_words:
+            return []
+        # Candidates come from the first word; the other words must prefix some word of the same company
+        first, rest = query_words[0], query_words[1:]
+        rows, seen = [], set()
+        for i in range(bisect.bisect_left(self._words, first), len(self._words)):
+            if not self._words[i].startswith(first):
+                break
+            row = self._word_rows[i]
+            if row in seen:
+                continue
+            seen.add(row)
+            if all(any(word.startswith(part) for word in self._row_words[row]) for part in rest):
+                rows.append(row)
+                if len(rows) == limit:
+                    break
+        return [self.tickers[row] for row in sorted(rows)]
+
+    def _fuzzy(self, key: str, limit: int) -> List[str]:
+        # Symbols sharing a deletion with the query are within one edit or adjacent swap of it
+        rows = set()
+        for variant in _deletions(key):
+            rows.update(self._deletions.get(variant, ()))
+        ranked = sorted(rows, key=lambda row: (-difflib.SequenceMatcher(None, key, self._keys[row]).ratio(), row))
+        return [self.tickers[row] for row in ranked[:limit]]
+
+def _deletions(key: str) -> set:
+    return {key} | {key[:i] + key[i + 1:] for i in range(len(key))}
+
+_index = TickerIndex([])
+_index_lock = threading.Lock()
+
+def get_ticker_index() -> TickerIndex:
+    return _index
+
+def set_ticker_index(index: TickerIndex) -> TickerIndex:
+    """Replace the shared index, e.g. after the ticker universe is refreshed."""
+    global _index
+    with _index_lock:
+        _index = index
+    return index
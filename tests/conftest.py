@@ -0,0 +1,19 @@
+import datetime as dt
+import pytest
+import services.db as db
+from services.local_db import LocalClient
+from utils.synthetic_data import write_local_dataset
+
+@pytest.fixture(scope="session")
+def local_data_dir(tmp_path_factory):
+    """Fixture to write a small synthetic dataset once per test session."""
+    data_dir = tmp_path_factory.mktemp("local_data")
+    write_local_dataset(str(data_dir), n_tickers=12, n_years=2, end_date=dt.date.today(), seed=7)
+    return str(data_dir)
+
+@pytest.fixture
+def local_client(local_data_dir):
+    """Fixture to create an offline client and start with an empty query cache."""
+    db.clear_query_cache()
+    yield LocalClient(local_data_dir)
+    db.clear_query_cache()
@@ -0,0 +1,72 @@
+import datetime as dt
+import numpy as np
+import polars as pl
+import pytest
+import services.db as db
+from services.backtest import (
+    ANNUAL, MONTHLY, NONE, QUARTERLY, SCHEDULES, backtest_portfolio, prepare_backtest, rebalance_flags, run_backtest
+)
+
+@pytest.fixture
+def prices():
+    """Fixture to create two years of daily closes for five tickers."""
+    rng = np.random.default_rng(3)
+    dates = np.arange(np.datetime64('2022-01-03'), np.datetime64('2024-01-03'))
+    dates = dates[np.is_busday(dates)]
+    closes = 50 * np.exp(np.cumsum(rng.normal(0.0002, 0.02, size=(len(dates), 5)), axis=0))
+    weights = np.array([0.4, 0.3, 0.1, 0.1, 0.1])
+    return dates, closes, weights
+
+def test_rebalance_flags():
+    """Test that rebalances fall on the first trading day of each month, quarter or year."""
+    dates = np.array(['2023-12-29', '2024-01-02', '2024-02-01', '2024-03-28', '2024-04-01', '2025-01-02'], dtype='datetime64[D]')
+    assert rebalance_flags(dates, NONE).tolist() == [False] * 6
+    assert rebalance_flags(dates, MONTHLY).tolist() == [False, True, True, True, True, True]
+    assert rebalance_flags(dates, QUARTERLY).tolist() == [False, True, False, False, True, True]
+    assert rebalance_flags(dates, ANNUAL).tolist() == [False, True, False, False, False, True]
+
+@pytest.mark.parametrize("schedule", SCHEDULES)
+def test_backtest_matches_daily_simulation(prices, schedule):
+    """Test that the array backtest matches trading the holdings one day at a time."""
+    dates, closes, weights = prices
+    backtest = run_backtest(closes, dates, weights, schedule)
+
+    flags = rebalance_flags(dates, schedule)
+    shares = weights / closes[0]
+    equity, turnover = [], []
+    for day in range(len(dates)):
+        value = shares @ closes[day]
+        equity.append(value)
+        if flags[day]:
+            turnover.append(np.abs(shares * closes[day] / value - weights).sum() / 2)
+            shares = value * weights / closes[day]
+
+    assert backtest.equity == pytest.approx(equity)
+    assert backtest.turnover == pytest.approx(turnover)
+    assert len(backtest.rebalance_dates) == flags.sum()
+    assert backtest.drawdown.max() == 0 and backtest.drawdown.min() == pytest.approx(backtest.summary()['max_drawdown'])
+
+def test_prepare_backtest_trims_to_common_history():
+    """Test that the backtest starts once every held ticker has traded and weights follow the holdings."""
+    close_matrix = pl.DataFrame({
+        "date": [dt.date(2024, 1, day) for day in range(2, 7)],
+        "A": [10.0, 11.0, None, 12.0, 13.0],
+        "B": [None, None, 5.0, 5.5, 6.0],
+        "C": [1.0, 1.0, 1.0, 1.0, 1.0],
+    })
+    dates, closes, weights, tickers = prepare_backtest(close_matrix, {"A": 30, "B": 10, "D": 5})
+    assert tickers == ["A", "B"]
+    assert dates[0] == np.datetime64('2024-01-04')
+    assert closes[0].tolist() == [11.0, 5.0]
+    assert weights.tolist() == [0.75, 0.25]
+
+def test_backtest_portfolio(local_client):
+    """Test that holdings are backtested between the selected dates from the close matrix."""
+    tickers = db.get_tickers(local_client)[:3]
+    end = dt.date.today()
+    start = end - dt.timedelta(days=365)
+    backtests = backtest_portfolio(local_client, {ticker: 100.0 for ticker in tickers}, [NONE, MONTHLY], start, end)
+    assert [backtest.schedule for backtest in backtests] == [NONE, MONTHLY]
+    assert backtests[0].dates[0] >= np.datetime64(start)
+    assert backtests[0].equity[0] == pytest.approx(1.0)
+    assert 11 <= len(backtests[1].turnover) <= 13
@@ -0,0 +1,106 @@
+import numpy as np
+import polars as pl
+import pytest
+import components as cmp
+from services.correlation import (
+    CLUSTERED_VIEW, MATRIX_VIEW, PAIRS_VIEW, SECTOR_VIEW, aggregate_by_sector, cluster_order, daily_returns, long_series, rebase, reorder_matrix,
+    rolling_correlation, served_view, top_pairs,
+)
+
+@pytest.fixture
+def block_corr():
+    """Fixture to create a correlation matrix of two interleaved blocks of tickers."""
+    rng = np.random.default_rng(5)
+    factors = rng.normal(size=(250, 2))
+    # Even tickers follow the first factor, odd tickers the second
+    returns = np.column_stack([factors[:, i % 2] + 0.3 * rng.normal(size=250) for i in range(8)])
+    return pl.DataFrame(np.corrcoef(returns.T), schema=[f"T{i}" for i in range(8)])
+
+def test_cluster_order_groups_blocks(block_corr):
+    """Test that clustering places each block of correlated tickers next to each other."""
+    order = cluster_order(block_corr.to_numpy())
+    assert sorted(order.tolist()) == list(range(8))
+    parities = [i % 2 for i in order]
+    assert parities == sorted(parities) or parities == sorted(parities, reverse=True)
+
+    clustered = reorder_matrix(block_corr, order)
+    assert clustered.columns == [f"T{i}" for i in order]
+    assert np.allclose(np.diag(clustered.to_numpy()), 1)
+
+def test_matrix_views_fall_back_to_sectors_past_the_cap():
+    """Test that large selections are aggregated by sector instead of drawn as a matrix."""
+    assert served_view(MATRIX_VIEW, 150, max_tickers=150) == MATRIX_VIEW
+    assert served_view(MATRIX_VIEW, 151, max_tickers=150) == SECTOR_VIEW
+    assert served_view(CLUSTERED_VIEW, 2000, max_tickers=150) == SECTOR_VIEW
+    assert served_view(PAIRS_VIEW, 2000, max_tickers=150) == PAIRS_VIEW
+
+def test_top_pairs(block_corr):
+    """Test that the strongest pairs come first and exclude the diagonal."""
+    pairs = top_pairs(block_corr, k=5)
+    assert pairs.height == 5
+    strengths = pairs["correlation"].abs().to_list()
+    assert strengths == sorted(strengths, reverse=True)
+    assert all(a != b for a, b in (pair.split(" / ") for pair in pairs["pair"]))
+
+def test_aggregate_by_sector(block_corr):
+    """Test that sector averages ignore each ticker's correlation with itself."""
+    sectors = {f"T{i}": "Even" if i % 2 == 0 else "Odd" for i in range(8)}
+    sector_matrix = aggregate_by_sector(block_corr, sectors)
+    assert sector_matrix.columns == ["Even", "Odd"]
+    corr = block_corr.to_numpy()
+    even = [0, 2, 4, 6]
+    expected = corr[np.ix_(even, even)][~np.eye(4, dtype=bool)].mean()
+    assert sector_matrix[0, "Even"] == pytest.approx(expected)
+    assert sector_matrix[0, "Odd"] < 0.5 < sector_matrix[0, "Even"]
+
+def test_heatmap_text_threshold(block_corr):
+    """Test that cell values are printed only for small matrices."""
+    small = cmp.create_correlation_heatmap(block_corr, title="Corr")
+    large = cmp.create_correlation_heatmap(block_corr, title="Corr", text_max_cells=16)
+    assert small.data[0].texttemplate
+    assert not large.data[0].texttemplate
+
+@pytest.fixture
+def closes():
+    """Fixture to create a close matrix of three tickers, one listed late and one with a gap."""
+    rng = np.random.default_rng(11)
+    closes = 100 * np.cumprod(1 + 0.01 * rng.normal(size=(200, 3)), axis=0)
+    closes[:20, 1] = np.nan
+    closes[50, 2] = np.nan
+    return closes
+
+def test_rebase_and_daily_returns(closes):
+    """Test that each ticker starts at 100 and gaps carry the last close forward."""
+    rebased = rebase(closes)
+    assert rebased[0, 0] == pytest.approx(100) and rebased[20, 1] == pytest.approx(100)
+    assert np.isnan(rebased[:20, 1]).all()
+    assert rebased[50, 2] == rebased[49, 2]
+
+    returns = daily_returns(closes)
+    assert np.isnan(returns[0]).all() and np.isnan(returns[20, 1])
+    assert returns[1, 0] == pytest.approx(closes[1, 0] / closes[0, 0] - 1)
+    assert returns[50, 2] == 0 and returns[51, 2] == pytest.approx(closes[51, 2] / closes[49, 2] - 1)
+
+@pytest.mark.parametrize("window", [30, 90])
+def test_rolling_correlation_matches_naive_windows(closes, window):
+    """Test that the cumulative-sum windows give the same correlations as each window computed on its own."""
+    returns = daily_returns(closes)
+    benchmark = returns.mean(axis=1)
+    rolling = rolling_correlation(returns, benchmark, window)
+
+    assert rolling.shape == returns.shape
+    for column in range(3):
+        for end in range(len(returns)):
+            x = returns[end - window + 1:end + 1, column] if end >= window - 1 else np.array([np.nan])
+            y = benchmark[end - window + 1:end + 1] if end >= window - 1 else np.array([np.nan])
+            if np.isnan(x).any() or np.isnan(y).any():
+                assert np.isnan(rolling[end, column])
+            else:
+                assert rolling[end, column] == pytest.approx(np.corrcoef(x, y)[0, 1], abs=1e-9)
+
+def test_long_series_drops_missing_days(closes):
+    """Test that the long frame holds one row per ticker and traded day."""
+    dates = np.arange(200)
+    long = long_series(dates, ["A", "B", "C"], rebase(closes))
+    assert long.columns == ["date", "ticker", "value"]
+    assert long.group_by("ticker").len().sort("ticker")["len"].to_list() == [200, 180, 200]
@@ -0,0 +1,140 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import pandas as pd
+import pytest
+import services.db as db
+from services.cache import ResultCache, SingleFlight
+
+class FakeJob:
+    """Query job stub that blocks until released or cancelled."""
+
+    def __init__(self, frame: pd.DataFrame, delay: float = 0.0):
+        self.frame = frame
+        self.delay = delay
+        self.cancelled = threading.Event()
+
+    def result(self, timeout=None):
+        if self.cancelled.wait(self.delay):
+            raise RuntimeError("Job cancelled")
+        return self
+
+    def to_dataframe(self):
+        return self.frame
+
+    def cancel(self):
+        self.cancelled.set()
+
+class FakeClient:
+    """Client stub returning the same frame for every query."""
+
+    def __init__(self, frame: pd.DataFrame, delay: float = 0.0):
+        self.frame = frame
+        self.delay = delay
+        self.jobs = []
+
+    def query(self, query, job_config=None):
+        job = FakeJob(self.frame, self.delay)
+        self.jobs.append(job)
+        return job
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Fixture to start every test with an empty query cache."""
+    db.clear_query_cache()
+    yield
+    db.clear_query_cache()
+
+@pytest.fixture
+def price_frame():
+    """Fixture to create a small price DataFrame."""
+    return pd.DataFrame({
+        "date": pd.to_datetime(["2024-01-01", "2024-01-02"]),
+        "open": [1.0, 2.0],
+        "close": [1.5, 2.5],
+        "high": [2.0, 3.0],
+        "low": [0.5, 1.5],
+    })
+
+def test_gather_queries_runs_concurrently(price_frame):
+    """Test that submitted fetchers overlap instead of running sequentially."""
+    client = FakeClient(price_frame, delay=0.2)
+    start = time.perf_counter()
+    results = db.gather_queries(
+        [db.submit_query(db.get_price_data, client, "AAPL", "1 month") for _ in range(4)],
+        timeout=5,
+    )
+    elapsed = time.perf_counter() - start
+    assert all(result.height == 2 for result in results)
+    assert elapsed < 0.6
+
+def test_gather_queries_cancels_on_timeout(price_frame):
+    """Test that timed out fetchers return the default and cancel their jobs."""
+    client = FakeClient(price_frame, delay=5)
+    results = db.gather_queries(
+        [db.submit_query(db.get_price_data, client, "AAPL", "max")],
+        timeout=0.1,
+        default="timeout",
+    )
+    assert results == ["timeout"]
+    time.sleep(0.05)
+    assert all(job.cancelled.is_set() for job in client.jobs)
+
+def test_query_handle_cancel(price_frame):
+    """Test that cancelling a handle cancels its running job."""
+    client = FakeClient(price_frame, delay=5)
+    handle = db.submit_query(db.get_price_data, client, "AAPL", "max")
+    time.sleep(0.05)
+    handle.cancel()
+    assert handle.cancelled()
+    assert handle.result(timeout=1).is_empty()
+    assert client.jobs[0].cancelled.is_set()
+
+def test_identical_concurrent_queries_are_coalesced(price_frame):
+    """Test that concurrent identical queries share one backend job."""
+    client = FakeClient(price_frame, delay=0.2)
+    coalesced_before = db.get_query_stats()['single_flight']['coalesced']
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: db.get_price_data(client, "MSFT", "1 month"), range(8)))
+    assert len(client.jobs) == 1
+    assert all(result.height == 2 for result in results)
+    assert db.get_query_stats()['single_flight']['coalesced'] - coalesced_before == 7
+
+def test_cached_query_skips_backend(price_frame):
+    """Test that a repeated query is served from the result cache."""
+    client = FakeClient(price_frame)
+    db.get_price_data(client, "MSFT", "3 months")
+    db.get_price_data(client, "MSFT", "3 months")
+    db.get_price_data(client, "MSFT", "6 months")
+    assert len(client.jobs) == 2
+
+def test_cache_expiry_thundering_herd_loads_once():
+    """Test that callers arriving after an expiry trigger exactly one load."""
+    cache = ResultCache(ttl=0.05, maxsize=10)
+    loads = []
+
+    def loader():
+        loads.append(1)
+        time.sleep(0.1)
+        return "value"
+
+    assert cache.get_or_load("key", loader) == "value"
+    time.sleep(0.1)
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        results = list(pool.map(lambda _: cache.get_or_load("key", loader), range(16)))
+    assert results == ["value"] * 16
+    assert len(loads) == 2
+
+def test_single_flight_followers_time_out_and_leave():
+    """Test that a follower stops waiting on a hung leader after the timeout and is no longer counted."""
+    flights = SingleFlight(timeout=0.05)
+    release = threading.Event()
+    leader = threading.Thread(target=flights.do, args=("key", release.wait))
+    leader.start()
+    while not flights.stats()['in_flight']:
+        time.sleep(0.001)
+    with pytest.raises(FutureTimeoutError):
+        flights.do("key", lambda: "unused")
+    assert not flights.has_followers("key")
+    release.set()
+    leader.join()
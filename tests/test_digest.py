@@ -0,0 +1,106 @@
+import numpy as np
+import polars as pl
+import pytest
+import services.db as db
+import services.digest as digest
+from services.digest import DIGEST_WINDOWS, compute_digest, open_digest, write_digest
+from services.price_store import write_generation
+
+@pytest.fixture
+def matrices():
+    """Fixture to create a year of prices for five tickers with one known mover, spike, high and low."""
+    dates = np.arange(np.datetime64("2024-12-01"), np.datetime64("2026-01-01"))
+    rng = np.random.default_rng(3)
+    close = 100 * np.cumprod(1 + 0.005 * rng.normal(size=(len(dates), 5)), axis=0)
+    close[-1, 0] = close[-2, 0] * 1.2
+    close[-1, 1] = close[-2, 1] * 0.8
+    close[-1, 4] = np.nan
+    volume = 1e6 * (1 + 0.1 * rng.random(size=close.shape))
+    volume[-1, 2] = 5e6
+    fields = {"close": close, "high": close * 1.01, "low": close * 0.99, "volume": volume}
+    sectors = {"A": "Tech", "B": "Tech", "C": "Energy", "D": "Energy", "E": "Energy"}
+    return dates, ["A", "B", "C", "D", "E"], fields, sectors
+
+def test_movers_match_window_returns(matrices):
+    """Test that movers rank each window's returns and skip tickers that did not trade on the last day."""
+    dates, tickers, fields, sectors = matrices
+    tables = compute_digest(dates, tickers, fields, sectors, top_n=2)
+    movers = tables["movers"]
+    assert set(movers["window"].unique()) == set(DIGEST_WINDOWS)
+    assert "E" not in movers["ticker"].to_list()
+
+    day = movers.filter(pl.col("window") == "1 day")
+    assert day.filter(pl.col("direction") == "gainers")["ticker"][0] == "A"
+    assert day.filter(pl.col("direction") == "losers")["ticker"][0] == "B"
+    assert day.filter(pl.col("ticker") == "A")["return"][0] == pytest.approx(0.2)
+
+    # With room for every ticker, each one that moved is listed with its return over the window
+    month = compute_digest(dates, tickers, fields, sectors, top_n=5)["movers"].filter(pl.col("window") == "1 month")
+    start = np.searchsorted(dates, dates[-1] - np.timedelta64(30, "D"), side="right") - 1
+    expected = fields["close"][-1, :4] / fields["close"][start, :4] - 1
+    assert dict(zip(month["ticker"], month["return"])) == pytest.approx(dict(zip(tickers, expected)))
+
+def test_volume_spikes_extremes_and_sectors(matrices):
+    """Test the volume z-score, the 52-week extremes and the per-sector averages."""
+    dates, tickers, fields, sectors = matrices
+    tables = compute_digest(dates, tickers, fields, sectors, lookback=20)
+
+    spike = tables["volume_spikes"].row(0, named=True)
+    history = fields["volume"][-21:-1, 2]
+    assert spike["ticker"] == "C"
+    assert spike["zscore"] == pytest.approx((5e6 - history.mean()) / history.std(ddof=1))
+
+    extremes = tables["extremes"]
+    assert extremes.filter(pl.col("ticker") == "A")["kind"].to_list() == ["52-Week High"]
+    assert extremes.filter(pl.col("ticker") == "B")["kind"].to_list() == ["52-Week Low"]
+
+    day = tables["sectors"].filter(pl.col("window") == "1 day")
+    returns = fields["close"][-1] / fields["close"][-2] - 1
+    tech = day.filter(pl.col("sector") == "Tech").row(0, named=True)
+    energy = day.filter(pl.col("sector") == "Energy").row(0, named=True)
+    assert tech["return"] == pytest.approx(returns[:2].mean()) and tech["tickers"] == 2
+    # The ticker without a last close is left out of its sector
+    assert energy["return"] == pytest.approx(returns[2:4].mean()) and energy["tickers"] == 2
+
+def test_digest_round_trip_and_sources_agree(local_client, tmp_path, monkeypatch):
+    """Test that the digest computed from the price store equals the one from the history export and survives a write."""
+    expected = digest.build_digest(local_client)
+    store_dir = str(tmp_path / "prices")
+    write_generation(store_dir, db.get_price_history(local_client))
+    monkeypatch.setattr(digest, "PRICE_STORE_DIR", store_dir)
+    from_store = digest.build_digest(local_client)
+    assert from_store.as_of == expected.as_of
+    for name in digest.TABLES:
+        assert from_store.table(name).equals(expected.table(name)), name
+
+    digest_dir = str(tmp_path / "digest")
+    write_digest(digest_dir, expected.tables, expected.version, expected.as_of)
+    loaded = open_digest(digest_dir)
+    assert loaded.version == expected.version and loaded.as_of == expected.as_of
+    assert all(loaded.table(name).equals(expected.table(name)) for name in digest.TABLES)
+
+def test_overview_reads_the_stored_digest_without_queries(local_client, tmp_path, monkeypatch):
+    """Test that a stored digest is served without querying the backend."""
+    built = digest.build_digest(local_client)
+    digest_dir = str(tmp_path / "digest")
+    write_digest(digest_dir, built.tables, built.version, built.as_of)
+    monkeypatch.setattr(digest, "DIGEST_DIR", digest_dir)
+    monkeypatch.setattr(local_client, "query", None)
+    assert digest.get_digest(local_client).table("movers").equals(built.table("movers"))
+
+def test_overview_never_exports_the_stocks_table(local_client, monkeypatch):
+    """Test that without a stored digest or local store a BigQuery deployment gets no digest instead of a table scan."""
+    digest._digest_cache.clear()
+    monkeypatch.setattr(digest, "DIGEST_DIR", "")
+    with monkeypatch.context() as patched:
+        patched.setattr(digest, "DATA_BACKEND", "bigquery")
+        patched.setattr(db, "get_price_history", None)
+        assert digest.get_digest(local_client) is None
+
+    # The offline backend computes one in process, and a failed build is not cached
+    monkeypatch.setattr(digest, "DATA_BACKEND", "local")
+    with monkeypatch.context() as patched:
+        patched.setattr(digest, "build_digest", lambda client: digest.Digest({}, "v1", None))
+        assert digest.get_digest(local_client) is None
+    assert digest.get_digest(local_client).as_of is not None
+    digest._digest_cache.clear()
@@ -0,0 +1,57 @@
+import base64
+import datetime as dt
+import json
+import numpy as np
+import plotly
+import polars as pl
+import pytest
+import components as cmp
+from utils.fig_utils import encode_figure
+from utils.synthetic_data import generate_stocks_data
+
+@pytest.fixture(scope="module")
+def max_period_data():
+    """Fixture to create 20 years of daily prices for one ticker."""
+    return generate_stocks_data(["AAA"], n_years=20, end_date=dt.date(2024, 6, 28), seed=3)
+
+def decode(encoded):
+    """Decode a typed array dict the way plotly.js does."""
+    values = np.frombuffer(base64.b64decode(encoded["bdata"]), dtype=np.dtype(encoded["dtype"]).newbyteorder("<"))
+    if "shape" in encoded:
+        values = values.reshape([int(size) for size in encoded["shape"].split(",")])
+    return values
+
+def payload_size(figure):
+    return len(json.dumps(figure, cls=plotly.utils.PlotlyJSONEncoder))
+
+def test_encode_figure_round_trip(max_period_data):
+    """Test that dates become epoch milliseconds on a date axis and prices keep cent precision."""
+    figure = encode_figure(cmp.create_candlestick_chart(max_period_data, title="AAA"))
+    trace = figure["data"][0]
+    assert figure["layout"]["xaxis"]["type"] == "date"
+    assert trace["close"]["dtype"] == "f4"
+    dates = decode(trace["x"]).astype("datetime64[ms]").astype("datetime64[D]")
+    assert (dates == max_period_data["date"].to_numpy()).all()
+    assert decode(trace["close"]) == pytest.approx(max_period_data["close"].to_numpy(), abs=0.005)
+
+def test_encode_figure_integer_and_matrix():
+    """Test that integers use the smallest typed array and matrices carry their shape."""
+    volume = pl.DataFrame({"date": [dt.date(2024, 1, 1), dt.date(2024, 1, 2)], "volume": [10, 70000]})
+    trace = encode_figure(cmp.create_bar_chart(volume, x="date", y="volume", title="Volume"))["data"][0]
+    assert trace["y"]["dtype"] == "i4"
+    assert decode(trace["y"]).tolist() == [10, 70000]
+
+    corr = pl.DataFrame({"A": [1.0, 0.25], "B": [0.25, 1.0]})
+    trace = encode_figure(cmp.create_correlation_heatmap(corr, title="Corr"))["data"][0]
+    assert trace["z"]["shape"] == "2, 2"
+    assert decode(trace["z"]).tolist() == [[1.0, 0.25], [0.25, 1.0]]
+
+@pytest.mark.parametrize("build, max_ratio", [
+    (lambda df: cmp.create_line_chart(df, x="date", y="close", title="AAA", color=cmp.PRIMARY_COLOR), 0.5),
+    (lambda df: cmp.create_candlestick_chart(df, title="AAA"), 0.4),
+    (lambda df: cmp.create_bar_chart(df, x="date", y="volume", title="AAA"), 0.65),
+])
+def test_max_period_payload_size(max_period_data, build, max_ratio):
+    """Test that encoded max-period figures stay well below their plain JSON size."""
+    fig = build(max_period_data)
+    assert payload_size(encode_figure(fig)) < max_ratio * len(fig.to_json())
@@ -0,0 +1,103 @@
+import threading
+import pytest
+import services.db as db
+from services.governor import QueryBudgetExceededError, QueryGovernor, begin_request, downsample_query, sampled_percent
+
+@pytest.fixture
+def budget(monkeypatch):
+    """Fixture to swap in a fresh governor whose budgets each test can set."""
+    governor = QueryGovernor()
+    monkeypatch.setattr(db, 'governor', governor)
+    begin_request('test')
+    return governor
+
+def test_estimate_is_cached_per_template(local_client, budget):
+    """Test that each query shape is dry-run once and only reads referenced columns."""
+    tickers = db.get_tickers(local_client)
+    calls = []
+    original = local_client.query
+    local_client.query = lambda query, job_config=None: calls.append(job_config.dry_run) or original(query, job_config)
+
+    select_all = budget.estimate(local_client, f"SELECT * FROM `p.d.{db.STOCKS_TABLE_ID}`")
+    budget.estimate(local_client, f"SELECT   *  FROM `p.d.{db.STOCKS_TABLE_ID}`")
+    select_close = budget.estimate(local_client, f"SELECT close FROM `p.d.{db.STOCKS_TABLE_ID}`")
+
+    assert calls == [True, True]
+    assert 0 < select_close < select_all
+    assert len(tickers) == 12
+
+def test_budget_rejects_and_serves_stale_result(local_client, budget):
+    """Test that an over-budget query falls back to its last cached result."""
+    tickers = db.get_tickers(local_client)
+    first = db.get_stocks_current_price(local_client, tickers)
+    assert len(first) == len(tickers)
+
+    # Expire the fresh entries but keep the stale copies
+    db._query_cache._cache.clear()
+    budget.max_bytes_per_request = 1
+    assert db.get_stocks_current_price(local_client, tickers) == first
+    assert budget.rejections == 1
+
+def test_budget_downsamples_price_history(local_client, budget):
+    """Test that an over-budget price query is served from a table sample."""
+    ticker = db.get_tickers(local_client)[0]
+    full_estimate = budget.estimate(
+        local_client, f"SELECT ticker, date, open, close, high, low FROM `p.d.{db.STOCKS_TABLE_ID}`"
+    )
+    budget.max_bytes_per_request = full_estimate // 2
+
+    # Block sampling may drop every row of a small table, so only the shape is checked
+    assert sampled_percent() is None
+    sampled = db.get_price_data(local_client, ticker, 'max')
+    assert budget.rejections == 1
+    assert budget.downsampled == 1
+    # The request is marked so its charts can say the series is a sample
+    assert 0 < sampled_percent() < 100
+    assert 'close' in sampled.columns
+
+def test_concurrent_admits_never_overspend(budget):
+    """Test that queries admitted at the same time cannot together exceed the budget."""
+    budget.max_bytes_per_minute = 100
+    admitted = []
+    start = threading.Barrier(8)
+
+    def admit():
+        start.wait()
+        try:
+            budget.admit(30)
+            admitted.append(30)
+        except QueryBudgetExceededError:
+            pass
+
+    threads = [threading.Thread(target=admit) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sum(admitted) == 90
+    assert budget.rejections == 5
+
+def test_budget_error_without_fallback(local_client, budget):
+    """Test that sector data has no fallback and surfaces the budget error."""
+    budget.max_bytes_per_request = 1
+    with pytest.raises(QueryBudgetExceededError):
+        db._run_query(local_client, f"SELECT ticker, sector FROM `p.d.{db.SECTORS_TABLE_ID}`")
+
+def test_cost_report_orders_interactions(local_client, budget):
+    """Test that processed bytes are attributed to the interaction that ran the query."""
+    tickers = db.get_tickers(local_client)
+    begin_request('update_heatmap')
+    db.get_corr_matrix(local_client, tickers, 'max')
+    begin_request('update_dashboard')
+    db.get_sector_data(local_client)
+
+    report = budget.cost_report()
+    assert [cost['interaction'] for cost in report][:2] == ['update_heatmap', 'update_dashboard']
+    assert report[0]['bytes'] > report[1]['bytes'] > 0
+
+def test_downsample_query_adds_tablesample():
+    """Test that only the target table reference is sampled."""
+    query = "SELECT * FROM `p.d.stocks` s JOIN `p.d.sectors` USING (ticker)"
+    assert downsample_query(query, "`p.d.stocks`", 10) == (
+        "SELECT * FROM `p.d.stocks` TABLESAMPLE SYSTEM (10 PERCENT) s JOIN `p.d.sectors` USING (ticker)"
+    )
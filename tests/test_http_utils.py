@@ -0,0 +1,53 @@
+import gzip
+import pytest
+from flask import Flask, jsonify
+from utils.http_utils import register_http_caching
+
+@pytest.fixture
+def client():
+    """Fixture to create a Flask app with compression and ETags enabled."""
+    server = Flask(__name__)
+    register_http_caching(server, enabled=True, min_bytes=100, algorithms=['gzip'])
+
+    @server.route('/large')
+    def large():
+        return jsonify(values=list(range(500)))
+
+    @server.route('/small')
+    def small():
+        return jsonify(ok=True)
+
+    @server.route('/metrics')
+    def metrics():
+        return 'sma_up 1\n' * 50
+
+    return server.test_client()
+
+def test_large_response_is_gzipped(client):
+    """Test that responses above the threshold are compressed for clients that accept gzip."""
+    response = client.get('/large', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert gzip.decompress(response.data) == client.get('/large').data
+
+def test_small_or_unaccepted_responses_are_not_compressed(client):
+    """Test that small responses and clients without gzip get the identity encoding."""
+    assert 'Content-Encoding' not in client.get('/small', headers={'Accept-Encoding': 'gzip'}).headers
+    assert 'Content-Encoding' not in client.get('/large').headers
+
+def test_etag_revalidation(client):
+    """Test that a matching If-None-Match returns an empty 304 per encoding."""
+    plain = client.get('/large')
+    compressed = client.get('/large', headers={'Accept-Encoding': 'gzip'})
+    assert plain.headers['Cache-Control'] == 'no-cache'
+    assert plain.headers['ETag'] != compressed.headers['ETag']
+
+    revalidated = client.get('/large', headers={'Accept-Encoding': 'gzip', 'If-None-Match': compressed.headers['ETag']})
+    assert revalidated.status_code == 304
+    assert revalidated.data == b''
+
+def test_live_routes_are_not_cached(client):
+    """Test that metrics are never given an ETag."""
+    response = client.get('/metrics')
+    assert response.headers['Cache-Control'] == 'no-store'
+    assert 'ETag' not in response.headers
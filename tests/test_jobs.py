@@ -0,0 +1,119 @@
+import json
+import os
+import subprocess
+import sys
+import time
+import diskcache
+import numpy as np
+import polars as pl
+import pytest
+from dash import Dash, Input, Output, dcc, html
+from benchmarks.dash_client import JOB_TIMEOUT_STATUS, DashCallbackClient
+from services.jobs import BoundedDiskcacheManager, JobSlots, background_callback
+
+@pytest.fixture
+def cache(tmp_path):
+    """Fixture to create a job cache in a temporary directory."""
+    cache = diskcache.Cache(str(tmp_path / "jobs"))
+    yield cache
+    cache.close()
+
+def exited_pid() -> int:
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+def create_job_app(manager, runs_path, delay=0) -> Dash:
+    app = Dash(__name__, background_callback_manager=manager)
+    app.layout = html.Div([
+        dcc.Location(id="url"), dcc.Input(id="value"), html.Div(id="result"), html.Div(id="status")
+    ])
+
+    @background_callback(
+        app,
+        Output("result", "children"),
+        Input("value", "value"),
+        status=Output("status", "children"),
+    )
+    def square(set_progress, value):
+        set_progress("Squaring...")
+        time.sleep(delay)
+        with open(runs_path, "a") as f:
+            f.write(f"{value}\n")
+        return value * value
+
+    return app
+
+def test_slots_are_granted_in_arrival_order(cache):
+    """Test that a full pool queues jobs and hands a freed slot to the earliest one."""
+    slots = JobSlots(cache, size=1)
+    pid = os.getpid()
+    first = slots.enqueue(pid)
+    assert slots.try_acquire(first, pid) == 0
+
+    second, third = slots.enqueue(pid), slots.enqueue(pid)
+    assert slots.try_acquire(second, pid) is None
+    assert slots.position(third) == 1
+
+    slots.release(0)
+    assert slots.try_acquire(third, pid) is None
+    assert slots.try_acquire(second, pid) == 0
+    assert slots.position(third) == 0
+
+def test_slots_of_exited_processes_are_reclaimed(cache):
+    """Test that a killed job neither holds its slot nor its place in the queue."""
+    slots = JobSlots(cache, size=1)
+    dead = exited_pid()
+    slots.try_acquire(slots.enqueue(dead), dead)
+    slots.enqueue(dead)
+
+    ticket = slots.enqueue(os.getpid())
+    assert slots.try_acquire(ticket, os.getpid()) == 0
+
+def test_background_callback_caches_results_by_input(cache, tmp_path):
+    """Test that a background job runs once per input and repeated requests are served from the cache."""
+    runs_path = tmp_path / "runs.txt"
+    manager = BoundedDiskcacheManager(cache, max_jobs=1, cache_by=[lambda: "v1"], expire=60)
+    client = DashCallbackClient(create_job_app(manager, runs_path), poll_seconds=0.01)
+
+    responses = [client.call("square", [value]) for value in [3, 3, 4]]
+    outputs = [json.loads(body)["response"]["result"]["children"] for _, body in responses]
+    assert outputs == [9, 9, 16]
+    assert runs_path.read_text().split() == ["3", "4"]
+
+def test_background_callback_runs_inline_without_manager(tmp_path):
+    """Test that heavy callbacks still answer in the request when no job manager is installed."""
+    runs_path = tmp_path / "runs.txt"
+    client = DashCallbackClient(create_job_app(None, runs_path))
+
+    status, body = client.call("square", [5])
+    assert status == 200
+    assert json.loads(body)["response"]["result"]["children"] == 25
+
+def test_client_reports_a_job_that_does_not_finish(cache, tmp_path):
+    """Test that polling a background job gives up after the timeout with a failure status."""
+    manager = BoundedDiskcacheManager(cache, max_jobs=1)
+    app = create_job_app(manager, tmp_path / "runs.txt", delay=3)
+    client = DashCallbackClient(app, poll_seconds=0.01, job_timeout=0.5)
+
+    start = time.perf_counter()
+    status, body = client.call("square", [2])
+    assert status == JOB_TIMEOUT_STATUS and b"did not finish" in body
+    assert time.perf_counter() - start < 2
+
+def test_jobs_run_polars_after_the_parent_has(cache, tmp_path):
+    """Test that a job can use Polars when the web process started Polars' thread pool before the job."""
+    frame = pl.DataFrame({"key": np.arange(200_000) % 7, "value": np.random.default_rng(0).random(200_000)})
+    assert frame.group_by("key").agg(pl.col("value").sum()).height == 7
+
+    app = Dash(__name__, background_callback_manager=BoundedDiskcacheManager(cache, max_jobs=1))
+    app.layout = html.Div([dcc.Location(id="url"), dcc.Input(id="value"), html.Div(id="result")])
+
+    @background_callback(app, Output("result", "children"), Input("value", "value"))
+    def group_sizes(set_progress, value):
+        keys = pl.DataFrame({"key": np.arange(value * 1_000) % value})
+        return keys.group_by("key").len().height
+
+    status, body = DashCallbackClient(app, poll_seconds=0.01, job_timeout=60).call("group_sizes", [5])
+    assert status == 200
+    assert json.loads(body)["response"]["result"]["children"] == 5
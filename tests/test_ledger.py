@@ -0,0 +1,106 @@
+import datetime as dt
+import numpy as np
+import pytest
+import services.ledger as ledger_service
+from services.ledger import (
+    AVERAGE, COST_METHODS, FIFO, LIFO, CostBasis, Ledger, get_cost_basis, record_position_change, summarize_pnl
+)
+
+@pytest.fixture
+def ledger():
+    """Fixture to create a ledger with two buys and a partial sell of one ticker and a closed position in another."""
+    ledger = Ledger()
+    ledger.append("AAPL", 10, 80.0, dt.date(2024, 1, 2))
+    ledger.append("AAPL", 10, 120.0, dt.date(2024, 6, 3))
+    ledger.append("MSFT", 4, 50.0, dt.date(2024, 7, 1))
+    ledger.append("AAPL", -15, 110.0, dt.date(2024, 9, 2))
+    ledger.append("MSFT", -4, 60.0, dt.date(2024, 10, 1))
+    return ledger
+
+@pytest.fixture
+def random_ledger():
+    """Fixture to create a ledger of 2,000 random trades over 20 tickers that never oversell."""
+    rng = np.random.default_rng(2)
+    ledger = Ledger()
+    for _ in range(2000):
+        ticker = f"T{rng.integers(20)}"
+        quantity = float(rng.integers(1, 50))
+        if ledger.position(ticker) > 0 and rng.random() < 0.4:
+            quantity = -min(ledger.position(ticker), quantity)
+        ledger.append(ticker, quantity, float(rng.uniform(10, 100)))
+    return ledger
+
+@pytest.mark.parametrize("method, realized, cost", [
+    (FIFO, 250.0 + 40.0, 600.0),
+    (LIFO, 50.0 + 40.0, 400.0),
+    (AVERAGE, 150.0 + 40.0, 500.0),
+])
+def test_cost_basis_methods(ledger, method, realized, cost):
+    """Test realized P&L and remaining cost of the open lots under each method."""
+    positions = CostBasis(method).update(ledger).positions(ledger.tickers, {"AAPL": 100.0, "MSFT": 70.0})
+    summary = summarize_pnl(positions)
+    assert summary['realized'] == pytest.approx(realized)
+    assert summary['cost_basis'] == pytest.approx(cost)
+    assert summary['unrealized'] == pytest.approx(500.0 - cost)
+    assert positions.filter(positions['ticker'] == "MSFT")['quantity'][0] == 0
+
+def test_oversell_is_rejected(ledger):
+    """Test that selling more than the position leaves the ledger unchanged."""
+    with pytest.raises(ValueError):
+        ledger.append("AAPL", -6, 100.0)
+    assert len(ledger) == 5 and ledger.position("AAPL") == 5
+
+def test_backdated_trade_is_rejected(ledger):
+    """Test that a trade dated before the ticker's last one is refused, so lots are never consumed out of date order."""
+    with pytest.raises(ValueError, match="on or after"):
+        ledger.append("AAPL", 5, 90.0, dt.date(2024, 3, 1))
+    assert len(ledger) == 5 and ledger.position("AAPL") == 5
+
+    # Other tickers and same-day trades are unaffected, and the rule survives the store round trip
+    ledger.append("MSFT", 2, 55.0, dt.date(2024, 10, 1))
+    ledger.append("NVDA", 1, 40.0, dt.date(2024, 3, 1))
+    restored = Ledger.from_dict(ledger.to_dict())
+    assert restored.last_date("AAPL") == np.datetime64("2024-09-02")
+    with pytest.raises(ValueError):
+        restored.append("AAPL", 5, 90.0, dt.date(2024, 9, 1))
+
+@pytest.mark.parametrize("method", COST_METHODS)
+def test_incremental_matches_replay(random_ledger, method):
+    """Test that applying trades as they are appended gives the same state as one pass over the history."""
+    replay = CostBasis(method).update(random_ledger)
+
+    incremental, ledger = CostBasis(method), Ledger(random_ledger.id)
+    for row in range(len(random_ledger)):
+        ticker, date, quantity, price = random_ledger.trade(row)
+        ledger.append(ticker, quantity, price, dt.date.fromisoformat(date))
+        incremental.update(ledger)
+
+    assert incremental.quantity == pytest.approx(replay.quantity)
+    assert incremental.cost == pytest.approx(replay.cost)
+    assert incremental.realized == pytest.approx(replay.realized)
+
+def test_round_trip(random_ledger):
+    """Test that the store representation restores columns and positions."""
+    restored = Ledger.from_dict(random_ledger.to_dict())
+    assert restored.id == random_ledger.id and restored.tickers == random_ledger.tickers
+    assert np.array_equal(restored.date, random_ledger.date)
+    assert np.array_equal(restored.quantity, random_ledger.quantity)
+    for ticker in random_ledger.tickers:
+        assert restored.position(ticker) == pytest.approx(random_ledger.position(ticker))
+
+def test_cost_basis_is_extended_per_append(ledger, monkeypatch):
+    """Test that a cached cost basis applies only new trades and starts over when the ledger was replaced."""
+    ledger_service.clear_cost_basis_cache()
+    applied = []
+    apply = CostBasis.apply
+    monkeypatch.setattr(CostBasis, "apply", lambda self, *args: applied.append(args) or apply(self, *args))
+
+    first = get_cost_basis(Ledger.from_dict(ledger.to_dict()), FIFO)
+    record_position_change(ledger, "AAPL", 8, 105.0)
+    assert get_cost_basis(Ledger.from_dict(ledger.to_dict()), FIFO) is first
+    assert len(applied) == 6 and first.quantity[0] == pytest.approx(8)
+
+    replaced = Ledger(ledger.id)
+    replaced.append("AAPL", 1, 10.0)
+    assert get_cost_basis(replaced, FIFO) is not first
+    ledger_service.clear_cost_basis_cache()
@@ -0,0 +1,83 @@
+import datetime as dt
+import time
+import polars as pl
+import pytest
+import services.db as db
+from services.local_db import translate_query
+from utils.synthetic_data import generate_stocks_data, generate_tickers
+
+def test_translate_query():
+    """Test rewriting BigQuery syntax into the DuckDB dialect."""
+    query = """
+        SELECT date FROM `project.dataset.stocks`
+        WHERE ticker = @ticker AND date > DATE_SUB(CURRENT_DATE(), INTERVAL @period_days DAY)
+    """
+    translated = translate_query(query)
+    assert '"stocks"' in translated
+    assert "$ticker" in translated
+    assert "(CURRENT_DATE() - INTERVAL ($period_days) DAY)" in translated
+
+def test_generate_stocks_data_shape():
+    """Test that the generator produces consistent OHLCV rows."""
+    tickers = generate_tickers(5, seed=1)
+    data = generate_stocks_data(tickers, n_years=1, end_date=dt.date(2024, 6, 28), seed=1)
+    assert data.height == 5 * 252
+    assert data["date"].max() == dt.date(2024, 6, 28)
+    assert (data["high"] >= data[["open", "close"]].max_horizontal()).all()
+    assert (data["low"] <= data[["open", "close"]].min_horizontal()).all()
+
+def test_get_tickers(local_client):
+    """Test fetching the ticker universe from the sectors table."""
+    tickers = db.get_tickers(local_client)
+    assert len(tickers) == 12
+    assert tickers == sorted(tickers)
+
+def test_get_price_data_period(local_client):
+    """Test that the period filter limits the returned rows."""
+    ticker = db.get_tickers(local_client)[0]
+    month = db.get_price_data(local_client, ticker, "1 month")
+    full = db.get_price_data(local_client, ticker, "max")
+    assert month.columns == ["date", "open", "close", "high", "low"]
+    assert month.schema["date"] == pl.Date
+    assert 0 < month.height < full.height
+    assert full["date"].is_sorted()
+
+def test_get_volume_data_range(local_client):
+    """Test that the volume range filter is applied."""
+    ticker = db.get_tickers(local_client)[0]
+    volume = db.get_volume_data(local_client, ticker, "max", (100001, 500000))
+    assert volume["volume"].min() >= 100001
+    assert volume["volume"].max() <= 500000
+    unbounded = db.get_volume_data(local_client, ticker, "max", (0, float("inf")))
+    assert unbounded.height >= volume.height
+
+def test_get_corr_matrix(local_client):
+    """Test building a correlation matrix for several tickers."""
+    tickers = db.get_tickers(local_client)[:3]
+    corr = db.get_corr_matrix(local_client, tickers, "1 year")
+    assert corr.shape == (3, 3)
+    assert corr[0, 0] == pytest.approx(1.0)
+
+def test_get_stocks_current_price(local_client):
+    """Test fetching the latest close for each ticker."""
+    tickers = db.get_tickers(local_client)[:4]
+    prices = db.get_stocks_current_price(local_client, tickers)
+    assert set(prices) == set(tickers)
+    assert all(price > 0 for price in prices.values())
+
+def test_aggregate_portfolio_by_sector(local_client):
+    """Test joining portfolio holdings with the sectors table."""
+    sector_data = db.get_sector_data(local_client)
+    tickers = sector_data["ticker"].to_list()[:3]
+    portfolio = pl.DataFrame({"Ticker": tickers, "Value": [100.0, 200.0, 300.0]})
+    aggregated = db.aggregate_portfolio_by_sector(portfolio, sector_data)
+    assert aggregated["Total Value"].sum() == pytest.approx(600.0)
+    assert aggregated["Total Value"].is_sorted(descending=True)
+
+def test_local_query_latency(local_client):
+    """Test that the simulated backend latency is applied to local query jobs."""
+    job = local_client.query(translate_query("SELECT 1 AS x"))
+    job.latency = 0.05
+    start = time.perf_counter()
+    assert job.to_dataframe()["x"].tolist() == [1]
+    assert time.perf_counter() - start >= 0.05
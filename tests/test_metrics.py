@@ -0,0 +1,44 @@
+import polars as pl
+import pytest
+from utils import metrics
+
+@pytest.fixture
+def enabled_metrics():
+    """Fixture to enable instrumentation with an empty registry."""
+    metrics.registry.reset()
+    metrics.set_enabled(True)
+    yield metrics.registry
+    metrics.set_enabled(False)
+    metrics.registry.reset()
+
+def test_instrument_records_duration_and_rows(enabled_metrics):
+    """Test that an instrumented call is rendered as a histogram and row counter."""
+    @metrics.instrument('query', count_rows=True)
+    def fetch():
+        return pl.DataFrame({"a": [1, 2, 3]})
+
+    fetch()
+    output = enabled_metrics.render()
+    assert 'sma_stage_duration_seconds_count{name="fetch",stage="query"} 1' in output
+    assert 'sma_stage_rows_total{name="fetch",stage="query"} 3' in output
+
+def test_instrument_counts_errors(enabled_metrics):
+    """Test that exceptions are counted and re-raised."""
+    @metrics.instrument('portfolio')
+    def failing():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        failing()
+    assert 'sma_stage_errors_total{name="failing",stage="portfolio"} 1' in enabled_metrics.render()
+
+def test_disabled_instrumentation_records_nothing():
+    """Test that no metrics are recorded while instrumentation is disabled."""
+    metrics.registry.reset()
+
+    @metrics.instrument('figure')
+    def build():
+        return 1
+
+    assert build() == 1
+    assert 'name="build"' not in metrics.registry.render()
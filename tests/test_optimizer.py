@@ -0,0 +1,77 @@
+import numpy as np
+import polars as pl
+import pytest
+import services.db as db
+import services.optimizer as optimizer
+from services.optimizer import (
+    efficient_frontier, project_simplex, return_statistics, solve_long_only, solve_unconstrained
+)
+
+@pytest.fixture
+def statistics():
+    """Fixture to create return statistics for 30 assets driven by two factors."""
+    rng = np.random.default_rng(11)
+    factors = rng.normal(0, 0.01, size=(750, 2))
+    returns = factors @ rng.normal(1, 0.5, size=(2, 30)) + rng.normal(0.0004, 0.015, size=(750, 30))
+    closes = 100 * np.cumprod(1 + returns, axis=0)
+    return return_statistics(pl.DataFrame(closes, schema=[f"T{i}" for i in range(30)]))
+
+def test_project_simplex():
+    """Test that projected rows are non-negative, sum to one and keep feasible rows unchanged."""
+    values = np.array([[0.2, 0.3, 0.5], [2.0, -1.0, 0.5], [-3.0, -2.0, -1.0]])
+    projected = project_simplex(values)
+    assert projected.min() >= 0
+    assert projected.sum(axis=1) == pytest.approx(np.ones(3))
+    assert projected[0] == pytest.approx(values[0])
+    assert projected[2] == pytest.approx([0, 0, 1])
+
+def test_long_only_matches_closed_form_when_interior():
+    """Test that the projected gradient solver agrees with the closed form when no weight is negative."""
+    mean = np.array([0.05, 0.07, 0.09])
+    cov = np.diag([0.04, 0.09, 0.16])
+    tolerance = np.array([0.0, 0.2])
+    assert solve_long_only(mean, cov, tolerance) == pytest.approx(solve_unconstrained(mean, cov, tolerance), abs=1e-5)
+
+def test_return_statistics_skips_short_histories():
+    """Test that tickers without enough returns in the lookback are left out."""
+    closes = pl.DataFrame({
+        "A": np.linspace(100, 120, 60),
+        "B": np.linspace(50, 40, 60),
+        "C": [None] * 55 + [10.0, 10.5, 11.0, 11.5, 12.0],
+    })
+    stats = return_statistics(closes)
+    assert stats.tickers == ["A", "B"]
+    assert np.all(np.linalg.eigvalsh(stats.cov) > 0)
+
+@pytest.mark.parametrize("long_only", [True, False])
+def test_efficient_frontier(statistics, long_only):
+    """Test that the frontier is monotone and the optimal portfolios beat its samples."""
+    frontier = efficient_frontier(statistics, long_only=long_only, points=30)
+    assert np.all(np.diff(frontier.returns) >= -1e-6)
+    assert np.all(np.diff(frontier.volatility) >= -1e-6)
+    assert frontier.weights.sum(axis=1) == pytest.approx(np.ones(30))
+    if long_only:
+        assert frontier.weights.min() >= 0
+
+    _, min_volatility, _ = statistics.performance(frontier.min_variance)
+    _, _, max_sharpe = statistics.performance(frontier.max_sharpe)
+    equal_weight = np.full(len(statistics.tickers), 1 / len(statistics.tickers))
+    assert min_volatility[0] <= statistics.performance(equal_weight)[1][0]
+    assert max_sharpe[0] >= np.nanmax(frontier.sharpe) - 1e-6
+
+def test_return_statistics_cached_per_data_version(local_client, monkeypatch):
+    """Test that statistics are fetched once per ticker set, period and data version."""
+    optimizer.clear_statistics_cache()
+    calls = []
+    fetch = db.get_close_matrix
+    monkeypatch.setattr(db, "get_close_matrix", lambda *args: calls.append(args) or fetch(*args))
+
+    tickers = db.get_tickers(local_client)[:4]
+    first = optimizer.get_return_statistics(local_client, tickers, "1 year")
+    again = optimizer.get_return_statistics(local_client, list(reversed(tickers)), "1 year")
+    assert again is first and len(calls) == 1
+
+    monkeypatch.setattr(db, "get_data_version", lambda client: "next")
+    optimizer.get_return_statistics(local_client, tickers, "1 year")
+    assert len(calls) == 2
+    optimizer.clear_statistics_cache()
@@ -0,0 +1,67 @@
+import polars as pl
+import pytest
+import services.db as db
+from services.parquet_store import open_parquet_store, write_generation
+
+@pytest.fixture
+def store_dir(local_client, tmp_path):
+    """Fixture to build a Parquet store from the local dataset, in small row groups."""
+    store_dir = str(tmp_path / "parquet")
+    write_generation(store_dir, db.get_price_history(local_client), row_group_size=1000)
+    return store_dir
+
+@pytest.mark.parametrize("period", ["1 month", "1 year", "max"])
+def test_price_plan_matches_query(local_client, store_dir, period):
+    """Test that the lazy price plan returns the same rows as the SQL fetcher."""
+    ticker = db.get_tickers(local_client)[0]
+    expected = db.get_price_data(local_client, ticker, period)
+    store = open_parquet_store(store_dir)
+    assert store.collect(store.price_plan(ticker, period)).equals(expected)
+
+@pytest.mark.parametrize("volume_range", [(100001, 5000000), (0, float("inf"))])
+def test_volume_plan_matches_query(local_client, store_dir, volume_range):
+    """Test that the volume range filter matches the SQL fetcher."""
+    ticker = db.get_tickers(local_client)[1]
+    expected = db.get_volume_data(local_client, ticker, "6 months", volume_range)
+    store = open_parquet_store(store_dir)
+    actual = store.collect(store.volume_plan(ticker, "6 months", volume_range))
+    assert actual.equals(expected.with_columns(pl.col("volume").cast(pl.Int64)))
+
+def test_filters_and_columns_are_pushed_into_the_scan(store_dir):
+    """Test that the optimized plan filters and projects inside the Parquet scan."""
+    store = open_parquet_store(store_dir)
+    plan = store.price_plan(store.tickers[0], "1 year").explain()
+    scan = plan[plan.index("Parquet SCAN"):]
+    assert "SELECTION" in scan and "ticker" in scan
+    # volume is never read; ticker only for the filter
+    assert "PROJECT 6/7 COLUMNS" in scan
+
+def test_fetchers_read_from_store(local_client, store_dir, monkeypatch):
+    """Test that the fetchers answer from the store without querying the backend."""
+    tickers = db.get_tickers(local_client)[:4]
+    expected_matrix = db.get_close_matrix(local_client, tickers, "1 year", include_dates=True)
+    expected_prices = db.get_stocks_current_price(local_client, tickers)
+
+    monkeypatch.setattr(db, "PARQUET_STORE_DIR", store_dir)
+    monkeypatch.setattr(local_client, "query", None)
+    matrix = db.get_close_matrix(local_client, tickers, "1 year", include_dates=True)
+    assert matrix.columns == ["date"] + tickers
+    assert matrix["date"].cast(pl.Date).equals(expected_matrix["date"].cast(pl.Date))
+    assert matrix.select(tickers).to_numpy() == pytest.approx(expected_matrix.select(tickers).to_numpy(), nan_ok=True)
+    assert db.get_stocks_current_price(local_client, tickers) == pytest.approx(expected_prices)
+    assert db.get_data_version(local_client) == open_parquet_store(store_dir).generation
+
+    # Date ranges are pushed into the scan
+    start, end = expected_matrix["date"].cast(pl.Date)[20], expected_matrix["date"].cast(pl.Date)[40]
+    ranged = db.get_close_matrix(local_client, tickers, "1 year", include_dates=True, start_date=start, end_date=end)
+    assert ranged["date"].cast(pl.Date).to_list() == expected_matrix["date"].cast(pl.Date)[20:41].to_list()
+
+def test_streaming_engine_gives_the_same_result(store_dir):
+    """Test that universe-wide plans give the same answer on the streaming engine."""
+    store = open_parquet_store(store_dir)
+    expected = store.close_matrix(store.tickers, "max", include_dates=True)
+    store.streaming = True
+    try:
+        assert store.close_matrix(store.tickers, "max", include_dates=True).equals(expected)
+    finally:
+        store.streaming = False
@@ -0,0 +1,96 @@
+import os
+import polars as pl
+import pytest
+import services.db as db
+import services.price_store as price_store
+from services.price_store import open_store, write_generation
+
+@pytest.fixture
+def store_dir(local_client, tmp_path):
+    """Fixture to build a price store from the local dataset."""
+    store_dir = str(tmp_path / "prices")
+    write_generation(store_dir, db.get_price_history(local_client))
+    return store_dir
+
+@pytest.mark.parametrize("period", ["1 month", "1 year", "max"])
+def test_price_frame_matches_query(local_client, store_dir, period):
+    """Test that slicing the store returns the same rows as the SQL fetcher."""
+    ticker = db.get_tickers(local_client)[0]
+    expected = db.get_price_data(local_client, ticker, period)
+    assert open_store(store_dir).price_frame(ticker, period).equals(expected)
+
+def test_volume_frame_matches_query(local_client, store_dir):
+    """Test that the volume range filter matches the SQL fetcher."""
+    ticker = db.get_tickers(local_client)[1]
+    volume_range = (100001, 5000000)
+    expected = db.get_volume_data(local_client, ticker, "6 months", volume_range)
+    actual = open_store(store_dir).volume_frame(ticker, "6 months", volume_range)
+    assert actual.equals(expected.with_columns(pl.col("volume").cast(pl.Int64)))
+
+def test_fetchers_read_from_store(local_client, store_dir, monkeypatch):
+    """Test that the fetchers answer from the store without querying the backend."""
+    tickers = db.get_tickers(local_client)[:4]
+    expected_corr = db.get_corr_matrix(local_client, tickers, "1 year")
+    expected_prices = db.get_stocks_current_price(local_client, tickers)
+
+    monkeypatch.setattr(db, "PRICE_STORE_DIR", store_dir)
+    monkeypatch.setattr(local_client, "query", None)
+    corr = db.get_corr_matrix(local_client, tickers, "1 year")
+    assert corr.columns == tickers
+    assert corr.select(sorted(tickers)).to_numpy() == pytest.approx(
+        expected_corr.select(sorted(tickers)).to_numpy()
+    )
+    assert db.get_stocks_current_price(local_client, tickers) == expected_prices
+
+def test_new_generation_is_swapped_in(local_client, store_dir, monkeypatch):
+    """Test that readers pick up a new generation and old ones are pruned."""
+    monkeypatch.setattr(price_store, "GENERATION_GRACE_SECONDS", 0)
+    first = open_store(store_dir)
+    history = db.get_price_history(local_client)
+    ticker = history["ticker"][0]
+    for _ in range(2):
+        write_generation(store_dir, history.with_columns(pl.col("close") * 2))
+
+    current = open_store(store_dir)
+    assert current.generation != first.generation
+    assert current.latest_close([ticker])[ticker] == pytest.approx(2 * first.latest_close([ticker])[ticker])
+    assert len([name for name in os.listdir(store_dir) if name.startswith("gen-")]) == 2
+
+def test_superseded_generation_outlives_its_grace_period(local_client, store_dir):
+    """Test that a reader that resolved a generation just before two swaps can still open it."""
+    resolved = price_store.current_generation(store_dir)
+    history = db.get_price_history(local_client)
+    for _ in range(2):
+        write_generation(store_dir, history)
+    assert price_store.PriceStore(os.path.join(store_dir, resolved)).generation == resolved
+
+    # Once the generation after it is older than the grace period, the next swap removes it
+    successor = sorted(name for name in os.listdir(store_dir) if name.startswith("gen-"))[1]
+    expired = os.path.getmtime(os.path.join(store_dir, successor)) - price_store.GENERATION_GRACE_SECONDS
+    os.utime(os.path.join(store_dir, successor), (expired, expired))
+    write_generation(store_dir, history)
+    assert not os.path.exists(os.path.join(store_dir, resolved))
+
+def test_close_matrix_dates_match_query(local_client, store_dir):
+    """Test that the store's close matrix with dates matches the SQL fetcher."""
+    tickers = db.get_tickers(local_client)[:3]
+    expected = db.get_close_matrix(local_client, tickers, "6 months", include_dates=True)
+    actual = open_store(store_dir).close_matrix(tickers, "6 months", include_dates=True)
+    assert actual.columns == ["date"] + tickers
+    assert actual["date"].cast(pl.Date).equals(expected["date"].cast(pl.Date))
+    assert actual.select(tickers).to_numpy() == pytest.approx(expected.select(tickers).to_numpy(), nan_ok=True)
+
+def test_close_matrix_date_range_matches_query(local_client, store_dir):
+    """Test that a date range is applied by the store and the SQL fetcher alike, both ends included."""
+    tickers = db.get_tickers(local_client)[:3]
+    full = db.get_close_matrix(local_client, tickers, "max", include_dates=True)
+    dates = full["date"].cast(pl.Date)
+    start, end = dates[100], dates[160]
+    expected = full.filter(dates.is_between(start, end))
+
+    for matrix in [
+        db.get_close_matrix(local_client, tickers, "max", include_dates=True, start_date=start, end_date=end),
+        open_store(store_dir).close_matrix(tickers, "max", include_dates=True, start_date=start, end_date=end),
+    ]:
+        assert matrix["date"].cast(pl.Date).to_list() == expected["date"].cast(pl.Date).to_list()
+        assert matrix.select(tickers).to_numpy() == pytest.approx(expected.select(tickers).to_numpy(), nan_ok=True)
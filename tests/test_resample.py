@@ -0,0 +1,71 @@
+import datetime as dt
+import polars as pl
+import pytest
+import services.db as db
+from services.local_db import translate_query
+from services.resample import DAILY, MONTHLY, WEEKLY, filter_volume, get_bar_interval, resample_ohlcv, sql_bar_date
+
+def test_resample_ohlcv_weekly_semantics():
+    """Test that weekly bars take the first open, last close, extremes and summed volume."""
+    df = pl.DataFrame({
+        'date': [dt.date(2024, 1, 1) + dt.timedelta(days=i) for i in range(10)],
+        'ticker': ['AAA'] * 10,
+        'open': [float(i) for i in range(10)],
+        'high': [float(i + 5) for i in range(10)],
+        'low': [float(i - 5) for i in range(10)],
+        'close': [float(i + 1) for i in range(10)],
+        'volume': [100] * 10,
+    })
+    bars = resample_ohlcv(df, WEEKLY)
+    assert bars.columns == df.columns
+    assert bars['date'].to_list() == [dt.date(2024, 1, 1), dt.date(2024, 1, 8)]
+    assert bars.row(0) == (dt.date(2024, 1, 1), 'AAA', 0.0, 11.0, -5.0, 7.0, 700)
+    assert bars.row(1) == (dt.date(2024, 1, 8), 'AAA', 7.0, 14.0, 2.0, 10.0, 300)
+
+def test_resample_ohlcv_groups_per_ticker():
+    """Test that bars are built separately for each ticker."""
+    df = pl.DataFrame({
+        'date': [dt.date(2024, 1, 2), dt.date(2024, 1, 3)] * 2,
+        'ticker': ['AAA', 'AAA', 'BBB', 'BBB'],
+        'volume': [1, 2, 30, 40],
+    })
+    bars = resample_ohlcv(df, MONTHLY)
+    assert bars.sort('ticker')['volume'].to_list() == [3, 70]
+
+def test_get_bar_interval():
+    """Test that only long periods switch to aggregated bars."""
+    assert get_bar_interval('1 year') == DAILY
+    assert get_bar_interval('5 years') == WEEKLY
+    assert get_bar_interval('max') == MONTHLY
+
+def test_get_price_data_bars_are_cached(local_client):
+    """Test that monthly bars aggregated by the query match the daily rows and are cached."""
+    ticker = db.get_tickers(local_client)[0]
+    daily = db.get_price_data(local_client, ticker, 'max')
+    monthly = db.get_price_data(local_client, ticker, 'max', MONTHLY)
+    executions = db.get_query_stats()['single_flight']['executions']
+
+    assert monthly.columns == daily.columns
+    assert daily.height > 15 * monthly.height
+    assert monthly['high'].max() == daily['high'].max()
+    assert db.get_price_data(local_client, ticker, 'max', MONTHLY).equals(monthly)
+    assert db.get_query_stats()['single_flight']['executions'] == executions
+
+def test_sql_bars_translate_to_monday_weeks():
+    """Test that weekly bars start on Monday in both dialects."""
+    assert sql_bar_date(WEEKLY) == "DATE_TRUNC(date, WEEK(MONDAY))"
+    assert translate_query(f"SELECT {sql_bar_date(WEEKLY)}") == "SELECT CAST(DATE_TRUNC('WEEK', date) AS DATE)"
+    assert translate_query(f"SELECT {sql_bar_date(MONTHLY)}") == "SELECT CAST(DATE_TRUNC('MONTH', date) AS DATE)"
+
+@pytest.mark.parametrize("interval", [WEEKLY, MONTHLY])
+def test_volume_range_filters_bars_after_resampling(local_client, interval):
+    """Test that the volume range applies to each bar's summed volume, not to the days summed into it."""
+    ticker = db.get_tickers(local_client)[0]
+    daily = db.get_volume_data(local_client, ticker, 'max', (0, float('inf')))
+    # Every day is below the range, so filtering days first would leave no bars
+    volume_range = (int(daily['volume'].max()) + 1, float('inf'))
+    expected = filter_volume(resample_ohlcv(daily.with_columns(pl.col('date').cast(pl.Date)), interval), volume_range)
+
+    bars = db.get_volume_data(local_client, ticker, 'max', volume_range, interval)
+    assert not bars.is_empty()
+    assert bars.with_columns(pl.col('date').cast(pl.Date)).equals(expected)
@@ -0,0 +1,163 @@
+import os
+import subprocess
+import time
+import numpy as np
+import polars as pl
+import pytest
+import services.db as db
+import services.risk as risk
+import services.simulation as simulation
+from services.risk import HISTORICAL, prepare_inputs, run_risk, summarize_tail
+from services.simulation import BOOTSTRAP, NORMAL, simulate_chunk, simulate_horizon_returns
+
+@pytest.fixture
+def inputs():
+    """Fixture to create risk inputs for three correlated assets over 500 days."""
+    rng = np.random.default_rng(5)
+    returns = rng.multivariate_normal(
+        [0.0003, 0.0005, 0.0002],
+        [[1.0e-4, 0.6e-4, 0.2e-4], [0.6e-4, 2.0e-4, 0.3e-4], [0.2e-4, 0.3e-4, 0.5e-4]],
+        size=500
+    )
+    closes = pl.DataFrame(100 * np.exp(np.cumsum(returns, axis=0)), schema=["A", "B", "C"])
+    return prepare_inputs(closes, {"A": 10, "B": 5, "C": 20})
+
+@pytest.fixture
+def inline_pool(monkeypatch):
+    """Fixture to run simulation chunks in the test process."""
+    monkeypatch.setattr(risk, "RISK_MAX_PROCESSES", 0)
+
+@pytest.fixture(autouse=True)
+def shared_jobs(tmp_path, monkeypatch):
+    """Fixture to share job state through a fresh directory, as the workers of one server would."""
+    monkeypatch.setattr(risk, "BACKGROUND_CACHE_DIR", str(tmp_path / "jobs"))
+    monkeypatch.setattr(risk, "_shared", None)
+
+def wait_for(job):
+    for _ in range(200):
+        if job.done:
+            return job
+        time.sleep(0.05)
+        job = risk.get_risk_job(job.key)
+    raise TimeoutError(job.key)
+
+def test_prepare_inputs_skips_tickers_without_history():
+    """Test that holdings without prices are dropped and the rest are valued at the last close."""
+    closes = pl.DataFrame({
+        "A": np.linspace(100, 110, 30),
+        "B": [None] * 30,
+        "C": [None] + list(np.linspace(10, 12, 29)),
+    }, schema={"A": pl.Float64, "B": pl.Float64, "C": pl.Float64})
+    inputs = prepare_inputs(closes, {"A": 2, "B": 1, "C": 10})
+    assert inputs.tickers == ["A", "C"]
+    assert inputs.value == pytest.approx(2 * 110 + 10 * 12)
+    assert inputs.log_returns.shape == (28, 2)
+
+def test_summarize_tail():
+    """Test that VaR is the k-th worst loss and CVaR the mean of the k worst."""
+    returns = np.linspace(-0.5, 0.49, 100)
+    summary = summarize_tail(returns, 100, 1000)
+    assert summary['var']['95%'] == pytest.approx(-returns[4] * 1000)
+    assert summary['cvar']['95%'] == pytest.approx(-returns[:5].mean() * 1000)
+    assert summary['var']['99%'] == pytest.approx(500)
+
+def test_historical_var_matches_quantile(inputs):
+    """Test that historical VaR matches the empirical quantile of overlapping window returns."""
+    result = run_risk(inputs, HISTORICAL, 0)
+    for horizon in [1, 10]:
+        growth = np.exp(np.cumsum(inputs.log_returns, axis=0))
+        growth = np.vstack([np.ones(3), growth])
+        window_returns = (growth[horizon:] / growth[:-horizon] - 1) @ inputs.weights
+        expected = -np.quantile(window_returns, 0.05, method='inverted_cdf') * inputs.value
+        assert result['horizons'][str(horizon)]['var']['95%'] == pytest.approx(expected)
+        assert sum(result['horizons'][str(horizon)]['counts']) == len(window_returns)
+
+def test_chunk_tail_is_exact(inputs, monkeypatch):
+    """Test that the running tail kept across batches equals the worst returns of the whole sample."""
+    monkeypatch.setattr(simulation, "BATCH_ELEMENTS", 3 * 10 * 700)
+    seed = np.random.SeedSequence(3)
+    bins = {10: inputs.bins(10)}
+    chunk = simulate_chunk(BOOTSTRAP, 10_000, seed, inputs.weights, [10], 100, bins, log_returns=inputs.log_returns)
+    all_returns = simulate_horizon_returns(
+        np.random.default_rng(seed), BOOTSTRAP, 10_000, 10, inputs.weights, log_returns=inputs.log_returns
+    )
+    tail, counts = chunk[10]
+    assert tail == pytest.approx(np.sort(all_returns)[:100])
+    assert counts.sum() == 10_000
+
+@pytest.mark.parametrize("method", [NORMAL, BOOTSTRAP])
+def test_monte_carlo_is_reproducible(inputs, inline_pool, method, monkeypatch):
+    """Test that a seed gives the same estimate however the paths are chunked, close to the normal approximation."""
+    first = run_risk(inputs, method, 40_000, seed=1)
+    monkeypatch.setattr(risk, "chunk_sizes", lambda n_paths: [10_000] * 4)
+    chunked = run_risk(inputs, method, 40_000, seed=1)
+    assert chunked['horizons'] != first['horizons']
+    assert run_risk(inputs, method, 40_000, seed=1) == chunked
+
+    sigma = np.sqrt(inputs.weights @ inputs.cov @ inputs.weights)
+    expected = (2.326 * sigma - inputs.weights @ inputs.mean) * inputs.value
+    assert first['horizons']['1']['var']['99%'] == pytest.approx(expected, rel=0.1)
+    assert first['horizons']['1']['cvar']['99%'] > first['horizons']['1']['var']['99%']
+
+def test_risk_job_cached_per_holdings(local_client, inline_pool, monkeypatch):
+    """Test that a finished job is served from the cache for the same holdings and recomputed for new ones."""
+    risk.clear_risk_cache()
+    monkeypatch.setattr(db, "get_client", lambda: local_client)
+    monkeypatch.setattr(local_client, "close", lambda: None)
+    tickers = db.get_tickers(local_client)[:3]
+    shares = {ticker: 10 for ticker in tickers}
+
+    job = wait_for(risk.start_risk_job(shares, NORMAL, 20_000, "1 year"))
+    assert job.error is None and job.result['tickers'] == sorted(tickers)
+
+    again = risk.start_risk_job(dict(reversed(list(shares.items()))), NORMAL, 20_000, "1 year")
+    assert again.key == job.key and again.result is job.result
+    other = wait_for(risk.start_risk_job({**shares, tickers[0]: 20}, NORMAL, 20_000, "1 year"))
+    assert other.key != job.key and other.result['value'] > job.result['value']
+    risk.clear_risk_cache()
+
+def test_jobs_are_shared_between_workers(local_client, inline_pool, monkeypatch):
+    """Test that a poll served by another worker finds the running or finished job instead of restarting it."""
+    risk.clear_risk_cache()
+    monkeypatch.setattr(db, "get_client", lambda: local_client)
+    monkeypatch.setattr(local_client, "close", lambda: None)
+    shares = {ticker: 10 for ticker in db.get_tickers(local_client)[:3]}
+    job = wait_for(risk.start_risk_job(shares, NORMAL, 20_000, "1 year"))
+
+    # Another worker has neither the job nor its result in memory
+    risk._results.clear()
+    shared = risk.get_risk_job(job.key)
+    assert shared.done and shared.result == job.result
+
+    running = risk.RiskJob("running", total=4)
+    running.completed = 1
+    risk._publish(running)
+    assert risk.get_risk_job("running").progress == 0.25
+
+    # A job whose worker exited is gone, so the poll starts it again
+    exited = subprocess.Popen(["true"])
+    exited.wait()
+    risk._shared_jobs().set("orphan", {"owner": exited.pid, "completed": 0, "total": 1, "result": None, "error": None})
+    assert risk.get_risk_job("orphan") is None
+    risk.clear_risk_cache()
+
+def test_failed_job_is_evicted_and_retried(local_client, inline_pool, monkeypatch):
+    """Test that a failed job leaves the running jobs, reports its error and runs again when restarted."""
+    risk.clear_risk_cache()
+    monkeypatch.setattr(db, "get_client", lambda: local_client)
+    monkeypatch.setattr(local_client, "close", lambda: None)
+    shares = {ticker: 10 for ticker in db.get_tickers(local_client)[:3]}
+
+    def failing(close_matrix, shares):
+        raise ValueError("No history")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(risk, "prepare_inputs", failing)
+        failed = wait_for(risk.start_risk_job(shares, HISTORICAL, 1, "1 year"))
+    assert failed.error == "No history" and failed.key not in risk._jobs
+    assert risk.get_risk_job(failed.key).error == "No history"
+
+    retried = wait_for(risk.start_risk_job(shares, HISTORICAL, 1, "1 year"))
+    assert retried.error is None and retried.result is not None
+    assert risk.get_risk_job(failed.key).result is retried.result
+    risk.clear_risk_cache()
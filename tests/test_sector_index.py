@@ -0,0 +1,146 @@
+import numpy as np
+import pytest
+import services.db as db
+import services.sector_index as sector_index
+from services.sector_index import CAP_WEIGHT, EQUAL_WEIGHT, MARKET, SectorIndex, rotation
+
+@pytest.fixture
+def universe():
+    """Fixture to create 60 days of closes and volumes for four tickers in two sectors, one listed late and one with a gap."""
+    dates = np.arange(np.datetime64("2026-01-01"), np.datetime64("2026-03-02"))
+    rng = np.random.default_rng(9)
+    close = 50 * np.cumprod(1 + 0.01 * rng.normal(size=(len(dates), 4)), axis=0)
+    volume = rng.integers(1_000, 10_000, size=close.shape).astype(float)
+    close[:10, 3] = np.nan
+    close[30, 1] = np.nan
+    sectors = {"A": "Tech", "B": "Tech", "C": "Energy", "D": "Energy"}
+    return dates, ["A", "B", "C", "D"], close, volume, sectors
+
+def naive_levels(close, volume, members, cap_window, weighted):
+    # Day by day, the members' returns on days they and the day before traded, averaged or dollar-volume weighted
+    level, levels = 100.0, [100.0]
+    dollar_volume = np.where(np.isnan(close), 0, close * volume)
+    last = np.full(close.shape[1], np.nan)
+    last[~np.isnan(close[0])] = close[0][~np.isnan(close[0])]
+    for day in range(1, len(close)):
+        returns = close[day] / last - 1
+        weights = dollar_volume[max(day - cap_window, 0):day].sum(axis=0) if weighted else np.ones(close.shape[1])
+        valid = members & ~np.isnan(returns)
+        if valid.any() and weights[valid].sum() > 0:
+            level *= 1 + np.average(returns[valid], weights=weights[valid])
+        levels.append(level)
+        last = np.where(np.isnan(close[day]), last, close[day])
+    return np.array(levels)
+
+@pytest.mark.parametrize("weighting", [EQUAL_WEIGHT, CAP_WEIGHT])
+def test_levels_match_day_by_day_averages(universe, weighting):
+    """Test that the matrix group-by gives the same sector and market levels as averaging each day on its own."""
+    dates, tickers, close, volume, sectors = universe
+    index = SectorIndex(sectors, cap_window=5).extend(dates, tickers, close, volume)
+    assert index.listed_sectors() == ["Energy", "Tech"]
+
+    for sector, members in [("Tech", [True, True, False, False]), ("Energy", [False, False, True, True]), (MARKET, [True] * 4)]:
+        expected = naive_levels(close, volume, np.array(members), 5, weighting == CAP_WEIGHT)
+        assert index.levels[weighting][:, index.sectors.index(sector)] == pytest.approx(expected)
+
+def test_incremental_updates_match_a_full_build(universe):
+    """Test that appending days in batches, including a ticker first seen in a later batch, gives the same series."""
+    dates, tickers, close, volume, sectors = universe
+    full = SectorIndex(sectors, cap_window=5).extend(dates, tickers, close, volume)
+
+    first = SectorIndex(sectors, cap_window=5).extend(dates[:8], tickers[:3], close[:8, :3], volume[:8, :3])
+    # Overlapping days are skipped, so a batch may start before the last indexed day
+    second = first.extend(dates[5:40], tickers, close[5:40], volume[5:40])
+    third = second.extend(dates[40:], tickers, close[40:], volume[40:])
+
+    assert len(first.dates) == 8 and np.array_equal(third.dates, full.dates)
+    for weighting in [EQUAL_WEIGHT, CAP_WEIGHT]:
+        assert third.levels[weighting] == pytest.approx(full.levels[weighting])
+        # Extending returns a new index; the earlier one still describes its own days
+        assert len(first.levels[weighting]) == 8
+
+def test_returns_on_aligns_market_returns_to_dates(universe):
+    """Test that market returns are looked up by date, with NaN on days the index does not cover."""
+    dates, tickers, close, volume, sectors = universe
+    index = SectorIndex(sectors).extend(dates, tickers, close, volume)
+    market = index.levels[EQUAL_WEIGHT][:, -1]
+    asked = np.concatenate([dates[[0, 1, 30]], [np.datetime64("2027-01-01")]])
+    returns = index.returns_on(asked)
+
+    assert np.isnan(returns[0]) and np.isnan(returns[3])
+    assert returns[1:3] == pytest.approx([market[1] / market[0] - 1, market[30] / market[29] - 1])
+    assert np.isnan(SectorIndex(sectors).returns_on(dates[:2])).all()
+
+def test_rotation_matches_trailing_averages(universe):
+    """Test the rotation ratio and momentum against trailing means computed per day."""
+    dates, tickers, close, volume, sectors = universe
+    index = SectorIndex(sectors).extend(dates, tickers, close, volume)
+    levels = index.levels[EQUAL_WEIGHT]
+    ratio, momentum = rotation(levels[:, :2], levels[:, -1], window=10, lag=3)
+
+    strength = levels[:, :2] / levels[:, -1:]
+    assert np.isnan(ratio[:9]).all() and np.isnan(momentum[:12]).all()
+    for day in range(9, len(dates)):
+        assert ratio[day] == pytest.approx(strength[day] / strength[day - 9:day + 1].mean(axis=0) * 100)
+    assert momentum[20] == pytest.approx(ratio[20] / ratio[17] * 100)
+
+def test_index_is_cached_per_version_and_extended_with_new_days(local_client, monkeypatch):
+    """Test that a data version is built once and a new version only fetches the days after the last indexed one."""
+    sector_index.clear_sector_index_cache()
+    fetches = []
+    history = sector_index.universe_history(local_client)
+
+    def universe_history(client, since=None):
+        fetches.append(since)
+        if since is None:
+            return history[0][:-5], history[1], history[2][:-5], history[3][:-5]
+        return history[0][-5:], history[1], history[2][-5:], history[3][-5:]
+
+    monkeypatch.setattr(sector_index, "universe_history", universe_history)
+    monkeypatch.setattr(db, "get_data_version", lambda client: "v1")
+    first = sector_index.get_sector_index(local_client)
+    assert sector_index.get_sector_index(local_client) is first
+    monkeypatch.setattr(db, "get_data_version", lambda client: "v2")
+    second = sector_index.get_sector_index(local_client)
+
+    assert fetches == [None, first.dates[-1]]
+    expected = SectorIndex(first.sector_of).extend(*history)
+    assert np.array_equal(second.dates, expected.dates)
+    assert second.levels[CAP_WEIGHT] == pytest.approx(expected.levels[CAP_WEIGHT])
+    sector_index.clear_sector_index_cache()
+
+def test_failed_history_fetch_is_not_cached(local_client, monkeypatch):
+    """Test that an index is not cached from a failed fetch and the next request builds it."""
+    sector_index.clear_sector_index_cache()
+    monkeypatch.setattr(db, "get_data_version", lambda client: "v1")
+    original = db.get_universe_history
+
+    def failing(client, since=None):
+        raise ValueError("Price history is unavailable right now.")
+
+    monkeypatch.setattr(db, "get_universe_history", failing)
+    with pytest.raises(ValueError):
+        sector_index.get_sector_index(local_client)
+    monkeypatch.setattr(db, "get_universe_history", lambda client, since=None: original(client, since).clear())
+    with pytest.raises(ValueError):
+        sector_index.get_sector_index(local_client)
+
+    monkeypatch.setattr(db, "get_universe_history", original)
+    assert len(sector_index.get_sector_index(local_client).dates)
+    sector_index.clear_sector_index_cache()
+
+def test_universe_history_since_matches_the_full_history(local_client, tmp_path, monkeypatch):
+    """Test that fetching the days after a date returns the tail of the full history, from the backend and the price store."""
+    from services.price_store import write_generation
+    dates, tickers, close, volume = sector_index.universe_history(local_client)
+    since = dates[-10]
+    tail = sector_index.universe_history(local_client, since)
+    assert np.array_equal(tail[0], dates[-9:]) and tail[1] == tickers
+    np.testing.assert_array_equal(tail[2], close[-9:])
+
+    store_dir = str(tmp_path / "prices")
+    write_generation(store_dir, db.get_price_history(local_client))
+    monkeypatch.setattr(sector_index, "PRICE_STORE_DIR", store_dir)
+    stored = sector_index.universe_history(local_client, since)
+    assert np.array_equal(stored[0], tail[0]) and stored[1] == tickers
+    np.testing.assert_array_equal(stored[2], tail[2])
@@ -0,0 +1,81 @@
+import threading
+import time
+import uuid
+from dash.exceptions import PreventUpdate
+import services.db as db
+from services.sequencing import Sequencer, latest_only, raise_if_superseded
+
+def test_new_generation_cancels_the_previous_one():
+    """Test that starting a call cancels the queries of the call it supersedes."""
+    sequencer = Sequencer(debounce_seconds=0, ttl=60, max_sessions=10)
+    first = sequencer.begin("tab", "update_heatmap")
+    second = sequencer.begin("tab", "update_heatmap")
+    other = sequencer.begin("other-tab", "update_heatmap")
+
+    assert (first.number, second.number, other.number) == (1, 2, 1)
+    assert first.handle.cancelled() and not second.handle.cancelled()
+    assert not sequencer.is_latest("tab", "update_heatmap", first)
+    assert sequencer.is_latest("tab", "update_heatmap", second)
+    assert sequencer.stats() == {'started': 3, 'superseded': 1, 'dropped': 0}
+
+def test_debounce_only_waits_inside_a_burst():
+    """Test that a call only waits when the previous one is still running."""
+    sequencer = Sequencer(debounce_seconds=0.2, ttl=60, max_sessions=10)
+    sequencer.begin("tab", "update_heatmap").finished = True
+    start = time.perf_counter()
+    sequencer.begin("tab", "update_heatmap")
+    assert time.perf_counter() - start < 0.1
+
+    start = time.perf_counter()
+    sequencer.begin("tab", "update_heatmap")
+    assert time.perf_counter() - start >= 0.2
+
+def test_superseded_call_is_dropped_and_its_queries_cancelled():
+    """Test that a slow call overtaken by a newer one returns no update and cancels its pending fetchers."""
+    session_id = uuid.uuid4().hex
+    release = threading.Event()
+    started = threading.Event()
+    handles, outcomes = [], []
+
+    def fetch(value):
+        release.wait(5)
+        return value
+
+    @latest_only
+    def callback(value):
+        handle = db.submit_query(fetch, value)
+        handles.append(handle)
+        started.set()
+        handle.result(5)
+        raise_if_superseded()
+        return value
+
+    def run(value):
+        try:
+            outcomes.append(callback(value, session_id))
+        except PreventUpdate:
+            outcomes.append('dropped')
+
+    slow = threading.Thread(target=run, args=(1,))
+    slow.start()
+    started.wait(5)
+    fast = threading.Thread(target=run, args=(2,))
+    fast.start()
+    # Let the fetchers finish once the newer call has started its own
+    while len(handles) < 2:
+        time.sleep(0.01)
+    release.set()
+    slow.join(5)
+    fast.join(5)
+
+    assert sorted(outcomes, key=str) == [2, 'dropped']
+    assert handles[0].cancelled()
+
+def test_calls_without_a_session_run_unsequenced():
+    """Test that calls made before the tab has a session id run as usual."""
+    @latest_only
+    def callback(value):
+        raise_if_superseded()
+        return value * 2
+
+    assert callback(4, None) == 8
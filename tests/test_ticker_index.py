@@ -0,0 +1,80 @@
+import json
+import plotly
+import pytest
+import services.db as db
+from market_dashboard.layout import create_layout as create_market_dashboard_layout
+from services.ticker_index import TickerIndex, get_ticker_index, set_ticker_index
+from utils.callback_utils import search_ticker_options
+from utils.synthetic_data import generate_tickers
+
+@pytest.fixture
+def ticker_index():
+    """Fixture to install a small shared ticker index and restore the previous one."""
+    previous = get_ticker_index()
+    yield set_ticker_index(TickerIndex(
+        ["MSFT", "AAPL", "AMZN", "AMD", "META", "GOOG"],
+        names={"MSFT": "Microsoft Corp.", "AAPL": "Apple Inc.", "AMZN": "Amazon.com Inc.",
+               "AMD": "Advanced Micro Devices", "META": "Meta Platforms", "GOOG": "Alphabet Inc."},
+        sectors={"MSFT": "Technology", "AAPL": "Technology", "AMZN": "Consumer Cyclical",
+                 "AMD": "Technology", "META": "Communication Services", "GOOG": "Communication Services"},
+    ))
+    set_ticker_index(previous)
+
+def test_prefix_search(ticker_index):
+    """Test that searches are case-insensitive, ordered and limited."""
+    assert ticker_index.search("am") == ["AMD", "AMZN"]
+    assert ticker_index.search("A", limit=2) == ["AAPL", "AMD"]
+    assert ticker_index.search("") == ticker_index.tickers
+    assert ticker_index.search("X") == []
+
+def test_name_and_sector_search(ticker_index):
+    """Test that symbol matches come first, then name and sector word matches."""
+    assert ticker_index.search("apple") == ["AAPL"]
+    assert ticker_index.search("a") == ["AAPL", "AMD", "AMZN", "GOOG"]
+    assert ticker_index.search("tech micro") == ["AMD", "MSFT"]
+    assert ticker_index.search("communication") == ["GOOG", "META"]
+
+def test_fuzzy_fallback(ticker_index):
+    """Test that misspelled symbols fall back to similar symbols."""
+    assert ticker_index.search("AAPLE") == ["AAPL"]
+    assert ticker_index.search("MSTF")[0] == "MSFT"
+    assert ticker_index.search("QQQQQ") == []
+
+def test_metadata_falls_back_to_symbols(local_client, monkeypatch):
+    """Test that a failed metadata query still indexes every ticker, without names or sectors."""
+    run_query = db._run_query
+
+    def without_names(client, query, *args, **kwargs):
+        if "name" in query:
+            raise RuntimeError("Unrecognized name: name")
+        return run_query(client, query, *args, **kwargs)
+
+    monkeypatch.setattr(db, "_run_query", without_names)
+    metadata = db.get_ticker_metadata(local_client)
+    index = TickerIndex.from_metadata(metadata)
+    assert index.tickers == db.get_tickers(local_client)
+    assert metadata["name"].null_count() == len(metadata)
+    assert index.names == {} and index.sectors == {}
+    assert index.search("none") == []
+
+def test_version_tracks_universe():
+    """Test that the version only changes when the ticker set changes."""
+    assert TickerIndex(["B", "A"]).version == TickerIndex(["A", "B"]).version
+    assert TickerIndex(["A"]).version != TickerIndex(["A", "B"]).version
+
+def test_search_options_keep_selection(ticker_index):
+    """Test that selected tickers stay in the options so the dropdown can display them."""
+    options = search_ticker_options("M", ["GOOG"])
+    assert [option["value"] for option in options] == ["GOOG", "META", "MSFT", "AMD"]
+    assert options[0]["label"] == "GOOG - Alphabet Inc."
+
+def test_layout_does_not_embed_universe():
+    """Test that the market layout stays small for a large ticker universe."""
+    tickers = generate_tickers(10000, seed=1)
+    layout = json.dumps(create_market_dashboard_layout(tickers), cls=plotly.utils.PlotlyJSONEncoder)
+    small_layout = json.dumps(create_market_dashboard_layout(tickers[:2]), cls=plotly.utils.PlotlyJSONEncoder)
+    assert tickers[0] in layout
+    assert tickers[-1] not in layout
+    # Only the default selections are embedded, so the layout does not grow with the universe
+    assert len(layout) == len(small_layout)
+    assert len(layout) < 25000
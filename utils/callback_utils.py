@@ -1,4 +1,5 @@
-from typing import Tuple
+from typing import Dict, List, Tuple, Union
+from services.ticker_index import SEARCH_LIMIT, get_ticker_index
 
 def get_period(period_key: str) -> str:
     period_mapping = {
@@ -20,4 +21,18 @@ def get_volume_range(volume_range_key: str) -> Tuple[int, int]:
         'low': (100001, 500000),
         'very_low': (0, 100000),
     }
-    return volume_range_mapping.get(volume_range_key, (0, float('inf')))
\ No newline at end of file
+    return volume_range_mapping.get(volume_range_key, (0, float('inf')))
+
+def get_ticker_options(tickers: List[str]) -> List[Dict[str, str]]:
+    index = get_ticker_index()
+    return [{'label': index.label(ticker), 'value': ticker} for ticker in tickers]
+
+def search_ticker_options(
+    search_value: str,
+    selected: Union[str, List[str], None],
+    limit: int = SEARCH_LIMIT
+) -> List[Dict[str, str]]:
+    """Options for a ticker dropdown: the selected tickers followed by the best search matches."""
+    selected = [selected] if isinstance(selected, str) else list(selected or [])
+    matches = get_ticker_index().search(search_value or '', limit)
+    return get_ticker_options(list(dict.fromkeys(selected + matches)))
@@ -1,7 +1,15 @@
-from typing import Dict, Union, List
+import base64
+import datetime as dt
+from typing import Any, Dict, Union, List
+import numpy as np
 import plotly.graph_objects as go
 import pandas as pd
 
+# Floats below this magnitude keep cent precision as float32
+FLOAT32_SAFE_LIMIT = 1e5
+# Integer typed arrays supported by plotly.js, smallest first
+INTEGER_DTYPES = ['i1', 'u1', 'i2', 'u2', 'i4', 'u4']
+
 def style_fig(fig: go.Figure, title: str, orientation: str = 'v') -> go.Figure:
     """Style the figure with a dark theme and custom layout."""
     xaxis_title = None if orientation == "v" else "Values"
@@ -50,4 +58,52 @@ def prepare_table_data(df: pd.DataFrame) -> List[Dict[str, Union[str, float]]]:
 def convert_hex_to_rgba(hex_color, opacity=1.0):
     hex_color = hex_color.lstrip('#')
     rgb_tuple = tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
-    return f"rgba({rgb_tuple[0]}, {rgb_tuple[1]}, {rgb_tuple[2]}, {opacity})"
\ No newline at end of file
+    return f"rgba({rgb_tuple[0]}, {rgb_tuple[1]}, {rgb_tuple[2]}, {opacity})"
+
+def encode_figure(fig: go.Figure) -> Dict[str, Any]:
+    """Convert a figure to a dict whose numeric and date arrays are base64 typed arrays.
+
+    Plotly.js decodes {'dtype', 'bdata', 'shape'} objects natively. Dates are
+    sent as epoch milliseconds on axes forced to the date type, and floats are
+    downcast to float32 when that keeps cent precision.
+    """
+    figure = fig.to_dict()
+    layout = figure.setdefault('layout', {})
+    for trace in figure['data']:
+        for key, value in trace.items():
+            if not isinstance(value, np.ndarray) or value.size == 0:
+                continue
+            encoded, is_date = _encode_array(value)
+            if encoded is None:
+                continue
+            trace[key] = encoded
+            if is_date and key in ('x', 'y'):
+                axis = trace.get(f'{key}axis', key)
+                layout.setdefault(f'{key}axis{axis[1:]}', {})['type'] = 'date'
+    return figure
+
+def _encode_array(values: np.ndarray):
+    # Returns the typed array dict, or None when the array is not numeric, and whether it held dates
+    is_date = False
+    if values.dtype == object and isinstance(values.flat[0], dt.date):
+        values = values.astype('datetime64[ms]')
+    if np.issubdtype(values.dtype, np.datetime64):
+        values = values.astype('datetime64[ms]').astype(np.int64).astype(np.float64)
+        dtype, is_date = 'f8', True
+    elif np.issubdtype(values.dtype, np.integer):
+        dtype = next(
+            (name for name in INTEGER_DTYPES
+             if np.iinfo(name).min <= values.min() and values.max() <= np.iinfo(name).max),
+            'f8'
+        )
+    elif np.issubdtype(values.dtype, np.floating):
+        finite = values[np.isfinite(values)]
+        dtype = 'f4' if finite.size == 0 or np.abs(finite).max() < FLOAT32_SAFE_LIMIT else 'f8'
+    else:
+        return None, False
+
+    data = np.ascontiguousarray(values, dtype=np.dtype(dtype).newbyteorder('<'))
+    encoded = {'dtype': dtype, 'bdata': base64.b64encode(data.tobytes()).decode('ascii')}
+    if data.ndim > 1:
+        encoded['shape'] = ', '.join(str(size) for size in data.shape)
+    return encoded, is_date
@@ -0,0 +1,24 @@
+from typing import Any, Callable
+
+def patch_for_gevent() -> None:
+    """Make sockets, threads and gRPC cooperative; must run before the app is imported."""
+    from gevent import monkey
+    monkey.patch_all()
+
+    # The BigQuery Storage API used by to_dataframe talks gRPC, which needs its own gevent integration
+    import grpc.experimental.gevent as grpc_gevent
+    grpc_gevent.init_gevent()
+
+def is_patched() -> bool:
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched('threading')
+
+def run_blocking(fn: Callable, *args, **kwargs) -> Any:
+    """Run a call that blocks in C code (e.g. DuckDB) on a real thread when gevent is active."""
+    if not is_patched():
+        return fn(*args, **kwargs)
+    import gevent
+    return gevent.get_hub().threadpool.apply(fn, args, kwargs)
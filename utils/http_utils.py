@@ -0,0 +1,83 @@
+import gzip
+from typing import Iterable, List, Optional
+from flask import Flask, Request, Response, request
+from config import COMPRESSION_ALGORITHMS, COMPRESSION_ENABLED, COMPRESSION_LEVEL, COMPRESSION_MIN_BYTES
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+# Mimetypes worth compressing; images and fonts are already compressed
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    'application/javascript',
+    'text/javascript',
+    'text/css',
+    'text/html',
+    'text/plain',
+    'image/svg+xml',
+}
+
+# GET routes whose responses depend on live data and must never be cached
+NO_STORE_PATHS = ('/metrics', '/query-costs')
+
+def supported_encodings(algorithms: Iterable[str] = COMPRESSION_ALGORITHMS) -> List[str]:
+    """Configured encodings in order of preference, without brotli when it is not installed."""
+    return [name for name in algorithms if name == 'gzip' or (name == 'br' and brotli is not None)]
+
+def choose_encoding(req: Request, encodings: List[str]) -> Optional[str]:
+    """Pick the first configured encoding the client accepts."""
+    for name in encodings:
+        if req.accept_encodings[name] > 0:
+            return name
+    return None
+
+def compress(data: bytes, encoding: str, level: int = COMPRESSION_LEVEL) -> bytes:
+    if encoding == 'br':
+        # Brotli quality runs 0-11; map the gzip level onto it
+        return brotli.compress(data, quality=min(11, level + 2))
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+def register_http_caching(
+    server: Flask,
+    enabled: bool = COMPRESSION_ENABLED,
+    min_bytes: int = COMPRESSION_MIN_BYTES,
+    level: int = COMPRESSION_LEVEL,
+    algorithms: Iterable[str] = COMPRESSION_ALGORITHMS
+) -> None:
+    """Add ETag revalidation for GET responses and gzip/brotli compression above min_bytes."""
+    encodings = supported_encodings(algorithms) if enabled else []
+
+    def finalize_response(response: Response) -> Response:
+        if response.direct_passthrough or response.status_code != 200 or 'Content-Encoding' in response.headers:
+            return response
+
+        compressible = response.mimetype in COMPRESSIBLE_MIMETYPES
+        encoding = choose_encoding(request, encodings) if compressible else None
+        if encoding and (response.calculate_content_length() or 0) < min_bytes:
+            encoding = None
+
+        if request.method == 'GET':
+            if request.path.startswith(NO_STORE_PATHS):
+                response.headers['Cache-Control'] = 'no-store'
+            else:
+                # Layout, dependencies and index pages only change on deploy, so clients revalidate
+                # with If-None-Match. The tag names the encoding so each representation has its own.
+                response.add_etag()
+                if encoding:
+                    etag, _ = response.get_etag()
+                    response.set_etag(f'{etag}-{encoding}')
+                response.headers.setdefault('Cache-Control', 'no-cache')
+                response.make_conditional(request)
+                if response.status_code == 304:
+                    return response
+
+        if compressible and encodings:
+            response.vary.add('Accept-Encoding')
+        if encoding:
+            response.set_data(compress(response.get_data(), encoding, level))
+            response.headers['Content-Encoding'] = encoding
+        return response
+
+    server.after_request(finalize_response)
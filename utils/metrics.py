@@ -0,0 +1,286 @@
+import bisect
+import contextvars
+import functools
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Tuple
+from config import METRICS_ENABLED, METRICS_JSON_LOGS
+
+logger = logging.getLogger('sma.metrics')
+
+# Upper bounds in seconds of the duration histogram buckets
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_enabled = METRICS_ENABLED
+_current_span = contextvars.ContextVar('current_span', default=None)
+_current_callback = contextvars.ContextVar('current_callback', default='')
+
+class _Histogram:
+    def __init__(self) -> None:
+        self.buckets = [0] * len(DURATION_BUCKETS)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(DURATION_BUCKETS, value)
+        if index < len(self.buckets):
+            self.buckets[index] += 1
+        self.count += 1
+        self.total += value
+
+class MetricsRegistry:
+    """In-process store of counters and duration histograms rendered in Prometheus format."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[Tuple, float]] = {}
+        self._histograms: Dict[str, Dict[Tuple, _Histogram]] = {}
+        self._help: Dict[str, str] = {}
+        self._collectors: List[Callable[[], List[Tuple[str, Dict[str, str], float]]]] = []
+
+    def describe(self, metric: str, help_text: str) -> None:
+        self._help[metric] = help_text
+
+    def inc(self, metric: str, labels: Dict[str, str], value: float = 1) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(metric, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, metric: str, labels: Dict[str, str], value: float) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(metric, {})
+            if key not in series:
+                series[key] = _Histogram()
+            series[key].observe(value)
+
+    def add_collector(self, collector: Callable[[], List[Tuple[str, Dict[str, str], float]]]) -> None:
+        """Register a function returning (metric, labels, value) gauges computed at scrape time."""
+        self._collectors.append(collector)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for metric, series in sorted(self._counters.items()):
+                lines += self._header(metric, 'counter')
+                for key, value in series.items():
+                    lines.append(f'{metric}{_format_labels(key)} {value}')
+            for metric, series in sorted(self._histograms.items()):
+                lines += self._header(metric, 'histogram')
+                for key, histogram in series.items():
+                    cumulative = 0
+                    for bound, count in zip(DURATION_BUCKETS, histogram.buckets):
+                        cumulative += count
+                        lines.append(f'{metric}_bucket{_format_labels(key + (("le", str(bound)),))} {cumulative}')
+                    lines.append(f'{metric}_bucket{_format_labels(key + (("le", "+Inf"),))} {histogram.count}')
+                    lines.append(f'{metric}_sum{_format_labels(key)} {histogram.total}')
+                    lines.append(f'{metric}_count{_format_labels(key)} {histogram.count}')
+
+        gauges: Dict[str, List[str]] = {}
+        for collector in self._collectors:
+            for metric, labels, value in collector():
+                gauges.setdefault(metric, []).append(
+                    f'{metric}{_format_labels(tuple(sorted(labels.items())))} {value}'
+                )
+        for metric, samples in sorted(gauges.items()):
+            lines += self._header(metric, 'gauge')
+            lines += samples
+        return '\n'.join(lines) + '\n'
+
+    def _header(self, metric: str, metric_type: str) -> List[str]:
+        header = [f'# TYPE {metric} {metric_type}']
+        if metric in self._help:
+            header.insert(0, f'# HELP {metric} {self._help[metric]}')
+        return header
+
+def _format_labels(key: Tuple) -> str:
+    if not key:
+        return ''
+    pairs = ','.join(f'{name}="{_escape(value)}"' for name, value in key)
+    return '{' + pairs + '}'
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+registry = MetricsRegistry()
+registry.describe('sma_stage_duration_seconds', 'Duration of instrumented stages.')
+registry.describe('sma_stage_errors_total', 'Instrumented calls that raised an exception.')
+registry.describe('sma_stage_rows_total', 'Rows returned by instrumented data stages.')
+registry.describe('sma_query_bytes_processed_total', 'Bytes processed by backend query jobs.')
+registry.describe('sma_query_backend_cache_hits_total', 'Query jobs answered from the backend result cache.')
+registry.describe('sma_logged_errors_total', 'Errors logged by the service layer.')
+
+def set_enabled(enabled: bool) -> None:
+    global _enabled
+    _enabled = enabled
+
+def is_enabled() -> bool:
+    return _enabled
+
+class Span:
+    """Timing scope for one stage; attributes are attached to the JSON log record."""
+
+    def __init__(self, name: str, stage: str) -> None:
+        self.name = name
+        self.stage = stage
+        self.attributes = {}
+
+    def set(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+class _NoopSpan:
+    def set(self, **attributes) -> None:
+        pass
+
+_NOOP_SPAN = _NoopSpan()
+
+@contextmanager
+def span(name: str, stage: str) -> Iterator[Span]:
+    """Time a block of code as one stage, e.g. span('get_price_data', 'query')."""
+    if not _enabled:
+        yield _NOOP_SPAN
+        return
+
+    current = Span(name, stage)
+    token = _current_span.set(current)
+    start = time.perf_counter()
+    error = None
+    try:
+        yield current
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        _current_span.reset(token)
+        labels = {'stage': stage, 'name': name}
+        registry.observe('sma_stage_duration_seconds', labels, duration)
+        if error is not None:
+            registry.inc('sma_stage_errors_total', labels)
+        if 'rows' in current.attributes:
+            registry.inc('sma_stage_rows_total', labels, current.attributes['rows'])
+        if METRICS_JSON_LOGS:
+            logger.info(json.dumps({
+                'event': 'span',
+                'stage': stage,
+                'name': name,
+                'callback': _current_callback.get(),
+                'duration_ms': round(duration * 1000, 3),
+                'error': repr(error) if error is not None else None,
+                **current.attributes,
+            }, default=str))
+
+def instrument(stage: str, name: str = None, count_rows: bool = False) -> Callable:
+    """Decorate a function so each call is recorded as a span of the given stage."""
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with span(span_name, stage) as current:
+                result = func(*args, **kwargs)
+                if count_rows:
+                    current.set(rows=_count_rows(result))
+                return result
+        return wrapper
+    return decorator
+
+def _count_rows(result) -> int:
+    if hasattr(result, 'height'):
+        return result.height
+    try:
+        return len(result)
+    except TypeError:
+        return 0
+
+def record_query_job(job) -> None:
+    """Record bytes processed and backend cache usage of a finished query job."""
+    if not _enabled:
+        return
+    bytes_processed = getattr(job, 'total_bytes_processed', None) or 0
+    cache_hit = bool(getattr(job, 'cache_hit', False))
+    current = _current_span.get()
+    name = current.name if current is not None else ''
+    labels = {'name': name, 'callback': _current_callback.get()}
+    registry.inc('sma_query_bytes_processed_total', labels, bytes_processed)
+    if cache_hit:
+        registry.inc('sma_query_backend_cache_hits_total', labels)
+    if current is not None:
+        current.set(bytes_processed=bytes_processed, backend_cache_hit=cache_hit)
+
+def instrument_callbacks(app) -> None:
+    """Wrap every registered Dash callback in a 'callback' span."""
+    for spec in app.callback_map.values():
+        # Clientside callbacks run in the browser
+        if 'callback' not in spec:
+            continue
+        callback = spec['callback']
+        func = getattr(callback, '__wrapped__', callback)
+        spec['callback'] = _instrument_callback(callback, func.__name__)
+
+def _instrument_callback(callback: Callable, name: str) -> Callable:
+    @functools.wraps(callback)
+    def wrapper(*args, **kwargs):
+        if not _enabled:
+            return callback(*args, **kwargs)
+        token = _current_callback.set(name)
+        try:
+            with span(name, 'callback'):
+                return callback(*args, **kwargs)
+        finally:
+            _current_callback.reset(token)
+    return wrapper
+
+def current_callback() -> str:
+    return _current_callback.get()
+
+class _ErrorCountingHandler(logging.Handler):
+    def emit(self, record: logging.LogRecord) -> None:
+        if _enabled:
+            registry.inc('sma_logged_errors_total', {'logger': record.name})
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        message = record.getMessage()
+        if message.startswith('{'):
+            return message
+        return json.dumps({
+            'event': 'log',
+            'level': record.levelname,
+            'logger': record.name,
+            'message': message,
+            'time': self.formatTime(record),
+        })
+
+def configure_logging() -> None:
+    """Count service layer errors and optionally switch logs to structured JSON."""
+    logging.getLogger('services').addHandler(_ErrorCountingHandler(level=logging.ERROR))
+    root = logging.getLogger()
+    if METRICS_JSON_LOGS:
+        handler = logging.StreamHandler()
+        handler.setFormatter(JsonFormatter())
+        root.handlers = [handler]
+        root.setLevel(logging.INFO)
+    elif not root.handlers:
+        logging.basicConfig(format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+def register_metrics_route(server, path: str = '/metrics') -> None:
+    """Expose the registry on the Flask server in Prometheus text format."""
+    from flask import Response
+
+    def metrics_view():
+        return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+    server.add_url_rule(path, 'metrics', metrics_view)
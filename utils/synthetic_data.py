@@ -0,0 +1,115 @@
+import argparse
+import datetime as dt
+import os
+import string
+from typing import List
+import numpy as np
+import polars as pl
+
+SECTORS = [
+    'Technology', 'Healthcare', 'Financial Services', 'Consumer Cyclical',
+    'Industrials', 'Communication Services', 'Consumer Defensive', 'Energy',
+    'Utilities', 'Real Estate', 'Basic Materials',
+]
+TRADING_DAYS_PER_YEAR = 252
+
+def generate_tickers(n_tickers: int, seed: int = 0) -> List[str]:
+    """Generate unique, sorted 3 to 4 letter ticker symbols."""
+    rng = np.random.default_rng(seed)
+    letters = np.array(list(string.ascii_uppercase))
+    tickers = set()
+    while len(tickers) < n_tickers:
+        length = rng.integers(3, 5)
+        tickers.add(''.join(rng.choice(letters, size=length)))
+    return sorted(tickers)
+
+def generate_sectors_data(tickers: List[str], seed: int = 0) -> pl.DataFrame:
+    """Generate the sectors table with a sector, industry and company name per ticker."""
+    rng = np.random.default_rng(seed)
+    sector_ids = rng.integers(0, len(SECTORS), size=len(tickers))
+    return pl.DataFrame({
+        'ticker': tickers,
+        'name': [f'{ticker.capitalize()} Corp.' for ticker in tickers],
+        'sector': [SECTORS[i] for i in sector_ids],
+        'industry': [f'{SECTORS[i]} {rng.integers(1, 4)}' for i in sector_ids],
+    })
+
+def generate_stocks_data(
+    tickers: List[str],
+    n_years: float,
+    end_date: dt.date = None,
+    seed: int = 0
+) -> pl.DataFrame:
+    """Generate daily OHLCV rows for every ticker over the last n_years of business days."""
+    rng = np.random.default_rng(seed)
+    end_date = end_date or dt.date.today()
+    n_days = int(n_years * TRADING_DAYS_PER_YEAR)
+    dates = np.busday_offset(np.datetime64(end_date, 'D'), np.arange(-n_days + 1, 1), roll='backward')
+    n_tickers = len(tickers)
+
+    # Geometric Brownian motion with a market factor so tickers are correlated
+    drift = rng.normal(0.0003, 0.0002, size=(1, n_tickers))
+    volatility = rng.uniform(0.01, 0.03, size=(1, n_tickers))
+    beta = rng.uniform(0.5, 1.5, size=(1, n_tickers))
+    market = rng.normal(0, 0.01, size=(n_days, 1))
+    returns = drift + beta * market + volatility * rng.standard_normal((n_days, n_tickers))
+    start_price = rng.uniform(5, 500, size=(1, n_tickers))
+    close = start_price * np.exp(np.cumsum(returns, axis=0))
+
+    # Derive the intraday range around the previous and current close
+    previous_close = np.vstack([start_price, close[:-1]])
+    open_ = previous_close * (1 + rng.normal(0, 0.003, size=close.shape))
+    spread = np.abs(rng.normal(0, 0.01, size=close.shape))
+    high = np.maximum(open_, close) * (1 + spread)
+    low = np.minimum(open_, close) * (1 - spread)
+    base_volume = rng.lognormal(13, 1.5, size=(1, n_tickers))
+    volume = (base_volume * rng.lognormal(0, 0.4, size=close.shape)).astype(np.int64)
+
+    # Flatten (date x ticker) matrices into rows sorted by ticker and date
+    return pl.DataFrame({
+        'date': np.tile(dates, n_tickers),
+        'ticker': np.repeat(np.array(tickers), n_days),
+        'open': open_.T.ravel(),
+        'high': high.T.ravel(),
+        'low': low.T.ravel(),
+        'close': close.T.ravel(),
+        'volume': volume.T.ravel(),
+    }).with_columns(pl.col('date').cast(pl.Date))
+
+def write_local_dataset(
+    data_dir: str,
+    n_tickers: int,
+    n_years: float,
+    end_date: dt.date = None,
+    seed: int = 0,
+    stocks_table: str = 'stocks',
+    sectors_table: str = 'sectors'
+) -> List[str]:
+    """Write synthetic stocks and sectors tables as Parquet files for the local backend.
+
+    The table names are parameters rather than read from config, so a dataset can be
+    generated before the environment the app will be configured from is set.
+    """
+    os.makedirs(data_dir, exist_ok=True)
+    tickers = generate_tickers(n_tickers, seed)
+    generate_sectors_data(tickers, seed).write_parquet(os.path.join(data_dir, f'{sectors_table}.parquet'))
+    generate_stocks_data(tickers, n_years, end_date, seed).write_parquet(
+        os.path.join(data_dir, f'{stocks_table}.parquet'),
+        row_group_size=100_000,
+    )
+    return tickers
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate a synthetic dataset for the local data backend.')
+    parser.add_argument('--tickers', type=int, default=500, help='Number of tickers')
+    parser.add_argument('--years', type=float, default=10, help='Years of daily history per ticker')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default='data', help='Output directory')
+    parser.add_argument('--stocks-table', default=os.getenv('STOCKS_TABLE_ID', 'stocks'), help='Name of the stocks table')
+    parser.add_argument('--sectors-table', default=os.getenv('SECTORS_TABLE_ID', 'sectors'), help='Name of the sectors table')
+    args = parser.parse_args()
+
+    tickers = write_local_dataset(
+        args.out, args.tickers, args.years, seed=args.seed, stocks_table=args.stocks_table, sectors_table=args.sectors_table
+    )
+    print(f"Wrote {len(tickers)} tickers x {args.years} years to {args.out}")